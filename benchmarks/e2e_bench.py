@@ -0,0 +1,412 @@
+"""偽のDiscordサーバーを使ったエンドツーエンドの性能試験
+
+main.py の Bot を実際に起動し（bot.start）、REST・Webhook・Gatewayの通信を
+benchmarks.fake_discord_server のローカルサーバーに向ける。イベントはGatewayから送り、
+完了はサーバーが受けたリクエストで判定するので、discord.py のレート制限の処理
+（X-RateLimit-* ヘッダーと429の待機）を含めた応答時間を計測できる。
+
+シナリオ:
+- pinnedlist: 複数のユーザーが同時に /pinnedlist を実行する
+  （INTERACTION_CREATE から一覧のフォローアップメッセージの送信まで）
+- pinnedlist_guild: 複数のユーザーが同時に /pinnedlist scope:サーバー全体 を実行する
+  （INTERACTION_CREATE から途中経過のメッセージが一覧に置き換わるまで）
+- pinsearch: 複数のユーザーが同時に /pinsearch を実行する
+  （INTERACTION_CREATE から検索結果の応答まで）
+- reactions: 新しいメッセージに📌を付ける（MESSAGE_REACTION_ADD からピン留めのリクエストまで）
+- overflow: ピン留めが上限（50件）のチャンネルで新しいメッセージに📌を付ける
+  （最も前のピン留めをアーカイブして解除し、ピン留めのリクエストを送るまで）
+- bulk_unpin: /pinnedlist → セレクトメニューで全て選択 → 「適用」でまとめて解除する
+  （最初の INTERACTION_CREATE から結果の「📌 N件のピン留めを解除しました。」の表示まで）
+- pinbatch: /pinbatch でメッセージリンクの一覧をまとめてピン留めする（1回の実行）
+  （INTERACTION_CREATE から途中経過のメッセージが結果に置き換わるまで）
+
+シナリオごとに p50/p99、スループット（操作数/秒）、ルートごとのREST呼び出し数と
+サーバーが返した429の数を出力する。
+
+使い方:
+    python -m benchmarks.e2e_bench
+    python -m benchmarks.e2e_bench --scenario bulk_unpin --channels 5 --latency 0.05
+    python -m benchmarks.e2e_bench --time-scale 0.1 --json --max-p99-ms 3000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from collections import Counter
+
+import discord
+
+from benchmarks.fake_discord import FakeDiscord
+from benchmarks.fake_discord_server import DEFAULT_GLOBAL_LIMIT, FakeDiscordServer, RateLimiter
+from benchmarks.reaction_bench import (
+    AUTHOR_ID,
+    GUILD_ID,
+    USER_BASE,
+    ReactionEvent,
+    check_thresholds,
+    import_main,
+    percentile,
+    reset_main_state,
+)
+
+SCENARIOS = ("pinnedlist", "pinnedlist_guild", "pinsearch", "reactions", "overflow", "bulk_unpin", "pinbatch")
+# シナリオごとのチャンネルIDの開始値（ピン留めの上限に当たらないようにチャンネルを分ける）
+CHANNEL_BASES = {"pinnedlist": 2000, "reactions": 3000, "bulk_unpin": 4000, "overflow": 5000, "pinbatch": 6000}
+# Discordのチャンネルあたりのピン留め数の上限
+MAX_PINS = 50
+# チャンネルを作らず、別のシナリオのチャンネルで実行するシナリオ
+SHARED_CHANNELS = {"pinnedlist_guild": "pinnedlist", "pinsearch": "pinnedlist"}
+# 1つの操作の完了を待つ上限（秒）
+OPERATION_TIMEOUT = 60.0
+SELECT_MENU = 3
+BUTTON = 2
+
+
+class E2EBench:
+    """偽のDiscordサーバーに接続した main.py の Bot でシナリオを実行する"""
+
+    def __init__(self, args):
+        self.args = args
+        self.main = import_main()
+        self.api = FakeDiscord(seed=args.seed)
+        self.server = FakeDiscordServer(self.api, latency=args.latency, limiter=self._limiter())
+        self.channels: dict[str, list[int]] = {}
+        # pinbatch でピン留めするメッセージのリンク
+        self.batch_links: list[str] = []
+        self._task: asyncio.Task | None = None
+        self._patch = None
+
+    def _limiter(self) -> RateLimiter:
+        return RateLimiter(global_limit=self.args.global_limit, time_scale=self.args.time_scale)
+
+    def seed(self):
+        """ギルド・チャンネル・ピン留めメッセージを登録する（GUILD_CREATE で送るため接続前に行う）"""
+        args = self.args
+        for name, base in CHANNEL_BASES.items():
+            self.channels[name] = [base + i for i in range(args.channels)]
+            for channel_id in self.channels[name]:
+                self.api.add_channel(GUILD_ID, channel_id)
+
+        # 一覧を表示するチャンネル: ユーザーが順番に📌を付けたピン留め
+        for channel_id in self.channels["pinnedlist"]:
+            for i in range(args.pins):
+                message_id = self.api.add_message(channel_id, AUTHOR_ID, f"ピン留め {i}")
+                self.api.pin_message(channel_id, message_id)
+                self.api.add_reaction(message_id, USER_BASE + i % args.users)
+
+        # 上限に達したチャンネル: 50件のピン留め
+        for channel_id in self.channels["overflow"]:
+            for i in range(MAX_PINS):
+                message_id = self.api.add_message(channel_id, AUTHOR_ID, f"上限 {i}")
+                self.api.pin_message(channel_id, message_id)
+                self.api.add_reaction(message_id, USER_BASE + i % args.users)
+
+        # まとめて解除するチャンネル: 解除するユーザーだけが📌を付けたピン留め
+        for i, channel_id in enumerate(self.channels["bulk_unpin"]):
+            for j in range(args.unpin):
+                message_id = self.api.add_message(channel_id, AUTHOR_ID, f"解除対象 {j}")
+                self.api.pin_message(channel_id, message_id)
+                self.api.add_reaction(message_id, USER_BASE + i)
+
+        # まとめてピン留めするチャンネル: ピン留めされていないメッセージ（チャンネルに順に振り分ける）
+        channels = self.channels["pinbatch"]
+        for i in range(args.batch):
+            channel_id = channels[i % len(channels)]
+            message_id = self.api.add_message(channel_id, AUTHOR_ID, f"移行 {i}")
+            self.batch_links.append(f"https://discord.com/channels/{GUILD_ID}/{channel_id}/{message_id}")
+
+    async def start(self):
+        """サーバーとBotを起動し、起動時のウォームアップが終わるまで待つ"""
+        main = self.main
+        self.seed()
+        await self.server.start()
+        reset_main_state(main, self.args.window)
+        if main.bot.is_closed():
+            main.bot.clear()
+        # 計測は読み込みが終わってから始めるため、ウォームアップの間隔は空けない
+        main.warmup.rate = 0
+        # GUILD_CREATE を待つ時間（既定の2秒）を短くする
+        main.bot._connection.guild_ready_timeout = 0.1
+        self._patch = self.server.patch_discord()
+        self._patch.__enter__()
+        self._task = asyncio.create_task(main.bot.start("fake-token"))
+        ready = asyncio.ensure_future(main.bot.wait_until_ready())
+        await asyncio.wait([ready, self._task], timeout=OPERATION_TIMEOUT, return_when=asyncio.FIRST_COMPLETED)
+        if self._task.done():
+            ready.cancel()
+            self._task.result()  # 起動時の例外をそのまま送出する
+        if not ready.done():
+            ready.cancel()
+            raise asyncio.TimeoutError("Botの起動が完了しませんでした")
+        # on_ready で始まるピン留めのウォームアップを待つ
+        while main.warmup.total == 0:
+            await asyncio.sleep(0.01)
+        await main.warmup.wait()
+
+    async def close(self):
+        main = self.main
+        try:
+            # 残っている通知の削除はRESTを使うため、Botを閉じる前に行う
+            await main.notifier.close()
+            # 表示したままの一覧のViewのタイムアウトを止める
+            store = main.bot._connection._view_store
+            views = {item.view for items in store._views.values() for item in items.values()}
+            for view in views - {None}:
+                view.stop()
+            await main.bot.close()
+            if self._task is not None:
+                await self._task
+            await main.loop_monitor.stop()
+        finally:
+            if self._patch is not None:
+                self._patch.__exit__(None, None, None)
+            main.pin_index.close()
+            main.search_index.close()
+            main.pin_archive.close()
+            main.pin_batches.close()
+            await self.server.stop()
+            # 同じプロセスでもう一度起動できるようにする
+            # （閉じたセッションのコネクタが残っていると、次のログインで "Session is closed" になる）
+            main.bot.clear()
+            main.bot.http.connector = discord.utils.MISSING
+
+    # --- 操作 ---
+
+    def _wait(self, predicate) -> asyncio.Future:
+        return self.server.wait_for_request(predicate)
+
+    async def _until(self, future: asyncio.Future) -> float:
+        return await asyncio.wait_for(future, OPERATION_TIMEOUT)
+
+    async def _command(self, name: str, user_id: int, channel_id: int, options: list | None = None) -> tuple[dict, float]:
+        """スラッシュコマンドを送り、(ペイロード, フォローアップの送信時刻) を返す"""
+        payload = self.api.command_interaction(name, user_id, channel_id, options)
+        token = payload["token"]
+        done = self._wait(lambda r, p, s, b: r.startswith("POST /webhooks/") and p.get("token") == token)
+        await self.server.dispatch("INTERACTION_CREATE", payload)
+        return payload, await self._until(done)
+
+    async def pinnedlist(self, user_id: int, channel_id: int) -> float:
+        start = time.perf_counter()
+        _, end = await self._command("pinnedlist", user_id, channel_id)
+        return end - start
+
+    async def pinnedlist_guild(self, user_id: int, channel_id: int) -> float:
+        start = time.perf_counter()
+        payload = self.api.command_interaction(
+            "pinnedlist", user_id, channel_id, [{"name": "scope", "type": 3, "value": "guild"}]
+        )
+        token = payload["token"]
+
+        def listed(r, p, s, b):
+            if not (r.startswith("PATCH /webhooks/") and p.get("token") == token):
+                return False
+            embeds = (b or {}).get("embeds") or []
+            # 途中経過（フッターが「⏳ 読み込み中」）の編集は数えない
+            return not embeds or not embeds[0].get("footer", {}).get("text", "").startswith("⏳")
+
+        done = self._wait(listed)
+        await self.server.dispatch("INTERACTION_CREATE", payload)
+        return await self._until(done) - start
+
+    async def pinsearch(self, user_id: int, channel_id: int) -> float:
+        start = time.perf_counter()
+        # 一覧を表示するチャンネルのピン留めの本文（「ピン留め {i}」）を検索する
+        payload = self.api.command_interaction(
+            "pinsearch", user_id, channel_id, [{"name": "query", "type": 3, "value": f"ピン留め {user_id % 10}"}]
+        )
+        token = payload["token"]
+        done = self._wait(lambda r, p, s, b: r.startswith("POST /interactions/") and p.get("token") == token)
+        await self.server.dispatch("INTERACTION_CREATE", payload)
+        return await self._until(done) - start
+
+    async def reaction(self, user_id: int, channel_id: int) -> float:
+        message_id = self.api.add_message(channel_id, AUTHOR_ID)
+        done = self._wait(lambda r, p, s, b: r.startswith("PUT ") and p.get("message_id") == str(message_id))
+        start = time.perf_counter()
+        self.api.add_reaction(message_id, user_id)
+        event = ReactionEvent(0, "add", channel_id, message_id, user_id)
+        await self.server.dispatch("MESSAGE_REACTION_ADD", event.payload())
+        return await self._until(done) - start
+
+    async def bulk_unpin(self, user_id: int, channel_id: int) -> float:
+        start = time.perf_counter()
+        payload, _ = await self._command("pinnedlist", user_id, channel_id)
+        message_id = self.api.interactions[payload["token"]]["followups"][0]
+        components = [c for row in self.api.messages[message_id]["components"] for c in row["components"]]
+        select = next(c for c in components if c["type"] == SELECT_MENU)
+
+        selected = self.api.component_interaction(
+            message_id, user_id, select["custom_id"], SELECT_MENU, [o["value"] for o in select["options"]]
+        )
+        token = selected["token"]
+        done = self._wait(lambda r, p, s, b: r.startswith("POST /interactions/") and p.get("token") == token)
+        await self.server.dispatch("INTERACTION_CREATE", selected)
+        await self._until(done)
+
+        applied = self.api.component_interaction(message_id, user_id, "apply_unpin", BUTTON)
+        token = applied["token"]
+        done = self._wait(
+            lambda r, p, s, b: r.startswith("PATCH /webhooks/") and p.get("token") == token
+            and (b or {}).get("content", "").startswith("📌")
+        )
+        await self.server.dispatch("INTERACTION_CREATE", applied)
+        return await self._until(done) - start
+
+    async def pinbatch(self, user_id: int, channel_id: int) -> float:
+        start = time.perf_counter()
+        payload = self.api.command_interaction("pinbatch", user_id, channel_id, [
+            {"name": "action", "type": 3, "value": "pin"},
+            {"name": "links", "type": 3, "value": "\n".join(self.batch_links)},
+        ])
+        token = payload["token"]
+
+        def reported(r, p, s, b):
+            if not (r.startswith("PATCH /webhooks/") and p.get("token") == token):
+                return False
+            embeds = (b or {}).get("embeds") or []
+            # 途中経過（フッターが「⏳ 処理中」）の編集は数えない
+            return bool(embeds) and embeds[0].get("footer", {}).get("text", "").startswith("完了")
+
+        done = self._wait(reported)
+        await self.server.dispatch("INTERACTION_CREATE", payload)
+        return await self._until(done) - start
+
+    def operations(self, name: str) -> list[tuple]:
+        """シナリオの (操作, ユーザーID, チャンネルID) のリスト"""
+        args = self.args
+        channels = self.channels[SHARED_CHANNELS.get(name, name)]
+        if name in ("pinnedlist", "pinnedlist_guild", "pinsearch"):
+            return [
+                (getattr(self, name), USER_BASE + i % args.users, channels[i % len(channels)])
+                for i in range(args.invocations)
+            ]
+        if name == "reactions":
+            return [
+                (self.reaction, USER_BASE + i % args.users, channels[i % len(channels)])
+                for i in range(args.messages)
+            ]
+        if name == "overflow":
+            return [
+                (self.reaction, USER_BASE + i % args.users, channels[i % len(channels)])
+                for i in range(args.overflow)
+            ]
+        if name == "bulk_unpin":
+            return [(self.bulk_unpin, USER_BASE + i, channel_id) for i, channel_id in enumerate(channels)]
+        if name == "pinbatch":
+            return [(self.pinbatch, USER_BASE, channels[0])]
+        raise ValueError(f"不明なシナリオです: {name}")
+
+    async def run(self, name: str) -> dict:
+        """1つのシナリオの操作を rate（件/秒）の間隔で開始し、全て完了するまで待つ"""
+        operations = self.operations(name)
+        self.api.calls.clear()
+        self.server.rate_limited.clear()
+        # 前のシナリオのバケットを持ち越さない
+        self.server.limiter = self._limiter()
+        interval = 1 / self.args.rate if self.args.rate > 0 else 0.0
+
+        async def started(i, operation, user_id, channel_id):
+            await asyncio.sleep(i * interval)
+            return await operation(user_id, channel_id)
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(started(i, *op) for i, op in enumerate(operations)))
+        # 完了の判定に使ったリクエストの後の処理（キャッシュの更新など）を終わらせる
+        await self.main.reaction_coalescer.drain()
+        elapsed = time.perf_counter() - start
+        latencies = sorted(latencies)
+        channel_ids = self.channels[SHARED_CHANNELS.get(name, name)]
+        return {
+            "scenario": name,
+            "operations": len(operations),
+            "elapsed": elapsed,
+            "throughput": len(operations) / elapsed if elapsed > 0 else 0.0,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "rest_calls": self.api.total_calls(),
+            "rest_by_route": dict(sorted(self.api.calls.items())),
+            "rate_limited": sum(self.server.rate_limited.values()),
+            "rate_limited_by_route": dict(sorted(self.server.rate_limited.items())),
+            "pinned": sum(len(self.api.pins.get(c, [])) for c in channel_ids),
+            "archived": sum([len(await self.main.pin_archive.channel_message_ids(c)) for c in channel_ids]),
+        }
+
+
+async def run_benchmarks(args) -> list[dict]:
+    """Botを1回起動し、指定されたシナリオを順に実行する"""
+    bench = E2EBench(args)
+    try:
+        await bench.start()
+        return [await bench.run(name) for name in args.scenario or SCENARIOS]
+    finally:
+        await bench.close()
+
+
+def print_report(results: list[dict]):
+    print(
+        f"{'scenario':<16} {'ops':>5} {'ops/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'REST':>5} {'429':>4} {'pinned':>6}"
+    )
+    for r in results:
+        print(
+            f"{r['scenario']:<16} {r['operations']:>5} {r['throughput']:>8.1f} {r['p50_ms']:>8.1f} "
+            f"{r['p99_ms']:>8.1f} {r['rest_calls']:>5} {r['rate_limited']:>4} {r['pinned']:>6}"
+        )
+    for r in results:
+        print(f"\n[{r['scenario']}] REST呼び出し（429）")
+        limited = Counter(r["rate_limited_by_route"])
+        for route, count in r["rest_by_route"].items():
+            suffix = f" ({limited[route]})" if limited[route] else ""
+            print(f"  {count:>5}  {route}{suffix}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="実行するシナリオ（複数指定可、既定は全て）")
+    parser.add_argument("--channels", type=int, default=5, help="シナリオごとのチャンネル数（bulk_unpin は1チャンネル1ユーザー）")
+    parser.add_argument("--users", type=int, default=5, help="pinnedlist・reactions の操作を行うユーザー数")
+    parser.add_argument("--pins", type=int, default=30, help="pinnedlist のチャンネルごとのピン留め数（最大50）")
+    parser.add_argument("--invocations", type=int, default=20, help="pinnedlist・pinnedlist_guild・pinsearch の実行回数")
+    parser.add_argument("--messages", type=int, default=50, help="reactions で📌を付けるメッセージ数")
+    parser.add_argument("--overflow", type=int, default=10, help="overflow でピン留め数が上限のチャンネルに📌を付けるメッセージ数")
+    parser.add_argument("--unpin", type=int, default=10, help="bulk_unpin でまとめて解除する件数（1ページ分まで）")
+    parser.add_argument("--batch", type=int, default=100, help="pinbatch でまとめてピン留めするメッセージ数（チャンネルごとに50件まで）")
+    parser.add_argument("--rate", type=float, default=0, help="操作の開始レート（件/秒、0で全て同時）")
+    parser.add_argument("--latency", type=float, default=0.02, help="偽のサーバーの応答時間（秒）")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="レート制限のウィンドウにかける係数（1で実際の長さ）")
+    parser.add_argument("--global-limit", type=int, default=DEFAULT_GLOBAL_LIMIT, help="全体のレート制限（回/秒、0で無効）")
+    parser.add_argument("--window", type=float, default=None, help="リアクションをまとめる時間（秒、既定は REACTION_COALESCE_WINDOW）")
+    parser.add_argument("--seed", type=int, default=0, help="乱数のシード")
+    parser.add_argument("--json", action="store_true", help="結果をJSONで出力する")
+    parser.add_argument("--max-p99-ms", type=float, help="p99がこの値（ミリ秒）を超えたら終了コード1にする")
+    parser.add_argument("--min-throughput", type=float, help="スループットがこの値（件/秒）を下回ったら終了コード1にする")
+    parser.add_argument("--verbose", action="store_true", help="Botのログを表示する")
+    args = parser.parse_args(argv)
+    if args.window is None:
+        from services.reaction_coalescer import DEFAULT_COALESCE_WINDOW
+        args.window = float(os.environ.get("REACTION_COALESCE_WINDOW", DEFAULT_COALESCE_WINDOW))
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    if not args.verbose:
+        # 429の待機は結果の表にまとめて出力する
+        logging.getLogger("discord.http").setLevel(logging.ERROR)
+    results = asyncio.run(run_benchmarks(args))
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        print_report(results)
+    failures = check_thresholds(results, args)
+    for failure in failures:
+        print(f"しきい値を満たしませんでした: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
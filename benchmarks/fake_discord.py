@@ -0,0 +1,468 @@
+"""ベンチマーク用の偽のDiscord REST API
+
+Botが使うエンドポイント（メッセージ取得、ピン留め一覧、ピン留め/解除、リアクションユーザー、
+メッセージの送信/編集/削除、ログインとスラッシュコマンドの同期、インタラクションの応答とフォローアップ）の
+状態とルーティングを模倣する。
+
+- FakeDiscord: チャンネル・メッセージ・ピン留め・リアクション・インタラクションの状態とルーティング
+- FakeHTTPLayer: bot.http.request を置き換えて FakeDiscord に振り分ける（プロセス内、通信なし）
+
+実際のHTTPとGatewayで接続する場合は benchmarks.fake_discord_server を使う。
+
+遅延（latency）と429の発生率（rate_limit_ratio）を指定できる。discord.py は429を
+HTTPClient.request の中で Retry-After だけ待って再送するため、FakeHTTPLayer も同じ動作をする。
+"""
+import asyncio
+import itertools
+import random
+import re
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from urllib.parse import unquote
+
+import discord
+
+PIN_EMOJI = "📌"
+BOT_ID = 1
+APPLICATION_ID = BOT_ID
+OWNER_ID = 3
+TIMESTAMP = "2024-01-01T00:00:00+00:00"
+ALL_PERMISSIONS = str(discord.Permissions.all().value)
+# インタラクションの応答の種類（InteractionResponseType）
+DEFERRED_CHANNEL_MESSAGE = 5
+DEFERRED_MESSAGE_UPDATE = 6
+MESSAGE_UPDATE = 7
+
+
+def user_json(user_id: int, bot: bool = False) -> dict:
+    return {
+        "id": str(user_id), "username": f"user{user_id}", "discriminator": "0",
+        "avatar": None, "global_name": None, "bot": bot,
+    }
+
+
+def member_json(user_id: int) -> dict:
+    return {"user": user_json(user_id), "roles": [], "joined_at": TIMESTAMP, "deaf": False, "mute": False, "flags": 0}
+
+
+def channel_json(guild_id: int, channel_id: int, position: int = 0) -> dict:
+    return {
+        "id": str(channel_id), "type": 0, "guild_id": str(guild_id), "name": f"channel{channel_id}",
+        "position": position, "permission_overwrites": [],
+    }
+
+
+def guild_json(guild_id: int, channel_ids: list[int]) -> dict:
+    """GUILD_CREATE のペイロード（ConnectionState にチャンネルを登録するため）"""
+    return {
+        "id": str(guild_id), "name": f"guild{guild_id}", "owner_id": str(BOT_ID), "member_count": 2,
+        "roles": [{"id": str(guild_id), "name": "@everyone", "permissions": ALL_PERMISSIONS,
+                   "position": 0, "color": 0, "hoist": False, "managed": False, "mentionable": False}],
+        "channels": [channel_json(guild_id, c, i) for i, c in enumerate(channel_ids)],
+        "members": [member_json(BOT_ID)],
+        "emojis": [], "stickers": [], "features": [], "threads": [], "stage_instances": [],
+        "guild_scheduled_events": [], "voice_states": [], "presences": [],
+    }
+
+
+class FakeDiscord:
+    """偽のDiscord APIの状態とルーティング
+
+    Args:
+        rate_limit_ratio: リクエストが429になる確率
+        retry_after: 429の Retry-After（秒）
+        seed: 乱数のシード
+    """
+
+    def __init__(self, rate_limit_ratio: float = 0.0, retry_after: float = 0.05, seed: int = 0):
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._ids = itertools.count(1 << 40)
+        self.messages: dict[int, dict] = {}
+        self.channel_guild: dict[int, int] = {}
+        self.pins: dict[int, list[int]] = {}  # channel_id -> ピン留めされた message_id（新しい順）
+        self.reactions: dict[int, dict[str, list[int]]] = {}  # message_id -> 絵文字 -> user_id
+        self.interactions: dict[str, dict] = {}  # token -> インタラクションの状態
+        self.commands: dict[str, dict] = {}  # 同期されたスラッシュコマンド（名前 -> コマンド）
+        self.calls: Counter = Counter()
+        self.rate_limited: Counter = Counter()
+        # 処理したリクエストごとに (ルートの表記, パスパラメータ, ステータス, リクエストのJSON) で呼ばれる関数
+        self.listeners: list = []
+        self.routes = [
+            ("GET", r"/users/@me", self._get_current_user),
+            ("GET", r"/oauth2/applications/@me", self._get_application),
+            ("PUT", r"/applications/(?P<application_id>\d+)/commands", self._sync_commands),
+            ("POST", r"/interactions/(?P<interaction_id>\d+)/(?P<token>[^/]+)/callback", self._interaction_callback),
+            ("POST", r"/webhooks/(?P<application_id>\d+)/(?P<token>[^/]+)", self._send_followup),
+            ("GET", r"/webhooks/(?P<application_id>\d+)/(?P<token>[^/]+)/messages/(?P<message_id>[^/]+)",
+             self._get_webhook_message),
+            ("PATCH", r"/webhooks/(?P<application_id>\d+)/(?P<token>[^/]+)/messages/(?P<message_id>[^/]+)",
+             self._edit_webhook_message),
+            ("DELETE", r"/webhooks/(?P<application_id>\d+)/(?P<token>[^/]+)/messages/(?P<message_id>[^/]+)",
+             self._delete_webhook_message),
+            ("GET", r"/channels/(?P<channel_id>\d+)/messages/pins", self._get_pins),
+            ("PUT", r"/channels/(?P<channel_id>\d+)/messages/pins/(?P<message_id>\d+)", self._pin),
+            ("DELETE", r"/channels/(?P<channel_id>\d+)/messages/pins/(?P<message_id>\d+)", self._unpin),
+            ("GET", r"/channels/(?P<channel_id>\d+)/messages/(?P<message_id>\d+)/reactions/(?P<emoji>[^/]+)",
+             self._get_reaction_users),
+            ("PUT", r"/channels/(?P<channel_id>\d+)/messages/(?P<message_id>\d+)/reactions/(?P<emoji>[^/]+)/@me",
+             self._add_own_reaction),
+            ("GET", r"/channels/(?P<channel_id>\d+)/messages/(?P<message_id>\d+)", self._get_message),
+            ("PATCH", r"/channels/(?P<channel_id>\d+)/messages/(?P<message_id>\d+)", self._edit_message),
+            ("DELETE", r"/channels/(?P<channel_id>\d+)/messages/(?P<message_id>\d+)", self._delete_message),
+            ("POST", r"/channels/(?P<channel_id>\d+)/messages", self._send_message),
+        ]
+        self._compiled = [
+            (method, re.compile(pattern + "$"), handler, self._template(pattern))
+            for method, pattern, handler in self.routes
+        ]
+
+    @staticmethod
+    def _template(pattern: str) -> str:
+        """ルートの正規表現から "/channels/{channel_id}/..." 形式の表記を作る"""
+        return re.sub(r"\(\?P<(\w+)>[^)]*\)", r"{\1}", pattern)
+
+    # --- 状態の準備 ---
+
+    def add_channel(self, guild_id: int, channel_id: int):
+        self.channel_guild[channel_id] = guild_id
+        self.pins.setdefault(channel_id, [])
+
+    def add_message(self, channel_id: int, author_id: int, content: str = "ベンチマーク用のメッセージ", message_id=None) -> int:
+        message_id = message_id or next(self._ids)
+        self.messages[message_id] = {
+            "id": str(message_id), "channel_id": str(channel_id),
+            "guild_id": str(self.channel_guild.get(channel_id, 0)),
+            "author": user_json(author_id, bot=(author_id == BOT_ID)), "content": content, "timestamp": TIMESTAMP,
+            "edited_timestamp": None, "tts": False, "mention_everyone": False, "mentions": [],
+            "mention_roles": [], "attachments": [], "embeds": [], "components": [], "flags": 0,
+            "pinned": False, "type": 0,
+        }
+        return message_id
+
+    def pin_message(self, channel_id: int, message_id: int):
+        """ピン留め済みの状態にする（準備用、リクエストとしては数えない）"""
+        self.pins.setdefault(channel_id, []).insert(0, message_id)
+        self.messages[message_id]["pinned"] = True
+
+    def add_reaction(self, message_id: int, user_id: int, emoji: str = PIN_EMOJI):
+        users = self.reactions.setdefault(message_id, {}).setdefault(emoji, [])
+        if user_id not in users:
+            users.append(user_id)
+
+    def remove_reaction(self, message_id: int, user_id: int, emoji: str = PIN_EMOJI):
+        users = self.reactions.get(message_id, {}).get(emoji, [])
+        if user_id in users:
+            users.remove(user_id)
+
+    def message_json(self, message_id: int) -> dict:
+        data = dict(self.messages[message_id])
+        data["reactions"] = [
+            {"emoji": {"id": None, "name": emoji}, "count": len(users), "me": BOT_ID in users,
+             "count_details": {"normal": len(users), "burst": 0}, "burst_colors": [], "me_burst": False}
+            for emoji, users in self.reactions.get(message_id, {}).items() if users
+        ]
+        return data
+
+    def pin_json(self, message_id: int) -> dict:
+        """ピン留め一覧のメッセージ（実際のDiscordと同じく、リアクションの情報を含まない）"""
+        data = self.message_json(message_id)
+        del data["reactions"]
+        return data
+
+    # --- ルーティング ---
+
+    def route_for(self, method: str, path: str):
+        """(ハンドラ, パスパラメータ, ルートの表記) を返す（該当なしは None）"""
+        for route_method, pattern, handler, template in self._compiled:
+            if route_method != method:
+                continue
+            match = pattern.match(path)
+            if match:
+                return handler, match.groupdict(), template
+        return None
+
+    def handle(self, method: str, path: str, query: dict | None = None, body=None) -> tuple[int, object]:
+        """リクエストを処理して (ステータス, レスポンスのJSON) を返す"""
+        found = self.route_for(method, path)
+        if found is None:
+            return 404, {"message": "404: Not Found", "code": 0}
+        handler, params, template = found
+        route = f"{method} {template}"
+        self.calls[route] += 1
+        if self.rate_limit_ratio and self._random.random() < self.rate_limit_ratio:
+            self.rate_limited[route] += 1
+            return 429, {"message": "You are being rate limited.", "retry_after": self.retry_after, "global": False}
+        status, data = handler(**params, query=query or {}, body=body)
+        for listener in self.listeners:
+            listener(route, params, status, body)
+        return status, data
+
+    def _message_or_404(self, message_id):
+        if int(message_id) not in self.messages:
+            return None
+        return self.messages[int(message_id)]
+
+    def _get_message(self, channel_id, message_id, query, body):
+        if self._message_or_404(message_id) is None:
+            return 404, {"message": "Unknown Message", "code": 10008}
+        return 200, self.message_json(int(message_id))
+
+    def _get_pins(self, channel_id, query, body):
+        limit = int(query.get("limit", 50))
+        ids = self.pins.get(int(channel_id), [])
+        before = query.get("before")
+        items = [
+            {"pinned_at": self.messages[m].get("pinned_at", TIMESTAMP), "message": self.pin_json(m)}
+            for m in ids
+            if before is None or self.messages[m].get("pinned_at", TIMESTAMP) < before
+        ]
+        return 200, {"items": items[:limit], "has_more": len(items) > limit}
+
+    def _pin(self, channel_id, message_id, query, body):
+        message = self._message_or_404(message_id)
+        if message is None:
+            return 404, {"message": "Unknown Message", "code": 10008}
+        pins = self.pins.setdefault(int(channel_id), [])
+        if int(message_id) not in pins:
+            if len(pins) >= 50:
+                return 400, {"message": "Maximum number of pins reached (50)", "code": 30003}
+            pins.insert(0, int(message_id))
+            message["pinned"] = True
+            message["pinned_at"] = datetime.now(timezone.utc).isoformat()
+        return 204, None
+
+    def _unpin(self, channel_id, message_id, query, body):
+        pins = self.pins.get(int(channel_id), [])
+        if int(message_id) not in pins:
+            return 404, {"message": "Unknown Message", "code": 10008}
+        pins.remove(int(message_id))
+        self.messages[int(message_id)]["pinned"] = False
+        return 204, None
+
+    def _get_reaction_users(self, channel_id, message_id, emoji, query, body):
+        users = sorted(self.reactions.get(int(message_id), {}).get(unquote(emoji), []))
+        after = int(query.get("after", 0))
+        limit = int(query.get("limit", 25))
+        users = [u for u in users if u > after][:limit]
+        return 200, [user_json(u, bot=(u == BOT_ID)) for u in users]
+
+    def _add_own_reaction(self, channel_id, message_id, emoji, query, body):
+        self.add_reaction(int(message_id), BOT_ID, unquote(emoji))
+        return 204, None
+
+    def _send_message(self, channel_id, query, body):
+        message_id = self.add_message(int(channel_id), BOT_ID, (body or {}).get("content", ""))
+        return 200, self.message_json(message_id)
+
+    def _edit_message(self, channel_id, message_id, query, body):
+        message = self._message_or_404(message_id)
+        if message is None:
+            return 404, {"message": "Unknown Message", "code": 10008}
+        if body and "content" in body:
+            message["content"] = body["content"]
+        return 200, self.message_json(int(message_id))
+
+    def _delete_message(self, channel_id, message_id, query, body):
+        if self.messages.pop(int(message_id), None) is None:
+            return 404, {"message": "Unknown Message", "code": 10008}
+        return 204, None
+
+    @staticmethod
+    def _apply_edit(message: dict, body):
+        for key, empty in (("content", ""), ("embeds", []), ("components", [])):
+            if body and key in body:
+                message[key] = body[key] if body[key] is not None else empty
+        if body and body.get("flags") is not None:
+            message["flags"] = body["flags"]
+
+    # --- ログインとスラッシュコマンド ---
+
+    def _get_current_user(self, query, body):
+        return 200, {**user_json(BOT_ID, bot=True), "verified": True, "mfa_enabled": False, "flags": 0}
+
+    def _get_application(self, query, body):
+        return 200, {
+            "id": str(APPLICATION_ID), "name": "PinBot", "description": "", "icon": None,
+            "bot_public": True, "bot_require_code_grant": False, "owner": user_json(OWNER_ID),
+            "verify_key": "0" * 64, "flags": 0,
+        }
+
+    def _sync_commands(self, application_id, query, body):
+        self.commands = {}
+        for i, command in enumerate(body or []):
+            self.commands[command["name"]] = {
+                **command, "id": str(APPLICATION_ID * 1000 + i), "application_id": application_id,
+                "version": "1", "default_member_permissions": command.get("default_member_permissions"),
+            }
+        return 200, list(self.commands.values())
+
+    # --- インタラクション ---
+
+    def command_interaction(self, name: str, user_id: int, channel_id: int, options: list | None = None) -> dict:
+        """スラッシュコマンドの INTERACTION_CREATE のペイロードを作る"""
+        command = self.commands.get(name, {"id": str(APPLICATION_ID * 1000), "name": name})
+        data = {"id": command["id"], "name": name, "type": 1}
+        if options:
+            data["options"] = options
+        return self._interaction(2, user_id, channel_id, data)
+
+    def component_interaction(self, message_id: int, user_id: int, custom_id: str, component_type: int,
+                              values: list | None = None) -> dict:
+        """ボタン・セレクトメニュー操作の INTERACTION_CREATE のペイロードを作る"""
+        message = self.messages[message_id]
+        data = {"custom_id": custom_id, "component_type": component_type}
+        if values is not None:
+            data["values"] = values
+        payload = self._interaction(3, user_id, int(message["channel_id"]), data)
+        payload["message"] = self.message_json(message_id)
+        self.interactions[payload["token"]]["source"] = message_id
+        return payload
+
+    def _interaction(self, kind: int, user_id: int, channel_id: int, data: dict) -> dict:
+        interaction_id = next(self._ids)
+        token = f"token{interaction_id}"
+        guild_id = self.channel_guild[channel_id]
+        self.interactions[token] = {
+            "id": interaction_id, "channel_id": channel_id, "user_id": user_id,
+            "source": None, "original": None, "response": None, "followups": [],
+        }
+        return {
+            "id": str(interaction_id), "application_id": str(APPLICATION_ID), "type": kind, "token": token,
+            "version": 1, "guild_id": str(guild_id), "channel_id": str(channel_id),
+            "channel": channel_json(guild_id, channel_id),
+            "member": {**member_json(user_id), "permissions": ALL_PERMISSIONS},
+            "app_permissions": ALL_PERMISSIONS, "locale": "ja", "guild_locale": "ja",
+            "entitlements": [], "authorizing_integration_owners": {"0": str(guild_id)},
+            "context": 0, "attachment_size_limit": 10 * 1024 * 1024, "data": data,
+        }
+
+    def _interaction_or_404(self, token):
+        return self.interactions.get(token)
+
+    def _interaction_callback(self, interaction_id, token, query, body):
+        interaction = self._interaction_or_404(token)
+        if interaction is None:
+            return 404, {"message": "Unknown interaction", "code": 10062}
+        if interaction["response"] is not None:
+            return 400, {"message": "Interaction has already been acknowledged.", "code": 40060}
+        kind = body["type"]
+        interaction["response"] = kind
+        data = body.get("data") or {}
+        if kind in (DEFERRED_MESSAGE_UPDATE, MESSAGE_UPDATE):
+            # コンポーネントの操作では元のメッセージが応答のメッセージになる
+            interaction["original"] = interaction["source"]
+            if kind == MESSAGE_UPDATE:
+                self._apply_edit(self.messages[interaction["source"]], data)
+        else:
+            message_id = self.add_message(interaction["channel_id"], BOT_ID, "")
+            self._apply_edit(self.messages[message_id], data)
+            interaction["original"] = message_id
+        message_id = interaction["original"]
+        return 200, {
+            "interaction": {
+                "id": str(interaction["id"]), "type": 2 if interaction["source"] is None else 3,
+                "response_message_id": str(message_id) if message_id else None,
+                "response_message_loading": kind == DEFERRED_CHANNEL_MESSAGE,
+                "response_message_ephemeral": bool(data.get("flags", 0) & 64),
+            },
+            "resource": {"type": kind, "message": self.message_json(message_id) if message_id else None},
+        }
+
+    def _webhook_message_id(self, interaction, message_id):
+        if message_id == "@original":
+            return interaction["original"]
+        message_id = int(message_id)
+        return message_id if message_id in interaction["followups"] else None
+
+    def _send_followup(self, application_id, token, query, body):
+        interaction = self._interaction_or_404(token)
+        if interaction is None or interaction["response"] is None:
+            return 404, {"message": "Unknown Webhook", "code": 10015}
+        message_id = self.add_message(interaction["channel_id"], BOT_ID, "")
+        self._apply_edit(self.messages[message_id], body)
+        interaction["followups"].append(message_id)
+        return 200, self.message_json(message_id)
+
+    def _get_webhook_message(self, application_id, token, message_id, query, body):
+        interaction = self._interaction_or_404(token)
+        message_id = interaction and self._webhook_message_id(interaction, message_id)
+        if not message_id or message_id not in self.messages:
+            return 404, {"message": "Unknown Message", "code": 10008}
+        return 200, self.message_json(message_id)
+
+    def _edit_webhook_message(self, application_id, token, message_id, query, body):
+        interaction = self._interaction_or_404(token)
+        message_id = interaction and self._webhook_message_id(interaction, message_id)
+        if not message_id or message_id not in self.messages:
+            return 404, {"message": "Unknown Message", "code": 10008}
+        self._apply_edit(self.messages[message_id], body)
+        return 200, self.message_json(message_id)
+
+    def _delete_webhook_message(self, application_id, token, message_id, query, body):
+        interaction = self._interaction_or_404(token)
+        message_id = interaction and self._webhook_message_id(interaction, message_id)
+        if not message_id or self.messages.pop(message_id, None) is None:
+            return 404, {"message": "Unknown Message", "code": 10008}
+        return 204, None
+
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+
+class FakeHTTPLayer:
+    """bot.http.request を置き換えて FakeDiscord で応答する（通信は発生しない）
+
+    Args:
+        discord_api: FakeDiscord
+        latency: 1リクエストあたりの応答時間（秒）
+        max_retries: 429の再送回数（discord.py と同じく5回）
+    """
+
+    def __init__(self, discord_api: FakeDiscord, latency: float = 0.0, max_retries: int = 5):
+        self.api = discord_api
+        self.latency = latency
+        self.max_retries = max_retries
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.retry_wait = 0.0
+        self._original = None
+
+    def install(self, client):
+        self._original = client.http.request
+        client.http.request = self.request
+
+    def uninstall(self, client):
+        client.http.request = self._original
+
+    async def request(self, route, **kwargs):
+        path = route.url[len(route.BASE):].split("?", 1)[0]
+        query = {k: str(v) for k, v in (kwargs.get("params") or {}).items()}
+        for attempt in range(self.max_retries + 1):
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                status, data = self.api.handle(route.method, path, query, kwargs.get("json"))
+            finally:
+                self.in_flight -= 1
+            if status == 429 and attempt < self.max_retries:
+                # discord.py と同様に Retry-After だけ待って再送する
+                start = time.perf_counter()
+                await asyncio.sleep(data["retry_after"])
+                self.retry_wait += time.perf_counter() - start
+                continue
+            break
+
+        if status < 300:
+            return data
+        response = SimpleNamespace(status=status, reason="")
+        if status == 403:
+            raise discord.Forbidden(response, data)
+        if status == 404:
+            raise discord.NotFound(response, data)
+        raise discord.HTTPException(response, data)
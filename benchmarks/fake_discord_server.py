@@ -0,0 +1,350 @@
+"""エンドツーエンドの性能試験用のローカルDiscordサーバー
+
+benchmarks.fake_discord の FakeDiscord をHTTPサーバーとして公開し、discord.py の
+HTTPClient・Webhook（インタラクションの応答）・Gatewayを実際の通信のまま接続できるようにする。
+
+- REST: /api/v10/... を FakeDiscord に振り分ける。ルートと主要パラメータ（チャンネル・Webhook）ごとの
+  バケットでレート制限を行い、Discordと同じヘッダー（X-RateLimit-Limit / Remaining / Reset /
+  Reset-After / Bucket / Scope、429の Retry-After）を返す。全体のレート制限（global）も再現する。
+- Gateway: HELLO → IDENTIFY → READY → GUILD_CREATE、ハートビートのACK、RESUME に応答し、
+  dispatch() で任意のイベント（MESSAGE_REACTION_ADD や INTERACTION_CREATE）を送信できる。
+  メッセージは圧縮せずテキストで送る（discord.py はテキストのメッセージも受け付ける）。
+
+使い方:
+    server = FakeDiscordServer(api)
+    await server.start()
+    with server.patch_discord():  # discord.py の接続先をこのサーバーにする
+        await bot.start("fake-token")
+"""
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import math
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+import yarl
+from aiohttp import WSMsgType, web
+from discord.gateway import DiscordWebSocket
+from discord.http import Route
+
+from benchmarks.fake_discord import APPLICATION_ID, BOT_ID, FakeDiscord, guild_json, user_json
+
+logger = logging.getLogger(__name__)
+
+API_PREFIX = "/api/v10"
+# ルートごとのレート制限（回数, 秒）。Discordが公開している値ではなく、実際の挙動に近い目安
+DEFAULT_ROUTE_LIMITS = {
+    "POST /channels/{channel_id}/messages": (5, 5.0),
+    "PATCH /channels/{channel_id}/messages/{message_id}": (5, 5.0),
+    "DELETE /channels/{channel_id}/messages/{message_id}": (5, 1.0),
+    "PUT /channels/{channel_id}/messages/pins/{message_id}": (5, 5.0),
+    "DELETE /channels/{channel_id}/messages/pins/{message_id}": (5, 5.0),
+    "GET /channels/{channel_id}/messages/{message_id}/reactions/{emoji}": (5, 1.0),
+    "POST /webhooks/{application_id}/{token}": (5, 2.0),
+    "PATCH /webhooks/{application_id}/{token}/messages/{message_id}": (5, 2.0),
+}
+# 上記以外のルートのレート制限
+DEFAULT_LIMIT = (50, 1.0)
+# 全体のレート制限（1秒あたりの回数）
+DEFAULT_GLOBAL_LIMIT = 50
+# レート制限の対象外のルート（インタラクションの応答は3秒以内に必要なため制限されない）
+UNLIMITED_ROUTES = {"POST /interactions/{interaction_id}/{token}/callback"}
+# 同じバケットを共有するルート（ピン留めと解除）
+SHARED_BUCKETS = {
+    "DELETE /channels/{channel_id}/messages/pins/{message_id}": "PUT /channels/{channel_id}/messages/pins/{message_id}",
+}
+# バケットを分ける主要パラメータ
+MAJOR_PARAMETERS = ("channel_id", "guild_id", "token")
+HEARTBEAT_INTERVAL_MS = 41250
+
+
+@dataclass
+class Bucket:
+    """1つのレート制限バケット（固定ウィンドウ）"""
+
+    limit: int
+    per: float
+    remaining: int = 0
+    reset_at: float = 0.0
+
+    def hit(self, now: float) -> bool:
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.per
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        return True
+
+
+@dataclass
+class RateLimiter:
+    """ルート・主要パラメータごとのバケットと全体のレート制限
+
+    Args:
+        limits: ルートの表記 -> (回数, 秒)
+        global_limit: 1秒あたりの全体の上限（0以下で無効）
+        time_scale: ウィンドウの長さにかける係数（テストを短時間で終えるために縮める）
+    """
+
+    limits: dict = field(default_factory=lambda: dict(DEFAULT_ROUTE_LIMITS))
+    global_limit: int = DEFAULT_GLOBAL_LIMIT
+    time_scale: float = 1.0
+    clock: object = time.time
+    _buckets: dict = field(default_factory=dict)
+    _global: Bucket | None = None
+
+    def __post_init__(self):
+        if self.global_limit > 0:
+            self._global = Bucket(self.global_limit, 1.0 * self.time_scale)
+
+    @staticmethod
+    def bucket_hash(route: str) -> str:
+        return hashlib.sha1(SHARED_BUCKETS.get(route, route).encode()).hexdigest()[:16]
+
+    def check(self, route: str, params: dict) -> tuple[int, dict, dict | None]:
+        """リクエストを1回数え、(ステータス, ヘッダー, 429のJSON) を返す（許可ならステータスは200）"""
+        if route in UNLIMITED_ROUTES:
+            return 200, {}, None
+        now = self.clock()
+        if self._global is not None and not self._global.hit(now):
+            retry_after = self._global.reset_at - now
+            return 429, {
+                "Retry-After": str(math.ceil(retry_after)),
+                "X-RateLimit-Global": "true",
+                "X-RateLimit-Scope": "global",
+            }, {"message": "You are being rate limited.", "retry_after": round(retry_after, 3), "global": True}
+
+        limit, per = self.limits.get(route, DEFAULT_LIMIT)
+        bucket_hash = self.bucket_hash(route)
+        key = (bucket_hash, tuple(params.get(name) for name in MAJOR_PARAMETERS))
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = Bucket(limit, per * self.time_scale)
+        allowed = bucket.hit(now)
+        reset_after = max(bucket.reset_at - now, 0.0)
+        headers = {
+            "X-RateLimit-Limit": str(bucket.limit),
+            "X-RateLimit-Remaining": str(bucket.remaining),
+            "X-RateLimit-Reset": f"{bucket.reset_at:.3f}",
+            "X-RateLimit-Reset-After": f"{reset_after:.3f}",
+            "X-RateLimit-Bucket": bucket_hash,
+        }
+        if allowed:
+            return 200, headers, None
+        headers.update({"Retry-After": str(math.ceil(reset_after)), "X-RateLimit-Scope": "user"})
+        return 429, headers, {"message": "You are being rate limited.", "retry_after": round(reset_after, 3), "global": False}
+
+
+def json_response(data, status: int = 200, headers: dict | None = None) -> web.Response:
+    """Discordと同じく charset なしの application/json で返す（discord.py は完全一致で判定する）"""
+    return web.Response(
+        body=json.dumps(data, ensure_ascii=False).encode(),
+        status=status,
+        headers={**(headers or {}), "Content-Type": "application/json"},
+    )
+
+
+class GatewaySession:
+    """Gatewayの1接続"""
+
+    def __init__(self, ws: web.WebSocketResponse):
+        self.ws = ws
+        self.sequence = itertools.count(1)
+        self.shard = None
+        self.identified = asyncio.Event()
+
+    async def send(self, op: int, data=None, event: str | None = None):
+        payload = {"op": op, "d": data, "s": None, "t": event}
+        if op == 0:
+            payload["s"] = next(self.sequence)
+        await self.ws.send_str(json.dumps(payload, ensure_ascii=False))
+
+
+class FakeDiscordServer:
+    """FakeDiscord をHTTP/Gatewayで公開するサーバー
+
+    Args:
+        api: 状態とルーティング（rate_limit_ratio による確率的な429は使わず、バケットで制限する）
+        guilds: ギルドID -> チャンネルIDのリスト（READY と GUILD_CREATE で送る）
+        host / port: 待ち受けるアドレス（port=0 で空いているポート）
+        latency: 1リクエストあたりの応答時間（秒）
+        limiter: レート制限（省略時は既定の値）
+    """
+
+    def __init__(self, api: FakeDiscord, guilds: dict | None = None, host: str = "127.0.0.1", port: int = 0,
+                 latency: float = 0.0, limiter: RateLimiter | None = None):
+        self.api = api
+        self._guilds = guilds
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.limiter = limiter or RateLimiter()
+        self.rate_limited: Counter = Counter()
+        self.sessions: list[GatewaySession] = []
+        self._runner: web.AppRunner | None = None
+        self._waiters: list[tuple] = []
+        api.listeners.append(self._notify_waiters)
+
+    @property
+    def guilds(self) -> dict:
+        """ギルドID -> チャンネルIDのリスト（省略時は接続の時点で FakeDiscord に登録されたチャンネル）"""
+        if self._guilds is not None:
+            return self._guilds
+        guilds: dict[int, list[int]] = {}
+        for channel_id, guild_id in self.api.channel_guild.items():
+            guilds.setdefault(guild_id, []).append(channel_id)
+        return guilds
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def gateway_url(self) -> str:
+        return f"ws://{self.host}:{self.port}/gateway/"
+
+    async def start(self):
+        app = web.Application(client_max_size=8 * 1024 * 1024)
+        app.router.add_get("/gateway/", self._gateway)
+        app.router.add_route("*", API_PREFIX + "/{path:.*}", self._rest)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        logger.info("偽のDiscordサーバーを起動しました (%s)", self.base_url)
+
+    async def stop(self):
+        for session in list(self.sessions):
+            await session.ws.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    @contextmanager
+    def patch_discord(self):
+        """discord.py のREST・Gatewayの接続先をこのサーバーに切り替える"""
+        base, gateway = Route.BASE, DiscordWebSocket.DEFAULT_GATEWAY
+        Route.BASE = self.base_url + API_PREFIX
+        DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(self.gateway_url)
+        try:
+            yield self
+        finally:
+            Route.BASE, DiscordWebSocket.DEFAULT_GATEWAY = base, gateway
+
+    # --- 完了の待ち合わせ ---
+
+    def wait_for_request(self, predicate) -> asyncio.Future:
+        """predicate(ルートの表記, パスパラメータ, ステータス, リクエストのJSON) が真になるリクエストを待つ"""
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((predicate, future))
+        return future
+
+    def _notify_waiters(self, route, params, status, body):
+        for waiter in list(self._waiters):
+            predicate, future = waiter
+            if future.done():
+                self._waiters.remove(waiter)
+            elif predicate(route, params, status, body):
+                self._waiters.remove(waiter)
+                future.set_result(time.perf_counter())
+
+    # --- REST ---
+
+    @staticmethod
+    async def _read_body(request: web.Request):
+        if not request.can_read_body:
+            return None
+        if request.content_type == "application/json":
+            return await request.json()
+        if request.content_type.startswith("multipart/"):
+            form = await request.post()
+            return json.loads(form["payload_json"]) if "payload_json" in form else None
+        return None
+
+    async def _rest(self, request: web.Request) -> web.Response:
+        path = "/" + request.match_info["path"]
+        headers = {"Via": "1.1 google"}
+        if path in ("/gateway", "/gateway/bot"):
+            return json_response({
+                "url": self.gateway_url, "shards": 1,
+                "session_start_limit": {"total": 1000, "remaining": 1000, "reset_after": 0, "max_concurrency": 1},
+            }, headers=headers)
+
+        found = self.api.route_for(request.method, path)
+        if found is not None:
+            _, params, template = found
+            route = f"{request.method} {template}"
+            status, limit_headers, error = self.limiter.check(route, params)
+            headers.update(limit_headers)
+            if status == 429:
+                self.rate_limited[route] += 1
+                return json_response(error, status=429, headers=headers)
+
+        body = await self._read_body(request)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        status, data = self.api.handle(request.method, path, dict(request.query), body)
+        if status == 204 or data is None:
+            return web.Response(status=status, headers=headers)
+        return json_response(data, status=status, headers=headers)
+
+    # --- Gateway ---
+
+    async def dispatch(self, event: str, data: dict):
+        """接続中の全てのセッションにイベントを送る"""
+        for session in list(self.sessions):
+            if session.identified.is_set():
+                await session.send(0, data, event)
+
+    async def wait_for_identify(self, timeout: float = 10.0):
+        """1つ以上のセッションが IDENTIFY を終えるまで待つ"""
+        deadline = time.monotonic() + timeout
+        while not any(s.identified.is_set() for s in self.sessions):
+            if time.monotonic() > deadline:
+                raise asyncio.TimeoutError("Gatewayに接続されませんでした")
+            await asyncio.sleep(0.01)
+
+    def _ready_payload(self, session: GatewaySession) -> dict:
+        data = {
+            "v": 10, "user": {**user_json(BOT_ID, bot=True), "verified": True, "mfa_enabled": False, "flags": 0},
+            "guilds": [{"id": str(g), "unavailable": True} for g in self.guilds],
+            "session_id": "fake-session", "resume_gateway_url": self.gateway_url,
+            "application": {"id": str(APPLICATION_ID), "flags": 0},
+        }
+        if session.shard is not None:
+            data["shard"] = session.shard
+        return data
+
+    async def _gateway(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        session = GatewaySession(ws)
+        self.sessions.append(session)
+        try:
+            await session.send(10, {"heartbeat_interval": HEARTBEAT_INTERVAL_MS})
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                payload = json.loads(msg.data)
+                op, data = payload.get("op"), payload.get("d")
+                if op == 1:  # HEARTBEAT
+                    await session.send(11)
+                elif op == 2:  # IDENTIFY
+                    session.shard = data.get("shard")
+                    await session.send(0, self._ready_payload(session), "READY")
+                    for guild_id, channel_ids in self.guilds.items():
+                        await session.send(0, guild_json(guild_id, channel_ids), "GUILD_CREATE")
+                    session.identified.set()
+                elif op == 6:  # RESUME
+                    await session.send(0, {}, "RESUMED")
+                    session.identified.set()
+        finally:
+            self.sessions.remove(session)
+        return ws
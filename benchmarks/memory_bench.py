@@ -0,0 +1,186 @@
+"""従来の設定と LEAN_RUNTIME のメモリ使用量（RSS）を比較するベンチマーク
+
+Discordには接続せず、Gatewayから届くペイロード（GUILD_CREATE、MESSAGE_CREATE、
+MESSAGE_REACTION_ADD）を合成して discord.py の ConnectionState に直接流し込み、
+キャッシュに載った状態のRSSを計測する。インテントで購読していないイベントは流さない。
+設定ごとに別プロセスで計測する。
+
+使い方:
+    python -m benchmarks.memory_bench --guilds 1000
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+
+import discord
+
+from services.runtime import client_options
+
+TIMESTAMP = "2024-01-01T00:00:00+00:00"
+
+
+def rss_bytes() -> int:
+    """現在のRSS（/proc がない環境では最大RSS）"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage if sys.platform == "darwin" else usage * 1024
+
+
+def user_data(user_id: int) -> dict:
+    return {"id": str(user_id), "username": f"user{user_id}", "discriminator": "0", "avatar": None, "global_name": None}
+
+
+def member_data(user_id: int | None = None) -> dict:
+    data = {"roles": [], "joined_at": TIMESTAMP, "deaf": False, "mute": False, "flags": 0}
+    if user_id is not None:
+        data["user"] = user_data(user_id)
+    return data
+
+
+def guild_create(index: int, args, bot_id: int) -> dict:
+    """1ギルド分の GUILD_CREATE ペイロード"""
+    guild_id = (index + 1) << 22
+    channel_base = guild_id + 1000
+    voice_channel = channel_base + args.channels
+    user_base = guild_id + 100000
+    voice_users = [user_base + i for i in range(args.voice)]
+    return {
+        "id": str(guild_id),
+        "name": f"guild {index}",
+        "owner_id": str(user_base),
+        "member_count": 500,
+        "roles": [
+            {"id": str(guild_id + i), "name": f"role{i}", "permissions": "0", "position": i, "color": 0,
+             "hoist": False, "managed": False, "mentionable": False}
+            for i in range(args.roles)
+        ],
+        "channels": [
+            {"id": str(channel_base + i), "type": 0, "name": f"channel{i}", "position": i, "permission_overwrites": []}
+            for i in range(args.channels)
+        ] + [{"id": str(voice_channel), "type": 2, "name": "voice", "position": args.channels, "permission_overwrites": [],
+            "bitrate": 64000, "user_limit": 0}],
+        "emojis": [
+            {"id": str(guild_id + 5000 + i), "name": f"emoji{i}", "roles": [], "require_colons": True,
+             "managed": False, "animated": False, "available": True}
+            for i in range(args.emojis)
+        ],
+        "voice_states": [
+            {"user_id": str(u), "channel_id": str(voice_channel), "session_id": "x", "deaf": False, "mute": False,
+             "self_deaf": False, "self_mute": False, "self_video": False, "suppress": False, "request_to_speak_timestamp": None}
+            for u in voice_users
+        ],
+        # プレゼンスのインテントがない場合、GUILD_CREATE のメンバーはBot自身とボイスチャンネルのユーザーのみ
+        "members": [member_data(bot_id)] + [member_data(u) for u in voice_users],
+        "stickers": [], "features": [], "threads": [], "stage_instances": [],
+        "guild_scheduled_events": [], "presences": [],
+    }
+
+
+def message_create(guild: dict, index: int) -> dict:
+    guild_id = int(guild["id"])
+    author = guild_id + 200000 + index
+    return {
+        "id": str(guild_id + 300000 + index), "channel_id": guild["channels"][index % len(guild["channels"])]["id"],
+        "guild_id": guild["id"], "author": user_data(author), "member": member_data(),
+        "content": "メッセージの本文です " * 5, "timestamp": TIMESTAMP, "edited_timestamp": None, "tts": False,
+        "mention_everyone": False, "mentions": [], "mention_roles": [], "attachments": [], "embeds": [],
+        "pinned": False, "type": 0,
+    }
+
+
+def reaction_add(guild: dict, index: int) -> dict:
+    guild_id = int(guild["id"])
+    user_id = guild_id + 400000 + index
+    return {
+        "user_id": str(user_id), "channel_id": guild["channels"][0]["id"], "message_id": str(guild_id + 300000),
+        "guild_id": guild["id"], "emoji": {"id": None, "name": "📌"}, "member": member_data(user_id),
+        "burst": False, "type": 0,
+    }
+
+
+async def load(lean: bool, args) -> dict:
+    """1つの設定でペイロードを流し込み、RSSの増加量を返す"""
+    options = client_options(lean)
+    client = discord.Client(**options)
+    state = client._connection
+    bot_id = 1
+    state.user = discord.ClientUser(state=state, data=user_data(bot_id))
+    intents = options["intents"]
+
+    gc.collect()
+    before = rss_bytes()
+    for i in range(args.guilds):
+        guild = guild_create(i, args, bot_id)
+        state.parse_guild_create(guild)
+        if intents.guild_messages:
+            for j in range(args.messages):
+                state.parse_message_create(message_create(guild, j))
+        if intents.guild_reactions:
+            for j in range(args.reactions):
+                state.parse_message_reaction_add(reaction_add(guild, j))
+    gc.collect()
+    after = rss_bytes()
+
+    return {
+        "mode": "lean" if lean else "default",
+        "guilds": len(state._guilds),
+        "cached_members": sum(len(g._members) for g in state._guilds.values()),
+        "cached_messages": len(state._messages) if state._messages is not None else 0,
+        "cached_emojis": len(state._emojis),
+        "rss_delta": after - before,
+        "rss_per_1000_guilds": (after - before) * 1000 / max(1, args.guilds),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--guilds", type=int, default=1000, help="ギルド数")
+    parser.add_argument("--channels", type=int, default=20, help="ギルドあたりのテキストチャンネル数")
+    parser.add_argument("--roles", type=int, default=20, help="ギルドあたりのロール数")
+    parser.add_argument("--emojis", type=int, default=30, help="ギルドあたりのカスタム絵文字数")
+    parser.add_argument("--voice", type=int, default=3, help="ギルドあたりのボイスチャンネル参加者数")
+    parser.add_argument("--messages", type=int, default=20, help="ギルドあたりのメッセージイベント数")
+    parser.add_argument("--reactions", type=int, default=5, help="ギルドあたりのリアクションイベント数")
+    parser.add_argument("--mode", choices=["default", "lean"], help="（内部用）1つの設定だけを計測して結果をJSONで出力する")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.mode:
+        print(json.dumps(asyncio.run(load(args.mode == "lean", args))))
+        return
+
+    results = []
+    for mode in ("default", "lean"):
+        # 設定ごとに別プロセスで計測する（同じプロセスだと解放済みのメモリがRSSに残るため）
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.memory_bench", *(argv if argv is not None else sys.argv[1:]), "--mode", mode],
+            check=True, capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        ).stdout
+        results.append(json.loads(output))
+
+    print(f"{'mode':<8} {'guilds':>7} {'members':>8} {'messages':>9} {'emojis':>7} {'RSS/1000 guilds':>16}")
+    for r in results:
+        print(
+            f"{r['mode']:<8} {r['guilds']:>7} {r['cached_members']:>8} {r['cached_messages']:>9} "
+            f"{r['cached_emojis']:>7} {r['rss_per_1000_guilds'] / 1024 / 1024:>13.1f} MiB"
+        )
+    default, lean = results
+    if default["rss_delta"] > 0:
+        print(f"削減率: {1 - lean['rss_delta'] / default['rss_delta']:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,396 @@
+"""📌リアクションイベントの処理性能を計測するベンチマーク
+
+Gatewayの MESSAGE_REACTION_ADD / MESSAGE_REACTION_REMOVE のペイロードを合成して
+discord.py の ConnectionState に流し込み、main.py の on_raw_reaction_add / on_raw_reaction_remove
+（コアレッサ → handle_pin_add / handle_pin_remove）を実際に動かす。REST呼び出しは
+benchmarks.fake_discord の偽のDiscord APIが応答する（遅延と429の発生率を指定できる）。
+
+シナリオごとに次の値を出力する。
+- スループット: 処理したイベント数 / 最初のイベントから全バッチの処理完了までの時間
+- p50/p99: コアレッサがイベントを受け付けてからハンドラの処理が終わるまでの時間
+  （まとめる時間 REACTION_COALESCE_WINDOW を含む）
+- REST呼び出し数（ルートごと）と429の数
+
+シナリオ:
+- pin: メッセージごとに1人が📌を付ける
+- pin_burst: 1つのメッセージに複数人が同時に📌を付ける
+- unpin: ピン留め済みのメッセージから📌を外す（ピン留めまでは準備として計測しない）
+- churn: 複数人がランダムに📌を付け外しする
+
+使い方:
+    python -m benchmarks.reaction_bench
+    python -m benchmarks.reaction_bench --scenario pin_burst --latency 0.05 --rate-limit 0.05
+    python -m benchmarks.reaction_bench --replay events.jsonl
+    python -m benchmarks.reaction_bench --json --max-p99-ms 800 --min-throughput 200
+
+--replay には1行1イベントのJSONを渡す:
+    {"t": 0.0, "type": "add", "channel_id": 2001, "message_id": 3001, "user_id": 100}
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass
+
+import discord
+
+from benchmarks.fake_discord import (
+    BOT_ID,
+    PIN_EMOJI,
+    FakeDiscord,
+    FakeHTTPLayer,
+    guild_json,
+    member_json,
+    user_json,
+)
+
+GUILD_ID = 1000
+CHANNEL_BASE = 2000
+AUTHOR_ID = 2
+USER_BASE = 100
+SCENARIOS = ("pin", "pin_burst", "unpin", "churn")
+
+
+@dataclass
+class ReactionEvent:
+    """再生する1つのリアクションイベント（t は再生開始からの秒数）"""
+
+    t: float
+    type: str  # "add" または "remove"
+    channel_id: int
+    message_id: int
+    user_id: int
+
+    def payload(self, guild_id: int = GUILD_ID) -> dict:
+        """Gatewayから届くペイロード"""
+        data = {
+            "user_id": str(self.user_id), "channel_id": str(self.channel_id),
+            "message_id": str(self.message_id), "guild_id": str(guild_id),
+            "emoji": {"id": None, "name": PIN_EMOJI}, "type": 0, "burst": False,
+        }
+        if self.type == "add":
+            data["member"] = member_json(self.user_id)
+        return data
+
+
+def load_events(path: str) -> list[ReactionEvent]:
+    """JSONL形式で記録したイベントを読み込む"""
+    events = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                data = json.loads(line)
+                events.append(ReactionEvent(
+                    float(data.get("t", 0)), data["type"], int(data["channel_id"]),
+                    int(data["message_id"]), int(data["user_id"]),
+                ))
+    return sorted(events, key=lambda e: e.t)
+
+
+def paced(events: list[ReactionEvent], rate: float) -> list[ReactionEvent]:
+    """イベントを rate（件/秒）の間隔で並べ直す（0以下なら全て同時）"""
+    interval = 1 / rate if rate > 0 else 0.0
+    for i, event in enumerate(events):
+        event.t = i * interval
+    return events
+
+
+def build_scenario(name: str, args, api: FakeDiscord) -> tuple[list, list]:
+    """シナリオのメッセージを偽のAPIに登録し、(準備のイベント, 計測するイベント) を返す"""
+    rng = random.Random(args.seed)
+    channels = [CHANNEL_BASE + i for i in range(args.channels)]
+    messages = [
+        (channels[i % len(channels)], api.add_message(channels[i % len(channels)], AUTHOR_ID))
+        for i in range(args.messages)
+    ]
+    setup, events = [], []
+    if name == "pin":
+        events = [ReactionEvent(0, "add", c, m, USER_BASE) for c, m in messages]
+    elif name == "pin_burst":
+        events = [
+            ReactionEvent(0, "add", c, m, USER_BASE + u)
+            for u in range(args.users) for c, m in messages
+        ]
+    elif name == "unpin":
+        setup = [ReactionEvent(0, "add", c, m, USER_BASE) for c, m in messages]
+        events = [ReactionEvent(0, "remove", c, m, USER_BASE) for c, m in messages]
+    elif name == "churn":
+        reacted: set[tuple[int, int]] = set()
+        for _ in range(args.messages * args.users):
+            channel_id, message_id = rng.choice(messages)
+            user_id = USER_BASE + rng.randrange(args.users)
+            key = (message_id, user_id)
+            events.append(ReactionEvent(0, "remove" if key in reacted else "add", channel_id, message_id, user_id))
+            reacted ^= {key}
+    else:
+        raise ValueError(f"不明なシナリオです: {name}")
+    return setup, paced(events, args.rate)
+
+
+def import_main():
+    """main.py をインポートする（.env の設定より優先して、ファイルや外部のバックエンドを使わない）"""
+    os.environ["PIN_INDEX_PATH"] = ":memory:"
+    os.environ["STATE_BACKEND_URL"] = ""
+    import main
+
+    return main
+
+
+def reset_main_state(main, window: float):
+    """main のインデックス・キャッシュ・通知をメモリ上に作り直す"""
+    from services.notifier import NotificationScheduler
+    from services.pin_cache import PinListCache
+    from services.pin_archive import PinArchive
+    from services.pin_batch import PinBatchJobs
+    from services.pin_index import PinIndex
+    from services.search_index import PinSearchIndex
+    from services.user_resolver import UserResolver
+
+    main.pin_index = PinIndex(":memory:")
+    main.search_index = PinSearchIndex(":memory:")
+    main.pin_archive = PinArchive(":memory:")
+    main.pin_batches = PinBatchJobs(":memory:")
+    main.pin_cache = PinListCache(on_fetch=main.index_channel_pins)
+    main.user_resolver = UserResolver(main.bot)
+    # 通知の削除は計測の終了後に行う
+    main.notifier = NotificationScheduler(lifetime=3600)
+    main.reaction_coalescer.window = window
+
+
+class ReactionBench:
+    """main.py のBotを偽のDiscord APIにつないでリアクションイベントを再生する
+
+    main をインポートするとBotやインデックスが作られるため、インポートは初期化時に行い、
+    インデックスとキャッシュはシナリオごとにメモリ上に作り直す。
+    """
+
+    def __init__(self, args):
+        main = import_main()
+        self.main = main
+        self.args = args
+        # イベントハンドラのタスクを作るループ（通常は bot.start() の中で設定される）
+        main.bot.loop = asyncio.get_running_loop()
+        self.state = main.bot._connection
+        self.state.user = discord.ClientUser(state=self.state, data=user_json(BOT_ID, bot=True))
+        self.api = None
+        self.layer = None
+        self._starts: dict[int, float] = {}
+        self.latencies: list[float] = []
+        self._handler = main.reaction_coalescer.handler
+        self._install_probes()
+
+    def _install_probes(self):
+        """コアレッサの受け付けとハンドラの完了の時刻を記録する"""
+        coalescer = self.main.reaction_coalescer
+        submit, handler = coalescer.submit, coalescer.handler
+
+        def timed_submit(payload, added):
+            self._starts[id(payload)] = time.perf_counter()
+            submit(payload, added)
+
+        async def timed_handler(added, removed):
+            try:
+                await handler(added, removed)
+            finally:
+                now = time.perf_counter()
+                for payload in (*added, *removed):
+                    start = self._starts.pop(id(payload), None)
+                    if start is not None:
+                        self.latencies.append(now - start)
+
+        coalescer.submit = timed_submit
+        coalescer.handler = timed_handler
+
+    def close(self):
+        """差し替えたREST呼び出しとコアレッサを元に戻す"""
+        coalescer = self.main.reaction_coalescer
+        del coalescer.submit
+        coalescer.handler = self._handler
+        if self.layer is not None:
+            self.layer.uninstall(self.main.bot)
+
+    def reset(self, channel_ids):
+        """偽のAPIとBotの状態をシナリオごとに作り直す"""
+        main = self.main
+        if self.layer is not None:
+            self.layer.uninstall(main.bot)
+        self.api = FakeDiscord(rate_limit_ratio=self.args.rate_limit, retry_after=self.args.retry_after, seed=self.args.seed)
+        for channel_id in channel_ids:
+            self.api.add_channel(GUILD_ID, channel_id)
+        self.layer = FakeHTTPLayer(self.api, latency=self.args.latency)
+        self.layer.install(main.bot)
+        # ギルドとチャンネルを登録する（parse_guild_create は on_guild_join を発火するため直接追加する）
+        self.state._add_guild_from_data(guild_json(GUILD_ID, sorted(channel_ids)))
+
+        reset_main_state(main, self.args.window)
+        self._starts.clear()
+        self.latencies = []
+
+    def dispatch(self, event: ReactionEvent):
+        if event.type == "add":
+            self.state.parse_message_reaction_add(event.payload())
+        else:
+            self.state.parse_message_reaction_remove(event.payload())
+
+    async def play(self, events: list[ReactionEvent]) -> float:
+        """イベントを t の時刻に流し込み、全バッチの処理完了までの秒数を返す"""
+        start = time.perf_counter()
+        for event in events:
+            delay = start + event.t - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            # 偽のAPIのリアクション状態もイベントに合わせる
+            if event.type == "add":
+                self.api.add_reaction(event.message_id, event.user_id)
+            else:
+                self.api.remove_reaction(event.message_id, event.user_id)
+            self.dispatch(event)
+        # dispatch したイベントハンドラのタスクがコアレッサに渡すまで待つ
+        await asyncio.sleep(0)
+        await self.main.reaction_coalescer.drain()
+        return time.perf_counter() - start
+
+    async def run(self, name: str, setup: list, events: list, channel_ids) -> dict:
+        """1つのシナリオを実行して結果を返す"""
+        main = self.main
+        coalescer = main.reaction_coalescer
+        if setup:
+            await self.play(setup)
+        self.api.calls.clear()
+        self.api.rate_limited.clear()
+        self.layer.retry_wait = 0.0
+        self.layer.max_in_flight = 0
+        self.latencies = []
+        received, batches = coalescer.events_received, coalescer.batches_processed
+
+        elapsed = await self.play(events)
+
+        events_received = coalescer.events_received - received
+        latencies = sorted(self.latencies)
+        result = {
+            "scenario": name,
+            "events": len(events),
+            "batches": coalescer.batches_processed - batches,
+            # 正味の変化がない、または同じユーザーの後のイベントにまとめられたイベント
+            "coalesced": events_received - len(latencies),
+            "elapsed": elapsed,
+            "throughput": events_received / elapsed if elapsed > 0 else 0.0,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "rest_calls": self.api.total_calls(),
+            "rest_by_route": dict(sorted(self.api.calls.items())),
+            "rate_limited": sum(self.api.rate_limited.values()),
+            "retry_wait": self.layer.retry_wait,
+            "max_in_flight": self.layer.max_in_flight,
+            "pinned": sum(len(self.api.pins.get(c, [])) for c in channel_ids),
+        }
+        await main.notifier.close()
+        main.pin_index.close()
+        main.search_index.close()
+        main.pin_archive.close()
+        main.pin_batches.close()
+        return result
+
+
+def percentile(values: list[float], p: float) -> float:
+    """ソート済みの値のパーセンタイル（最近傍順位法、値がなければ0）"""
+    if not values:
+        return 0.0
+    rank = math.ceil(len(values) * p / 100)
+    return values[min(len(values), max(rank, 1)) - 1]
+
+
+async def run_benchmarks(args) -> list[dict]:
+    """指定されたシナリオ（または記録したイベント）を順に実行する"""
+    bench = ReactionBench(args)
+    results = []
+    try:
+        if args.replay:
+            events = load_events(args.replay)
+            channel_ids = {e.channel_id for e in events}
+            bench.reset(channel_ids)
+            for event in events:
+                if event.message_id not in bench.api.messages:
+                    bench.api.add_message(event.channel_id, AUTHOR_ID, message_id=event.message_id)
+            results.append(await bench.run(os.path.basename(args.replay), [], events, channel_ids))
+            return results
+
+        for name in args.scenario or SCENARIOS:
+            channel_ids = {CHANNEL_BASE + i for i in range(args.channels)}
+            bench.reset(channel_ids)
+            setup, events = build_scenario(name, args, bench.api)
+            results.append(await bench.run(name, setup, events, channel_ids))
+        return results
+    finally:
+        bench.close()
+
+
+def check_thresholds(results: list[dict], args) -> list[str]:
+    """しきい値を満たさなかったシナリオの説明を返す"""
+    failures = []
+    for r in results:
+        if args.max_p99_ms is not None and r["p99_ms"] > args.max_p99_ms:
+            failures.append(f"{r['scenario']}: p99 {r['p99_ms']:.1f} ms > {args.max_p99_ms} ms")
+        if args.min_throughput is not None and r["throughput"] < args.min_throughput:
+            failures.append(f"{r['scenario']}: スループット {r['throughput']:.1f}/s < {args.min_throughput}/s")
+    return failures
+
+
+def print_report(results: list[dict]):
+    print(
+        f"{'scenario':<10} {'events':>6} {'batches':>7} {'coalesced':>9} {'events/s':>9} "
+        f"{'p50 ms':>8} {'p99 ms':>8} {'REST':>5} {'429':>4}"
+    )
+    for r in results:
+        print(
+            f"{r['scenario']:<10} {r['events']:>6} {r['batches']:>7} {r['coalesced']:>9} {r['throughput']:>9.1f} "
+            f"{r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['rest_calls']:>5} {r['rate_limited']:>4}"
+        )
+    for r in results:
+        print(f"\n[{r['scenario']}] REST呼び出し")
+        for route, count in r["rest_by_route"].items():
+            print(f"  {count:>5}  {route}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="実行するシナリオ（複数指定可、既定は全て）")
+    parser.add_argument("--replay", help="記録したイベント（JSONL）を再生する")
+    parser.add_argument("--messages", type=int, default=200, help="シナリオで使うメッセージ数")
+    parser.add_argument("--users", type=int, default=5, help="pin_burst・churn でリアクションするユーザー数")
+    parser.add_argument("--channels", type=int, default=10, help="メッセージを分散させるチャンネル数")
+    parser.add_argument("--rate", type=float, default=0, help="イベントの送信レート（件/秒、0で全て同時）")
+    parser.add_argument("--latency", type=float, default=0.02, help="偽のAPIの応答時間（秒）")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="リクエストが429になる確率")
+    parser.add_argument("--retry-after", type=float, default=0.05, help="429の Retry-After（秒）")
+    parser.add_argument("--window", type=float, default=None, help="リアクションをまとめる時間（秒、既定は REACTION_COALESCE_WINDOW）")
+    parser.add_argument("--seed", type=int, default=0, help="乱数のシード")
+    parser.add_argument("--json", action="store_true", help="結果をJSONで出力する")
+    parser.add_argument("--max-p99-ms", type=float, help="p99がこの値（ミリ秒）を超えたら終了コード1にする")
+    parser.add_argument("--min-throughput", type=float, help="スループットがこの値（件/秒）を下回ったら終了コード1にする")
+    args = parser.parse_args(argv)
+    if args.window is None:
+        from services.reaction_coalescer import DEFAULT_COALESCE_WINDOW
+        args.window = float(os.environ.get("REACTION_COALESCE_WINDOW", DEFAULT_COALESCE_WINDOW))
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = asyncio.run(run_benchmarks(args))
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        print_report(results)
+    failures = check_thresholds(results, args)
+    for failure in failures:
+        print(f"しきい値を満たしませんでした: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,71 +2,632 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 import os
+import atexit
+import math
+import logging
 import dotenv
-from server import server_thread
+import server
 import asyncio
 from datetime import datetime, timedelta, timezone
-from views.unpin_view import UnpinSelectView
+from views.pinned_list_view import PinnedListView, DEFAULT_PAGE_SIZE, progress_embed
+from views.search_results import search_results_embed
+from views.batch_report import batch_report_embed
+from services.concurrency import bounded_gather
+from services.logging_setup import setup_logging
+from services.loop_monitor import LoopLagMonitor
+from services import health
+from services.metrics import (
+    Counter,
+    Gauge,
+    PIN_ACTIONS,
+    REACTION_EVENTS,
+    install_rate_limit_counter,
+    instrument_http,
+    timed,
+)
+from services.pin_fetcher import (
+    PIN_EMOJI,
+    DEFAULT_FETCH_CONCURRENCY,
+    find_pushpin_reaction,
+    refresh_pins,
+    resolve_pushpin_reactors,
+    resolve_remaining_reactors,
+)
+from services.pin_index import PinIndex, SharedPinIndex, DEFAULT_INDEX_PATH
+from services.pin_cache import PinListCache, DEFAULT_CACHE_SIZE, DEFAULT_CACHE_TTL
+from services.pin_catalog import merge_sorted, sort_key
+from services.pin_batch import (
+    PinBatchJobs,
+    DEFAULT_BATCH_CONCURRENCY,
+    DEFAULT_BATCH_MAX_ITEMS,
+    parse_message_links,
+    result_status,
+)
+from services.pin_archive import (
+    ArchivedPin,
+    PinArchive,
+    DEFAULT_ARCHIVE_POLICY,
+    choose_eviction,
+    group_by_channel,
+    is_max_pins_error,
+)
+from services.notifier import NotificationScheduler, DEFAULT_NOTIFICATION_LIFETIME, DEFAULT_MAX_OUTSTANDING
+from services.reaction_coalescer import ReactionCoalescer, DEFAULT_COALESCE_WINDOW
+from services.rest_scheduler import RestScheduler, Priority, rest_priority, DEFAULT_MAX_IN_FLIGHT
+from services.search_index import PinSearchIndex, DEFAULT_SEARCH_LIMIT
+from services.shards import ShardStats, shard_options
+from services.state_backend import create_state_backend
+from services.runtime import client_options
+from services.user_resolver import UserResolver, DEFAULT_USER_CACHE_SIZE, mention
+from services.warmup import PinWarmup, accessible_channels, DEFAULT_WARMUP_CONCURRENCY, DEFAULT_WARMUP_RATE
 
 # 環境変数の読み込み
 dotenv.load_dotenv()
+logger = logging.getLogger("main")
 TOKEN = os.environ.get("DISCORD_TOKEN")
+# /pinnedlist でメッセージを再取得する際の同時実行数
+PIN_FETCH_CONCURRENCY = int(os.environ.get("PIN_FETCH_CONCURRENCY", DEFAULT_FETCH_CONCURRENCY))
+# /pinnedlist の1ページあたりの件数
+PINNEDLIST_PAGE_SIZE = int(os.environ.get("PINNEDLIST_PAGE_SIZE", DEFAULT_PAGE_SIZE))
+# /pinnedlist scope:サーバー全体 で同時に読み込むチャンネル数
+GUILD_SCAN_CONCURRENCY = int(os.environ.get("GUILD_SCAN_CONCURRENCY", 5))
+# 時間のかかるコマンド（サーバー全体の一覧・/pinbatch）の途中経過を更新する間隔（秒）
+# （インタラクションのメッセージの編集は2秒あたり5回まで）
+PROGRESS_UPDATE_INTERVAL = 1.0
+# /pinsearch で表示する件数
+PIN_SEARCH_LIMIT = int(os.environ.get("PIN_SEARCH_LIMIT", DEFAULT_SEARCH_LIMIT))
+# /pinbatch で同時にピン留め・解除するメッセージ数と、1回に指定できるメッセージ数の上限
+PIN_BATCH_CONCURRENCY = int(os.environ.get("PIN_BATCH_CONCURRENCY", DEFAULT_BATCH_CONCURRENCY))
+PIN_BATCH_MAX_ITEMS = int(os.environ.get("PIN_BATCH_MAX_ITEMS", DEFAULT_BATCH_MAX_ITEMS))
+# /pinbatch に添付できるファイルの大きさの上限（バイト）
+PIN_BATCH_MAX_FILE_SIZE = 1024 * 1024
+# ピン留めが上限（50件）に達した時にアーカイブするピン留めの選び方（oldest_pinned / oldest_message / off）
+PIN_ARCHIVE_POLICY = os.environ.get("PIN_ARCHIVE_POLICY", DEFAULT_ARCHIVE_POLICY).lower()
+# ピン留めインデックス（📌リアクションユーザー）の保存先
+PIN_INDEX_PATH = os.environ.get("PIN_INDEX_PATH", DEFAULT_INDEX_PATH)
+# 複数プロセスで共有するステートバックエンド（例: redis://localhost:6379/0、未指定ならプロセス内のみ）
+STATE_BACKEND_URL = os.environ.get("STATE_BACKEND_URL")
+STATE_KEY_PREFIX = os.environ.get("STATE_KEY_PREFIX", "pinbot")
+# ピン留め一覧キャッシュの設定
+PIN_CACHE_SIZE = int(os.environ.get("PIN_CACHE_SIZE", DEFAULT_CACHE_SIZE))
+PIN_CACHE_TTL = float(os.environ.get("PIN_CACHE_TTL", DEFAULT_CACHE_TTL))
+# 一時的な通知メッセージの表示秒数と同時表示数の上限
+NOTIFICATION_LIFETIME = float(os.environ.get("NOTIFICATION_LIFETIME", DEFAULT_NOTIFICATION_LIFETIME))
+NOTIFICATION_MAX_OUTSTANDING = int(os.environ.get("NOTIFICATION_MAX_OUTSTANDING", DEFAULT_MAX_OUTSTANDING))
+# 同じメッセージへのリアクションイベントをまとめる時間（秒）
+REACTION_COALESCE_WINDOW = float(os.environ.get("REACTION_COALESCE_WINDOW", DEFAULT_COALESCE_WINDOW))
+# 起動時・ギルド参加時にピン留めを読み込むチャンネルの同時実行数と開始レート（チャンネル/秒）
+WARMUP_CONCURRENCY = int(os.environ.get("WARMUP_CONCURRENCY", DEFAULT_WARMUP_CONCURRENCY))
+WARMUP_RATE = float(os.environ.get("WARMUP_RATE", DEFAULT_WARMUP_RATE))
+# REST呼び出しを同時に送る数の上限（0以下で無制限、優先度の順に送り出す）
+REST_MAX_IN_FLIGHT = int(os.environ.get("REST_MAX_IN_FLIGHT", DEFAULT_MAX_IN_FLIGHT))
+# ヘルスチェック用サーバーの動かし方（"integrated": Botと同じイベントループ, "thread": 別スレッド）
+HEALTH_SERVER_MODE = os.environ.get("HEALTH_SERVER_MODE", "integrated").lower()
+# /livez・/readyz のしきい値（0以下でその項目を判定しない）
+HEALTH_MAX_LOOP_LAG = float(os.environ.get("HEALTH_MAX_LOOP_LAG", health.DEFAULT_MAX_LOOP_LAG))
+HEALTH_MAX_HEARTBEAT_AGE = float(os.environ.get("HEALTH_MAX_HEARTBEAT_AGE", health.DEFAULT_MAX_HEARTBEAT_AGE))
+HEALTH_MAX_NOT_READY = float(os.environ.get("HEALTH_MAX_NOT_READY", health.DEFAULT_MAX_NOT_READY))
+HEALTH_MAX_LATENCY = float(os.environ.get("HEALTH_MAX_LATENCY", health.DEFAULT_MAX_LATENCY))
+HEALTH_MAX_EVENT_AGE = float(os.environ.get("HEALTH_MAX_EVENT_AGE", health.DEFAULT_MAX_EVENT_AGE))
+HEALTH_MAX_PENDING = int(os.environ.get("HEALTH_MAX_PENDING", health.DEFAULT_MAX_PENDING))
+# 表示名をキャッシュするユーザー数
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", DEFAULT_USER_CACHE_SIZE))
+# 必要最小限のインテントとキャッシュで動かすか（`!pin` テキストコマンドの代わりに /pin を使う）
+LEAN_RUNTIME = os.environ.get("LEAN_RUNTIME", "").lower() in ("1", "true", "yes")
+# シャーディングの設定（未指定なら1接続の commands.Bot で起動する）
+SHARD_OPTIONS = shard_options(
+    os.environ.get("SHARD_MODE"),
+    os.environ.get("SHARD_COUNT"),
+    os.environ.get("SHARD_IDS"),
+)
 
-# Discordのインテントを設定
-intents = discord.Intents.default()
-intents.message_content = True
-intents.reactions = True  # リアクションのイベントを受け取るために必要
+# Discordのインテントとキャッシュを設定
+options = client_options(LEAN_RUNTIME)
 
 # discord.ext.commands.Bot に移行（スラッシュコマンド対応）
-bot = commands.Bot(command_prefix="!", intents=intents)
+if SHARD_OPTIONS is not None:
+    # 複数のシャードで接続する（SHARD_IDS を指定するとプロセスごとに担当を分けられる）
+    bot = commands.AutoShardedBot(command_prefix="!", **options, **SHARD_OPTIONS)
+else:
+    bot = commands.Bot(command_prefix="!", **options)
+
+# ピン留めインデックス・ロック・キャッシュの無効化を共有するステートバックエンド
+state_backend = create_state_backend(STATE_BACKEND_URL, prefix=STATE_KEY_PREFIX)
+# メッセージごとの📌リアクションユーザーのインデックス
+# （共有のバックエンドがあればプロセス間で共有し、なければSQLiteに保存する）
+pin_index = SharedPinIndex(state_backend) if state_backend.shared else PinIndex(PIN_INDEX_PATH)
+# ピン留めメッセージ本文の全文検索インデックス（/pinsearch、プロセスごとにSQLiteに保存する）
+search_index = PinSearchIndex(PIN_INDEX_PATH)
+# ピン留めの上限を超えた分のアーカイブ（/pinnedlist で通常のピン留めと一緒に表示する）
+pin_archive = PinArchive(PIN_INDEX_PATH)
+# /pinbatch のジョブ（メッセージごとの結果を保存し、中断しても再開できるようにする）
+pin_batches = PinBatchJobs(PIN_INDEX_PATH)
+# 実行中の /pinbatch のジョブ（job_id -> タスク）
+batch_tasks: dict[int, asyncio.Task] = {}
+# チャンネルごとのアーカイブ処理のロック（同時に上限に達しても同じピン留めを選ばない）
+archive_locks: dict[int, asyncio.Lock] = {}
+
+
+async def index_channel_pins(channel, pins: list):
+    """RESTで取得し直したピン留め一覧を全文検索インデックスと突き合わせる"""
+    await search_index.reconcile_channel(
+        channel.guild.id if channel.guild else 0,
+        channel.id,
+        pins,
+        keep=await pin_archive.channel_message_ids(channel.id)  # アーカイブしたものも検索できるようにする
+    )
+
+
+# チャンネルごとのピン留め一覧キャッシュ（取得し直したら全文検索インデックスに反映する）
+pin_cache = PinListCache(
+    maxsize=PIN_CACHE_SIZE,
+    ttl=PIN_CACHE_TTL,
+    backend=state_backend if state_backend.shared else None,
+    on_fetch=index_channel_pins,
+)
+# ユーザーIDから表示名を解決する（LRU）
+user_resolver = UserResolver(bot, maxsize=USER_CACHE_SIZE)
+# イベントループの遅延を計測するハートビート
+loop_monitor = LoopLagMonitor()
+# シャードごとの接続状態とイベント数（/shards で公開する）
+shard_stats = ShardStats(bot)
+server.app.state.shards = shard_stats
+# REST呼び出しを優先度の順に送り出すスケジューラ
+rest_scheduler = RestScheduler(max_in_flight=REST_MAX_IN_FLIGHT)
+# 一時的な通知メッセージの削除スケジューラ
+notifier = NotificationScheduler(lifetime=NOTIFICATION_LIFETIME, max_outstanding=NOTIFICATION_MAX_OUTSTANDING)
+
+
+def days_cutoff(days) -> datetime | None:
+    """過去 days 日間の始まりの日時（日数の指定がなければ None）"""
+    if days is None or days <= 0:
+        return None
+    return datetime.now(timezone.utc) - timedelta(days=days)
+
+
+async def archived_pins(channel, user=None, days=None) -> list:
+    """チャンネルでアーカイブしたピン留め（作者と日数の絞り込みはアーカイブの索引で行う、新しい順）"""
+    return await pin_archive.query(
+        channel.guild.id if channel.guild else 0,
+        channel_id=channel.id,
+        author_id=user.id if user else None,
+        after=days_cutoff(days)
+    )
+
+
+async def query_channel_pins(channel, user=None, days=None, order=None) -> list:
+    """チャンネルのピン留めとアーカイブを作者・日数で絞り込み、order の順に並べる
+
+    絞り込みはピン留め一覧の索引（PinCatalog）とアーカイブの索引で行い、
+    📌リアクションユーザーの解決（メッセージの再取得）より前に済ませる。
+    order が None ならピン留めした順に並べ、アーカイブした分を後に続ける。
+    """
+    catalog = await pin_cache.get_catalog(channel)
+    author_id = user.id if user else None
+    if order == "most_reacted":
+        pins = catalog.query(author_id=author_id, after=days_cutoff(days)) + await archived_pins(channel, user, days)
+        return await sort_by_reactors(pins, lambda page_pins: resolve_reactors(channel, page_pins))
+    pinned = catalog.query(author_id=author_id, after=days_cutoff(days), order=order)
+    return merge_archived(pinned, await archived_pins(channel, user, days), order)
+
+
+def merge_archived(pinned: list, archived: list, order) -> list:
+    """order（None / newest / oldest）の順に並んだピン留めと、新しい順に並んだアーカイブを1つの一覧にまとめる"""
+    if order is None:
+        return pinned + archived
+    if order == "oldest":
+        archived = archived[::-1]
+    return merge_sorted([pinned, archived], order)
+
+
+async def sort_by_reactors(pins: list, resolve) -> list:
+    """絞り込んだピン留めを📌リアクションユーザーが多い順に並べる
+
+    ピン留め一覧の取得結果にはリアクションの情報が揃っていないため、件数は
+    📌リアクションユーザーのインデックスから求め、インデックスにないものだけメッセージを再取得する。
+
+    Args:
+        pins: ピン留めメッセージのリスト
+        resolve: resolve_reactors / resolve_guild_reactors と同じく (メッセージ, ユーザーIDのset) のリストを返す関数
+    """
+    counts = {message.id: len(reactors) for message, reactors in await resolve(pins)}
+    return sorted(pins, key=sort_key("most_reacted", counts))
+
+
+async def index_pinned(message):
+    """ピン留めしたメッセージの本文を全文検索インデックスに登録する"""
+    await search_index.add(
+        message.guild.id if message.guild else 0, message.channel.id, message.id, message.author.id, message.content
+    )
+
+
+async def resolve_reactors(channel, pins: list) -> list:
+    """ピン留めメッセージの📌リアクションユーザーを解決する
+
+    インデックスに登録済みのものはそのまま使い、未登録のものだけ
+    並列で再取得してインデックスに登録する。
+
+    Returns:
+        list[tuple]: (メッセージ, Bot以外のリアクションユーザーIDのset) のリスト（元の順序を維持）
+    """
+    known = {}
+    unknown = []
+    for pin in pins:
+        if isinstance(pin, ArchivedPin):
+            # アーカイブしたピン留めは保存した📌リアクションユーザーを使う
+            known[pin.id] = (pin, set(pin.reactors))
+            continue
+        reactors = await pin_index.get_reactors(pin.id)
+        if reactors is None:
+            unknown.append(pin)
+        else:
+            known[pin.id] = (pin, reactors)
+
+    if unknown:
+        for message, reactors in await refresh_pins(channel, unknown, PIN_FETCH_CONCURRENCY):
+            guild_id = channel.guild.id if channel.guild else 0
+            await pin_index.set_reactors(guild_id, channel.id, message.id, reactors)
+            known[message.id] = (message, reactors)
+
+    return [known[pin.id] for pin in pins if pin.id in known]
+
+
+async def resolve_guild_reactors(pins: list) -> list:
+    """複数のチャンネルにまたがるピン留めメッセージの📌リアクションユーザーを解決する（元の順序を維持）"""
+    resolved = {}
+    for channel, grouped in group_by_channel(pins, bot.get_channel):
+        for message, reactors in await resolve_reactors(channel, grouped):
+            resolved[message.id] = (message, reactors)
+    return [resolved[pin.id] for pin in pins if pin.id in resolved]
+
+
+async def warm_channel(channel) -> int:
+    """チャンネルのピン留めを読み込み、インデックスと突き合わせる
+
+    ピン留め一覧キャッシュを埋め、Bot停止中やゲートウェイ切断中に取りこぼした
+    リアクションイベントを補正する。読み込んだピン留め数を返す。
+    """
+    pins = await pin_cache.get_pins(channel)
+    refreshed = await refresh_pins(channel, pins, PIN_FETCH_CONCURRENCY)
+    await pin_index.reconcile_channel(
+        channel.guild.id,
+        channel.id,
+        [(message.id, reactors) for message, reactors in refreshed]
+    )
+    return len(refreshed)
+
+
+# 起動時・ギルド参加時のピン留めの読み込み（最初の /pinnedlist を速くする）
+warmup = PinWarmup(warm_channel, concurrency=WARMUP_CONCURRENCY, rate=WARMUP_RATE)
+
+
+async def load_channel_pins(channel, user=None, days=None, order="newest") -> list:
+    """サーバー全体の一覧のために、チャンネルのピン留めメッセージとアーカイブを絞り込んで取得する
+
+    ウォームアップ済みでその後ピン留めが変化しておらず、インデックスにも
+    メッセージがないチャンネルはピン留めがないため、REST呼び出しを省く。
+    """
+    if warmup.is_warm(channel.id) and not await pin_index.channel_message_ids(channel.id):
+        return merge_archived([], await archived_pins(channel, user, days), order)
+    return await query_channel_pins(channel, user, days, order)
+
+
+async def index_reactor_added(payload, message):
+    """📌リアクションの追加をインデックスに反映する
+
+    インデックスに未登録のメッセージは、リアクション数から追加したユーザーしか
+    いないと分かる場合を除き、リアクションユーザーを取得して登録する。
+    """
+    if payload.member is not None and payload.member.bot:
+        return  # Botのリアクションは記録しない
+
+    if await pin_index.get_reactors(message.id) is not None:
+        await pin_index.add_reactor(payload.guild_id or 0, payload.channel_id, message.id, payload.user_id)
+        return
 
-# ピン留め用の絵文字（pushpin）
-PIN_EMOJI = "📌"
+    pushpin_reaction = find_pushpin_reaction(message)
+    if pushpin_reaction is not None and pushpin_reaction.count - int(pushpin_reaction.me) <= 1:
+        reactors = {payload.user_id}
+    else:
+        reactors = await resolve_pushpin_reactors(message)
+        reactors.add(payload.user_id)
+    await pin_index.set_reactors(payload.guild_id or 0, payload.channel_id, message.id, reactors)
 
 
-async def check_is_self_only_pin(pin, user_id):
-    """ピン留めメッセージが自分だけのものかチェックする関数
+async def archive_oldest_pin(channel, source: str):
+    """PIN_ARCHIVE_POLICY に従ってピン留めを1件選び、アーカイブに移してピン留めを解除する
+
+    アーカイブへの保存を先に行い、解除に失敗したらアーカイブから戻す。
+    チャンネルごとのロックの中で呼ぶこと。
 
     Args:
-        pin: ピン留めメッセージオブジェクト
-        user_id: チェックするユーザーのID
+        source: メトリクスのラベル（ピン留めのきっかけ: reaction / batch）
 
     Returns:
-        bool: 自分だけがピン留めしている場合True
-    """
-    print(f"[DEBUG] check_is_self_only_pin: メッセージID={pin.id}, チェック対象ユーザーID={user_id}")
-    print(f"[DEBUG] メッセージ内容: {pin.content[:30]}...")
-    print(f"[DEBUG] リアクション数: {len(pin.reactions)}")
-
-    pin_reaction = None
-    for reaction in pin.reactions:
-        print(f"[DEBUG] リアクション: {reaction.emoji} (count={reaction.count})")
-        if str(reaction.emoji) == PIN_EMOJI:
-            pin_reaction = reaction
-            print(f"[DEBUG] 📌リアクションを発見！")
-            break
-
-    if pin_reaction is None:
-        print(f"[DEBUG] 📌リアクションが見つかりませんでした")
+        アーカイブしたメッセージ（アーカイブできるピン留めがなければNone）
+    """
+    await pin_cache.invalidate(channel.id)  # 最新のピン留め一覧から選ぶ
+    victim = choose_eviction(await pin_cache.get_pins(channel), PIN_ARCHIVE_POLICY)
+    if victim is None:
+        return None
+
+    reactors = await pin_index.get_reactors(victim.id)
+    if reactors is None:
+        # ピン留め一覧の取得結果にはリアクションの情報が揃っていないため、メッセージを再取得する
+        refreshed = await refresh_pins(channel, [victim], PIN_FETCH_CONCURRENCY)
+        reactors = refreshed[0][1] if refreshed else set()
+    await pin_archive.add(victim, reactors)
+    try:
+        await victim.unpin(reason="ピン留めの上限に達したためアーカイブ")
+    except discord.NotFound:
+        pass  # 既に解除されている
+    except discord.HTTPException:
+        await pin_archive.remove(victim.id)
+        raise
+    PIN_ACTIONS.inc(action="archive", source=source, result="success")
+    await pin_index.remove_message(victim.id)
+    await pin_cache.invalidate(channel.id)
+    logger.info(
+        "ピン留めの上限に達したため、ピン留めをアーカイブしました (チャンネル: %s, メッセージID: %s)",
+        channel.name, victim.id
+    )
+    return victim
+
+
+async def pin_message(channel, message, source: str) -> bool:
+    """メッセージをピン留めする
+
+    チャンネルのピン留めが上限に達していれば、1件アーカイブしてからやり直す。
+
+    Args:
+        source: メトリクスのラベル（ピン留めのきっかけ: reaction / batch）
+
+    Returns:
+        bool: アーカイブしてからピン留めしたか
+    """
+    try:
+        await message.pin()
         return False
+    except discord.HTTPException as e:
+        if not is_max_pins_error(e) or PIN_ARCHIVE_POLICY == "off":
+            raise
+        error = e
+
+    lock = archive_locks.setdefault(channel.id, asyncio.Lock())
+    async with lock:
+        if await archive_oldest_pin(channel, source) is None:
+            raise error
+        await message.pin()
+    return True
+
+
+async def apply_batch_item(job, channel, message_id: int, pinned: set[int]) -> str:
+    """/pinbatch の1件をピン留め・解除する（pinned: ジョブの開始時にピン留めされていたメッセージID）
+
+    Returns:
+        str: 結果（done / skipped）、失敗した場合は例外を送出する
+    """
+    message = channel.get_partial_message(message_id)
+    if job.action == "pin":
+        if message_id in pinned:
+            return "skipped"
+        # 上限に達していれば古いピン留めをアーカイブする
+        await pin_message(channel, message, "batch")
+        await pin_archive.remove(message_id)
+        return "done"
+
+    if message_id in pinned:
+        try:
+            await message.unpin(reason="/pinbatch による解除")
+        except discord.NotFound:
+            pass  # 既に解除されている
+        await pin_index.remove_message(message_id)
+        return "done"
+    if await pin_archive.remove(message_id):
+        return "done"
+    return "skipped"
+
+
+async def run_pin_batch(job, on_progress=None):
+    """/pinbatch のジョブの未処理のメッセージをピン留め・解除する（中断したジョブの再開にも使う）
+
+    チャンネルごとのピン留め一覧を最初に1回だけ取得して処理済みかどうかを判定し、
+    ピン留め・解除は PIN_BATCH_CONCURRENCY 件ずつ、📌リアクションや一覧の表示より低い優先度で送る。
+    結果はメッセージごとに保存する。
+
+    Args:
+        job: BatchJob
+        on_progress: 1件処理するたびに呼ばれるコルーチン関数（任意）
+    """
+    guild = bot.get_guild(job.guild_id)
+    by_channel: dict[int, list[int]] = {}
+    for link in await pin_batches.pending(job.job_id):
+        by_channel.setdefault(link.channel_id, []).append(link.message_id)
+
+    async def record(message_id: int, result):
+        status, detail = result_status(result)
+        await pin_batches.set_result(job.job_id, message_id, status, detail)
+        PIN_ACTIONS.inc(action=job.action, source="batch", result=status)
+        if on_progress is not None:
+            await on_progress()
+
+    with rest_priority(Priority.BATCH):
+        pinned: dict[int, set[int]] = {}
+        channels = []
+        for channel_id, message_ids in by_channel.items():
+            channel = guild.get_channel_or_thread(channel_id) if guild else None
+            if channel is None:
+                for message_id in message_ids:
+                    await record(message_id, "not_found")
+            else:
+                channels.append(channel)
+
+        async def on_channel(channel, result):
+            if isinstance(result, Exception):
+                for message_id in by_channel[channel.id]:
+                    await record(message_id, result)
+            else:
+                pinned[channel.id] = {pin.id for pin in result}
+
+        await bounded_gather(channels, pin_cache.get_pins, PIN_BATCH_CONCURRENCY, on_done=on_channel)
+
+        items = [
+            (channel, message_id)
+            for channel in channels if channel.id in pinned
+            for message_id in by_channel[channel.id]
+        ]
+        await bounded_gather(
+            items,
+            lambda item: apply_batch_item(job, item[0], item[1], pinned[item[0].id]),
+            PIN_BATCH_CONCURRENCY,
+            on_done=lambda item, result: record(item[1], result)
+        )
+
+        # ピン留め一覧を読み直し、全文検索インデックスに反映する
+        for channel in channels:
+            if channel.id in pinned:
+                await pin_cache.invalidate(channel.id)
+                try:
+                    await pin_cache.get_pins(channel)
+                except discord.HTTPException as e:
+                    logger.warning("ピン留め一覧の再取得に失敗しました (チャンネル: %s): %s", channel.name, e)
+
+    await pin_batches.finish(job.job_id)
+    counts = await pin_batches.counts(job.job_id)
+    logger.info("/pinbatch のジョブ #%d が完了しました: %s", job.job_id, dict(counts))
+
+
+def start_pin_batch(job, on_progress=None) -> asyncio.Task:
+    """ジョブを実行するタスクを開始する（実行中ならそのタスクを返す）"""
+    task = batch_tasks.get(job.job_id)
+    if task is not None and not task.done():
+        return task
+    task = asyncio.create_task(run_pin_batch(job, on_progress))
+    batch_tasks[job.job_id] = task
+
+    def finished(t):
+        if batch_tasks.get(job.job_id) is t:
+            del batch_tasks[job.job_id]
+        if not t.cancelled() and t.exception() is not None:
+            logger.error("/pinbatch のジョブ #%d が中断しました: %s", job.job_id, t.exception())
+
+    task.add_done_callback(finished)
+    return task
+
+
+async def batch_report(job_id: int) -> discord.Embed:
+    """ジョブの途中経過または結果のEmbed"""
+    job = await pin_batches.get(job_id)
+    return batch_report_embed(job, await pin_batches.counts(job_id), await pin_batches.failures(job_id))
+
+
+async def on_messages_unpinned(messages: list):
+    """まとめて解除でピン留めが解除された時のコールバック"""
+    for message in messages:
+        await pin_index.remove_message(message.id)
+        await search_index.remove(message.id)
+        await pin_cache.invalidate(message.channel.id)
+
+
+async def setup_hook():
+    """
+    Bot起動時（ログイン前）に1回だけ実行される初期化処理
+    """
+    # REST呼び出しの優先度付けとレート制限の計測、イベントループ遅延の計測を開始
+    # （スケジューラのキューで待った時間もREST呼び出しの応答時間に含める）
+    rest_scheduler.install(bot.http)
+    instrument_http(bot.http)
+    install_rate_limit_counter()
+    loop_monitor.start()
 
-    reaction_users = []
-    async for user in pin_reaction.users():
-        print(f"[DEBUG] リアクションユーザー: {user.name} (ID={user.id}, bot={user.bot})")
-        if not user.bot:
-            reaction_users.append(user)
 
-    print(f"[DEBUG] Bot以外のリアクションユーザー数: {len(reaction_users)}")
-    if len(reaction_users) > 0:
-        print(f"[DEBUG] リアクションユーザーID: {[u.id for u in reaction_users]}")
+bot.setup_hook = setup_hook
 
-    # 自分だけがリアクションしている場合のみTrue
-    is_self_only = (
-        len(reaction_users) == 1 and
-        reaction_users[0].id == user_id
+
+def register_bot_metrics():
+    """Botの状態を出力時に読み取るメトリクスを登録する"""
+    Gauge(
+        "pinbot_gateway_latency_seconds",
+        "ゲートウェイのハートビート遅延",
+        callback=lambda: bot.latency if math.isfinite(bot.latency) else None
+    )
+    Gauge(
+        "pinbot_shard_latency_seconds",
+        "シャードごとのゲートウェイのハートビート遅延",
+        ["shard"],
+        callback=lambda: {(str(shard_id),): latency for shard_id, latency in shard_stats.latencies()}
+    )
+    Gauge(
+        "pinbot_event_loop_lag_current_seconds",
+        "直近のイベントループの遅延",
+        callback=lambda: loop_monitor.lag
+    )
+    Counter(
+        "pinbot_pin_cache_requests_total",
+        "ピン留め一覧キャッシュの参照数",
+        ["result"],
+        callback=lambda: {("hit",): pin_cache.hits, ("miss",): pin_cache.misses}
+    )
+    Counter(
+        "pinbot_user_name_lookups_total",
+        "ユーザー名の解決数",
+        ["result"],
+        callback=lambda: {("hit",): user_resolver.hits, ("miss",): user_resolver.misses}
+    )
+    Gauge(
+        "pinbot_pin_cache_entries",
+        "ピン留め一覧キャッシュのチャンネル数",
+        callback=lambda: len(pin_cache)
+    )
+    Gauge(
+        "pinbot_pin_index_entries",
+        "ピン留めインデックスのメッセージ数",
+        callback=lambda: len(pin_index)
+    )
+    Gauge(
+        "pinbot_search_index_entries",
+        "全文検索インデックスのメッセージ数",
+        callback=lambda: len(search_index)
+    )
+    Gauge(
+        "pinbot_pin_batch_running",
+        "実行中の /pinbatch のジョブ数",
+        callback=lambda: len(batch_tasks)
+    )
+    Gauge(
+        "pinbot_pin_archive_entries",
+        "ピン留めの上限を超えてアーカイブしたメッセージ数",
+        callback=lambda: len(pin_archive)
+    )
+    Gauge(
+        "pinbot_notifications_outstanding",
+        "削除待ちの通知メッセージ数",
+        callback=lambda: notifier.outstanding
+    )
+    Gauge(
+        "pinbot_rest_queue_depth",
+        "RESTスケジューラのキューで待っているリクエスト数",
+        ["priority"],
+        callback=lambda: {(p.name.lower(),): n for p, n in rest_scheduler.depth().items()}
+    )
+    Gauge(
+        "pinbot_rest_in_flight",
+        "RESTスケジューラが送り出して応答を待っているリクエスト数",
+        callback=lambda: rest_scheduler.in_flight
+    )
+    Gauge(
+        "pinbot_warmup_channels",
+        "ピン留めのウォームアップのチャンネル数（累計、pending は待っている・処理中の数）",
+        ["state"],
+        callback=lambda: {
+            (state,): warmup.progress()[state] for state in ("total", "done", "failed", "skipped", "pending")
+        }
+    )
+    Gauge(
+        "pinbot_reaction_batches_pending",
+        "処理待ちのリアクションイベントのバッチ数",
+        callback=lambda: reaction_coalescer.pending
     )
-    print(f"[DEBUG] 結果: is_self_only={is_self_only}")
-    return is_self_only
 
 
 @bot.event
@@ -74,49 +635,117 @@ async def on_ready():
     """
     Botが起動した時のイベント
     """
-    print(f'{bot.user} がログインしました!')
-    print(f'Bot ID: {bot.user.id}')
-    print('📌 リアクションでメッセージをピン留めするBotが起動しました')
+    logger.info("%s がログインしました! (Bot ID: %s)", bot.user, bot.user.id)
+    logger.info("📌 リアクションでメッセージをピン留めするBotが起動しました")
+    if LEAN_RUNTIME:
+        logger.info("LEAN_RUNTIME: メッセージイベントを受け取らないため `!pin` コマンドの代わりに /pin を使用してください")
 
     # スラッシュコマンドを同期
     try:
         synced = await bot.tree.sync()
-        print(f'スラッシュコマンドを {len(synced)} 個同期しました')
+        logger.info("スラッシュコマンドを %d 個同期しました", len(synced))
     except Exception as e:
-        print(f'スラッシュコマンド同期エラー: {e}')
+        logger.error("スラッシュコマンド同期エラー: %s", e)
+
+    # ピン留めの読み込みとインデックスのリコンシリエーション（再接続時も実行、処理中のチャンネルは重ねない）
+    channels = sum(warmup.schedule(accessible_channels(guild)) for guild in bot.guilds)
+    logger.info("ピン留めのウォームアップを開始しました (%d チャンネル)", channels)
+
+    # 停止前に完了していなかった /pinbatch のジョブを未処理のメッセージから再開する
+    for job in await pin_batches.unfinished():
+        if job.job_id not in batch_tasks:
+            start_pin_batch(job)
+            logger.info("/pinbatch のジョブ #%d を再開しました", job.job_id)
+
+
+@bot.event
+async def on_guild_join(guild):
+    """
+    Botがギルドに参加した時のイベント
+    参加したギルドのピン留めを読み込んでおく
+    """
+    channels = warmup.schedule(accessible_channels(guild))
+    logger.info("ギルドに参加しました: %s (ウォームアップ %d チャンネル)", guild.name, channels)
+
+
+# /pinnedlist の並べ替えの表示名
+SORT_LABELS = {"newest": "新しい順", "oldest": "古い順", "most_reacted": "📌が多い順"}
+
+
+def list_conditions_text(days, sort) -> str:
+    """一覧のフッターに表示する期間と並べ替えの説明"""
+    conditions = []
+    if days:
+        conditions.append(f"過去{days}日間")
+    if sort is not None:
+        conditions.append(SORT_LABELS[sort])
+    return f"（{'・'.join(conditions)}）" if conditions else ""
+
+
+def progress_updater(message, render):
+    """
+    途中経過を表示するメッセージを更新する関数を返す
+    更新はメッセージの編集のレート制限に合わせて PROGRESS_UPDATE_INTERVAL 秒に1回まで間引き、
+    すぐ終われば途中経過は更新しない
+
+    Args:
+        message: 途中経過を表示するメッセージ
+        render: 途中経過のEmbedを返す関数（コルーチン関数でもよい）
+    """
+    state = {"updated_at": asyncio.get_running_loop().time(), "updating": False}
+
+    async def update():
+        now = asyncio.get_running_loop().time()
+        if state["updating"] or now - state["updated_at"] < PROGRESS_UPDATE_INTERVAL:
+            return
+        state["updating"] = True
+        try:
+            await message.edit(embed=await discord.utils.maybe_coroutine(render))
+        except discord.HTTPException as e:
+            logger.warning("途中経過の更新に失敗しました: %s", e)
+        finally:
+            state["updated_at"] = asyncio.get_running_loop().time()
+            state["updating"] = False
+
+    return update
 
 
 @bot.tree.command(name="pinnedlist", description="ピン留めメッセージの一覧を表示します")
 @app_commands.describe(
     user="表示するユーザー（省略時は全員のメッセージ）",
-    days="過去何日間のメッセージを表示するか（省略時は全期間）"
+    days="過去何日間のメッセージを表示するか（省略時は全期間）",
+    scope="一覧の範囲（省略時はこのチャンネル）",
+    sort="並べ替え（省略時はこのチャンネルならピン留めした順、サーバー全体なら新しい順）"
+)
+@app_commands.choices(
+    scope=[
+        app_commands.Choice(name="このチャンネル", value="channel"),
+        app_commands.Choice(name="サーバー全体", value="guild"),
+    ],
+    sort=[app_commands.Choice(name=label, value=value) for value, label in SORT_LABELS.items()],
 )
+@timed("pinnedlist")
 async def pinnedlist(
     interaction: discord.Interaction,
     user: discord.Member = None,
-    days: int = None
+    days: int = None,
+    scope: app_commands.Choice[str] = None,
+    sort: app_commands.Choice[str] = None
 ):
     """
     ピン留めメッセージの一覧を表示し、自分だけがピン留めしているメッセージはまとめて解除できるスラッシュコマンド
     """
     await interaction.response.defer(ephemeral=True)
 
-    try:
-        # チャンネルのピン留めメッセージを取得
-        pins = await interaction.channel.pins()
-
-        # ユーザーでフィルタリング（指定がなければ全員）
-        if user:
-            filtered_pins = [p for p in pins if p.author.id == user.id]
-            title_user = f"{user.display_name} さん"
-        else:
-            filtered_pins = pins
-            title_user = "全員"
+    order = sort.value if sort is not None else None
+    if scope is not None and scope.value == "guild":
+        await pinnedlist_guild(interaction, user, days, order)
+        return
 
-        # 日数でフィルタリング
-        if days is not None and days > 0:
-            cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
-            filtered_pins = [p for p in filtered_pins if p.created_at >= cutoff_date]
+    try:
+        # チャンネルのピン留めメッセージを絞り込んで取得（上限を超えてアーカイブした分も含める）
+        filtered_pins = await query_channel_pins(interaction.channel, user, days, order)
+        title_user = f"{user.display_name} さん" if user else "全員"
 
         if not filtered_pins:
             period_text = f"過去{days}日間の" if days else ""
@@ -127,340 +756,665 @@ async def pinnedlist(
             )
             return
 
-        # Embedを作成
-        embed = discord.Embed(
+        # ページ単位で表示（📌/🔒の判定は表示するページの分だけ行う）
+        view = PinnedListView(
+            filtered_pins,
+            user_id=interaction.user.id,
+            resolve=lambda page_pins: resolve_reactors(interaction.channel, page_pins),
             title=f"📌 {title_user}のピン留めメッセージ一覧",
-            color=discord.Color.gold()
+            guild_id=interaction.guild_id,
+            period_text=list_conditions_text(days, order),
+            page_size=PINNEDLIST_PAGE_SIZE,
+            on_unpinned=on_messages_unpinned
         )
+        embed = await view.render_page(0)
 
-        # メッセージリストを作成（リアクションベース判定）
-        message_list = []
-        my_pins = []  # 自分だけがピン留めしているメッセージ（解除用）
-        my_id = interaction.user.id
+        # 解除・ページ送りが不要な場合はViewを付けない
+        if view.children:
+            await interaction.followup.send(embed=embed, view=view, ephemeral=True)
+        else:
+            await interaction.followup.send(embed=embed, ephemeral=True)
 
-        for pin in filtered_pins:
-            # リアクション情報を取得するためにメッセージを再取得
-            try:
-                pin = await interaction.channel.fetch_message(pin.id)
-            except discord.NotFound:
-                continue  # メッセージが削除されている場合はスキップ
-            except discord.Forbidden:
-                continue  # 権限エラーの場合はスキップ
-            # メッセージ冒頭の10文字を取得（改行を除去）
-            content_preview = pin.content.replace('\n', ' ')[:10]
-            if len(pin.content) > 10:
-                content_preview += "..."
-
-            # メッセージが空の場合（画像のみなど）
-            if not content_preview.strip():
-                content_preview = "[添付ファイル/埋め込み]"
-
-            # メッセージリンクを作成
-            message_link = f"https://discord.com/channels/{interaction.guild_id}/{pin.channel.id}/{pin.id}"
-
-            # 自分だけがピン留めしているかチェック
-            is_self_only = await check_is_self_only_pin(pin, my_id)
-
-            if is_self_only:
-                # 自分だけがピン留め: 解除可能
-                message_list.append(f"📌 [{content_preview}]({message_link})")
-                my_pins.append(pin)
-            else:
-                # 他人もピン留め or 自分はピン留めしていない: 解除不可
-                message_list.append(f"🔒 [{content_preview}]({message_link}) *by {pin.author.display_name}*")
+    except discord.Forbidden:
+        await interaction.followup.send(
+            "❌ ピン留めメッセージを取得する権限がありません。",
+            ephemeral=True
+        )
+    except Exception as e:
+        logger.exception("pinnedlistコマンドエラー: %s", e)
+        await interaction.followup.send(
+            f"❌ エラーが発生しました: {str(e)}",
+            ephemeral=True
+        )
 
-        # Embedの文字制限（4096文字）を考慮してリストを結合
-        description = "\n".join(message_list)
-        if len(description) > 4000:
-            description = description[:4000] + "\n...（以降省略）"
 
-        embed.description = description
+async def pinnedlist_guild(interaction: discord.Interaction, user, days, order=None):
+    """
+    サーバー全体のピン留めメッセージの一覧を表示する（/pinnedlist scope:サーバー全体）
+    チャンネルを並列に読み込み、読み込みが終わったチャンネルの分から途中経過を表示する
+    """
+    guild = interaction.guild
+    if guild is None:
+        await interaction.followup.send("❌ サーバー全体の一覧はサーバー内でのみ使用できます。", ephemeral=True)
+        return
 
-        # フッターに件数を表示
-        period_text = f"（過去{days}日間）" if days else ""
-        total_count = len(filtered_pins)
-        my_count = len(my_pins)
+    title = f"📌 {user.display_name + ' さん' if user else '全員'}のピン留めメッセージ一覧（サーバー全体）"
+    # 実行したユーザーが読めないチャンネルのピン留めは表示しない
+    channels = accessible_channels(guild, interaction.user)
+    order = order or "newest"
+    found = []
+    # チャンネルごとの、order の順に並んだ一覧
+    loaded = []
+    state = {"done": 0, "failed": 0}
 
-        footer_text = f"合計 {total_count} 件{period_text}"
-        if my_count > 0:
-            if my_count > 25:
-                footer_text += f" | 📌 自分: {my_count}件（解除は先頭25件まで）"
+    try:
+        message = await interaction.followup.send(
+            embed=progress_embed(title, found, 0, len(channels), guild.id), ephemeral=True, wait=True
+        )
+        update_progress = progress_updater(
+            message, lambda: progress_embed(title, found, state["done"], len(channels), guild.id)
+        )
+
+        async def on_channel(channel, result):
+            state["done"] += 1
+            if isinstance(result, discord.Forbidden):
+                pass  # 権限のないチャンネルは飛ばす
+            elif isinstance(result, Exception):
+                state["failed"] += 1
+                logger.warning("サーバー全体の一覧の読み込みエラー (チャンネル: %s): %s", channel.name, result)
             else:
-                footer_text += f" | 📌 自分: {my_count}件（解除可能）"
-        else:
-            footer_text += " | 自分のピン留めはありません"
+                found.extend(result)
+                loaded.append(result)
+            await update_progress()
+
+        await bounded_gather(
+            channels,
+            # 📌が多い順はチャンネルをまたいで件数を解決してから並べる
+            lambda channel: load_channel_pins(channel, user, days, "newest" if order == "most_reacted" else order),
+            GUILD_SCAN_CONCURRENCY,
+            on_done=on_channel
+        )
 
-        embed.set_footer(text=footer_text)
+        failed_text = f"⚠️ {state['failed']} チャンネルの読み込みに失敗しました。" if state["failed"] else None
+        if not found:
+            period_text = f"過去{days}日間の" if days else ""
+            target_text = f"{user.display_name} さんの" if user else ""
+            await message.edit(
+                content=f"📌 {target_text}{period_text}ピン留めメッセージはこのサーバーにありません。\n{failed_text or ''}".strip(),
+                embed=None
+            )
+            return
 
-        # 解除用のViewを作成（自分のメッセージのみ）
-        if my_pins:
-            view = UnpinSelectView(my_pins, user_id=my_id)
-            await interaction.followup.send(embed=embed, view=view, ephemeral=True)
+        # チャンネルをまたいで order の順に並べる
+        if order == "most_reacted":
+            found = await sort_by_reactors(found, resolve_guild_reactors)
         else:
-            await interaction.followup.send(embed=embed, ephemeral=True)
+            found = merge_sorted(loaded, order)
+        view = PinnedListView(
+            found,
+            user_id=interaction.user.id,
+            resolve=resolve_guild_reactors,
+            title=title,
+            guild_id=guild.id,
+            period_text=list_conditions_text(days, order),
+            page_size=PINNEDLIST_PAGE_SIZE,
+            on_unpinned=on_messages_unpinned,
+            show_channel=True
+        )
+        embed = await view.render_page(0)
+        await message.edit(content=failed_text, embed=embed, view=view if view.children else None)
 
-    except discord.Forbidden:
+    except Exception as e:
+        logger.exception("pinnedlistコマンドエラー: %s", e)
         await interaction.followup.send(
-            "❌ ピン留めメッセージを取得する権限がありません。",
+            f"❌ エラーが発生しました: {str(e)}",
+            ephemeral=True
+        )
+
+
+@bot.tree.command(name="pinsearch", description="ピン留めメッセージを本文のキーワードで検索します")
+@app_commands.describe(
+    query="検索するキーワード（空白で区切ると全てを含むメッセージを検索）",
+    user="メッセージの作者（省略時は全員）",
+    channel="検索するチャンネル（省略時はサーバー全体）"
+)
+@timed("pinsearch")
+async def pinsearch(
+    interaction: discord.Interaction,
+    query: str,
+    user: discord.Member = None,
+    channel: discord.TextChannel = None
+):
+    """
+    ピン留めメッセージを全文検索インデックスから検索するスラッシュコマンド（REST呼び出しなし）
+    """
+    if interaction.guild_id is None:
+        await interaction.response.send_message("❌ /pinsearch はサーバー内でのみ使用できます。", ephemeral=True)
+        return
+
+    guild = interaction.guild
+    if guild is None:
+        await interaction.response.send_message("❌ /pinsearch はBotが参加しているサーバーでのみ使用できます。", ephemeral=True)
+        return
+    # 実行したユーザーが見られないチャンネルのピン留めは検索しない
+    readable = {c.id for c in (*guild.text_channels, *guild.threads) if c.permissions_for(interaction.user).view_channel}
+
+    # 1件多く取得して、表示しきれない結果があるかを判定する
+    hits = await search_index.search(
+        interaction.guild_id,
+        query,
+        channel_id=channel.id if channel else None,
+        author_id=user.id if user else None,
+        limit=PIN_SEARCH_LIMIT + 1,
+        channel_ids=readable
+    )
+    if not hits:
+        await interaction.response.send_message(
+            f"🔍 「{query}」を含むピン留めメッセージは見つかりませんでした。",
             ephemeral=True
         )
+        return
+
+    embed = search_results_embed(query, hits[:PIN_SEARCH_LIMIT], more=len(hits) > PIN_SEARCH_LIMIT)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+@bot.tree.command(name="pinbatch", description="メッセージリンクの一覧からまとめてピン留め・解除します")
+@app_commands.describe(
+    action="ピン留めするか解除するか",
+    links="メッセージリンク（空白・改行・カンマ区切り）",
+    file="メッセージリンクを並べたテキストファイル",
+    job="途中経過・結果を表示するジョブの番号（中断したジョブは再開します）"
+)
+@app_commands.choices(action=[
+    app_commands.Choice(name="ピン留め", value="pin"),
+    app_commands.Choice(name="解除", value="unpin"),
+])
+@app_commands.default_permissions(manage_messages=True)
+@timed("pinbatch")
+async def pinbatch(
+    interaction: discord.Interaction,
+    action: app_commands.Choice[str] = None,
+    links: str = None,
+    file: discord.Attachment = None,
+    job: int = None
+):
+    """
+    メッセージリンクの一覧を検証・重複除去し、まとめてピン留め・解除するスラッシュコマンド
+    処理はジョブとして保存し、途中経過を表示しながら進め、最後に結果をまとめて表示する
+    """
+    guild = interaction.guild
+    if guild is None:
+        await interaction.response.send_message("❌ /pinbatch はサーバー内でのみ使用できます。", ephemeral=True)
+        return
+    if not interaction.permissions.manage_messages:
+        await interaction.response.send_message("❌ /pinbatch にはメッセージの管理権限が必要です。", ephemeral=True)
+        return
+    await interaction.response.defer(ephemeral=True)
+
+    try:
+        if job is not None:
+            # 保存したジョブの途中経過・結果を表示する（中断していれば再開する）
+            batch = await pin_batches.get(job)
+            if batch is None or batch.guild_id != guild.id:
+                await interaction.followup.send(f"❌ ジョブ #{job} が見つかりません。", ephemeral=True)
+                return
+            if not batch.finished:
+                start_pin_batch(batch)
+            await interaction.followup.send(embed=await batch_report(job), ephemeral=True)
+            return
+
+        if action is None or (not links and file is None):
+            await interaction.followup.send(
+                "❌ `action:` と、`links:` または `file:` のメッセージリンクを指定してください。", ephemeral=True
+            )
+            return
+
+        text = links or ""
+        if file is not None:
+            if file.size > PIN_BATCH_MAX_FILE_SIZE:
+                await interaction.followup.send("❌ ファイルが大きすぎます（1MBまで）。", ephemeral=True)
+                return
+            text += "\n" + (await file.read()).decode("utf-8", errors="replace")
+
+        parsed = parse_message_links(text, guild.id)
+        if not parsed.links:
+            await interaction.followup.send(
+                f"❌ このサーバーのメッセージリンクがありません（無効なリンク {len(parsed.invalid)} 件）。", ephemeral=True
+            )
+            return
+        if len(parsed.links) > PIN_BATCH_MAX_ITEMS:
+            await interaction.followup.send(
+                f"❌ 1回に指定できるメッセージは {PIN_BATCH_MAX_ITEMS} 件までです（{len(parsed.links)} 件）。", ephemeral=True
+            )
+            return
+
+        # 実行したユーザーとBotがメッセージを管理できないチャンネルは処理しない
+        rejected = {}
+        for link in parsed.links:
+            channel = guild.get_channel_or_thread(link.channel_id)
+            if channel is None:
+                rejected[link] = "not_found"
+            elif not (channel.permissions_for(interaction.user).manage_messages
+                      and channel.permissions_for(guild.me).manage_messages):
+                rejected[link] = "forbidden"
+
+        batch = await pin_batches.create(guild.id, interaction.channel_id, interaction.user.id, action.value, parsed, rejected)
+        message = await interaction.followup.send(embed=await batch_report(batch.job_id), ephemeral=True, wait=True)
+        on_progress = progress_updater(message, lambda: batch_report(batch.job_id))
+
+        # コマンドの処理が中断されてもジョブは続ける
+        await asyncio.shield(start_pin_batch(batch, on_progress))
+        try:
+            await message.edit(embed=await batch_report(batch.job_id))
+        except discord.HTTPException as e:
+            # インタラクションの期限（15分）を過ぎた場合は /pinbatch job: で結果を確認できる
+            logger.warning("/pinbatch の結果を表示できませんでした (ジョブ #%d): %s", batch.job_id, e)
+
     except Exception as e:
-        print(f"pinnedlistコマンドエラー: {e}")
+        logger.exception("pinbatchコマンドエラー: %s", e)
         await interaction.followup.send(
             f"❌ エラーが発生しました: {str(e)}",
             ephemeral=True
         )
 
 
-@bot.event
-async def on_raw_reaction_add(payload):
+@timed("pin_add")
+async def handle_pin_add(payloads: list):
     """
-    リアクションが追加された時のイベント（キャッシュ不要版）
-    📌(pushpin)リアクションが追加されたメッセージをピン留めする
+    📌リアクションが追加されたメッセージをピン留めする
+    同じメッセージへの追加はまとめて渡され、ピン留めは1回だけ行う
     """
-    # Botの反応は無視
-    if payload.user_id == bot.user.id:
+    payload = payloads[-1]
+    # チャンネルとメッセージを取得
+    channel = bot.get_channel(payload.channel_id)
+    if channel is None:
+        logger.warning("チャンネルが見つかりません (ID: %s)", payload.channel_id)
         return
 
-    # pushpin絵文字かどうかチェック
-    if str(payload.emoji) == PIN_EMOJI:
-        # チャンネルとメッセージを取得
-        channel = bot.get_channel(payload.channel_id)
-        if channel is None:
-            print(f"チャンネルが見つかりません (ID: {payload.channel_id})")
-            return
+    try:
+        message = await channel.fetch_message(payload.message_id)
+    except discord.NotFound:
+        logger.info("メッセージが見つかりません (ID: %s)", payload.message_id)
+        return
+    except discord.Forbidden:
+        logger.warning("メッセージを取得する権限がありません (チャンネルID: %s)", payload.channel_id)
+        return
+
+    # 実行者の名前はログにだけ使うため、ペイロードのメンバー情報とキャッシュから解決する（RESTは呼ばない）
+    for p in payloads:
+        user_resolver.remember(p.member)
+    user_name = user_resolver.name(payload.user_id)
+    user_mention = mention(payload.user_id)
+
+    # 既にピン留めされているかチェック
+    if message.pinned:
+        for p in payloads:
+            await index_reactor_added(p, message)
+        await index_pinned(message)
+        logger.debug("メッセージは既にピン留めされています (ID: %s)", message.id)
+        return
+
+    try:
+        # メッセージをピン留め（上限に達していれば古いピン留めをアーカイブする）
+        archived = await pin_message(channel, message, "reaction")
+        PIN_ACTIONS.inc(action="pin", source="reaction", result="success")
+        await pin_cache.invalidate(channel.id)
+        # アーカイブから📌を付け直した場合は通常のピン留めに戻す
+        await pin_archive.remove(message.id)
+        for p in payloads:
+            await index_reactor_added(p, message)
+        await index_pinned(message)
+
+        # ログ出力
+        logger.info(
+            "メッセージをピン留めしました (チャンネル: %s, 作者: %s, 実行者: %s, メッセージID: %s)",
+            channel.name, message.author.name, user_name, message.id
+        )
 
+        # ピン留め実行を知らせる一時的なメッセージを送信
+        # 削除はスケジューラに任せる（同時に複数のピン留めがあれば1つの通知にまとめる）
+        for p in payloads:
+            await notifier.notify(channel, "📌 {mentions} がメッセージをピン留めしました！", mention(p.user_id))
+        if archived:
+            await notifier.send_temporary(
+                channel,
+                "🗄️ ピン留めが上限に達したため、古いピン留めをアーカイブしました（`/pinnedlist` で表示されます）。"
+            )
+
+    except discord.Forbidden:
+        # ピン留め権限がない場合
+        PIN_ACTIONS.inc(action="pin", source="reaction", result="forbidden")
+        logger.warning("権限エラー: ピン留め権限がありません (ユーザー: %s)", user_name)
+        await notifier.send_temporary(
+            channel,
+            f"❌ {user_mention} ピン留めする権限がありません。"
+        )
+    except discord.HTTPException as e:
+        # その他のエラー（ピン留め数上限など）
+        PIN_ACTIONS.inc(action="pin", source="reaction", result="error")
+        logger.error("HTTPエラー: %s", e)
+        await notifier.send_temporary(
+            channel,
+            f"❌ {user_mention} ピン留めに失敗しました: {str(e)}"
+        )
+    except Exception as e:
+        # 予期しないエラー
+        PIN_ACTIONS.inc(action="pin", source="reaction", result="error")
+        logger.exception("予期しないエラー: %s", e)
+        await notifier.send_temporary(
+            channel,
+            f"❌ {user_mention} 予期しないエラーが発生しました。"
+        )
+
+
+async def update_archived_reactors(message):
+    """アーカイブしたピン留めの📌リアクションユーザーを更新し、いなくなればアーカイブから削除する"""
+    try:
+        remaining = await resolve_remaining_reactors(message)
+    except discord.HTTPException as e:
+        logger.warning("リアクションユーザー取得エラー: %s", e)
+        return  # 安全側に倒してアーカイブを維持する
+    if remaining:
+        await pin_archive.set_reactors(message.id, remaining)
+        return
+    await pin_archive.remove(message.id)
+    await search_index.remove(message.id)
+    PIN_ACTIONS.inc(action="unpin", source="reaction", result="success")
+    logger.info("アーカイブしたピン留めを削除しました (メッセージID: %s)", message.id)
+
+
+@timed("pin_remove")
+async def handle_pin_remove(payloads: list):
+    """
+    📌リアクションが削除されたらピン留めも解除する
+    同じメッセージからの削除はまとめて渡され、判定は1回だけ行う
+    """
+    payload = payloads[-1]
+    # チャンネルとメッセージを取得
+    channel = bot.get_channel(payload.channel_id)
+    if channel is None:
+        logger.warning("チャンネルが見つかりません (ID: %s)", payload.channel_id)
+        return
+
+    # 実行者の名前はログにだけ使うため、ペイロードのメンバー情報とキャッシュから解決する（RESTは呼ばない）
+    for p in payloads:
+        user_resolver.remember(p.member)
+    user_name = user_resolver.name(payload.user_id)
+    user_mention = mention(payload.user_id)
+
+    logger.debug(
+        "リアクション削除検知 (チャンネル: %s, メッセージID: %s, 削除者: %s)",
+        channel.name, payload.message_id, user_name
+    )
+
+    remaining = None
+    for p in payloads:
+        remaining = await pin_index.remove_reactor(p.message_id, p.user_id)
+    if remaining is not None:
+        # インデックスで状態が分かっている場合はメッセージを取得しない
+        message = channel.get_partial_message(payload.message_id)
+        logger.debug("📌リアクションユーザー（インデックス）: %d人", len(remaining))
+    else:
+        # メッセージを1回だけ取得して判定する
         try:
             message = await channel.fetch_message(payload.message_id)
         except discord.NotFound:
-            print(f"メッセージが見つかりません (ID: {payload.message_id})")
+            logger.info("メッセージが見つかりません (ID: %s)", payload.message_id)
             return
         except discord.Forbidden:
-            print(f"メッセージを取得する権限がありません")
+            logger.warning("メッセージを取得する権限がありません (チャンネルID: %s)", payload.channel_id)
             return
 
-        # ユーザーを取得
-        user = bot.get_user(payload.user_id)
-        if user is None:
-            try:
-                user = await bot.fetch_user(payload.user_id)
-            except:
-                user = None
-
-        # 既にピン留めされているかチェック
-        if message.pinned:
-            print(f"メッセージ '{message.content[:50]}...' は既にピン留めされています")
+        # ピン留めされていないなら何もしない（アーカイブしたものは📌リアクションユーザーを更新する）
+        if not message.pinned:
+            if await pin_archive.get(message.id) is not None:
+                await update_archived_reactors(message)
+            else:
+                logger.debug("メッセージは既にピン留めされていません (ID: %s)", message.id)
             return
 
         try:
-            # メッセージをピン留め
-            await message.pin()
-
-            # ログ出力
-            print(f"メッセージをピン留めしました:")
-            print(f"  チャンネル: {channel.name}")
-            print(f"  作者: {message.author.name}")
-            print(f"  内容: {message.content[:100]}...")
-            print(f"  ピン留め実行者: {user.name if user else payload.user_id}")
-            print(f"  メッセージID: {message.id}")
-            print(f"  メッセージ作成日時: {message.created_at}")
-
-            # ピン留め実行を知らせる一時的なメッセージを送信
-            user_mention = user.mention if user else f"<@{payload.user_id}>"
-            pin_notification = await channel.send(
-                f"📌 {user_mention} がメッセージをピン留めしました！"
-            )
+            remaining = await resolve_remaining_reactors(message)
+        except discord.HTTPException as e:
+            logger.warning("リアクションユーザー取得エラー: %s", e)
+            # エラーの場合は安全側に倒してピン留めを維持する
+            return
+        if remaining:
+            await pin_index.set_reactors(payload.guild_id or 0, channel.id, message.id, remaining)
+        logger.debug("📌リアクションユーザー（Bot以外）: %d人", len(remaining))
 
-            # 5秒後に通知メッセージを削除
-            await asyncio.sleep(5)
+    if not remaining:
+        logger.debug("Bot以外のリアクションがなくなりました (メッセージID: %s)", message.id)
+        try:
+            # ピン留めを解除（インデックス経由の場合は既に解除済みでもよい）
             try:
-                await pin_notification.delete()
+                await message.unpin()
             except discord.NotFound:
-                pass  # 既に削除されている場合は無視
+                pass
+            PIN_ACTIONS.inc(action="unpin", source="reaction", result="success")
+            await pin_cache.invalidate(channel.id)
+            await pin_index.remove_message(message.id)
+            await search_index.remove(message.id)
+
+            logger.info(
+                "ピン留めを解除しました (チャンネル: %s, 実行者: %s, メッセージID: %s)",
+                channel.name, user_name, message.id
+            )
+
+            # ピン留め解除を知らせる一時的なメッセージを送信
+            for p in payloads:
+                await notifier.notify(channel, "📌 {mentions} がピン留めを解除しました。", mention(p.user_id))
 
         except discord.Forbidden:
-            # ピン留め権限がない場合
-            user_name = user.name if user else str(payload.user_id)
-            user_mention = user.mention if user else f"<@{payload.user_id}>"
-            print(f"権限エラー: ピン留め権限がありません (ユーザー: {user_name})")
-            await channel.send(
-                f"❌ {user_mention} ピン留めする権限がありません。",
-                delete_after=5
+            PIN_ACTIONS.inc(action="unpin", source="reaction", result="forbidden")
+            logger.warning("権限エラー: ピン留め解除権限がありません (ユーザー: %s)", user_name)
+            await notifier.send_temporary(
+                channel,
+                f"❌ {user_mention} ピン留めを解除する権限がありません。"
             )
         except discord.HTTPException as e:
-            # その他のエラー（ピン留め数上限など）
-            user_mention = user.mention if user else f"<@{payload.user_id}>"
-            print(f"HTTPエラー: {e}")
-            await channel.send(
-                f"❌ {user_mention} ピン留めに失敗しました: {str(e)}",
-                delete_after=5
+            PIN_ACTIONS.inc(action="unpin", source="reaction", result="error")
+            logger.error("HTTPエラー: %s", e)
+            await notifier.send_temporary(
+                channel,
+                f"❌ {user_mention} ピン留め解除に失敗しました: {str(e)}"
             )
         except Exception as e:
-            # 予期しないエラー
-            user_mention = user.mention if user else f"<@{payload.user_id}>"
-            print(f"予期しないエラー: {e}")
-            await channel.send(
-                f"❌ {user_mention} 予期しないエラーが発生しました。",
-                delete_after=5
+            PIN_ACTIONS.inc(action="unpin", source="reaction", result="error")
+            logger.exception("予期しないエラー: %s", e)
+            await notifier.send_temporary(
+                channel,
+                f"❌ {user_mention} 予期しないエラーが発生しました。"
             )
+    else:
+        logger.debug("他のユーザーの📌リアクションが残っているため、ピン留めを維持します (メッセージID: %s)", message.id)
+
+
+async def process_reaction_batch(added: list, removed: list):
+    """
+    1つのメッセージに対する📌リアクションの正味の変化を処理する
+    追加が残っていればピン留め状態になるべきなので、削除はインデックスへの反映のみ行う
+    メッセージの取得も含めて、一覧の更新より先にREST呼び出しを送り出す
+    """
+    with rest_priority(Priority.PIN):
+        if added:
+            for p in removed:
+                await pin_index.remove_reactor(p.message_id, p.user_id)
+            await handle_pin_add(added)
+        elif removed:
+            await handle_pin_remove(removed)
+
+
+# メッセージごとにリアクションイベントをまとめて直列に処理する
+reaction_coalescer = ReactionCoalescer(
+    process_reaction_batch,
+    window=REACTION_COALESCE_WINDOW,
+    locks=state_backend.lock,
+)
+register_bot_metrics()
+
+# /livez・/readyz の判定
+health_monitor = health.HealthMonitor(
+    bot,
+    loop_monitor,
+    pending=lambda: reaction_coalescer.pending + notifier.outstanding,
+    max_loop_lag=HEALTH_MAX_LOOP_LAG,
+    max_heartbeat_age=HEALTH_MAX_HEARTBEAT_AGE,
+    max_not_ready=HEALTH_MAX_NOT_READY,
+    max_latency=HEALTH_MAX_LATENCY,
+    max_event_age=HEALTH_MAX_EVENT_AGE,
+    max_pending=HEALTH_MAX_PENDING,
+)
+server.app.state.health = health_monitor
+
+
+async def record_gateway_event(event_type):
+    """
+    Gatewayイベントを受信するたびに呼ばれるイベント（on_socket_event_type）
+    /readyz 用に最後にイベントを受信した時刻を記録する
+    """
+    health_monitor.record_event()
+
+
+# discord.py はイベントごとにタスクを作って呼び出すため、判定が有効な場合だけ登録する
+if HEALTH_MAX_EVENT_AGE > 0:
+    bot.add_listener(record_gateway_event, "on_socket_event_type")
+
+
+@bot.event
+async def on_raw_reaction_add(payload):
+    """
+    リアクションが追加された時のイベント（キャッシュ不要版）
+    📌(pushpin)リアクションの追加をメッセージごとにまとめてから処理する
+    """
+    shard_stats.record_event(payload.guild_id)
+
+    # Botの反応は無視
+    if payload.user_id == bot.user.id:
+        return
+
+    # pushpin絵文字かどうかチェック
+    if str(payload.emoji) == PIN_EMOJI:
+        REACTION_EVENTS.inc(action="add")
+        reaction_coalescer.submit(payload, added=True)
+
 
 @bot.event
 async def on_raw_reaction_remove(payload):
     """
     リアクションが削除された時のイベント（キャッシュ不要版）
-    📌リアクションが削除されたらピン留めも解除する
+    📌リアクションの削除をメッセージごとにまとめてから処理する
     """
+    shard_stats.record_event(payload.guild_id)
+
     # Botの反応は無視
     if payload.user_id == bot.user.id:
         return
 
     # pushpin絵文字かどうかチェック
     if str(payload.emoji) == PIN_EMOJI:
-        # チャンネルとメッセージを取得
-        channel = bot.get_channel(payload.channel_id)
-        if channel is None:
-            print(f"チャンネルが見つかりません (ID: {payload.channel_id})")
-            return
+        REACTION_EVENTS.inc(action="remove")
+        reaction_coalescer.submit(payload, added=False)
 
-        try:
-            message = await channel.fetch_message(payload.message_id)
-        except discord.NotFound:
-            print(f"メッセージが見つかりません (ID: {payload.message_id})")
-            return
-        except discord.Forbidden:
-            print(f"メッセージを取得する権限がありません")
-            return
 
-        # ユーザーを取得
-        user = bot.get_user(payload.user_id)
-        if user is None:
-            try:
-                user = await bot.fetch_user(payload.user_id)
-            except:
-                user = None
+@bot.event
+async def on_shard_connect(shard_id):
+    """シャードがGatewayに接続した時のイベント（シャーディング時のみ）"""
+    shard_stats.connected(shard_id)
 
-        # ピン留めされていないなら何もしない
-        if not message.pinned:
-            print(f"メッセージは既にピン留めされていません (ID: {message.id})")
-            return
 
-        # 詳細なログ出力
-        print(f"リアクション削除検知:")
-        print(f"  チャンネル: {channel.name}")
-        print(f"  メッセージID: {message.id}")
-        print(f"  削除者: {user.name if user else payload.user_id}")
+@bot.event
+async def on_shard_disconnect(shard_id):
+    """シャードがGatewayから切断された時のイベント（シャーディング時のみ）"""
+    logger.warning("シャード %s が切断されました", shard_id)
+    shard_stats.disconnected(shard_id)
 
-        # メッセージから最新のリアクション情報を取得
-        # メッセージを再フェッチして最新の状態を確実に取得
-        try:
-            message = await channel.fetch_message(payload.message_id)
-        except:
-            pass
 
-        should_unpin = False
-        pushpin_reaction = None
+@bot.event
+async def on_shard_resumed(shard_id):
+    """シャードがセッションを再開した時のイベント（シャーディング時のみ）"""
+    logger.info("シャード %s がセッションを再開しました", shard_id)
+    shard_stats.resumed(shard_id)
 
-        # 📌リアクションを探す
-        for reaction in message.reactions:
-            if str(reaction.emoji) == PIN_EMOJI:
-                pushpin_reaction = reaction
-                break
 
-        if pushpin_reaction is None:
-            # 📌リアクションが完全に削除された
-            print("  📌リアクションが完全に削除されました")
-            should_unpin = True
-        else:
-            # 実際のユーザー数をカウント（Bot以外）
-            real_user_count = 0
-            try:
-                async for reaction_user in pushpin_reaction.users():
-                    if not reaction_user.bot:
-                        real_user_count += 1
-                        print(f"    📌リアクションユーザー: {reaction_user.name}")
-
-                print(f"  📌リアクション数: {pushpin_reaction.count} (Bot以外: {real_user_count})")
-
-                if real_user_count == 0:
-                    should_unpin = True
-                    print("  Bot以外のリアクションがなくなりました")
-            except Exception as e:
-                print(f"  リアクションユーザー取得エラー: {e}")
-                # エラーの場合は安全側に倒してカウントで判定
-                if pushpin_reaction.count == 0:
-                    should_unpin = True
-
-        if should_unpin:
-            try:
-                # ピン留めを解除
-                await message.unpin()
+@bot.event
+async def on_connect():
+    """Gatewayに接続した時のイベント（シャーディング時は on_shard_connect で数える）"""
+    if SHARD_OPTIONS is None:
+        shard_stats.connected(0)
 
-                user_name = user.name if user else str(payload.user_id)
-                print(f"ピン留めを解除しました:")
-                print(f"  チャンネル: {channel.name}")
-                print(f"  解除実行者: {user_name}")
-                print(f"  メッセージID: {message.id}")
 
-                # ピン留め解除を知らせる一時的なメッセージを送信
-                user_mention = user.mention if user else f"<@{payload.user_id}>"
-                unpin_notification = await channel.send(
-                    f"📌 {user_mention} がピン留めを解除しました。"
-                )
+@bot.event
+async def on_disconnect():
+    """Gatewayから切断された時のイベント"""
+    if SHARD_OPTIONS is None:
+        logger.warning("Gatewayから切断されました")
+        shard_stats.disconnected(0)
 
-                # 5秒後に通知メッセージを削除
-                await asyncio.sleep(5)
-                try:
-                    await unpin_notification.delete()
-                except discord.NotFound:
-                    pass
-
-            except discord.Forbidden:
-                user_name = user.name if user else str(payload.user_id)
-                user_mention = user.mention if user else f"<@{payload.user_id}>"
-                print(f"権限エラー: ピン留め解除権限がありません (ユーザー: {user_name})")
-                await channel.send(
-                    f"❌ {user_mention} ピン留めを解除する権限がありません。",
-                    delete_after=5
-                )
-            except discord.HTTPException as e:
-                user_mention = user.mention if user else f"<@{payload.user_id}>"
-                print(f"HTTPエラー: {e}")
-                await channel.send(
-                    f"❌ {user_mention} ピン留め解除に失敗しました: {str(e)}",
-                    delete_after=5
-                )
-            except Exception as e:
-                user_mention = user.mention if user else f"<@{payload.user_id}>"
-                print(f"予期しないエラー: {e}")
-                await channel.send(
-                    f"❌ {user_mention} 予期しないエラーが発生しました。",
-                    delete_after=5
-                )
-        else:
-            print("  他のユーザーの📌リアクションが残っているため、ピン留めを維持します")
 
 @bot.event
-async def on_error(event, *args, **kwargs):
+async def on_resumed():
+    """セッションを再開した時のイベント"""
+    if SHARD_OPTIONS is None:
+        logger.info("Gatewayのセッションを再開しました")
+        shard_stats.resumed(0)
+
+
+@bot.event
+async def on_guild_channel_pins_update(channel, last_pin):
     """
-    エラーハンドリング
+    チャンネルのピン留めが変化した時のイベント
+    Bot以外（Discordのメニューなど）によるピン留め/解除でもキャッシュを破棄する
     """
-    print(f"エラーが発生しました in {event}")
-    import traceback
-    traceback.print_exc()
+    await pin_cache.invalidate(channel.id)
+    # ウォームアップで読み込んだ内容とずれるため、サーバー全体の一覧でREST呼び出しを省かない
+    warmup.forget(channel.id)
+
 
 @bot.event
-async def on_message(message):
+async def on_raw_message_edit(payload):
     """
-    メッセージが送信された時のイベント
-    簡単なコマンドも用意
+    メッセージが編集された時のイベント（キャッシュ不要版）
+    ピン留めメッセージの本文が変わったら全文検索インデックスを更新する
     """
-    # Botの発言は無視
-    if message.author.bot:
-        return
+    if "content" in payload.data:
+        await search_index.update_content(payload.message_id, payload.data["content"])
 
-    # ヘルプコマンド
-    if message.content.lower() in ['!pin help', '!pinhelp']:
-        help_message = """
+
+@bot.event
+async def on_raw_message_delete(payload):
+    """
+    メッセージが削除された時のイベント（キャッシュ不要版）
+    削除されたピン留めメッセージを検索結果に出さない
+    """
+    await search_index.remove(payload.message_id)
+
+
+@bot.event
+async def on_error(event, *args, **kwargs):
+    """
+    エラーハンドリング
+    """
+    logger.exception("エラーが発生しました in %s", event)
+
+# ヘルプメッセージ（!pin help と /pin help で共通）
+# ピン留めが上限に達した時の動作の説明（PIN_ARCHIVE_POLICY によって変わる）
+ARCHIVE_HELP = {
+    "oldest_pinned": "最も前にピン留めしたもの",
+    "oldest_message": "最も古い投稿",
+}
+if PIN_ARCHIVE_POLICY in ARCHIVE_HELP:
+    OVERFLOW_HELP = (
+        f"• Discordのピン留めは1チャンネル50件までです。上限に達したチャンネルで📌や `/pinbatch` でピン留めすると、"
+        f"{ARCHIVE_HELP[PIN_ARCHIVE_POLICY]}をアーカイブに移してピン留めを解除し、新しいメッセージをピン留めします\n"
+        f"• アーカイブしたメッセージは `/pinnedlist` に 🗄️ 付きで表示され、`/pinsearch` でも検索できます"
+        f"（📌を全員が外すとアーカイブから削除、付け直すと再びピン留め）"
+    )
+else:
+    OVERFLOW_HELP = "• Discordのピン留めは1チャンネル50件までです（上限に達するとそれ以上ピン留めできません）"
+
+HELP_MESSAGE = f"""
 📌 **Pin Bot の使い方**
 
 このBotは 📌 (pushpin) リアクションでメッセージを簡単にピン留めできます！
@@ -473,6 +1427,11 @@ async def on_message(message):
 • `/pinnedlist` - 全員のピン留めメッセージ一覧を表示
 • `/pinnedlist user:@ユーザー` - 指定ユーザーのピン留めを表示
 • `/pinnedlist days:7` - 過去7日間のピン留めメッセージを表示
+• `/pinnedlist scope:サーバー全体` - サーバー内の全チャンネルのピン留めを表示
+• `/pinnedlist sort:📌が多い順` - 新しい順 / 古い順 / 📌が多い順に並べ替えて表示
+• `/pinsearch query:キーワード` - ピン留めメッセージを本文で検索
+• `/pinbatch action:ピン留め links:メッセージリンク` - メッセージリンクの一覧からまとめてピン留め・解除（要メッセージ管理権限）
+• `/pin help` - この使い方を表示
 
 **まとめて解除:**
 自分だけがピン留めしているメッセージ（📌）は選択して一括解除できます。
@@ -480,41 +1439,134 @@ async def on_message(message):
 
 **注意:**
 • Botにピン留め権限が必要です
-• 1チャンネルあたり最大50件までピン留めできます
-• まとめて解除は先頭25件まで選択可能です
+{OVERFLOW_HELP}
+• 一覧はページ送りで表示され、まとめて解除は表示中のページから選択します
 
 **デバッグコマンド:**
-• `!pin test` - 動作テスト
-• `!pin status` - Bot状態確認
-        """
-        await message.channel.send(help_message)
+• `/pin test` または `!pin test` - 動作テスト
+• `/pin status` または `!pin status` - Bot状態確認
+"""
+# 動作テスト用のメッセージ
+TEST_MESSAGE = "📌 このメッセージにリアクションしてテストしてください！"
+
+
+async def status_text(channel) -> str:
+    """!pin status と /pin status で表示するBotの状態"""
+    pins = await pin_cache.get_pins(channel)
+    cache_stats = pin_cache.stats()
+    return (
+        f"**Bot状態:**\n"
+        f"• Bot名: {bot.user.name}\n"
+        f"• 現在のピン留め数: {len(pins)}/50（アーカイブ {len(await pin_archive.channel_message_ids(channel.id))} 件）\n"
+        f"• ピン留め一覧キャッシュ: ヒット {cache_stats['hits']} / ミス {cache_stats['misses']}\n"
+        f"• ウォームアップ: {warmup.done + warmup.failed + warmup.skipped}/{warmup.total} チャンネル\n"
+        f"• 権限: {'✅' if channel.permissions_for(channel.guild.me).manage_messages else '❌'} メッセージ管理\n"
+        f"• 稼働時間: {discord.utils.utcnow() - bot.user.created_at}"
+    )
+
+
+# !pin テキストコマンドのスラッシュコマンド版（LEAN_RUNTIME ではメッセージイベントを受け取らないため）
+pin_group = app_commands.Group(name="pin", description="Pin Bot の使い方・動作テスト・状態確認")
+
+
+@pin_group.command(name="help", description="Pin Bot の使い方を表示します")
+async def pin_help(interaction: discord.Interaction):
+    await interaction.response.send_message(HELP_MESSAGE, ephemeral=True)
+
+
+@pin_group.command(name="test", description="📌リアクションを試すためのメッセージを送信します")
+async def pin_test(interaction: discord.Interaction):
+    await interaction.response.send_message(TEST_MESSAGE)
+    test_msg = await interaction.original_response()
+    await test_msg.add_reaction(PIN_EMOJI)
+
+
+@pin_group.command(name="status", description="Botの状態とこのチャンネルのピン留め数を表示します")
+async def pin_status(interaction: discord.Interaction):
+    await interaction.response.defer(ephemeral=True)
+    try:
+        await interaction.followup.send(await status_text(interaction.channel), ephemeral=True)
+    except Exception as e:
+        await interaction.followup.send(f"ステータス取得エラー: {e}", ephemeral=True)
+
+
+bot.tree.add_command(pin_group)
+
+@bot.event
+async def on_message(message):
+    """
+    メッセージが送信された時のイベント
+    簡単なコマンドも用意
+    """
+    shard_stats.record_event(message.guild.id if message.guild else None)
+
+    # Botの発言は無視
+    if message.author.bot:
+        return
+
+    # ヘルプコマンド
+    if message.content.lower() in ['!pin help', '!pinhelp']:
+        await message.channel.send(HELP_MESSAGE)
 
     # テストコマンド
     elif message.content.lower() == '!pin test':
-        test_msg = await message.channel.send("📌 このメッセージにリアクションしてテストしてください！")
+        test_msg = await message.channel.send(TEST_MESSAGE)
         await test_msg.add_reaction(PIN_EMOJI)
 
     # ステータスコマンド
     elif message.content.lower() == '!pin status':
         try:
-            pins = await message.channel.pins()
-            await message.channel.send(
-                f"**Bot状態:**\n"
-                f"• Bot名: {bot.user.name}\n"
-                f"• 現在のピン留め数: {len(pins)}/50\n"
-                f"• 権限: {'✅' if message.channel.permissions_for(message.guild.me).manage_messages else '❌'} メッセージ管理\n"
-                f"• 稼働時間: {discord.utils.utcnow() - bot.user.created_at}"
-            )
+            await message.channel.send(await status_text(message.channel))
         except Exception as e:
             await message.channel.send(f"ステータス取得エラー: {e}")
 
+async def stop_background_tasks():
+    """
+    停止時にバックグラウンドの処理を片付ける関数
+    Botのセッションを閉じる前に呼び、受け付け済みのリアクションイベントの処理と通知の削除を済ませる
+    """
+    # /pinbatch のジョブは結果を保存済みのため、中断しても次の起動時に未処理のメッセージから再開する
+    tasks = list(batch_tasks.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await reaction_coalescer.drain()
+    await notifier.close()
+    await loop_monitor.stop()
+
+
+async def run_bot(embedded_server: bool = True):
+    """
+    Botを起動し、停止（SIGINT/SIGTERM）したら後片付けをする
+    embedded_server: ヘルスチェック用サーバーを同じイベントループで起動する（False なら別スレッドで起動済み）
+    """
+    try:
+        async with bot:
+            try:
+                if embedded_server:
+                    server.app.state.bot = bot
+                    await server.serve_with(server.create_server(), bot.start(TOKEN))
+                else:
+                    await server.run_until_signal(bot.start(TOKEN))
+            finally:
+                await stop_background_tasks()
+    finally:
+        await warmup.close()
+        await state_backend.close()
+
 if __name__ == "__main__":
-    # Koyeb用サーバーを起動
-    server_thread()
+    # ログ出力の設定（出力は別スレッドで行う）
+    log_listener = setup_logging()
+    atexit.register(log_listener.stop)
 
-    # Discord Botを起動
-    if TOKEN:
-        print("Discord Botを起動しています...")
-        bot.run(TOKEN)
+    if not TOKEN:
+        logger.error("DISCORD_TOKEN環境変数が設定されていません")
     else:
-        print("ERROR: DISCORD_TOKEN環境変数が設定されていません")
+        if HEALTH_SERVER_MODE == "thread":
+            # Koyeb用サーバーを別スレッドで起動
+            server.server_thread()
+        logger.info("Discord Botを起動しています...")
+        try:
+            asyncio.run(run_bot(embedded_server=HEALTH_SERVER_MODE != "thread"))
+        except KeyboardInterrupt:
+            pass
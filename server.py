@@ -1,13 +1,35 @@
+import asyncio
+import contextlib
+import logging
+import math
+import signal
 from threading import Thread
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse
 import uvicorn
 
+from services.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Koyebの要求に従い0.0.0.0:8080で待ち受ける
+HOST = "0.0.0.0"
+PORT = 8080
+# 受けたらBotを停止して後片付けをするシグナル（コンテナの停止はSIGTERM）
+STOP_SIGNALS = (signal.SIGINT, signal.SIGTERM)
+
 # FastAPIアプリケーションのインスタンス作成
 app = FastAPI(
     title="Discord Pin Bot Server",
     description="Koyeb用のDiscord Pin Botサーバー",
     version="1.0.0"
 )
+# 同じイベントループで動かす場合に Bot の状態を参照するため main.py で設定する
+app.state.bot = None
+# liveness/readiness の判定（services.health.HealthMonitor、main.py で設定する）
+app.state.health = None
+# シャードごとの状態（services.shards.ShardStats、main.py で設定する）
+app.state.shards = None
 
 @app.get("/")
 async def root():
@@ -32,16 +54,72 @@ async def health_check():
         "service": "discord-pin-bot"
     }
 
+@app.get("/livez")
+async def liveness():
+    """
+    liveness用エンドポイント
+    イベントループが止まっている、または長時間Gatewayに接続できていない場合は503を返す
+    """
+    monitor = app.state.health
+    if monitor is None:
+        return {"status": "alive", "problems": []}
+    ok, detail = monitor.liveness()
+    return JSONResponse(detail, status_code=200 if ok else 503)
+
+@app.get("/readyz")
+async def readiness():
+    """
+    readiness用エンドポイント
+    Gatewayの接続状態、レイテンシ、最後のイベント、イベントループの遅延、未処理タスク数で判定する
+    """
+    monitor = app.state.health
+    if monitor is None:
+        return JSONResponse({"status": "not_ready", "problems": ["not_configured"]}, status_code=503)
+    ok, detail = monitor.readiness()
+    return JSONResponse(detail, status_code=200 if ok else 503)
+
 @app.get("/status")
 async def bot_status():
     """
     Bot状態確認用エンドポイント
+    Botと同じイベントループで動いている場合は接続状態も返す
     """
-    return {
+    status = {
         "message": "Bot is running",
         "function": "Pin messages with pushpin reaction",
-        "port": 8080
+        "port": PORT
     }
+    bot = app.state.bot
+    if bot is not None:
+        latency = bot.latency
+        status.update({
+            "ready": bot.is_ready(),
+            "guilds": len(bot.guilds),
+            "latency_ms": round(latency * 1000, 1) if math.isfinite(latency) else None
+        })
+    return status
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus形式のメトリクス
+    リアクションイベント数、ピン留め/解除数、REST呼び出し数、レート制限、キャッシュ、遅延など
+    """
+    return Response(
+        content=REGISTRY.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+@app.get("/shards")
+async def shards():
+    """
+    シャードごとの状態確認用エンドポイント
+    レイテンシ、担当ギルド数、イベント数、接続・切断・RESUMEの回数を返す
+    """
+    stats = app.state.shards
+    if stats is None:
+        return {"shard_count": None, "shards": []}
+    return stats.snapshot()
 
 def start_server():
     """
@@ -50,9 +128,10 @@ def start_server():
     """
     uvicorn.run(
         app,
-        host="0.0.0.0",
-        port=8080,
-        log_level="info"
+        host=HOST,
+        port=PORT,
+        log_level="info",
+        log_config=None  # ログは setup_logging() の設定に従う
     )
 
 def server_thread():
@@ -62,4 +141,95 @@ def server_thread():
     """
     t = Thread(target=start_server, daemon=True)
     t.start()
-    print("Koyeb用サーバーをポート8080で起動しました")
+    logger.info("Koyeb用サーバーをポート%dで起動しました", PORT)
+
+class EmbeddedServer(uvicorn.Server):
+    """
+    Botと同じイベントループで動かすuvicornサーバー
+    uvicorn は停止した後に受けたシグナルを送り直し、SIGTERMではそのままプロセスが終了して
+    Botの後片付けが行われないため、シグナルは uvicorn ではなく serve_with で受ける
+    """
+
+    def capture_signals(self):
+        return contextlib.nullcontext()
+
+@contextlib.contextmanager
+def stop_on_signals(callback):
+    """
+    STOP_SIGNALS を受けたら callback を呼ぶようにする関数（イベントループのシグナルハンドラとして登録する）
+    """
+    loop = asyncio.get_running_loop()
+    installed = []
+    for sig in STOP_SIGNALS:
+        try:
+            loop.add_signal_handler(sig, callback)
+        except (NotImplementedError, RuntimeError):
+            continue  # Windows・メインスレッド以外では登録できない
+        installed.append(sig)
+    try:
+        yield
+    finally:
+        for sig in installed:
+            loop.remove_signal_handler(sig)
+
+def create_server(host: str = HOST, port: int = PORT) -> uvicorn.Server:
+    """
+    呼び出し元のイベントループで動かすuvicornサーバーを作成する関数
+    serve() を await すると起動し、should_exit を True にすると停止する
+    """
+    config = uvicorn.Config(
+        app,
+        host=host,
+        port=port,
+        log_level="info",
+        log_config=None,  # ログは setup_logging() の設定に従う
+        lifespan="off"
+    )
+    return EmbeddedServer(config)
+
+async def serve_with(server: uvicorn.Server, main_coro):
+    """
+    サーバーと main_coro（Botの起動処理）を同じイベントループで動かす関数
+    どちらかが終了したらもう一方も停止させる
+    SIGINT/SIGTERM を受けたらサーバーを停止し、Botのタスクをキャンセルして呼び出し元に戻る
+    """
+
+    def stop():
+        logger.info("停止シグナルを受けました。停止しています...")
+        server.should_exit = True
+
+    with stop_on_signals(stop):
+        server_task = asyncio.create_task(server.serve(), name="health-server")
+        main_task = asyncio.create_task(main_coro, name="bot")
+        logger.info("Koyeb用サーバーをポート%dで起動しました（Botと同じイベントループ）", server.config.port)
+        try:
+            done, _ = await asyncio.wait({server_task, main_task}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            server.should_exit = True
+            if not main_task.done():
+                main_task.cancel()
+            await asyncio.gather(server_task, main_task, return_exceptions=True)
+    # Bot側の例外は呼び出し元に伝える
+    if main_task in done and not main_task.cancelled():
+        main_task.result()
+
+async def run_until_signal(main_coro):
+    """
+    main_coro（Botの起動処理）を実行し、SIGINT/SIGTERM を受けたらキャンセルして呼び出し元に戻る関数
+    サーバーを別スレッドで動かす場合（HEALTH_SERVER_MODE=thread）に使う
+    """
+    main_task = asyncio.create_task(main_coro, name="bot")
+
+    def stop():
+        logger.info("停止シグナルを受けました。停止しています...")
+        main_task.cancel()
+
+    with stop_on_signals(stop):
+        try:
+            await asyncio.wait({main_task})
+        finally:
+            if not main_task.done():
+                main_task.cancel()
+            await asyncio.gather(main_task, return_exceptions=True)
+    if not main_task.cancelled():
+        main_task.result()
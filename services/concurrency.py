@@ -0,0 +1,67 @@
+"""REST呼び出しを並列実行するためのユーティリティ"""
+import asyncio
+
+import discord
+
+from services.metrics import RATE_LIMIT_HITS
+
+# 429(レート制限)を受けた時の最大リトライ回数
+MAX_RATE_LIMIT_RETRIES = 3
+
+
+async def call_with_rate_limit_retry(func, *args, retries: int = MAX_RATE_LIMIT_RETRIES):
+    """レート制限(429)を受けた場合に待機してから再実行する
+
+    discord.py は通常 429 を内部でリトライするが、リトライ上限を超えた場合や
+    サブレートリミットでは HTTPException として送出されるため、ここで吸収する。
+
+    Args:
+        func: 実行するコルーチン関数
+        *args: func に渡す引数
+        retries: 最大リトライ回数
+
+    Returns:
+        func の戻り値
+    """
+    attempt = 0
+    while True:
+        try:
+            return await func(*args)
+        except discord.HTTPException as e:
+            if e.status != 429 or attempt >= retries:
+                raise
+            RATE_LIMIT_HITS.inc(scope="retry")
+            retry_after = getattr(e.response, "headers", {}).get("Retry-After")
+            try:
+                delay = float(retry_after)
+            except (TypeError, ValueError):
+                delay = 2 ** attempt
+            attempt += 1
+            await asyncio.sleep(delay)
+
+
+async def bounded_gather(items, func, limit: int, on_done=None):
+    """同時実行数を制限しつつ items の各要素に func を適用する
+
+    Args:
+        items: 処理対象のイテラブル
+        func: 各要素を受け取るコルーチン関数
+        limit: 同時実行数の上限
+        on_done: 各要素の処理が終わるたびに (要素, 結果または例外) で呼ばれるコルーチン関数（任意）
+
+    Returns:
+        list: items と同じ順序の結果リスト（例外も結果として返す）
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(item):
+        async with semaphore:
+            try:
+                result = await call_with_rate_limit_retry(func, item)
+            except Exception as e:
+                result = e
+        if on_done is not None:
+            await on_done(item, result)
+        return result
+
+    return await asyncio.gather(*(run(item) for item in items), return_exceptions=True)
@@ -0,0 +1,134 @@
+"""Gatewayとイベントループの状態に基づくliveness/readinessの判定
+
+判定は保持している値を読むだけなので、毎秒ポーリングされても負荷にならない。
+"""
+import math
+import time
+
+# しきい値の既定値（0以下を指定するとその項目は判定しない）
+DEFAULT_MAX_LOOP_LAG = 5.0          # イベントループの遅延（秒）
+DEFAULT_MAX_HEARTBEAT_AGE = 10.0    # 最後のハートビートからの経過時間（秒）
+DEFAULT_MAX_NOT_READY = 300.0       # Gatewayに接続できていない状態が続いてよい時間（秒）
+DEFAULT_MAX_LATENCY = 10.0          # Gatewayのレイテンシ（秒）
+DEFAULT_MAX_EVENT_AGE = 0.0         # 最後のGatewayイベントからの経過時間（秒、既定は判定しない）
+DEFAULT_MAX_PENDING = 1000          # 未処理のリアクション処理・通知の数
+
+
+def _exceeds(value, limit) -> bool:
+    return limit > 0 and value is not None and value > limit
+
+
+class HealthMonitor:
+    """Botのliveness/readinessを判定する
+
+    Args:
+        bot: discord.Client
+        loop_monitor: イベントループの遅延を計測する LoopLagMonitor
+        pending: 未処理のタスク数を返す関数
+        clock: 現在時刻を返す関数（time.monotonic と同じ基準）
+    """
+
+    def __init__(
+        self,
+        bot,
+        loop_monitor,
+        pending=lambda: 0,
+        max_loop_lag: float = DEFAULT_MAX_LOOP_LAG,
+        max_heartbeat_age: float = DEFAULT_MAX_HEARTBEAT_AGE,
+        max_not_ready: float = DEFAULT_MAX_NOT_READY,
+        max_latency: float = DEFAULT_MAX_LATENCY,
+        max_event_age: float = DEFAULT_MAX_EVENT_AGE,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        clock=time.monotonic,
+    ):
+        self.bot = bot
+        self.loop_monitor = loop_monitor
+        self.pending = pending
+        self.max_loop_lag = max_loop_lag
+        self.max_heartbeat_age = max_heartbeat_age
+        self.max_not_ready = max_not_ready
+        self.max_latency = max_latency
+        self.max_event_age = max_event_age
+        self.max_pending = max_pending
+        self._clock = clock
+        self.started_at = clock()
+        self.last_event: float | None = None
+        # 起動直後は未接続として扱う
+        self._not_ready_since: float | None = self.started_at
+
+    def record_event(self):
+        """Gatewayイベントを受信したことを記録する"""
+        self.last_event = self._clock()
+
+    def _age(self, timestamp, now) -> float | None:
+        return None if timestamp is None else round(now - timestamp, 3)
+
+    def _not_ready_for(self, now) -> float:
+        """Gatewayに接続できていない状態が続いている時間（秒）"""
+        if self.bot.is_ready() and not self.bot.is_closed():
+            self._not_ready_since = None
+            return 0.0
+        if self._not_ready_since is None:
+            self._not_ready_since = now
+        return now - self._not_ready_since
+
+    def liveness(self) -> tuple[bool, dict]:
+        """プロセスを再起動すべきでないかを判定する
+
+        イベントループが止まっている、または長時間Gatewayに接続できていない場合に False を返す。
+        """
+        now = self._clock()
+        heartbeat_age = self._age(self.loop_monitor.last_beat, now)
+        if heartbeat_age is None:
+            # ハートビート開始前は起動からの経過時間で判定する
+            heartbeat_age = round(now - self.started_at, 3)
+        not_ready_for = round(self._not_ready_for(now), 3)
+
+        problems = []
+        if _exceeds(self.loop_monitor.lag, self.max_loop_lag):
+            problems.append("event_loop_lag")
+        if _exceeds(heartbeat_age, self.max_heartbeat_age):
+            problems.append("heartbeat_stalled")
+        if _exceeds(not_ready_for, self.max_not_ready):
+            problems.append("gateway_not_ready")
+
+        return not problems, {
+            "status": "alive" if not problems else "dead",
+            "problems": problems,
+            "event_loop_lag": round(self.loop_monitor.lag, 4),
+            "heartbeat_age": heartbeat_age,
+            "not_ready_for": not_ready_for,
+        }
+
+    def readiness(self) -> tuple[bool, dict]:
+        """イベントを処理できる状態かを判定する"""
+        now = self._clock()
+        ready = self.bot.is_ready() and not self.bot.is_closed()
+        latency = self.bot.latency
+        latency = round(latency, 4) if math.isfinite(latency) else None
+        event_age = self._age(self.last_event, now)
+        pending = self.pending()
+
+        problems = []
+        if not ready:
+            problems.append("gateway_not_ready")
+        if latency is None:
+            problems.append("no_heartbeat_ack")
+        elif _exceeds(latency, self.max_latency):
+            problems.append("gateway_latency")
+        if _exceeds(event_age, self.max_event_age):
+            problems.append("no_recent_events")
+        if _exceeds(self.loop_monitor.lag, self.max_loop_lag):
+            problems.append("event_loop_lag")
+        if _exceeds(pending, self.max_pending):
+            problems.append("too_many_pending")
+
+        return not problems, {
+            "status": "ready" if not problems else "not_ready",
+            "problems": problems,
+            "ready": ready,
+            "latency": latency,
+            "last_event_age": event_age,
+            "event_loop_lag": round(self.loop_monitor.lag, 4),
+            "pending": pending,
+        }
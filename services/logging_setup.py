@@ -0,0 +1,81 @@
+"""ログ出力の設定
+
+ハンドラは QueueHandler だけをルートロガーに登録し、実際の出力は
+QueueListener のスレッドで行う。イベントループ上のハンドラは標準出力への
+書き込みを待たない。
+
+環境変数:
+    LOG_LEVEL: ルートのログレベル（既定: INFO）
+    LOG_FORMAT: "text"（既定）または "json"
+    LOG_LEVELS: ロガーごとのレベル（例: "services.pin_fetcher=DEBUG,discord=WARNING"）
+"""
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from datetime import datetime, timezone
+
+# LogRecord の標準属性（extra で渡された項目と区別するため）
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+TEXT_FORMAT = "%(asctime)s %(levelname)-8s %(name)s: %(message)s"
+
+
+class JsonFormatter(logging.Formatter):
+    """1行1JSONで出力するフォーマッタ（extra の項目もフィールドとして出力する）"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def parse_levels(spec: str) -> dict[str, int]:
+    """"name=LEVEL,name=LEVEL" 形式の指定を辞書に変換する"""
+    levels = {}
+    for item in spec.split(","):
+        name, sep, level = item.partition("=")
+        if not sep or not name.strip():
+            continue
+        levels[name.strip()] = logging.getLevelName(level.strip().upper())
+    return levels
+
+
+def setup_logging(stream=None) -> logging.handlers.QueueListener:
+    """ログ出力を設定し、出力スレッド（QueueListener）を開始する
+
+    Returns:
+        QueueListener: 終了時に stop() を呼ぶと残りのログを出力して停止する
+    """
+    if os.environ.get("LOG_FORMAT", "text").lower() == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(TEXT_FORMAT)
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+
+    for name, level in parse_levels(os.environ.get("LOG_LEVELS", "")).items():
+        logging.getLogger(name).setLevel(level)
+
+    listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,41 @@
+"""イベントループの遅延を計測するハートビートタスク"""
+import asyncio
+import time
+
+from services.metrics import EVENT_LOOP_LAG
+
+# ハートビートの間隔（秒）の既定値
+DEFAULT_HEARTBEAT_INTERVAL = 0.5
+
+
+class LoopLagMonitor:
+    """一定間隔で sleep し、予定より遅れて起きた時間をイベントループの遅延として記録する"""
+
+    def __init__(self, interval: float = DEFAULT_HEARTBEAT_INTERVAL):
+        self.interval = interval
+        self.lag = 0.0
+        self.last_beat: float | None = None  # 最後にハートビートした時刻（time.monotonic）
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        """ハートビートタスクを開始する（実行中なら何もしない）"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.lag = max(0.0, now - start - self.interval)
+            self.last_beat = now
+            EVENT_LOOP_LAG.observe(self.lag)
@@ -0,0 +1,295 @@
+"""Prometheus形式のメトリクス
+
+依存パッケージを増やさないよう、Counter / Gauge / Histogram とテキスト形式の
+出力だけを実装する。メトリクスの更新はイベントループ側、出力はHTTPサーバー側で
+行われるため、値の更新と読み出しはロックで保護する。
+"""
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+# レイテンシ用のヒストグラムのバケット（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames, values, extra: dict | None = None) -> str:
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.extend(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = ""
+    # 出力時に値を取得する関数（{ラベルのタプル: 値} または値そのものを返す）
+    callback = None
+
+    def __init__(self, name: str, documentation: str, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: ラベルが一致しません ({sorted(labels)} != {sorted(self.labelnames)})")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def _items(self) -> list[tuple]:
+        """出力する (ラベルのタプル, 値) の一覧"""
+        if self.callback is not None:
+            result = self.callback()
+            return list(result.items()) if isinstance(result, dict) else [((), result)]
+        with self._lock:
+            return list(self._values.items())
+
+
+class Counter(_Metric):
+    """単調増加するカウンタ（callback を指定すると、他で数えている累計を出力時に取得する）"""
+
+    type_name = "counter"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None, callback=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self._values: dict[tuple, float] = {}
+        self.callback = callback
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in self._items()]
+
+
+class Gauge(_Metric):
+    """任意の値を取るゲージ（callback を指定すると出力時に値を取得する）"""
+
+    type_name = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None, callback=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self._values: dict[tuple, float] = {}
+        self.callback = callback
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}"
+            for key, v in self._items()
+            if v is not None
+        ]
+
+
+class Histogram(_Metric):
+    """値の分布を記録するヒストグラム"""
+
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # ラベル -> [バケットごとの件数, 合計, 件数]
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """with ブロックの実行時間を記録する"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return entry[2] if entry else 0
+
+    def _samples(self):
+        with self._lock:
+            items = [(key, (list(e[0]), e[1], e[2])) for key, e in self._values.items()]
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                labels = _format_labels(self.labelnames, key, {"le": _format_value(bound)})
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """メトリクスの登録先"""
+
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+
+    def register(self, metric: _Metric):
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        """Prometheusのテキスト形式で出力する"""
+        lines = []
+        for metric in self._metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception:
+                logging.getLogger(__name__).exception("メトリクスの出力に失敗しました: %s", metric.name)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# --- Botのメトリクス ---
+
+REACTION_EVENTS = Counter(
+    "pinbot_reaction_events_total",
+    "受信した📌リアクションイベント数",
+    ["action"],
+)
+PIN_ACTIONS = Counter(
+    "pinbot_pin_actions_total",
+    "ピン留め/解除の実行数",
+    ["action", "source", "result"],
+)
+HANDLER_DURATION = Histogram(
+    "pinbot_handler_duration_seconds",
+    "ハンドラ・コマンドの処理時間",
+    ["handler"],
+)
+REST_REQUESTS = Counter(
+    "pinbot_rest_requests_total",
+    "Discord REST APIの呼び出し数",
+    ["method", "route", "status"],
+)
+REST_DURATION = Histogram(
+    "pinbot_rest_request_duration_seconds",
+    "Discord REST APIの応答時間（レート制限による待機を含む）",
+    ["method", "route"],
+)
+REST_QUEUE_WAIT = Histogram(
+    "pinbot_rest_queue_wait_seconds",
+    "RESTスケジューラのキューで待った時間（バケットの残り回数・同時実行数の上限による待機）",
+    ["priority"],
+)
+RATE_LIMIT_HITS = Counter(
+    "pinbot_rate_limit_hits_total",
+    "レート制限(429)を受けた回数",
+    ["scope"],
+)
+EVENT_LOOP_LAG = Histogram(
+    "pinbot_event_loop_lag_seconds",
+    "イベントループの遅延",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+
+
+def timed(handler: str):
+    """コルーチン関数の処理時間を HANDLER_DURATION に記録するデコレータ"""
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with HANDLER_DURATION.time(handler=handler):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def instrument_http(http):
+    """discord.py の HTTPClient.request を計測用にラップする
+
+    Args:
+        http: bot.http（discord.http.HTTPClient）
+    """
+    original = http.request
+
+    async def request(route, **kwargs):
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            return await original(route, **kwargs)
+        except Exception as e:
+            status = str(getattr(e, "status", None) or type(e).__name__)
+            raise
+        finally:
+            REST_REQUESTS.inc(method=route.method, route=route.path, status=status)
+            REST_DURATION.observe(time.perf_counter() - start, method=route.method, route=route.path)
+
+    http.request = request
+
+
+class RateLimitLogCounter(logging.Handler):
+    """discord.http のレート制限ログを数えるハンドラ
+
+    discord.py は429を内部でリトライするため、ログからレート制限の発生を検知する。
+    """
+
+    def emit(self, record: logging.LogRecord):
+        message = str(record.msg)
+        if message.startswith("We are being rate limited"):
+            RATE_LIMIT_HITS.inc(scope="route")
+        elif message.startswith("Global rate limit"):
+            RATE_LIMIT_HITS.inc(scope="global")
+
+
+def install_rate_limit_counter():
+    """discord.http ロガーにレート制限カウンタを登録する"""
+    logger = logging.getLogger("discord.http")
+    if not any(isinstance(h, RateLimitLogCounter) for h in logger.handlers):
+        logger.addHandler(RateLimitLogCounter(logging.WARNING))
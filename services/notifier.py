@@ -0,0 +1,181 @@
+"""一時的な通知メッセージの送信と削除を管理するスケジューラ
+
+リアクションハンドラ内で asyncio.sleep(5) してから削除する代わりに、
+削除期限をヒープで管理する1つのバックグラウンドタスクが削除を担当する。
+"""
+import asyncio
+import heapq
+import itertools
+import time
+
+import discord
+
+from services.rest_scheduler import Priority, rest_priority
+
+# 通知メッセージを表示しておく秒数
+DEFAULT_NOTIFICATION_LIFETIME = 5.0
+# 同時に表示しておく通知メッセージ数の上限
+DEFAULT_MAX_OUTSTANDING = 100
+
+
+class _Notification:
+    """削除待ちの通知メッセージ"""
+
+    def __init__(self, key=None):
+        self.key = key
+        self.message = None
+        self.mentions: list[str] = []
+        self.deadline = 0.0
+        self.lock = asyncio.Lock()
+
+
+class NotificationScheduler:
+    """一時的な通知メッセージの削除を一元管理する
+
+    同じチャンネル・同じ種類の通知が表示中に発生した場合は、新しいメッセージを
+    送信せず既存のメッセージにユーザーを追記して表示期限を延長する。
+    """
+
+    def __init__(
+        self,
+        lifetime: float = DEFAULT_NOTIFICATION_LIFETIME,
+        max_outstanding: int = DEFAULT_MAX_OUTSTANDING,
+        clock=time.monotonic,
+    ):
+        self.lifetime = lifetime
+        self.max_outstanding = max_outstanding
+        self._clock = clock
+        self._heap: list[tuple[float, int, _Notification]] = []
+        self._seq = itertools.count()
+        self._coalescing: dict[tuple, _Notification] = {}
+        self._outstanding = 0
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.dropped = 0
+
+    @property
+    def outstanding(self) -> int:
+        """送信済みで削除待ちの通知数"""
+        return self._outstanding
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def _schedule(self, notification: _Notification):
+        notification.deadline = self._clock() + self.lifetime
+        heapq.heappush(self._heap, (notification.deadline, next(self._seq), notification))
+        self._wakeup.set()
+        self._ensure_started()
+
+    async def notify(self, channel, template: str, mention: str):
+        """ユーザー操作の通知を送信する（同じチャンネル・種類の通知はまとめる）
+
+        Args:
+            channel: 送信先チャンネル
+            template: "{mentions}" を含む通知メッセージのテンプレート
+            mention: 通知に含めるユーザーのメンション
+        """
+        key = (channel.id, template)
+        notification = self._coalescing.get(key)
+        owner = notification is None
+        if owner:
+            if self._outstanding >= self.max_outstanding:
+                self.dropped += 1
+                return
+            notification = _Notification(key)
+            self._coalescing[key] = notification
+            self._outstanding += 1
+
+        if mention not in notification.mentions:
+            notification.mentions.append(mention)
+
+        try:
+            async with notification.lock:
+                if owner or notification.message is not None:
+                    content = template.format(mentions=", ".join(notification.mentions))
+                    try:
+                        if notification.message is None:
+                            notification.message = await channel.send(content)
+                        elif notification.message.content != content:
+                            notification.message = await notification.message.edit(content=content)
+                    except discord.HTTPException:
+                        if notification.message is None:
+                            raise
+                    self._schedule(notification)
+                    return
+        finally:
+            # 送信できなかった通知の分は、作成した呼び出しだけが1回戻す（送信後は削除時に戻す）
+            if owner and notification.message is None:
+                self._forget(notification)
+        # 最初の送信が失敗して破棄された通知には追記せず、新しい通知として送り直す
+        await self.notify(channel, template, mention)
+
+    async def send_temporary(self, channel, content: str):
+        """まとめずに一時的なメッセージを送信する（エラー通知など）"""
+        if self._outstanding >= self.max_outstanding:
+            self.dropped += 1
+            return
+        notification = _Notification()
+        self._outstanding += 1
+        try:
+            notification.message = await channel.send(content)
+        finally:
+            if notification.message is None:
+                self._forget(notification)
+        self._schedule(notification)
+
+    def _forget(self, notification: _Notification):
+        if notification.key is not None and self._coalescing.get(notification.key) is notification:
+            del self._coalescing[notification.key]
+        self._outstanding -= 1
+
+    async def _delete(self, notification: _Notification):
+        self._forget(notification)
+        try:
+            # 削除タスクは最初に通知した処理の優先度を引き継ぐため、明示的に最も低くする
+            with rest_priority(Priority.CLEANUP):
+                await notification.message.delete()
+        except discord.HTTPException:
+            pass  # 既に削除されている場合などは無視
+
+    async def _run(self):
+        """期限が来た通知を順に削除するバックグラウンドタスク"""
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            deadline, _, notification = self._heap[0]
+            delay = deadline - self._clock()
+            if delay > 0:
+                # wait_for は待機の完了と同時に届いたキャンセルを握りつぶすことがあるため、
+                # 期限にイベントをセットするタイマーで待つ（close() で確実に止まるように）
+                timer = asyncio.get_running_loop().call_later(delay, self._wakeup.set)
+                try:
+                    await self._wakeup.wait()
+                finally:
+                    timer.cancel()
+                continue
+
+            heapq.heappop(self._heap)
+            # 期限が延長された通知は新しいエントリで処理する
+            if deadline < notification.deadline or notification.lock.locked():
+                continue
+            await self._delete(notification)
+
+    async def close(self):
+        """バックグラウンドタスクを停止し、残っている通知をすべて削除する"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        pending = {id(n): n for _, _, n in self._heap}
+        self._heap.clear()
+        for notification in pending.values():
+            await self._delete(notification)
@@ -0,0 +1,242 @@
+"""チャンネルのピン留め上限（50件）を超えた分を保存するアーカイブ
+
+Discordのピン留めは1チャンネル50件までで、上限に達するとピン留めが
+HTTPException（エラーコード 30003）で失敗する。上限に達したチャンネルでは、
+方針に従って選んだピン留めを解除してこのアーカイブに移し、新しいピン留めの枠を空ける。
+
+アーカイブしたピン留めは /pinnedlist で通常のピン留めと一緒に表示し、
+まとめて解除（ArchivedPin.unpin()）でアーカイブから削除できる。
+
+保存はSQLiteで、作成日時はメッセージID（スノーフレーク）から求めるため列を持たない。
+チャンネル・作者ごとの索引をメッセージIDの順に持ち、チャンネル・作者・期間での
+絞り込みを索引の範囲の走査で行う。
+"""
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import NamedTuple
+
+import discord
+
+from services.pin_index import DEFAULT_INDEX_PATH
+
+# 上限に達した時にアーカイブするピン留めの選び方
+# - oldest_pinned: 最も前にピン留めされたもの（channel.pins() の末尾）
+# - oldest_message: 最も前に投稿されたもの
+# - off: アーカイブしない（従来どおりピン留めに失敗する）
+ARCHIVE_POLICIES = ("oldest_pinned", "oldest_message", "off")
+DEFAULT_ARCHIVE_POLICY = "oldest_pinned"
+# ピン留め数の上限に達した時のエラーコード
+MAX_PINS_ERROR_CODE = 30003
+
+
+class ArchivedAuthor(NamedTuple):
+    """アーカイブしたピン留めの作者（discord.Member の代わりに一覧で使う）"""
+
+    id: int
+    display_name: str
+
+
+@dataclass
+class ArchivedPin:
+    """アーカイブしたピン留めメッセージ
+
+    /pinnedlist で discord.Message と同じように扱えるよう、id / content / author /
+    channel / created_at / unpin() を持つ。
+    """
+
+    message_id: int
+    guild_id: int
+    channel_id: int
+    author_id: int
+    author_name: str
+    content: str
+    reactors: set[int] = field(default_factory=set)
+    archived_at: float = 0.0
+    archive: "PinArchive | None" = field(default=None, repr=False, compare=False)
+
+    @property
+    def id(self) -> int:
+        return self.message_id
+
+    @property
+    def author(self) -> ArchivedAuthor:
+        return ArchivedAuthor(self.author_id, self.author_name)
+
+    @property
+    def channel(self) -> discord.Object:
+        return discord.Object(id=self.channel_id)
+
+    @property
+    def created_at(self) -> datetime:
+        return discord.utils.snowflake_time(self.message_id)
+
+    async def unpin(self, *, reason=None):
+        """アーカイブから削除する（まとめて解除から呼ばれる）"""
+        if self.archive is not None:
+            await self.archive.remove(self.message_id)
+
+
+def is_max_pins_error(error: discord.HTTPException) -> bool:
+    """チャンネルのピン留め数の上限に達したことによるエラーか"""
+    return error.code == MAX_PINS_ERROR_CODE
+
+
+def choose_eviction(pins: list, policy: str = DEFAULT_ARCHIVE_POLICY):
+    """アーカイブするピン留めを選ぶ（pins は channel.pins() の順 = 新しくピン留めした順）"""
+    if not pins or policy == "off":
+        return None
+    if policy == "oldest_message":
+        return min(pins, key=lambda p: p.id)
+    return pins[-1]
+
+
+def group_by_channel(pins: list, get_channel) -> list[tuple]:
+    """ピン留めメッセージをチャンネルごとに分ける（チャンネルの初出の順、各チャンネル内は元の順）
+
+    ArchivedPin.channel はメッセージを取得できない discord.Object のため、チャンネルは
+    同じチャンネルの通常のピン留めか get_channel(channel_id) から解決する。
+    どちらもなければ（アーカイブしたピン留めだけのチャンネル）discord.Object のままにする。
+
+    Returns:
+        list[tuple]: (チャンネル, ピン留めメッセージのリスト) のリスト
+    """
+    grouped: dict[int, list] = {}
+    channels = {}
+    for pin in pins:
+        grouped.setdefault(pin.channel.id, []).append(pin)
+        if not isinstance(pin, ArchivedPin):
+            channels.setdefault(pin.channel.id, pin.channel)
+    return [
+        (channels.get(channel_id) or get_channel(channel_id) or group[0].channel, group)
+        for channel_id, group in grouped.items()
+    ]
+
+
+class PinArchive:
+    """チャンネルのピン留め上限を超えた分のピン留めを保存する"""
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH, clock=time.time):
+        self.path = path
+        self._clock = clock
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS archived_pins (
+                message_id INTEGER PRIMARY KEY,
+                guild_id INTEGER NOT NULL,
+                channel_id INTEGER NOT NULL,
+                author_id INTEGER NOT NULL,
+                author_name TEXT NOT NULL,
+                content TEXT NOT NULL,
+                reactors TEXT NOT NULL,
+                archived_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS archived_pins_channel ON archived_pins (channel_id, message_id);
+            CREATE INDEX IF NOT EXISTS archived_pins_author ON archived_pins (guild_id, author_id, message_id);
+            """
+        )
+        self._conn.commit()
+        # アーカイブ件数（メトリクスは別スレッドから読まれることがあるため、SQLiteに問い合わせず保持する）
+        self._count = self._conn.execute("SELECT COUNT(*) FROM archived_pins").fetchone()[0]
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        self._conn.close()
+
+    def _row(self, row) -> ArchivedPin:
+        message_id, guild_id, channel_id, author_id, author_name, content, reactors, archived_at = row
+        return ArchivedPin(
+            message_id, guild_id, channel_id, author_id, author_name, content,
+            {int(u) for u in reactors.split()}, archived_at, archive=self
+        )
+
+    async def add(self, message, reactors: set[int]):
+        """ピン留めメッセージ（discord.Message）をアーカイブに保存する"""
+        exists = self._conn.execute(
+            "SELECT 1 FROM archived_pins WHERE message_id = ?", (message.id,)
+        ).fetchone()
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO archived_pins"
+                " (message_id, guild_id, channel_id, author_id, author_name, content, reactors, archived_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    message.id,
+                    message.guild.id if message.guild else 0,
+                    message.channel.id,
+                    message.author.id,
+                    message.author.display_name,
+                    message.content,
+                    " ".join(str(u) for u in sorted(reactors)),
+                    self._clock(),
+                ),
+            )
+        if not exists:
+            self._count += 1
+
+    async def get(self, message_id: int) -> ArchivedPin | None:
+        row = self._conn.execute(
+            "SELECT * FROM archived_pins WHERE message_id = ?", (message_id,)
+        ).fetchone()
+        return self._row(row) if row is not None else None
+
+    async def set_reactors(self, message_id: int, reactors: set[int]):
+        """アーカイブしたピン留めの📌リアクションユーザーを置き換える"""
+        with self._conn:
+            self._conn.execute(
+                "UPDATE archived_pins SET reactors = ? WHERE message_id = ?",
+                (" ".join(str(u) for u in sorted(reactors)), message_id),
+            )
+
+    async def remove(self, message_id: int) -> bool:
+        """アーカイブから削除する（削除したら True）"""
+        with self._conn:
+            cursor = self._conn.execute("DELETE FROM archived_pins WHERE message_id = ?", (message_id,))
+        self._count -= cursor.rowcount
+        return cursor.rowcount > 0
+
+    async def channel_message_ids(self, channel_id: int) -> set[int]:
+        """チャンネルでアーカイブしているメッセージID"""
+        return {
+            message_id for (message_id,) in self._conn.execute(
+                "SELECT message_id FROM archived_pins WHERE channel_id = ?", (channel_id,)
+            )
+        }
+
+    async def query(
+        self,
+        guild_id: int,
+        channel_id: int | None = None,
+        author_id: int | None = None,
+        after: datetime | None = None,
+        before: datetime | None = None,
+        limit: int | None = None,
+    ) -> list[ArchivedPin]:
+        """チャンネル・作者・投稿日時の範囲でアーカイブを新しい順に取得する
+
+        投稿日時の範囲はメッセージIDの範囲に置き換えて索引で絞り込む。
+        """
+        conditions = ["guild_id = ?"]
+        params: list = [guild_id]
+        if channel_id is not None:
+            conditions.append("channel_id = ?")
+            params.append(channel_id)
+        if author_id is not None:
+            conditions.append("author_id = ?")
+            params.append(author_id)
+        if after is not None:
+            conditions.append("message_id >= ?")
+            params.append(discord.utils.time_snowflake(after))
+        if before is not None:
+            conditions.append("message_id < ?")
+            params.append(discord.utils.time_snowflake(before))
+        sql = "SELECT * FROM archived_pins WHERE " + " AND ".join(conditions) + " ORDER BY message_id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [self._row(row) for row in self._conn.execute(sql, params)]
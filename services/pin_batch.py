@@ -0,0 +1,249 @@
+"""メッセージリンクの一覧からまとめてピン留め・解除するバッチジョブ（/pinbatch）
+
+他のツールから移行する時などに、数百件のメッセージを📌リアクションではなく
+メッセージリンクの一覧でまとめてピン留め・解除する。
+
+入力（メッセージリンクを並べたテキストまたは添付ファイル）は検証・重複除去してから
+ジョブとしてSQLiteに保存し、メッセージごとの結果を処理のたびに書き込む。
+Botが途中で停止しても、次の起動時に未処理のメッセージから再開できる。
+"""
+import re
+import sqlite3
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import NamedTuple
+
+import discord
+
+from services.pin_index import DEFAULT_INDEX_PATH
+
+BATCH_ACTIONS = ("pin", "unpin")
+# 1つのジョブで扱うメッセージ数の既定の上限
+DEFAULT_BATCH_MAX_ITEMS = 1000
+# 同時にピン留め・解除するメッセージ数の既定値
+DEFAULT_BATCH_CONCURRENCY = 3
+
+# メッセージごとの結果
+# - pending: 未処理
+# - done: ピン留め・解除した
+# - skipped: 既にピン留めされている（解除ではピン留めされていない）
+# - not_found: チャンネルまたはメッセージが見つからない
+# - forbidden: 実行したユーザーかBotに権限がない
+# - failed: その他のエラー
+PENDING = "pending"
+BATCH_STATUSES = ("done", "skipped", "not_found", "forbidden", "failed")
+
+MESSAGE_LINK_RE = re.compile(
+    r"<?https?://(?:(?:ptb|canary)\.)?discord(?:app)?\.com/channels/(\d+|@me)/(\d+)/(\d+)/?>?"
+)
+
+
+class MessageLink(NamedTuple):
+    """メッセージリンクが指すメッセージ"""
+
+    channel_id: int
+    message_id: int
+
+
+@dataclass
+class ParsedLinks:
+    """メッセージリンクの一覧を検証した結果"""
+
+    links: list[MessageLink] = field(default_factory=list)
+    # メッセージリンクでないもの・別のサーバーのメッセージリンク
+    invalid: list[str] = field(default_factory=list)
+    # 重複して取り除いたリンクの数
+    duplicates: int = 0
+
+
+def parse_message_links(text: str, guild_id: int) -> ParsedLinks:
+    """空白・改行・カンマで区切ったメッセージリンクを検証し、重複を取り除く（入力の順を維持）"""
+    parsed = ParsedLinks()
+    seen = set()
+    for token in re.split(r"[\s,]+", text):
+        if not token:
+            continue
+        match = MESSAGE_LINK_RE.fullmatch(token)
+        if match is None or match.group(1) != str(guild_id):
+            parsed.invalid.append(token)
+            continue
+        link = MessageLink(int(match.group(2)), int(match.group(3)))
+        if link in seen:
+            parsed.duplicates += 1
+            continue
+        seen.add(link)
+        parsed.links.append(link)
+    return parsed
+
+
+def result_status(result) -> tuple[str, str]:
+    """1件の処理の戻り値または例外を (結果, 詳細) に変換する"""
+    if isinstance(result, discord.NotFound):
+        return "not_found", ""
+    if isinstance(result, discord.Forbidden):
+        return "forbidden", ""
+    if isinstance(result, Exception):
+        return "failed", str(result)
+    return result, ""
+
+
+@dataclass
+class BatchJob:
+    """まとめてピン留め・解除するジョブ"""
+
+    job_id: int
+    guild_id: int
+    channel_id: int
+    user_id: int
+    action: str
+    created_at: float
+    finished_at: float | None = None
+    invalid: list[str] = field(default_factory=list)
+    duplicates: int = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+
+class BatchFailure(NamedTuple):
+    """ピン留め・解除できなかったメッセージ"""
+
+    channel_id: int
+    message_id: int
+    status: str
+    detail: str
+
+
+class PinBatchJobs:
+    """バッチジョブとメッセージごとの結果を保存する"""
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH, clock=time.time):
+        self.path = path
+        self._clock = clock
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS batch_jobs (
+                job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER NOT NULL,
+                channel_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                action TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                finished_at REAL,
+                invalid TEXT NOT NULL,
+                duplicates INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS batch_items (
+                job_id INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                channel_id INTEGER NOT NULL,
+                message_id INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                detail TEXT NOT NULL DEFAULT '',
+                PRIMARY KEY (job_id, position)
+            );
+            CREATE INDEX IF NOT EXISTS batch_items_status ON batch_items (job_id, status);
+            """
+        )
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def _job(self, row) -> BatchJob:
+        job_id, guild_id, channel_id, user_id, action, created_at, finished_at, invalid, duplicates = row
+        return BatchJob(
+            job_id, guild_id, channel_id, user_id, action, created_at, finished_at,
+            invalid.split("\n") if invalid else [], duplicates
+        )
+
+    async def create(
+        self,
+        guild_id: int,
+        channel_id: int,
+        user_id: int,
+        action: str,
+        parsed: ParsedLinks,
+        rejected: dict[MessageLink, str] | None = None,
+    ) -> BatchJob:
+        """ジョブを作成する
+
+        Args:
+            guild_id: ギルドID
+            channel_id: コマンドを実行したチャンネルのID
+            user_id: コマンドを実行したユーザーのID
+            action: "pin" または "unpin"
+            parsed: 検証したメッセージリンク
+            rejected: 処理する前に結果が決まったメッセージ（チャンネルがない・権限がないなど）と結果
+        """
+        rejected = rejected or {}
+        with self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO batch_jobs (guild_id, channel_id, user_id, action, created_at, invalid, duplicates)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (guild_id, channel_id, user_id, action, self._clock(), "\n".join(parsed.invalid), parsed.duplicates),
+            )
+            job_id = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT INTO batch_items (job_id, position, channel_id, message_id, status) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (job_id, position, link.channel_id, link.message_id, rejected.get(link, PENDING))
+                    for position, link in enumerate(parsed.links)
+                ],
+            )
+        return await self.get(job_id)
+
+    async def get(self, job_id: int) -> BatchJob | None:
+        row = self._conn.execute("SELECT * FROM batch_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._job(row) if row is not None else None
+
+    async def unfinished(self) -> list[BatchJob]:
+        """完了していないジョブ（作成した順）"""
+        return [
+            self._job(row) for row in self._conn.execute(
+                "SELECT * FROM batch_jobs WHERE finished_at IS NULL ORDER BY job_id"
+            )
+        ]
+
+    async def pending(self, job_id: int) -> list[MessageLink]:
+        """未処理のメッセージ（入力の順）"""
+        return [
+            MessageLink(channel_id, message_id) for channel_id, message_id in self._conn.execute(
+                "SELECT channel_id, message_id FROM batch_items WHERE job_id = ? AND status = ? ORDER BY position",
+                (job_id, PENDING),
+            )
+        ]
+
+    async def set_result(self, job_id: int, message_id: int, status: str, detail: str = ""):
+        """メッセージの処理結果を保存する（再開した時に処理し直さない）"""
+        with self._conn:
+            self._conn.execute(
+                "UPDATE batch_items SET status = ?, detail = ? WHERE job_id = ? AND message_id = ?",
+                (status, detail, job_id, message_id),
+            )
+
+    async def finish(self, job_id: int):
+        with self._conn:
+            self._conn.execute("UPDATE batch_jobs SET finished_at = ? WHERE job_id = ?", (self._clock(), job_id))
+
+    async def counts(self, job_id: int) -> Counter:
+        """結果ごとのメッセージ数（未処理は pending）"""
+        return Counter(dict(self._conn.execute(
+            "SELECT status, COUNT(*) FROM batch_items WHERE job_id = ? GROUP BY status", (job_id,)
+        )))
+
+    async def failures(self, job_id: int, limit: int | None = None) -> list[BatchFailure]:
+        """ピン留め・解除できなかったメッセージ（入力の順）"""
+        sql = (
+            "SELECT channel_id, message_id, status, detail FROM batch_items"
+            " WHERE job_id = ? AND status IN ('not_found', 'forbidden', 'failed') ORDER BY position"
+        )
+        params: list = [job_id]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [BatchFailure(*row) for row in self._conn.execute(sql, params)]
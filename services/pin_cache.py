@@ -0,0 +1,162 @@
+"""チャンネルごとのピン留め一覧のキャッシュ（LRU + TTL）"""
+import asyncio
+import time
+from collections import OrderedDict
+
+from services.pin_catalog import PinCatalog
+
+# キャッシュするチャンネル数の既定値
+DEFAULT_CACHE_SIZE = 256
+# キャッシュの有効期限（秒）の既定値
+DEFAULT_CACHE_TTL = 300.0
+
+
+async def fetch_all_pins(channel) -> list:
+    """チャンネルの全てのピン留めメッセージを新しくピン留めした順に取得する
+
+    channel.pins() は既定では先頭の50件までしか返さないため、limit=None で全件をたどる。
+    """
+    return [message async for message in channel.pins(limit=None)]
+
+
+class PinListCache:
+    """channel.pins() の結果をチャンネル単位でキャッシュする
+
+    ピン留め一覧はBot自身のピン留め/解除か on_guild_channel_pins_update でしか
+    変化しないため、それらのタイミングで invalidate() して鮮度を保つ。
+    TTL は取りこぼしに対する保険として使う。
+
+    backend（共有のステートバックエンド）を指定した場合は、チャンネルごとのバージョン番号を
+    バックエンドに置き、invalidate() でバージョンを上げて他のプロセスのキャッシュも無効にする。
+
+    on_fetch を指定した場合は、RESTで取得し直した時だけ (チャンネル, ピン留めのリスト) を渡して呼ぶ
+    （キャッシュにヒットした時は呼ばない）。
+    """
+
+    def __init__(
+        self,
+        maxsize: int = DEFAULT_CACHE_SIZE,
+        ttl: float = DEFAULT_CACHE_TTL,
+        clock=time.monotonic,
+        backend=None,
+        on_fetch=None,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self.backend = backend
+        self.on_fetch = on_fetch
+        # channel_id -> (有効期限, バージョン, ピン留めのリスト)
+        self._entries: OrderedDict[int, tuple[float, str | None, list]] = OrderedDict()
+        self._inflight: dict[int, asyncio.Future] = {}
+        # channel_id -> (元にしたピン留めのリスト, 作者・投稿日時の索引)
+        self._catalogs: dict[int, tuple[list, PinCatalog]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    async def _version(self, channel_id: int) -> str | None:
+        """共有のバージョン番号（バックエンドがなければ None）"""
+        if self.backend is None:
+            return None
+        return await self.backend.get(f"pins_version:{channel_id}")
+
+    def _lookup(self, channel_id: int, version: str | None) -> list | None:
+        entry = self._entries.get(channel_id)
+        if entry is None:
+            return None
+        expires_at, cached_version, pins = entry
+        if self._clock() >= expires_at or cached_version != version:
+            del self._entries[channel_id]
+            self._catalogs.pop(channel_id, None)
+            return None
+        self._entries.move_to_end(channel_id)
+        return pins
+
+    def _store(self, channel_id: int, version: str | None, pins: list):
+        self._entries[channel_id] = (self._clock() + self.ttl, version, pins)
+        self._entries.move_to_end(channel_id)
+        while len(self._entries) > self.maxsize:
+            evicted, _ = self._entries.popitem(last=False)
+            self._catalogs.pop(evicted, None)
+
+    async def get_pins(self, channel) -> list:
+        """チャンネルのピン留め一覧を取得する（キャッシュがなければ全件を取得する）
+
+        同じチャンネルへの取得が同時に発生した場合はREST呼び出しを1回にまとめる。
+
+        Returns:
+            list: ピン留めメッセージのリスト（呼び出し側で変更してよいコピー）
+        """
+        return list(await self._get(channel))
+
+    async def _get(self, channel) -> list:
+        """キャッシュまたはRESTからピン留め一覧を取得し、ヒット/ミスを数える（キャッシュしたリストそのものを返す）"""
+        version = await self._version(channel.id)
+        pins = self._lookup(channel.id, version)
+        if pins is not None:
+            self.hits += 1
+            return pins
+
+        inflight = self._inflight.get(channel.id)
+        if inflight is not None:
+            # 取得中のリクエストに相乗りする（REST呼び出しは発生しない）
+            self.hits += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[channel.id] = future
+        try:
+            pins = await fetch_all_pins(channel)
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # 待機者がいない場合の警告を抑止
+            raise
+        else:
+            # 取得中に invalidate されていなければ保存する
+            if self._inflight.get(channel.id) is future:
+                self._store(channel.id, version, pins)
+            future.set_result(pins)
+        finally:
+            if self._inflight.get(channel.id) is future:
+                del self._inflight[channel.id]
+        if self.on_fetch is not None:
+            await self.on_fetch(channel, pins)
+        return pins
+
+    async def get_catalog(self, channel) -> PinCatalog:
+        """チャンネルのピン留め一覧を作者・投稿日時で索引したもの（一覧のキャッシュと一緒に使い回す）
+
+        ピン留め一覧の取得と同じく1回の参照として数えるため、get_pins() と続けて呼ばない。
+        """
+        pins = await self._get(channel)
+        cached = self._catalogs.get(channel.id)
+        if cached is not None and cached[0] is pins:
+            return cached[1]
+        catalog = PinCatalog(pins)
+        entry = self._entries.get(channel.id)
+        # 取得中に invalidate された一覧は索引も保存しない
+        if entry is not None and entry[2] is pins:
+            self._catalogs[channel.id] = (pins, catalog)
+        return catalog
+
+    async def invalidate(self, channel_id: int):
+        """チャンネルのキャッシュを破棄する（バックエンドがあれば他のプロセスの分も）"""
+        self._entries.pop(channel_id, None)
+        self._catalogs.pop(channel_id, None)
+        self._inflight.pop(channel_id, None)
+        if self.backend is not None:
+            await self.backend.incr(f"pins_version:{channel_id}")
+
+    def stats(self) -> dict:
+        """ヒット/ミス数などの統計情報"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,96 @@
+"""作者と投稿日時で索引したピン留め一覧（/pinnedlist の絞り込みと並べ替え）
+
+/pinnedlist の作者・日数の絞り込みと並べ替えを、ピン留め一覧の全件を走査せずに行う。
+投稿日時はメッセージID（スノーフレーク）から求められるため、メッセージIDの昇順に並べた
+一覧を二分探索すれば日数の絞り込みは範囲の切り出しになる。作者ごとにも同じ並びの一覧を持つ。
+
+絞り込みは📌リアクションユーザーの解決（fetch_message）より前に行う。
+ピン留め一覧の取得結果にはリアクションの情報が揃っていないため、📌が多い順の並べ替えには
+呼び出し側が📌リアクションユーザーのインデックスから求めた件数を渡す。
+"""
+import heapq
+from bisect import bisect_left
+from datetime import datetime
+
+import discord
+
+# /pinnedlist の並べ替え
+# - newest: 投稿が新しい順
+# - oldest: 投稿が古い順
+# - most_reacted: 📌リアクションが多い順（同数なら新しい順）
+SORT_ORDERS = ("newest", "oldest", "most_reacted")
+
+
+def sort_key(order: str, counts: dict[int, int] | None = None):
+    """並べ替えの順に小さくなるキー（heapq.merge / sorted に渡す）
+
+    Args:
+        order: SORT_ORDERS のいずれか
+        counts: メッセージIDごとのBot以外の📌リアクション数（most_reacted で使う、ないものは0件）
+    """
+    if order == "oldest":
+        return lambda pin: pin.id
+    if order == "most_reacted":
+        counts = counts or {}
+        return lambda pin: (-counts.get(pin.id, 0), -pin.id)
+    return lambda pin: -pin.id
+
+
+def merge_sorted(lists: list[list], order: str, counts: dict[int, int] | None = None) -> list:
+    """それぞれ order の順に並んだ一覧を1つにまとめる（全件の並べ替えはしない）"""
+    return list(heapq.merge(*lists, key=sort_key(order, counts)))
+
+
+class PinCatalog:
+    """ピン留めメッセージを作者と投稿日時で引けるようにした一覧
+
+    ピン留め一覧キャッシュと同じ期間だけ使い回し、ピン留めが変化したら作り直す。
+    """
+
+    def __init__(self, pins: list):
+        ordered = sorted(pins, key=lambda pin: pin.id)
+        # 元の順（channel.pins() の順 = 新しくピン留めした順）
+        self._position = {pin.id: i for i, pin in enumerate(pins)}
+        self._pins = ordered
+        self._ids = [pin.id for pin in ordered]
+        # author_id -> (メッセージIDの昇順のID一覧, ピン留め一覧)
+        self._by_author: dict[int, tuple[list[int], list]] = {}
+        for pin in ordered:
+            ids, author_pins = self._by_author.setdefault(pin.author.id, ([], []))
+            ids.append(pin.id)
+            author_pins.append(pin)
+
+    def __len__(self):
+        return len(self._pins)
+
+    def query(
+        self,
+        author_id: int | None = None,
+        after: datetime | None = None,
+        before: datetime | None = None,
+        order: str | None = None,
+        counts: dict[int, int] | None = None,
+    ) -> list:
+        """作者・投稿日時の範囲で絞り込み、order の順に並べたピン留めを返す
+
+        Args:
+            author_id: 作者のユーザーID（None なら全員）
+            after: この日時以降の投稿に絞り込む
+            before: この日時より前の投稿に絞り込む
+            order: SORT_ORDERS のいずれか（None なら元の一覧の順）
+            counts: メッセージIDごとのBot以外の📌リアクション数（most_reacted で使う）
+        """
+        if author_id is not None:
+            ids, pins = self._by_author.get(author_id, ([], []))
+        else:
+            ids, pins = self._ids, self._pins
+        start = bisect_left(ids, discord.utils.time_snowflake(after)) if after is not None else 0
+        end = bisect_left(ids, discord.utils.time_snowflake(before)) if before is not None else len(ids)
+
+        if order == "oldest":
+            return pins[start:end]
+        if order == "newest":
+            return pins[start:end][::-1]
+        if order == "most_reacted":
+            return sorted(pins[start:end], key=sort_key(order, counts))
+        return sorted(pins[start:end], key=lambda pin: self._position[pin.id])
@@ -0,0 +1,98 @@
+"""ピン留めメッセージの再取得と📌リアクションユーザーの解決"""
+import logging
+
+import discord
+
+from services.concurrency import bounded_gather
+
+logger = logging.getLogger(__name__)
+
+# ピン留め用の絵文字（pushpin）
+PIN_EMOJI = "📌"
+
+# /pinnedlist でメッセージを並列取得する際の既定の同時実行数
+DEFAULT_FETCH_CONCURRENCY = 5
+
+
+def find_pushpin_reaction(message):
+    """メッセージから📌リアクションを探す（なければNone）"""
+    for reaction in message.reactions:
+        if str(reaction.emoji) == PIN_EMOJI:
+            return reaction
+    return None
+
+
+async def resolve_pushpin_reactors(message) -> set[int]:
+    """📌リアクションを付けたBot以外のユーザーIDを取得する
+
+    Args:
+        message: リアクション情報を含むメッセージオブジェクト
+
+    Returns:
+        set[int]: Bot以外のリアクションユーザーID
+    """
+    pin_reaction = find_pushpin_reaction(message)
+    if pin_reaction is None:
+        logger.debug("📌リアクションが見つかりませんでした (メッセージID: %s)", message.id)
+        return set()
+
+    reactors = set()
+    async for user in pin_reaction.users():
+        if not user.bot:
+            reactors.add(user.id)
+
+    logger.debug("Bot以外のリアクションユーザー: %s (メッセージID: %s)", reactors, message.id)
+    return reactors
+
+
+async def resolve_remaining_reactors(message) -> set[int]:
+    """📌リアクション削除後に残っているBot以外のユーザーIDを取得する
+
+    reaction.count と reaction.me から残りがBot自身だけ（または0人）と分かる場合は
+    ユーザー一覧を取得しない。他のユーザーが残っている場合のみ、Botが混ざっていないか
+    確認するためにユーザー一覧を取得する。
+    """
+    pin_reaction = find_pushpin_reaction(message)
+    if pin_reaction is None:
+        return set()
+    if pin_reaction.count - int(pin_reaction.me) <= 0:
+        return set()
+    return await resolve_pushpin_reactors(message)
+
+
+def is_self_only(reactors: set[int], user_id: int) -> bool:
+    """自分だけが📌リアクションしている場合True"""
+    return reactors == {user_id}
+
+
+async def refresh_pins(channel, pins: list, concurrency: int = DEFAULT_FETCH_CONCURRENCY) -> list:
+    """ピン留めメッセージを並列に再取得し、📌リアクションユーザーを解決する
+
+    同時実行数はセマフォで制限し、結果は元のピン留め順序を維持する。
+    削除済み・権限のないメッセージは結果から除外する。
+
+    Args:
+        channel: ピン留めメッセージのあるチャンネル
+        pins: channel.pins() で取得したメッセージのリスト
+        concurrency: 同時に実行するREST呼び出し数の上限
+
+    Returns:
+        list[tuple]: (再取得したメッセージ, Bot以外のリアクションユーザーIDのset) のリスト
+    """
+
+    async def refresh(pin):
+        # リアクション情報を取得するためにメッセージを再取得
+        message = await channel.fetch_message(pin.id)
+        reactors = await resolve_pushpin_reactors(message)
+        return message, reactors
+
+    results = await bounded_gather(pins, refresh, concurrency)
+
+    refreshed = []
+    for result in results:
+        if isinstance(result, (discord.NotFound, discord.Forbidden)):
+            continue  # 削除済み or 権限エラーの場合はスキップ
+        if isinstance(result, BaseException):
+            raise result
+        refreshed.append(result)
+    return refreshed
@@ -0,0 +1,264 @@
+"""ピン留めメッセージごとの📌リアクションユーザーを保持するインデックス
+
+リアクションイベントで差分更新し、/pinnedlist の「自分だけのピン留めか」の判定を
+REST呼び出しなしで行えるようにする。内容はSQLiteに永続化し、起動時に
+channel.pins() と突き合わせて（リコンシリエーション）イベントの取りこぼしを補正する。
+"""
+import sqlite3
+from dataclasses import dataclass, field
+
+# インデックスの既定の保存先
+DEFAULT_INDEX_PATH = "pin_index.db"
+
+
+@dataclass
+class PinRecord:
+    """1件のピン留めメッセージの情報"""
+
+    guild_id: int
+    channel_id: int
+    message_id: int
+    reactors: set[int] = field(default_factory=set)
+
+
+class PinIndex:
+    """ギルド/チャンネル/メッセージ単位で📌リアクションユーザー（Bot以外）を保持するインデックス
+
+    参照はメモリ上の辞書で行い、更新はSQLiteへ書き込む（ライトスルー）。
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS pins (
+                message_id INTEGER PRIMARY KEY,
+                guild_id INTEGER NOT NULL,
+                channel_id INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS pins_channel ON pins (channel_id);
+            CREATE TABLE IF NOT EXISTS pin_reactors (
+                message_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                PRIMARY KEY (message_id, user_id)
+            );
+            """
+        )
+        self._conn.commit()
+        self._records: dict[int, PinRecord] = {}
+        # チャンネルID -> メッセージIDのset（チャンネル単位の参照で全件を走査しない）
+        self._by_channel: dict[int, set[int]] = {}
+        self._load()
+
+    def _load(self):
+        """SQLiteの内容をメモリに読み込む"""
+        for message_id, guild_id, channel_id in self._conn.execute(
+            "SELECT message_id, guild_id, channel_id FROM pins"
+        ):
+            self._put(PinRecord(guild_id, channel_id, message_id))
+        for message_id, user_id in self._conn.execute(
+            "SELECT message_id, user_id FROM pin_reactors"
+        ):
+            record = self._records.get(message_id)
+            if record is not None:
+                record.reactors.add(user_id)
+
+    def __len__(self):
+        return len(self._records)
+
+    def close(self):
+        self._conn.close()
+
+    def _put(self, record: PinRecord):
+        self._pop(record.message_id)
+        self._records[record.message_id] = record
+        self._by_channel.setdefault(record.channel_id, set()).add(record.message_id)
+
+    def _pop(self, message_id: int):
+        record = self._records.pop(message_id, None)
+        if record is None:
+            return
+        message_ids = self._by_channel.get(record.channel_id)
+        if message_ids is not None:
+            message_ids.discard(message_id)
+            if not message_ids:
+                del self._by_channel[record.channel_id]
+
+    async def get_reactors(self, message_id: int) -> set[int] | None:
+        """📌リアクションユーザーを取得する（インデックスにない場合はNone）"""
+        record = self._records.get(message_id)
+        if record is None:
+            return None
+        return set(record.reactors)
+
+    async def channel_message_ids(self, channel_id: int) -> set[int]:
+        """チャンネル内でインデックスに登録されているメッセージIDを取得する"""
+        return set(self._by_channel.get(channel_id, ()))
+
+    async def set_reactors(self, guild_id: int, channel_id: int, message_id: int, reactors: set[int]):
+        """メッセージの📌リアクションユーザーを丸ごと置き換える"""
+        self._put(PinRecord(guild_id, channel_id, message_id, set(reactors)))
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pins (message_id, guild_id, channel_id) VALUES (?, ?, ?)",
+                (message_id, guild_id, channel_id),
+            )
+            self._conn.execute("DELETE FROM pin_reactors WHERE message_id = ?", (message_id,))
+            self._conn.executemany(
+                "INSERT INTO pin_reactors (message_id, user_id) VALUES (?, ?)",
+                [(message_id, user_id) for user_id in reactors],
+            )
+
+    async def add_reactor(self, guild_id: int, channel_id: int, message_id: int, user_id: int):
+        """📌リアクションユーザーを1人追加する"""
+        record = self._records.get(message_id)
+        if record is None:
+            record = PinRecord(guild_id, channel_id, message_id)
+            self._put(record)
+        record.reactors.add(user_id)
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO pins (message_id, guild_id, channel_id) VALUES (?, ?, ?)",
+                (message_id, guild_id, channel_id),
+            )
+            self._conn.execute(
+                "INSERT OR IGNORE INTO pin_reactors (message_id, user_id) VALUES (?, ?)",
+                (message_id, user_id),
+            )
+
+    async def remove_reactor(self, message_id: int, user_id: int) -> set[int] | None:
+        """📌リアクションユーザーを1人削除する
+
+        Returns:
+            set[int] | None: 削除後の残りのユーザー（インデックスにない場合はNone）
+        """
+        record = self._records.get(message_id)
+        if record is None:
+            return None
+        record.reactors.discard(user_id)
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM pin_reactors WHERE message_id = ? AND user_id = ?",
+                (message_id, user_id),
+            )
+        return set(record.reactors)
+
+    async def remove_message(self, message_id: int):
+        """ピン留めが解除されたメッセージをインデックスから削除する"""
+        self._pop(message_id)
+        with self._conn:
+            self._conn.execute("DELETE FROM pins WHERE message_id = ?", (message_id,))
+            self._conn.execute("DELETE FROM pin_reactors WHERE message_id = ?", (message_id,))
+
+    async def reconcile_channel(self, guild_id: int, channel_id: int, pinned: list):
+        """channel.pins() の結果とインデックスを突き合わせる
+
+        Args:
+            guild_id: ギルドID
+            channel_id: チャンネルID
+            pinned: (メッセージID, 📌リアクションユーザーのset) のリスト
+        """
+        pinned_ids = set()
+        for message_id, reactors in pinned:
+            pinned_ids.add(message_id)
+            await self.set_reactors(guild_id, channel_id, message_id, reactors)
+
+        # もうピン留めされていないメッセージを削除
+        for message_id in await self.channel_message_ids(channel_id) - pinned_ids:
+            await self.remove_message(message_id)
+
+
+class SharedPinIndex:
+    """ステートバックエンドに保持する PinIndex（複数プロセスで共有する場合に使う）
+
+    PinIndex と同じインターフェースを持つ。同じメッセージへの更新はリアクション処理の
+    メッセージ単位のロックで直列化される前提で、コマンドをトランザクションにはしない。
+
+    キー:
+        pin:{メッセージID}          -> "ギルドID:チャンネルID"
+        pin:{メッセージID}:reactors -> 📌リアクションユーザーIDのset
+        channel:{チャンネルID}:pins -> チャンネル内のメッセージIDのset
+        pins                        -> 全メッセージIDのset
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        # メトリクス用の件数（他のプロセスの更新は reconcile 時に反映する概算値）
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def close(self):
+        pass
+
+    async def refresh_size(self):
+        """全体の件数を読み直す"""
+        self._size = await self.backend.scard("pins")
+
+    async def get_reactors(self, message_id: int) -> set[int] | None:
+        """📌リアクションユーザーを取得する（インデックスにない場合はNone）"""
+        if await self.backend.get(f"pin:{message_id}") is None:
+            return None
+        return {int(u) for u in await self.backend.smembers(f"pin:{message_id}:reactors")}
+
+    async def channel_message_ids(self, channel_id: int) -> set[int]:
+        """チャンネル内でインデックスに登録されているメッセージIDを取得する"""
+        return {int(m) for m in await self.backend.smembers(f"channel:{channel_id}:pins")}
+
+    async def _register(self, guild_id: int, channel_id: int, message_id: int, replace: bool):
+        await self.backend.put(f"pin:{message_id}", f"{guild_id}:{channel_id}", nx=not replace)
+        await self.backend.sadd(f"channel:{channel_id}:pins", message_id)
+        self._size += await self.backend.sadd("pins", message_id)
+
+    async def set_reactors(self, guild_id: int, channel_id: int, message_id: int, reactors: set[int]):
+        """メッセージの📌リアクションユーザーを丸ごと置き換える"""
+        await self._register(guild_id, channel_id, message_id, replace=True)
+        await self.backend.delete(f"pin:{message_id}:reactors")
+        if reactors:
+            await self.backend.sadd(f"pin:{message_id}:reactors", *reactors)
+
+    async def add_reactor(self, guild_id: int, channel_id: int, message_id: int, user_id: int):
+        """📌リアクションユーザーを1人追加する"""
+        await self._register(guild_id, channel_id, message_id, replace=False)
+        await self.backend.sadd(f"pin:{message_id}:reactors", user_id)
+
+    async def remove_reactor(self, message_id: int, user_id: int) -> set[int] | None:
+        """📌リアクションユーザーを1人削除する
+
+        Returns:
+            set[int] | None: 削除後の残りのユーザー（インデックスにない場合はNone）
+        """
+        if await self.backend.get(f"pin:{message_id}") is None:
+            return None
+        await self.backend.srem(f"pin:{message_id}:reactors", user_id)
+        return {int(u) for u in await self.backend.smembers(f"pin:{message_id}:reactors")}
+
+    async def remove_message(self, message_id: int):
+        """ピン留めが解除されたメッセージをインデックスから削除する"""
+        location = await self.backend.get(f"pin:{message_id}")
+        if location is not None:
+            channel_id = location.partition(":")[2]
+            await self.backend.srem(f"channel:{channel_id}:pins", message_id)
+        await self.backend.delete(f"pin:{message_id}", f"pin:{message_id}:reactors")
+        self._size -= await self.backend.srem("pins", message_id)
+
+    async def reconcile_channel(self, guild_id: int, channel_id: int, pinned: list):
+        """channel.pins() の結果とインデックスを突き合わせる
+
+        Args:
+            guild_id: ギルドID
+            channel_id: チャンネルID
+            pinned: (メッセージID, 📌リアクションユーザーのset) のリスト
+        """
+        pinned_ids = set()
+        for message_id, reactors in pinned:
+            pinned_ids.add(message_id)
+            await self.set_reactors(guild_id, channel_id, message_id, reactors)
+
+        # もうピン留めされていないメッセージを削除
+        for message_id in await self.channel_message_ids(channel_id) - pinned_ids:
+            await self.remove_message(message_id)
+        await self.refresh_size()
@@ -0,0 +1,127 @@
+"""メッセージ単位でリアクションイベントをまとめて処理するコアレッサ
+
+複数のユーザーが短時間に同じメッセージへ📌を付け外しした場合でも、
+一定時間（ウィンドウ）内のイベントをまとめて正味の変化だけを処理し、
+同じメッセージに対する処理はキーごとのロックで直列化する。
+"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+# イベントをまとめる既定の時間（秒）
+DEFAULT_COALESCE_WINDOW = 0.5
+
+
+class KeyedLock:
+    """キーごとの asyncio.Lock（使われなくなったロックは破棄する）"""
+
+    def __init__(self):
+        self._locks: dict = {}
+        self._waiters: dict = {}
+
+    def __len__(self):
+        return len(self._locks)
+
+    @asynccontextmanager
+    async def __call__(self, key):
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._waiters[key] -= 1
+            if self._waiters[key] == 0:
+                del self._waiters[key]
+                del self._locks[key]
+
+
+class _Batch:
+    """1つのメッセージに対してウィンドウ内に届いたイベント"""
+
+    def __init__(self):
+        # user_id -> [最初の操作, 最後の操作, 最後のペイロード]
+        self.users: dict[int, list] = {}
+
+    def add(self, payload, added: bool):
+        entry = self.users.get(payload.user_id)
+        if entry is None:
+            self.users[payload.user_id] = [added, added, payload]
+        else:
+            entry[1] = added
+            entry[2] = payload
+
+    def net_changes(self) -> tuple[list, list]:
+        """正味の変化を (追加のペイロード, 削除のペイロード) で返す
+
+        付けて外した（または外して付け直した）ユーザーは変化なしとして扱う。
+        """
+        added, removed = [], []
+        for first, last, payload in self.users.values():
+            if first != last:
+                continue
+            (added if last else removed).append(payload)
+        return added, removed
+
+
+class ReactionCoalescer:
+    """リアクションイベントをメッセージごとにまとめて handler に渡す
+
+    Args:
+        handler: (追加のペイロードのリスト, 削除のペイロードのリスト) を受け取るコルーチン関数
+        window: 最初のイベントから処理を始めるまでの待ち時間（秒）
+        locks: メッセージIDを受け取りロックの非同期コンテキストマネージャを返す関数
+            （省略時はプロセス内の KeyedLock。複数プロセスではステートバックエンドのロックを渡す）
+    """
+
+    def __init__(self, handler, window: float = DEFAULT_COALESCE_WINDOW, locks=None):
+        self.handler = handler
+        self.window = window
+        self.locks = locks if locks is not None else KeyedLock()
+        self._batches: dict[int, _Batch] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self.events_received = 0
+        self.batches_processed = 0
+
+    @property
+    def pending(self) -> int:
+        """まだ処理が終わっていないバッチ数"""
+        return len(self._tasks)
+
+    def submit(self, payload, added: bool):
+        """リアクションイベントを受け付ける（処理の完了は待たない）"""
+        self.events_received += 1
+        key = payload.message_id
+        batch = self._batches.get(key)
+        if batch is None:
+            batch = self._batches[key] = _Batch()
+            task = asyncio.get_running_loop().create_task(self._process(key, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        batch.add(payload, added)
+
+    async def _process(self, key, batch: _Batch):
+        if self.window > 0:
+            await asyncio.sleep(self.window)
+        # ウィンドウを閉じる（以降のイベントは次のバッチになる）
+        if self._batches.get(key) is batch:
+            del self._batches[key]
+
+        added, removed = batch.net_changes()
+        if not added and not removed:
+            return
+        async with self.locks(key):
+            self.batches_processed += 1
+            try:
+                await self.handler(added, removed)
+            except Exception:
+                logger.exception("リアクション処理でエラーが発生しました (メッセージID: %s)", key)
+
+    async def drain(self):
+        """受け付け済みのイベントがすべて処理されるまで待つ"""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
@@ -0,0 +1,293 @@
+"""優先度付きのREST呼び出しスケジューラ
+
+discord.py の HTTPClient.request をラップし、Botが行うREST呼び出しを優先度の順に送り出す。
+discord.py 自身もバケットごとにレート制限を待つが、待っているリクエストは到着順に処理されるため、
+/pinnedlist の一覧の更新のような大量の取得が、同じバケットのピン留め・解除を待たせてしまう。
+
+このスケジューラはバケットごとの残り回数（X-RateLimit-Remaining とリセット時刻）を
+discord.py のレート制限の状態から読み取り、残り回数がなくなったバケットのリクエストを送らずに
+キューに留める。リセット後は優先度の高いものから送り出す。同時に送るリクエスト数の上限を
+指定すると、上限に達している間も優先度の順に待たせる。
+
+優先度は呼び出し元が rest_priority() で指定し、指定がなければルートから決める:
+- PIN: ユーザーの操作によるピン留め・解除（📌リアクション、まとめて解除）
+- RESPONSE: ユーザーへの応答（メッセージの送信・編集、リアクションの追加）
+- REFRESH: ピン留め一覧の更新などの取得
+- CLEANUP: 一時的な通知メッセージの削除
+- BATCH: /pinbatch によるまとめてのピン留め・解除
+- WARMUP: 起動時・ギルド参加時のピン留めの事前読み込み
+
+インタラクションの応答（コールバックとフォローアップ）は discord.py のWebhookの経路で送られ、
+トークンごとの別のバケットを使うため、このスケジューラのキューには入らない。
+"""
+import asyncio
+import bisect
+import contextvars
+import enum
+import itertools
+import time
+from contextlib import contextmanager
+
+import discord
+
+from services.metrics import REST_QUEUE_WAIT
+
+# 同時に送るリクエスト数の既定の上限（0以下で無制限）
+DEFAULT_MAX_IN_FLIGHT = 16
+# 使い終わったバケットの残り回数を捨てる間隔（秒）
+BUDGET_PRUNE_INTERVAL = 60.0
+
+
+class Priority(enum.IntEnum):
+    """REST呼び出しの優先度（値が小さいほど先に送る）"""
+
+    PIN = 0
+    RESPONSE = 1
+    REFRESH = 2
+    CLEANUP = 3
+    BATCH = 4
+    WARMUP = 5
+
+
+_priority: contextvars.ContextVar[Priority | None] = contextvars.ContextVar("rest_priority", default=None)
+
+
+def current_priority() -> Priority | None:
+    """rest_priority() で指定されている優先度（指定がなければ None）"""
+    return _priority.get()
+
+
+@contextmanager
+def rest_priority(priority: Priority):
+    """このブロック（とその中で作られたタスク）のREST呼び出しの優先度を指定する"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def route_priority(route) -> Priority:
+    """呼び出し元が優先度を指定しなかった場合の、ルートによる優先度"""
+    if "/pins/" in route.path and route.method in ("PUT", "DELETE"):
+        return Priority.PIN
+    if route.method == "GET":
+        return Priority.REFRESH
+    if route.method == "DELETE" and route.path == "/channels/{channel_id}/messages/{message_id}":
+        return Priority.CLEANUP
+    return Priority.RESPONSE
+
+
+class _Budget:
+    """1つのバケットの残り回数（discord.py が受け取ったレート制限ヘッダーから更新する）"""
+
+    __slots__ = ("limit", "remaining", "reset_at", "in_flight", "unlimited")
+
+    def __init__(self):
+        self.limit: int | None = None  # 分かるまでは1件ずつ送る
+        self.remaining = 0
+        self.reset_at: float | None = None  # イベントループの時刻
+        self.in_flight = 0
+        self.unlimited = False  # レート制限ヘッダーが返されないルート
+
+    def expired(self, now: float) -> bool:
+        """送信中のリクエストがなく、リセットの時刻を過ぎている（捨てても次に作り直せば同じ状態になる）"""
+        return self.in_flight == 0 and (self.reset_at is None or now >= self.reset_at)
+
+    def take(self, now: float) -> bool:
+        """1回分を確保できれば確保して True を返す"""
+        if self.unlimited:
+            return True
+        if self.limit is None:
+            return self.in_flight == 0
+        if self.reset_at is not None and now >= self.reset_at:
+            self.remaining = self.limit - self.in_flight
+            self.reset_at = None
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        return True
+
+    def restore(self):
+        """応答を受け取らずに終わった1回分（接続エラー・キャンセル）を戻す
+
+        応答がなければ discord.py のレート制限の状態も更新されず、残り回数を使い切ったままだと
+        リセットの時刻もないため、バケットのリクエストが二度と送られなくなる。
+        """
+        if self.limit is not None and not self.unlimited:
+            self.remaining = min(self.remaining + 1, self.limit - self.in_flight)
+
+    def update(self, ratelimit):
+        """discord.py の Ratelimit の状態を写す（ヘッダーを受け取っていなければ制限なしとみなす）"""
+        if not ratelimit.dirty:
+            self.unlimited = True
+            return
+        self.unlimited = False
+        self.limit = ratelimit.limit
+        self.remaining = ratelimit.remaining
+        self.reset_at = ratelimit.expires
+
+
+class RestScheduler:
+    """Botが行うREST呼び出しを優先度の順に、バケットの残り回数の範囲で送り出す
+
+    Args:
+        max_in_flight: 同時に送るリクエスト数の上限（0以下で無制限）
+        prune_interval: 使い終わったバケットの残り回数を捨てる間隔（秒）
+    """
+
+    def __init__(self, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT, prune_interval: float = BUDGET_PRUNE_INTERVAL):
+        self.max_in_flight = max_in_flight
+        self.prune_interval = prune_interval
+        self._next_prune = 0.0
+        self.in_flight = 0
+        self._http = None
+        self._budgets: dict[str, _Budget] = {}
+        # (優先度, 順番, ルート, Future) を優先度の順に並べる
+        self._waiters: list[tuple] = []
+        self._seq = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+        self.dispatched = 0
+
+    def install(self, http):
+        """bot.http（discord.http.HTTPClient）の request をラップする"""
+        self._http = http
+        original = http.request
+
+        async def request(route, **kwargs):
+            budget = await self.acquire(route)
+            responded = False
+            try:
+                result = await original(route, **kwargs)
+                responded = True
+                return result
+            except discord.HTTPException:
+                responded = True
+                raise
+            finally:
+                self.release(route, budget, responded)
+
+        http.request = request
+
+    def depth(self) -> dict[Priority, int]:
+        """優先度ごとの待っているリクエスト数"""
+        counts = {priority: 0 for priority in Priority}
+        for priority, _, _, future in self._waiters:
+            if not future.done():
+                counts[priority] += 1
+        return counts
+
+    # --- バケット ---
+
+    def _key(self, route) -> str:
+        """discord.py と同じバケットのキー（バケットのハッシュが分かれば同じバケットのルートをまとめる）"""
+        # discord.py にはバケットの状態を参照する公開APIがないため内部の辞書を読む
+        bucket_hash = getattr(self._http, "_bucket_hashes", {}).get(route.key)
+        return f"{bucket_hash or route.key}:{route.major_parameters}"
+
+    def _ratelimit(self, key: str):
+        return getattr(self._http, "_buckets", {}).get(key)
+
+    def _budget(self, route) -> _Budget:
+        key = self._key(route)
+        budget = self._budgets.get(key)
+        if budget is None:
+            budget = self._budgets[key] = _Budget()
+            ratelimit = self._ratelimit(key)
+            if ratelimit is not None and ratelimit.dirty:
+                budget.update(ratelimit)
+        return budget
+
+    def _prune(self, now: float):
+        """リセットの時刻を過ぎ、送信中も待っているリクエストもないバケットを捨てる
+
+        バケットはチャンネルごとに作られるため、捨てなければ一度でも触れたチャンネルの数だけ増え続ける。
+        """
+        if now < self._next_prune:
+            return
+        self._next_prune = now + self.prune_interval
+        waiting = {self._key(route) for _, _, route, future in self._waiters if not future.done()}
+        for key, budget in list(self._budgets.items()):
+            if key not in waiting and budget.expired(now):
+                del self._budgets[key]
+
+    def _has_slot(self) -> bool:
+        return self.max_in_flight <= 0 or self.in_flight < self.max_in_flight
+
+    # --- 送り出し ---
+
+    async def acquire(self, route) -> _Budget:
+        """送ってよくなるまで待ち、確保したバケットを返す"""
+        priority = current_priority()
+        if priority is None:
+            priority = route_priority(route)
+        loop = asyncio.get_running_loop()
+        if not self._waiters and self._has_slot():
+            budget = self._budget(route)
+            if budget.take(loop.time()):
+                self._start(budget)
+                return budget
+
+        future = loop.create_future()
+        waiter = (priority, next(self._seq), route, future)
+        bisect.insort(self._waiters, waiter)
+        start = time.perf_counter()
+        try:
+            self._pump()
+            budget = await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 送り出された直後にキャンセルされた場合は確保した分を戻す
+                self.release(route, future.result(), False)
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+        REST_QUEUE_WAIT.observe(time.perf_counter() - start, priority=priority.name.lower())
+        return budget
+
+    def release(self, route, budget: _Budget, responded: bool):
+        """リクエストが終わったら、discord.py が受け取ったレート制限でバケットを更新して次を送り出す"""
+        budget.in_flight -= 1
+        self.in_flight -= 1
+        if responded:
+            key = self._key(route)
+            ratelimit = self._ratelimit(key)
+            if ratelimit is not None:
+                budget.update(ratelimit)
+            # バケットのハッシュが分かった後は、同じバケットの別のルートも同じ残り回数を使う
+            self._budgets.setdefault(key, budget)
+        else:
+            budget.restore()
+        self._pump()
+
+    def _start(self, budget: _Budget):
+        budget.in_flight += 1
+        self.in_flight += 1
+        self.dispatched += 1
+
+    def _pump(self):
+        """優先度の順に、バケットの残り回数と同時実行数の上限の範囲で送り出す"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        next_reset = None
+        for waiter in list(self._waiters):
+            if not self._has_slot():
+                break
+            _, _, route, future = waiter
+            if future.done():
+                self._waiters.remove(waiter)
+                continue
+            budget = self._budget(route)
+            if budget.take(now):
+                self._waiters.remove(waiter)
+                self._start(budget)
+                future.set_result(budget)
+            elif budget.in_flight == 0 and budget.reset_at is not None:
+                # 送信中のリクエストがなければ、リセットの時刻に送り出し直す
+                next_reset = budget.reset_at if next_reset is None else min(next_reset, budget.reset_at)
+        if self._waiters and next_reset is not None:
+            self._timer = loop.call_at(next_reset, self._pump)
+        self._prune(now)
@@ -0,0 +1,53 @@
+"""Gatewayのインテントとキャッシュの設定
+
+Botが使う機能は📌リアクションのRAWイベント、スラッシュコマンド、`!pin` テキストコマンドだけなので、
+LEAN_RUNTIME を有効にするとそれ以外のイベントとキャッシュを切ってメモリ使用量を抑える。
+"""
+import discord
+
+
+def default_intents() -> discord.Intents:
+    """従来どおりのインテント（既定のインテント + メッセージ内容）"""
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.reactions = True  # リアクションのイベントを受け取るために必要
+    return intents
+
+
+def lean_intents() -> discord.Intents:
+    """必要最小限のインテント
+
+    - guilds: チャンネル・ギルドのキャッシュ（bot.get_channel、権限の確認、起動時の同期）
+    - guild_reactions: 📌リアクションのRAWイベント
+    - message_content: /pinnedlist でREST取得したピン留めの本文を読むため
+      （MESSAGE_CREATEイベントは受け取らないため `!pin` テキストコマンドは使えず、/pin で代替する）
+
+    guild_messages を購読しないため、メッセージの編集・削除のイベントも届かない。
+    全文検索インデックスの本文は、ピン留め一覧をRESTで取得し直した時の突き合わせでのみ更新される。
+    """
+    intents = discord.Intents.none()
+    intents.guilds = True
+    intents.guild_reactions = True
+    intents.message_content = True
+    return intents
+
+
+def client_options(lean: bool) -> dict:
+    """commands.Bot に渡すインテントとキャッシュの設定
+
+    Args:
+        lean: 必要最小限の設定にするか
+
+    Returns:
+        dict: intents / member_cache_flags / max_messages / chunk_guilds_at_startup
+    """
+    if not lean:
+        return {"intents": default_intents()}
+    return {
+        "intents": lean_intents(),
+        # メンバーはRAWイベントのペイロードとRESTの結果だけで足りるのでキャッシュしない
+        "member_cache_flags": discord.MemberCacheFlags.none(),
+        # メッセージはRAWイベントで扱うためメッセージキャッシュは不要
+        "max_messages": None,
+        "chunk_guilds_at_startup": False,
+    }
@@ -0,0 +1,227 @@
+"""ピン留めメッセージ本文の全文検索インデックス
+
+/pinsearch でキーワードからピン留めを探すため、ピン留めメッセージの本文を
+SQLiteの FTS5 に登録しておく。ピン留め・解除の処理とピン留め一覧の取得時に差分更新し、
+検索ではREST呼び出しを行わない。
+
+本文の大半は日本語で単語の区切りがないため、FTS5 の単語分割には頼らず、
+正規化（NFKC + casefold）した本文を文字・数字の連続ごとに2文字ずつのN-gramに分けて登録する。
+検索語も同じく2文字ずつに分け、連続するN-gramのフレーズとして検索するので、
+部分文字列の一致と同じ結果になる。1文字の検索語はN-gramを持たないため、
+正規化した本文を直接照合する。
+"""
+import sqlite3
+import unicodedata
+from dataclasses import dataclass
+from typing import Collection
+
+from services.pin_index import DEFAULT_INDEX_PATH
+
+# /pinsearch で表示する既定の件数
+DEFAULT_SEARCH_LIMIT = 20
+
+
+@dataclass
+class SearchHit:
+    """検索に一致したピン留めメッセージ"""
+
+    message_id: int
+    guild_id: int
+    channel_id: int
+    author_id: int
+    content: str
+
+
+def normalize(text: str) -> str:
+    """全角・半角と大文字・小文字の違いをなくし、文字・数字以外を空白にする"""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return "".join(c if unicodedata.category(c)[0] in "LN" else " " for c in text)
+
+
+def bigrams(word: str) -> list[str]:
+    """空白を含まない文字列の2文字ずつのN-gram（順序を維持）"""
+    return [word[i:i + 2] for i in range(len(word) - 1)]
+
+
+def index_text(content: str) -> str:
+    """FTS5 に登録する、本文のN-gramを空白で区切った文字列"""
+    return " ".join(gram for word in normalize(content).split() for gram in bigrams(word))
+
+
+def build_query(query: str) -> tuple[str | None, list[str]]:
+    """検索語を FTS5 のクエリと、N-gramを持たない1文字の語に分ける
+
+    空白で区切った語は全て含むもの（AND）を探す。
+
+    Returns:
+        tuple: (FTS5 の MATCH に渡すクエリ（2文字以上の語がなければNone）, 1文字の語のリスト)
+    """
+    phrases = []
+    singles = []
+    for word in normalize(query).split():
+        if len(word) >= 2:
+            phrases.append('"' + " ".join(bigrams(word)) + '"')
+        else:
+            singles.append(word)
+    return " AND ".join(phrases) or None, singles
+
+
+class PinSearchIndex:
+    """ギルド単位でピン留めメッセージの本文を検索するインデックス
+
+    本文とN-gramはSQLiteに保存し、参照もSQLiteで行う（件数が多くてもメモリを使わない）。
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS pin_texts (
+                message_id INTEGER PRIMARY KEY,
+                guild_id INTEGER NOT NULL,
+                channel_id INTEGER NOT NULL,
+                author_id INTEGER NOT NULL,
+                content TEXT NOT NULL,
+                normalized TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS pin_texts_guild ON pin_texts (guild_id);
+            CREATE INDEX IF NOT EXISTS pin_texts_channel ON pin_texts (channel_id);
+            CREATE VIRTUAL TABLE IF NOT EXISTS pin_grams USING fts5(
+                grams, tokenize = "unicode61 remove_diacritics 0"
+            );
+            """
+        )
+        self._conn.commit()
+        # 登録件数（メトリクスは別スレッドから読まれることがあるため、SQLiteに問い合わせず保持する）
+        self._count = self._conn.execute("SELECT COUNT(*) FROM pin_texts").fetchone()[0]
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        self._conn.close()
+
+    def _put(self, guild_id: int, channel_id: int, message_id: int, author_id: int, content: str) -> int:
+        """本文を登録する（新しく登録したら1、置き換えたら0を返す）"""
+        exists = self._conn.execute("SELECT 1 FROM pin_texts WHERE message_id = ?", (message_id,)).fetchone()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO pin_texts (message_id, guild_id, channel_id, author_id, content, normalized)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (message_id, guild_id, channel_id, author_id, content, normalize(content)),
+        )
+        self._conn.execute("DELETE FROM pin_grams WHERE rowid = ?", (message_id,))
+        self._conn.execute(
+            "INSERT INTO pin_grams (rowid, grams) VALUES (?, ?)", (message_id, index_text(content))
+        )
+        return 0 if exists else 1
+
+    def _delete(self, message_id: int) -> int:
+        """本文を削除する（削除した件数を返す）"""
+        cursor = self._conn.execute("DELETE FROM pin_texts WHERE message_id = ?", (message_id,))
+        self._conn.execute("DELETE FROM pin_grams WHERE rowid = ?", (message_id,))
+        return cursor.rowcount
+
+    async def add(self, guild_id: int, channel_id: int, message_id: int, author_id: int, content: str):
+        """ピン留めメッセージの本文を登録する（登録済みなら置き換える）"""
+        with self._conn:
+            added = self._put(guild_id, channel_id, message_id, author_id, content)
+        self._count += added
+
+    async def update_content(self, message_id: int, content: str) -> bool:
+        """登録済みのメッセージの本文を更新する（登録されていなければ何もせず False を返す）"""
+        row = self._conn.execute(
+            "SELECT guild_id, channel_id, author_id, content FROM pin_texts WHERE message_id = ?", (message_id,)
+        ).fetchone()
+        if row is None:
+            return False
+        guild_id, channel_id, author_id, current = row
+        if current != content:
+            with self._conn:
+                self._put(guild_id, channel_id, message_id, author_id, content)
+        return True
+
+    async def remove(self, message_id: int):
+        """ピン留めが解除されたメッセージを削除する"""
+        with self._conn:
+            removed = self._delete(message_id)
+        self._count -= removed
+
+    async def channel_message_ids(self, channel_id: int) -> set[int]:
+        """チャンネル内で登録されているメッセージIDを取得する"""
+        return {
+            message_id for (message_id,) in self._conn.execute(
+                "SELECT message_id FROM pin_texts WHERE channel_id = ?", (channel_id,)
+            )
+        }
+
+    async def reconcile_channel(self, guild_id: int, channel_id: int, messages: list, keep=frozenset()):
+        """チャンネルのピン留め一覧と突き合わせる（本文が変わったものだけ書き直す）
+
+        Args:
+            guild_id: ギルドID
+            channel_id: チャンネルID
+            messages: ピン留めメッセージ（discord.Message）のリスト
+            keep: ピン留め一覧になくても削除しないメッセージID（アーカイブしたピン留め）
+        """
+        stored = dict(self._conn.execute(
+            "SELECT message_id, content FROM pin_texts WHERE channel_id = ?", (channel_id,)
+        ))
+        delta = 0
+        with self._conn:
+            for message in messages:
+                if stored.pop(message.id, None) != message.content:
+                    delta += self._put(guild_id, channel_id, message.id, message.author.id, message.content)
+            # もうピン留めされていないメッセージを削除
+            for message_id in stored.keys() - keep:
+                delta -= self._delete(message_id)
+        self._count += delta
+
+    async def search(
+        self,
+        guild_id: int,
+        query: str,
+        channel_id: int | None = None,
+        author_id: int | None = None,
+        limit: int = DEFAULT_SEARCH_LIMIT,
+        channel_ids: Collection[int] | None = None,
+    ) -> list[SearchHit]:
+        """検索語を全て含むピン留めメッセージを新しい順に返す（検索語が空なら空のリスト）
+
+        Args:
+            channel_ids: 検索するチャンネルのID（実行したユーザーが読めるチャンネル、None なら全て）
+        """
+        match, singles = build_query(query)
+        if (match is None and not singles) or (channel_ids is not None and not channel_ids):
+            return []
+
+        columns = "t.message_id, t.guild_id, t.channel_id, t.author_id, t.content"
+        if match is not None:
+            # N-gramの一致を新しい順にたどり、条件に合うものが limit 件見つかった所で止める
+            # （CROSS JOIN で結合の順序を固定しないと、本文の行ごとに MATCH を評価してしまう）
+            sql = f"SELECT {columns} FROM pin_grams g CROSS JOIN pin_texts t ON t.message_id = g.rowid"
+            conditions = ["pin_grams MATCH ?", "t.guild_id = ?"]
+            params: list = [match, guild_id]
+            order = "g.rowid"
+        else:
+            sql = f"SELECT {columns} FROM pin_texts t"
+            conditions = ["t.guild_id = ?"]
+            params = [guild_id]
+            order = "t.message_id"
+        for word in singles:
+            conditions.append("instr(t.normalized, ?) > 0")
+            params.append(word)
+        if channel_id is not None:
+            conditions.append("t.channel_id = ?")
+            params.append(channel_id)
+        if author_id is not None:
+            conditions.append("t.author_id = ?")
+            params.append(author_id)
+        if channel_ids is not None:
+            conditions.append(f"t.channel_id IN ({', '.join('?' * len(channel_ids))})")
+            params.extend(channel_ids)
+        # メッセージID（スノーフレーク）の降順 = 新しい順
+        sql += " WHERE " + " AND ".join(conditions) + f" ORDER BY {order} DESC LIMIT ?"
+        params.append(limit)
+        return [SearchHit(*row) for row in self._conn.execute(sql, params)]
@@ -0,0 +1,149 @@
+"""シャーディングの設定とシャードごとの統計
+
+環境変数:
+    SHARD_MODE: "auto" を指定すると AutoShardedBot で起動する（シャード数はDiscordの推奨値）
+    SHARD_COUNT: 全体のシャード数（指定すると AutoShardedBot で起動する）
+    SHARD_IDS: このプロセスが担当するシャード（例: "0-3" や "0,2,4"、SHARD_COUNT と併用）
+"""
+import math
+import time
+
+from services.metrics import Counter
+
+SHARD_EVENTS = Counter(
+    "pinbot_shard_events_total",
+    "シャードごとの処理したイベント数",
+    ["shard"],
+)
+SHARD_RECONNECTS = Counter(
+    "pinbot_shard_reconnects_total",
+    "シャードごとのGateway再接続（切断・RESUME）回数",
+    ["shard", "kind"],
+)
+
+
+def parse_shard_ids(spec: str | None) -> list[int] | None:
+    """ "0-3,8" 形式のシャード指定をIDのリストに変換する（未指定なら None）"""
+    if not spec or not spec.strip():
+        return None
+    ids = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, sep, end = part.partition("-")
+        if sep:
+            first, last = int(start), int(end)
+            if first > last:
+                raise ValueError(f"シャードの範囲が不正です: {part}")
+            ids.update(range(first, last + 1))
+        else:
+            ids.add(int(part))
+    if any(i < 0 for i in ids):
+        raise ValueError(f"シャードIDは0以上で指定してください: {spec}")
+    return sorted(ids)
+
+
+def shard_options(mode: str | None, count: str | None, ids: str | None) -> dict | None:
+    """環境変数の値から AutoShardedBot に渡す引数を作る
+
+    Returns:
+        dict: shard_count / shard_ids（シャーディングしない場合は None）
+    """
+    shard_ids = parse_shard_ids(ids)
+    shard_count = int(count) if count else None
+    if shard_ids is not None:
+        if shard_count is None:
+            raise ValueError("SHARD_IDS を指定する場合は SHARD_COUNT も指定してください")
+        if shard_ids[-1] >= shard_count:
+            raise ValueError(f"SHARD_IDS は 0〜{shard_count - 1} の範囲で指定してください")
+    if shard_count is None and (mode or "").lower() != "auto":
+        return None
+    return {"shard_count": shard_count, "shard_ids": shard_ids}
+
+
+def shard_id_for_guild(guild_id: int | None, shard_count: int | None) -> int:
+    """ギルドIDから担当シャードを求める（Discordのシャーディングの式）"""
+    if guild_id is None or not shard_count:
+        return 0
+    return (guild_id >> 22) % shard_count
+
+
+class ShardStats:
+    """シャードごとの接続状態とイベント数
+
+    Args:
+        bot: discord.Client または discord.AutoShardedClient
+        clock: 現在時刻を返す関数
+    """
+
+    def __init__(self, bot, clock=time.time):
+        self.bot = bot
+        self._clock = clock
+        # shard_id -> {"events", "connects", "disconnects", "resumes", "last_connect", "last_event"}
+        self._shards: dict[int, dict] = {}
+
+    def _entry(self, shard_id: int) -> dict:
+        entry = self._shards.get(shard_id)
+        if entry is None:
+            entry = self._shards[shard_id] = {
+                "events": 0,
+                "connects": 0,
+                "disconnects": 0,
+                "resumes": 0,
+                "last_connect": None,
+                "last_event": None,
+            }
+        return entry
+
+    def latencies(self) -> list[tuple[int, float]]:
+        """(シャードID, レイテンシ) のリスト（未接続のシャードは含めない）"""
+        latencies = getattr(self.bot, "latencies", None)
+        if latencies is None:
+            latencies = [(0, self.bot.latency)]
+        return [(shard_id, latency) for shard_id, latency in latencies if math.isfinite(latency)]
+
+    def record_event(self, guild_id: int | None):
+        """ギルドのイベントを担当シャードの件数として数える"""
+        shard_id = shard_id_for_guild(guild_id, self.bot.shard_count)
+        entry = self._entry(shard_id)
+        entry["events"] += 1
+        entry["last_event"] = self._clock()
+        SHARD_EVENTS.inc(shard=shard_id)
+
+    def connected(self, shard_id: int):
+        entry = self._entry(shard_id)
+        entry["connects"] += 1
+        entry["last_connect"] = self._clock()
+        if entry["connects"] > 1:
+            # 2回目以降の接続はセッションを張り直した再接続
+            SHARD_RECONNECTS.inc(shard=shard_id, kind="reconnect")
+
+    def disconnected(self, shard_id: int):
+        self._entry(shard_id)["disconnects"] += 1
+        SHARD_RECONNECTS.inc(shard=shard_id, kind="disconnect")
+
+    def resumed(self, shard_id: int):
+        self._entry(shard_id)["resumes"] += 1
+        SHARD_RECONNECTS.inc(shard=shard_id, kind="resume")
+
+    def snapshot(self) -> dict:
+        """/shards エンドポイント用の状態"""
+        latencies = dict(self.latencies())
+        shards_info = getattr(self.bot, "shards", None)
+        shard_ids = set(self._shards) | set(latencies)
+        if shards_info:
+            shard_ids |= set(shards_info)
+        shards = []
+        for shard_id in sorted(shard_ids):
+            entry = self._entry(shard_id)
+            info = shards_info.get(shard_id) if shards_info else None
+            latency = latencies.get(shard_id)
+            shards.append({
+                "id": shard_id,
+                "connected": (not info.is_closed()) if info is not None else not self.bot.is_closed(),
+                "latency_ms": round(latency * 1000, 1) if latency is not None else None,
+                "guilds": sum(1 for g in self.bot.guilds if g.shard_id == shard_id),
+                **entry,
+            })
+        return {"shard_count": self.bot.shard_count, "shards": shards}
@@ -0,0 +1,320 @@
+"""プロセス間で共有する状態の保存先（ステートバックエンド）
+
+複数のプロセスでシャードを分担する場合に、ピン留めインデックス・メッセージ単位の
+ロック・キャッシュの無効化を共有するために使う。
+
+- MemoryStateBackend: プロセス内のメモリに保持する（1プロセスで動かす場合）
+- RedisStateBackend: Redis互換サーバーに保持する（RESPプロトコルを直接話す最小限の実装）
+
+値はRedisと同じく文字列として扱う。
+"""
+import asyncio
+import logging
+import secrets
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
+from services.reaction_coalescer import KeyedLock
+
+logger = logging.getLogger(__name__)
+
+# ロックを保持できる最大時間（秒）。保持したままプロセスが落ちてもこの時間で解放される
+DEFAULT_LOCK_TIMEOUT = 30.0
+# ロックが取れなかった時の再試行間隔（秒）
+LOCK_RETRY_INTERVAL = 0.05
+# ロックが自分のトークンのままの場合だけ削除するスクリプト（GET と DEL の間に他のプロセスが取得しても消さない）
+RELEASE_LOCK_SCRIPT = (
+    'if redis.call("get", KEYS[1]) == ARGV[1] then return redis.call("del", KEYS[1]) end return 0'
+)
+
+
+class StateBackend:
+    """ステートバックエンドのインターフェース"""
+
+    # 他のプロセスと状態を共有するか
+    shared = False
+
+    async def get(self, key: str) -> str | None:
+        raise NotImplementedError
+
+    async def put(self, key: str, value, ttl: float | None = None, nx: bool = False) -> bool:
+        """値を保存する（nx=True の場合はキーがない時だけ保存し、保存したかを返す）"""
+        raise NotImplementedError
+
+    async def delete(self, *keys: str) -> int:
+        raise NotImplementedError
+
+    async def incr(self, key: str) -> int:
+        raise NotImplementedError
+
+    async def sadd(self, key: str, *members) -> int:
+        raise NotImplementedError
+
+    async def srem(self, key: str, *members) -> int:
+        raise NotImplementedError
+
+    async def smembers(self, key: str) -> set[str]:
+        raise NotImplementedError
+
+    async def scard(self, key: str) -> int:
+        raise NotImplementedError
+
+    def lock(self, key):
+        """キーごとの排他ロック（async with で使う）"""
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class MemoryStateBackend(StateBackend):
+    """プロセス内のメモリに状態を保持するバックエンド"""
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._values: dict[str, str] = {}
+        self._expires: dict[str, float] = {}
+        self._sets: dict[str, set[str]] = {}
+        self._locks = KeyedLock()
+
+    def _alive(self, key: str) -> bool:
+        expires_at = self._expires.get(key)
+        if expires_at is not None and self._clock() >= expires_at:
+            self._values.pop(key, None)
+            del self._expires[key]
+        return key in self._values
+
+    async def get(self, key):
+        return self._values[key] if self._alive(key) else None
+
+    async def put(self, key, value, ttl=None, nx=False):
+        if nx and self._alive(key):
+            return False
+        self._values[key] = str(value)
+        if ttl is not None:
+            self._expires[key] = self._clock() + ttl
+        else:
+            self._expires.pop(key, None)
+        return True
+
+    async def delete(self, *keys):
+        deleted = 0
+        for key in keys:
+            if self._alive(key):
+                del self._values[key]
+                self._expires.pop(key, None)
+                deleted += 1
+            if self._sets.pop(key, None) is not None:
+                deleted += 1
+        return deleted
+
+    async def incr(self, key):
+        value = int(self._values[key]) + 1 if self._alive(key) else 1
+        self._values[key] = str(value)
+        return value
+
+    async def sadd(self, key, *members):
+        members = {str(m) for m in members}
+        current = self._sets.setdefault(key, set())
+        added = len(members - current)
+        current |= members
+        return added
+
+    async def srem(self, key, *members):
+        current = self._sets.get(key)
+        if not current:
+            return 0
+        members = {str(m) for m in members}
+        removed = len(current & members)
+        current -= members
+        if not current:
+            del self._sets[key]
+        return removed
+
+    async def smembers(self, key):
+        return set(self._sets.get(key, ()))
+
+    async def scard(self, key):
+        return len(self._sets.get(key, ()))
+
+    def lock(self, key):
+        return self._locks(key)
+
+
+class RedisError(Exception):
+    """Redisがエラー応答を返した"""
+
+
+class RedisStateBackend(StateBackend):
+    """Redis互換サーバーに状態を保持するバックエンド
+
+    1本の接続でコマンドを順番に送受信する。接続が切れた場合は次のコマンドで再接続する。
+
+    Args:
+        url: redis://[:パスワード@]ホスト[:ポート][/DB番号]
+        prefix: キーの接頭辞
+        lock_timeout: ロックを保持できる最大時間（秒）
+    """
+
+    shared = True
+
+    def __init__(self, url: str, prefix: str = "pinbot", lock_timeout: float = DEFAULT_LOCK_TIMEOUT):
+        parsed = urlparse(url)
+        if parsed.scheme not in ("redis", ""):
+            raise ValueError(f"未対応のURLです: {url}")
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.prefix = prefix
+        self.lock_timeout = lock_timeout
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._io_lock = asyncio.Lock()
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        if self.password:
+            await self._roundtrip("AUTH", self.password)
+        if self.db:
+            await self._roundtrip("SELECT", self.db)
+        logger.info("ステートバックエンドに接続しました (%s:%s/%s)", self.host, self.port, self.db)
+
+    @staticmethod
+    def _encode(args) -> bytes:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    async def _read_reply(self):
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("ステートバックエンドとの接続が切れました")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body.decode()
+        if kind == b"-":
+            raise RedisError(body.decode())
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            length = int(body)
+            if length < 0:
+                return None
+            data = await self._reader.readexactly(length + 2)
+            return data[:-2].decode()
+        if kind == b"*":
+            length = int(body)
+            if length < 0:
+                return None
+            return [await self._read_reply() for _ in range(length)]
+        raise RedisError(f"不正な応答です: {line!r}")
+
+    async def _roundtrip(self, *args):
+        self._writer.write(self._encode(args))
+        await self._writer.drain()
+        return await self._read_reply()
+
+    async def execute(self, *args):
+        """コマンドを1つ実行して応答を返す"""
+        async with self._io_lock:
+            if self._writer is None:
+                try:
+                    await self._connect()
+                except BaseException:
+                    self._drop_connection()
+                    raise
+            try:
+                return await self._roundtrip(*args)
+            except RedisError:
+                # エラー応答は読み終えているため、接続はそのまま使える
+                raise
+            except BaseException:
+                # 接続エラーに加えてキャンセルされた場合も、読み残した応答が次のコマンドの応答に
+                # 混ざらないよう接続を破棄し、次のコマンドで再接続する
+                self._drop_connection()
+                raise
+
+    def _drop_connection(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def get(self, key):
+        return await self.execute("GET", self._key(key))
+
+    async def put(self, key, value, ttl=None, nx=False):
+        args = ["SET", self._key(key), value]
+        if ttl is not None:
+            args += ["PX", max(1, int(ttl * 1000))]
+        if nx:
+            args.append("NX")
+        return await self.execute(*args) == "OK"
+
+    async def delete(self, *keys):
+        if not keys:
+            return 0
+        return await self.execute("DEL", *(self._key(k) for k in keys))
+
+    async def incr(self, key):
+        return await self.execute("INCR", self._key(key))
+
+    async def sadd(self, key, *members):
+        if not members:
+            return 0
+        return await self.execute("SADD", self._key(key), *members)
+
+    async def srem(self, key, *members):
+        if not members:
+            return 0
+        return await self.execute("SREM", self._key(key), *members)
+
+    async def smembers(self, key):
+        return set(await self.execute("SMEMBERS", self._key(key)))
+
+    async def scard(self, key):
+        return await self.execute("SCARD", self._key(key))
+
+    @asynccontextmanager
+    async def lock(self, key):
+        """SET NX PX によるロック
+
+        保持時間が lock_timeout を超えると他のプロセスが取得できるようになるため、
+        解放時は自分のトークンのままの場合だけ削除する（比較と削除はEVALで不可分に行う）。
+        """
+        lock_key = f"lock:{key}"
+        token = secrets.token_hex(8)
+        delay = LOCK_RETRY_INTERVAL
+        while not await self.put(lock_key, token, ttl=self.lock_timeout, nx=True):
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+        try:
+            yield
+        finally:
+            try:
+                await self.execute("EVAL", RELEASE_LOCK_SCRIPT, 1, self._key(lock_key), token)
+            except (ConnectionError, OSError, RedisError):
+                logger.warning("ロックの解放に失敗しました (%s)", lock_key, exc_info=True)
+
+    async def close(self):
+        async with self._io_lock:
+            if self._writer is not None:
+                self._writer.close()
+                try:
+                    await self._writer.wait_closed()
+                except (ConnectionError, OSError):
+                    pass
+            self._reader = self._writer = None
+
+
+def create_state_backend(url: str | None, prefix: str = "pinbot") -> StateBackend:
+    """URLに応じたステートバックエンドを作成する（未指定ならメモリ）"""
+    if not url:
+        return MemoryStateBackend()
+    return RedisStateBackend(url, prefix=prefix)
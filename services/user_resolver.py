@@ -0,0 +1,64 @@
+"""ユーザーIDから表示名を解決する（LRUキャッシュ付き）
+
+メンションは `<@ユーザーID>` で作れるため名前の解決は不要。名前が必要なのはログの
+表示だけなので、イベントのペイロード（payload.member）やdiscord.pyのキャッシュにある名前を使い、
+RESTでの取得（fetch_user）は行わない。
+"""
+from collections import OrderedDict
+
+# 表示名をキャッシュするユーザー数の既定値
+DEFAULT_USER_CACHE_SIZE = 1024
+
+
+def mention(user_id: int) -> str:
+    """ユーザーのメンション（名前の解決は不要）"""
+    return f"<@{user_id}>"
+
+
+class UserResolver:
+    """ユーザーIDごとの表示名を保持するLRUキャッシュ
+
+    Args:
+        client: discord.Client（キャッシュの参照に使う）
+        maxsize: 保持するユーザー数の上限
+    """
+
+    def __init__(self, client, maxsize: int = DEFAULT_USER_CACHE_SIZE):
+        self.client = client
+        self.maxsize = maxsize
+        self._names: OrderedDict[int, str] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._names)
+
+    def _store(self, user_id: int, name: str):
+        self._names[user_id] = name
+        self._names.move_to_end(user_id)
+        while len(self._names) > self.maxsize:
+            self._names.popitem(last=False)
+
+    def remember(self, user):
+        """ペイロードなどで得たユーザー（Member/User）の名前を記録する"""
+        if user is not None:
+            self._store(user.id, user.name)
+
+    def cached_name(self, user_id: int) -> str | None:
+        """RESTを呼ばずに分かる名前（LRU → discord.pyのキャッシュの順に探す）"""
+        name = self._names.get(user_id)
+        if name is not None:
+            self._names.move_to_end(user_id)
+            self.hits += 1
+            return name
+        user = self.client.get_user(user_id)
+        if user is not None:
+            self.hits += 1
+            self._store(user_id, user.name)
+            return user.name
+        self.misses += 1
+        return None
+
+    def name(self, user_id: int) -> str:
+        """ログ用の名前（分からなければユーザーIDを返し、RESTは呼ばない）"""
+        return self.cached_name(user_id) or str(user_id)
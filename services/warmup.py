@@ -0,0 +1,205 @@
+"""起動時・ギルド参加時のピン留めの事前読み込み（ウォームアップ）
+
+再起動後の最初の /pinnedlist は、チャンネルのピン留めの取得と📌リアクションユーザーの
+解決が必要なため遅い。ウォームアップはアクセスできるテキストチャンネルを順に回り、
+ピン留め一覧キャッシュと📌リアクションユーザーのインデックスを埋めておく。
+
+- 同時に処理するチャンネル数を制限し、チャンネルの処理を始める間隔を空けて
+  レート制限より低い頻度に抑える
+- REST呼び出しは最も低い優先度（Priority.WARMUP）で送り、ユーザーの操作を待たせない
+- 待っている・処理中のチャンネルは重ねて追加しない（再接続とギルド参加が重なった場合など）
+- 進捗（完了・失敗・スキップしたチャンネル数と読み込んだピン留め数）をログに出力する
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+
+import discord
+
+from services.rest_scheduler import Priority, rest_priority
+
+logger = logging.getLogger(__name__)
+
+# 同時に処理するチャンネル数
+DEFAULT_WARMUP_CONCURRENCY = 2
+# 1秒あたりに処理を始めるチャンネル数（0以下で制限なし）
+DEFAULT_WARMUP_RATE = 2.0
+# 進捗をログに出力する間隔（秒）
+PROGRESS_LOG_INTERVAL = 10.0
+
+
+def can_read_history(channel, member) -> bool:
+    """member がチャンネルのメッセージ（ピン留め）を読めるか"""
+    permissions = channel.permissions_for(member)
+    return permissions.view_channel and permissions.read_message_history
+
+
+def accessible_channels(guild, member=None) -> list:
+    """ピン留めを読めるテキストチャンネル
+
+    Bot自身が読めるもの（Bot自身のメンバー情報がなければ全て）に絞り込み、
+    member を指定した場合はそのメンバーも読めるものに絞り込む。
+    """
+    me = guild.me
+    return [
+        channel for channel in guild.text_channels
+        if (me is None or can_read_history(channel, me))
+        and (member is None or can_read_history(channel, member))
+    ]
+
+
+class PinWarmup:
+    """チャンネルのピン留めをバックグラウンドで読み込むジョブ
+
+    Args:
+        warm_channel: チャンネルを受け取り、読み込んだピン留め数を返すコルーチン関数
+        concurrency: 同時に処理するチャンネル数
+        rate: 1秒あたりに処理を始めるチャンネル数（0以下で制限なし）
+    """
+
+    def __init__(
+        self,
+        warm_channel,
+        concurrency: int = DEFAULT_WARMUP_CONCURRENCY,
+        rate: float = DEFAULT_WARMUP_RATE,
+        clock=time.monotonic,
+    ):
+        self.warm_channel = warm_channel
+        self.concurrency = max(1, concurrency)
+        self.rate = rate
+        self._clock = clock
+        self._queue: deque = deque()
+        self._queued: set[int] = set()
+        # 読み込みが終わり、その後ピン留めが変化していないチャンネル
+        self._warm: set[int] = set()
+        # 読み込み中にピン留めが変化したチャンネル
+        self._changed: set[int] = set()
+        self._task: asyncio.Task | None = None
+        self._idle: asyncio.Event | None = None
+        self._next_start = 0.0
+        self._last_log = 0.0
+        self._started_at = 0.0
+        self.total = 0
+        self.done = 0
+        self.failed = 0
+        self.skipped = 0
+        self.pins = 0
+
+    @property
+    def pending(self) -> int:
+        """待っている・処理中のチャンネル数"""
+        return len(self._queued)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def is_warm(self, channel_id: int) -> bool:
+        """チャンネルのピン留めがインデックスに揃っているか"""
+        return channel_id in self._warm
+
+    def forget(self, channel_id: int):
+        """ピン留めが変化したチャンネルを、読み込み済みとして扱わないようにする"""
+        self._warm.discard(channel_id)
+        if channel_id in self._queued:
+            self._changed.add(channel_id)
+
+    def progress(self) -> dict:
+        return {
+            "total": self.total,
+            "done": self.done,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "pending": self.pending,
+            "pins": self.pins,
+        }
+
+    def schedule(self, channels) -> int:
+        """チャンネルを追加してジョブを開始し、追加したチャンネル数を返す"""
+        added = 0
+        for channel in channels:
+            if channel.id in self._queued:
+                continue
+            self._queued.add(channel.id)
+            self._queue.append(channel)
+            added += 1
+        self.total += added
+        if added and not self.running:
+            self._idle = asyncio.Event()
+            self._started_at = self._last_log = self._clock()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return added
+
+    async def wait(self):
+        """追加済みのチャンネルの処理が全て終わるまで待つ"""
+        if self.running:
+            await self._idle.wait()
+
+    async def close(self):
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _run(self):
+        try:
+            with rest_priority(Priority.WARMUP):
+                # 処理中に追加されたチャンネルも同じジョブで処理する
+                while self._queue:
+                    await asyncio.gather(*(self._worker() for _ in range(self.concurrency)))
+            logger.info(
+                "ピン留めのウォームアップが完了しました (%d チャンネル, 失敗 %d, スキップ %d, ピン留め %d 件, %.1f 秒)",
+                self.done, self.failed, self.skipped, self.pins, self._clock() - self._started_at
+            )
+        finally:
+            self._idle.set()
+
+    async def _throttle(self):
+        """チャンネルの処理を始める間隔を rate に合わせる"""
+        if self.rate <= 0:
+            return
+        now = self._clock()
+        start = max(now, self._next_start)
+        self._next_start = start + 1 / self.rate
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def _worker(self):
+        while self._queue:
+            channel = self._queue.popleft()
+            try:
+                await self._throttle()
+                self._warm.discard(channel.id)
+                self._changed.discard(channel.id)
+                count = await self.warm_channel(channel)
+                # 読み込み中に変化していれば、読み込んだ内容が古い可能性がある
+                if channel.id not in self._changed:
+                    self._warm.add(channel.id)
+                self.pins += count
+                self.done += 1
+            except discord.Forbidden:
+                self.skipped += 1  # 権限のないチャンネル
+            except discord.HTTPException as e:
+                self.failed += 1
+                logger.warning("ウォームアップエラー (チャンネル: %s): %s", channel.name, e)
+            except Exception:
+                self.failed += 1
+                logger.exception("ウォームアップ中の予期しないエラー (チャンネル: %s)", channel.name)
+            finally:
+                self._queued.discard(channel.id)
+                self._changed.discard(channel.id)
+            self._log_progress()
+
+    def _log_progress(self):
+        now = self._clock()
+        if now - self._last_log < PROGRESS_LOG_INTERVAL:
+            return
+        self._last_log = now
+        finished = self.done + self.failed + self.skipped
+        logger.info(
+            "ピン留めのウォームアップ: %d/%d チャンネル (ピン留め %d 件)", finished, self.total, self.pins
+        )
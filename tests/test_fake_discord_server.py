@@ -0,0 +1,115 @@
+"""偽のDiscordサーバーとエンドツーエンドの性能試験のテスト"""
+import aiohttp
+
+from benchmarks.e2e_bench import parse_args, run_benchmarks
+from benchmarks.fake_discord import FakeDiscord
+from benchmarks.fake_discord_server import FakeDiscordServer, RateLimiter
+
+PIN_ROUTE = "PUT /channels/{channel_id}/messages/pins/{message_id}"
+
+
+class TestRateLimiter:
+    """バケットと全体のレート制限のテスト"""
+
+    def test_bucket_per_channel(self):
+        now = [100.0]
+        limiter = RateLimiter(global_limit=0, clock=lambda: now[0])
+
+        statuses = [limiter.check(PIN_ROUTE, {"channel_id": "1"})[0] for _ in range(6)]
+        status, headers, error = limiter.check(PIN_ROUTE, {"channel_id": "1"})
+
+        assert statuses == [200] * 5 + [429]
+        assert status == 429
+        assert headers["X-RateLimit-Remaining"] == "0"
+        assert headers["X-RateLimit-Scope"] == "user"
+        assert error["retry_after"] == 5.0
+        # チャンネルが違えば別のバケット
+        assert limiter.check(PIN_ROUTE, {"channel_id": "2"})[0] == 200
+        # ウィンドウが過ぎれば回復する
+        now[0] += 5.0
+        assert limiter.check(PIN_ROUTE, {"channel_id": "1"})[0] == 200
+
+    def test_pin_and_unpin_share_bucket(self):
+        limiter = RateLimiter(global_limit=0, clock=lambda: 0.0)
+        unpin = "DELETE /channels/{channel_id}/messages/pins/{message_id}"
+
+        pin_headers = limiter.check(PIN_ROUTE, {"channel_id": "1"})[1]
+        unpin_headers = limiter.check(unpin, {"channel_id": "1"})[1]
+
+        assert pin_headers["X-RateLimit-Bucket"] == unpin_headers["X-RateLimit-Bucket"]
+        assert unpin_headers["X-RateLimit-Remaining"] == "3"
+
+    def test_global_limit(self):
+        limiter = RateLimiter(global_limit=2, clock=lambda: 0.0)
+
+        for _ in range(2):
+            assert limiter.check("GET /users/@me", {})[0] == 200
+        status, headers, error = limiter.check("GET /users/@me", {})
+
+        assert status == 429
+        assert headers["X-RateLimit-Global"] == "true"
+        assert error["global"] is True
+
+
+class TestFakeDiscordServer:
+    """HTTPでの応答のテスト"""
+
+    async def test_rate_limit_headers(self):
+        api = FakeDiscord()
+        api.add_channel(1, 10)
+        message_id = api.add_message(10, 2)
+        server = FakeDiscordServer(api, limiter=RateLimiter(global_limit=0))
+        await server.start()
+        try:
+            url = f"{server.base_url}/api/v10/channels/10/messages/pins/{message_id}"
+            async with aiohttp.ClientSession() as session:
+                statuses = []
+                for _ in range(6):
+                    async with session.put(url) as response:
+                        statuses.append(response.status)
+                        headers = response.headers
+                        body = await response.json() if response.status == 429 else None
+        finally:
+            await server.stop()
+
+        assert statuses == [204] * 5 + [429]
+        # discord.py はJSONの判定と、Cloudflareによる制限との区別にこれらのヘッダーを使う
+        assert headers["Content-Type"] == "application/json"
+        assert headers["Via"] == "1.1 google"
+        assert headers["Retry-After"] == "5"
+        assert body["retry_after"] > 0
+        assert api.calls[PIN_ROUTE] == 5
+        assert server.rate_limited[PIN_ROUTE] == 1
+
+
+class TestE2EBench:
+    """main.py の Bot を偽のサーバーに接続したシナリオのテスト"""
+
+    async def test_scenarios(self):
+        args = parse_args([
+            "--channels", "2", "--users", "2", "--pins", "3", "--invocations", "3",
+            "--messages", "3", "--overflow", "3", "--unpin", "2", "--batch", "5", "--latency", "0", "--time-scale", "0.01", "--window", "0",
+        ])
+
+        results = {r["scenario"]: r for r in await run_benchmarks(args)}
+
+        assert results["pinnedlist"]["rest_by_route"]["POST /webhooks/{application_id}/{token}"] == 3
+        # サーバー全体の一覧は途中経過を送ってから一覧に置き換える
+        guild = results["pinnedlist_guild"]["rest_by_route"]
+        assert guild["POST /webhooks/{application_id}/{token}"] == 3
+        assert guild["PATCH /webhooks/{application_id}/{token}/messages/{message_id}"] >= 3
+        # 検索はインデックスだけで応答する
+        assert results["pinsearch"]["rest_by_route"] == {"POST /interactions/{interaction_id}/{token}/callback": 3}
+        assert results["reactions"]["rest_by_route"][PIN_ROUTE] == 3
+        # 上限に達したチャンネルでは、最も前のピン留めをアーカイブしてからピン留めする
+        assert results["overflow"]["pinned"] == 2 * 50
+        assert results["overflow"]["archived"] == 3
+        # まとめて解除で全てのピン留めが外れる
+        assert results["bulk_unpin"]["pinned"] == 0
+        # まとめてピン留めは1件ずつピン留めし、結果を1つのメッセージにまとめる
+        assert results["pinbatch"]["pinned"] == 5
+        assert results["pinbatch"]["rest_by_route"][PIN_ROUTE] == 5
+        assert results["pinbatch"]["rest_by_route"]["POST /webhooks/{application_id}/{token}"] == 1
+        for result in results.values():
+            assert result["throughput"] > 0
+            assert result["p99_ms"] >= result["p50_ms"]
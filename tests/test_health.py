@@ -0,0 +1,166 @@
+"""liveness/readiness判定のテスト"""
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+import server
+from services.health import HealthMonitor
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def bot():
+    bot = MagicMock(latency=0.05)
+    bot.is_ready.return_value = True
+    bot.is_closed.return_value = False
+    return bot
+
+
+@pytest.fixture
+def loop_monitor(clock):
+    return MagicMock(lag=0.001, last_beat=clock.now)
+
+
+def make_monitor(bot, loop_monitor, clock, **kwargs):
+    return HealthMonitor(bot, loop_monitor, clock=clock, **kwargs)
+
+
+class TestLiveness:
+    """livenessの判定のテスト"""
+
+    def test_alive(self, bot, loop_monitor, clock):
+        monitor = make_monitor(bot, loop_monitor, clock)
+
+        ok, detail = monitor.liveness()
+
+        assert ok
+        assert detail["problems"] == []
+
+    def test_stalled_heartbeat(self, bot, loop_monitor, clock):
+        monitor = make_monitor(bot, loop_monitor, clock, max_heartbeat_age=10)
+        clock.now += 30
+
+        ok, detail = monitor.liveness()
+
+        assert not ok
+        assert "heartbeat_stalled" in detail["problems"]
+
+    def test_event_loop_lag(self, bot, loop_monitor, clock):
+        loop_monitor.lag = 8.0
+        monitor = make_monitor(bot, loop_monitor, clock, max_loop_lag=5)
+
+        ok, detail = monitor.liveness()
+
+        assert not ok
+        assert "event_loop_lag" in detail["problems"]
+
+    def test_not_ready_for_too_long(self, bot, loop_monitor, clock):
+        monitor = make_monitor(bot, loop_monitor, clock, max_not_ready=60)
+        assert monitor.liveness()[0]
+
+        # 切断されてすぐは再起動しない
+        bot.is_ready.return_value = False
+        clock.now += 1
+        loop_monitor.last_beat = clock.now
+        assert monitor.liveness()[0]
+
+        clock.now += 120
+        loop_monitor.last_beat = clock.now
+        ok, detail = monitor.liveness()
+        assert not ok
+        assert "gateway_not_ready" in detail["problems"]
+
+        # 再接続したら回復する
+        bot.is_ready.return_value = True
+        assert monitor.liveness()[0]
+
+    def test_zero_threshold_disables_check(self, bot, loop_monitor, clock):
+        loop_monitor.lag = 100.0
+        monitor = make_monitor(bot, loop_monitor, clock, max_loop_lag=0)
+
+        assert monitor.liveness()[0]
+
+
+class TestReadiness:
+    """readinessの判定のテスト"""
+
+    def test_ready(self, bot, loop_monitor, clock):
+        monitor = make_monitor(bot, loop_monitor, clock)
+        monitor.record_event()
+
+        ok, detail = monitor.readiness()
+
+        assert ok
+        assert detail["ready"] is True
+        assert detail["latency"] == 0.05
+        assert detail["last_event_age"] == 0
+
+    def test_disconnected(self, bot, loop_monitor, clock):
+        bot.is_closed.return_value = True
+        monitor = make_monitor(bot, loop_monitor, clock)
+
+        ok, detail = monitor.readiness()
+
+        assert not ok
+        assert "gateway_not_ready" in detail["problems"]
+
+    def test_no_heartbeat_ack(self, bot, loop_monitor, clock):
+        bot.latency = float("nan")
+        monitor = make_monitor(bot, loop_monitor, clock)
+
+        ok, detail = monitor.readiness()
+
+        assert not ok
+        assert detail["latency"] is None
+        assert "no_heartbeat_ack" in detail["problems"]
+
+    def test_no_recent_events(self, bot, loop_monitor, clock):
+        monitor = make_monitor(bot, loop_monitor, clock, max_event_age=60)
+        monitor.record_event()
+        clock.now += 61
+
+        ok, detail = monitor.readiness()
+
+        assert not ok
+        assert "no_recent_events" in detail["problems"]
+
+    def test_too_many_pending(self, bot, loop_monitor, clock):
+        monitor = make_monitor(bot, loop_monitor, clock, pending=lambda: 50, max_pending=10)
+
+        ok, detail = monitor.readiness()
+
+        assert not ok
+        assert detail["pending"] == 50
+
+
+class TestHealthEndpoints:
+    """/livez・/readyz エンドポイントのテスト"""
+
+    async def test_readyz_returns_503_when_not_ready(self, bot, loop_monitor, clock, monkeypatch):
+        bot.is_ready.return_value = False
+        monkeypatch.setattr(server.app.state, "health", make_monitor(bot, loop_monitor, clock))
+
+        response = await server.readiness()
+
+        assert response.status_code == 503
+        assert json.loads(response.body)["status"] == "not_ready"
+
+    async def test_livez_returns_200(self, bot, loop_monitor, clock, monkeypatch):
+        monkeypatch.setattr(server.app.state, "health", make_monitor(bot, loop_monitor, clock))
+
+        response = await server.liveness()
+
+        assert response.status_code == 200
@@ -0,0 +1,85 @@
+"""ログ設定のユニットテスト"""
+import io
+import json
+import logging
+
+import pytest
+
+from services.logging_setup import JsonFormatter, parse_levels, setup_logging
+
+
+@pytest.fixture
+def restore_logging():
+    """テスト後にルートロガーの設定を元に戻す"""
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    yield
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+    logging.getLogger("test.module").setLevel(logging.NOTSET)
+
+
+class TestParseLevels:
+    """ロガーごとのレベル指定のテスト"""
+
+    def test_parse(self):
+        assert parse_levels("services.pin_fetcher=debug, discord=WARNING") == {
+            "services.pin_fetcher": logging.DEBUG,
+            "discord": logging.WARNING,
+        }
+
+    def test_ignores_invalid_items(self):
+        assert parse_levels(",noequals,=INFO") == {}
+
+
+class TestJsonFormatter:
+    """JSONフォーマッタのテスト"""
+
+    def test_outputs_message_and_extra(self):
+        record = logging.makeLogRecord({
+            "name": "main",
+            "levelname": "INFO",
+            "msg": "ピン留めしました (ID: %s)",
+            "args": (123,),
+            "message_id": 123,
+        })
+
+        entry = json.loads(JsonFormatter().format(record))
+
+        assert entry["message"] == "ピン留めしました (ID: 123)"
+        assert entry["logger"] == "main"
+        assert entry["message_id"] == 123
+
+
+class TestSetupLogging:
+    """setup_logging のテスト"""
+
+    def test_logs_are_written_by_listener(self, monkeypatch, restore_logging):
+        """ログはリスナーのスレッド経由で出力される"""
+        monkeypatch.setenv("LOG_FORMAT", "json")
+        monkeypatch.setenv("LOG_LEVELS", "test.module=DEBUG")
+        stream = io.StringIO()
+
+        listener = setup_logging(stream)
+        logging.getLogger("test.module").debug("debug %s", "message")
+        logging.getLogger("other").debug("hidden")
+        listener.stop()
+
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        assert [line["message"] for line in lines] == ["debug message"]
+        assert isinstance(logging.getLogger().handlers[0], logging.handlers.QueueHandler)
+
+    def test_disabled_debug_is_not_formatted(self, monkeypatch, restore_logging):
+        """無効なレベルのログは引数を文字列化しない"""
+        monkeypatch.setenv("LOG_LEVEL", "INFO")
+
+        class Expensive:
+            def __str__(self):
+                raise AssertionError("formatted")
+
+        listener = setup_logging(io.StringIO())
+        logging.getLogger("other").debug("value: %s", Expensive())
+        listener.stop()
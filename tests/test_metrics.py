@@ -0,0 +1,125 @@
+"""メトリクスのユニットテスト"""
+import logging
+from unittest.mock import MagicMock
+
+import pytest
+
+from services.metrics import (
+    RATE_LIMIT_HITS,
+    REST_REQUESTS,
+    Counter,
+    Gauge,
+    Histogram,
+    Registry,
+    install_rate_limit_counter,
+    instrument_http,
+)
+
+
+@pytest.fixture
+def registry():
+    return Registry()
+
+
+class TestMetrics:
+    """Counter / Gauge / Histogram のテスト"""
+
+    def test_counter_with_labels(self, registry):
+        counter = Counter("test_total", "テスト", ["action"], registry=registry)
+
+        counter.inc(action="pin")
+        counter.inc(2, action="pin")
+        counter.inc(action="unpin")
+
+        text = registry.render()
+        assert "# TYPE test_total counter" in text
+        assert 'test_total{action="pin"} 3' in text
+        assert 'test_total{action="unpin"} 1' in text
+
+    def test_wrong_labels_raise(self, registry):
+        counter = Counter("test_total", "テスト", ["action"], registry=registry)
+
+        with pytest.raises(ValueError):
+            counter.inc(other="x")
+
+    def test_gauge_callback(self, registry):
+        Gauge("test_gauge", "テスト", ["result"], registry=registry,
+              callback=lambda: {("hit",): 5, ("miss",): 2})
+        Gauge("test_none", "テスト", registry=registry, callback=lambda: None)
+
+        text = registry.render()
+        assert 'test_gauge{result="hit"} 5' in text
+        assert 'test_gauge{result="miss"} 2' in text
+        assert "\ntest_none " not in text
+
+    def test_counter_callback(self, registry):
+        hits = {"count": 3}
+        Counter("test_requests_total", "テスト", ["result"], registry=registry,
+                callback=lambda: {("hit",): hits["count"]})
+
+        hits["count"] = 4
+        text = registry.render()
+        assert "# TYPE test_requests_total counter" in text
+        assert 'test_requests_total{result="hit"} 4' in text
+
+    def test_histogram_buckets_are_cumulative(self, registry):
+        histogram = Histogram("test_seconds", "テスト", registry=registry, buckets=(0.1, 1.0))
+
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5.0)
+
+        text = registry.render()
+        assert 'test_seconds_bucket{le="0.1"} 1' in text
+        assert 'test_seconds_bucket{le="1.0"} 2' in text
+        assert 'test_seconds_bucket{le="+Inf"} 3' in text
+        assert "test_seconds_count 3" in text
+        assert "test_seconds_sum 5.55" in text
+
+    def test_label_values_are_escaped(self, registry):
+        counter = Counter("test_total", "テスト", ["route"], registry=registry)
+
+        counter.inc(route='a"b')
+
+        assert 'test_total{route="a\\"b"} 1' in registry.render()
+
+
+class TestInstrumentation:
+    """REST呼び出し・レート制限の計測のテスト"""
+
+    async def test_instrument_http_counts_requests(self):
+        async def request(route, **kwargs):
+            return {"id": "1"}
+
+        http = MagicMock()
+        http.request = request
+        route = MagicMock(method="GET", path="/channels/{channel_id}/pins")
+        before = REST_REQUESTS.value(method="GET", route=route.path, status="ok")
+
+        instrument_http(http)
+        await http.request(route)
+
+        assert REST_REQUESTS.value(method="GET", route=route.path, status="ok") == before + 1
+
+    def test_rate_limit_log_is_counted(self):
+        install_rate_limit_counter()
+        before = RATE_LIMIT_HITS.value(scope="route")
+
+        logging.getLogger("discord.http").warning(
+            "We are being rate limited. %s %s responded with 429. Retrying in %.2f seconds.",
+            "PUT", "https://discord.com/api/v10/channels/1/pins/2", 1.0
+        )
+
+        assert RATE_LIMIT_HITS.value(scope="route") == before + 1
+
+
+class TestMetricsEndpoint:
+    """/metrics エンドポイントのテスト"""
+
+    async def test_metrics_endpoint(self):
+        from server import metrics
+
+        response = await metrics()
+
+        assert response.media_type.startswith("text/plain")
+        assert b"pinbot_reaction_events_total" in response.body
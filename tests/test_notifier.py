@@ -0,0 +1,175 @@
+"""NotificationScheduler のユニットテスト"""
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import discord
+
+from services.notifier import NotificationScheduler
+
+PIN_TEMPLATE = "📌 {mentions} がメッセージをピン留めしました！"
+
+
+def create_mock_channel(channel_id=1):
+    """送信したメッセージを記録するモックチャンネル"""
+    channel = MagicMock()
+    channel.id = channel_id
+    channel.sent = []
+
+    async def send(content):
+        message = MagicMock()
+        message.content = content
+        message.delete = AsyncMock()
+
+        async def edit(content):
+            message.content = content
+            return message
+
+        message.edit = AsyncMock(side_effect=edit)
+        channel.sent.append(message)
+        return message
+
+    channel.send = AsyncMock(side_effect=send)
+    return channel
+
+
+class TestNotificationScheduler:
+    """NotificationScheduler のテスト"""
+
+    async def test_notify_returns_without_waiting(self):
+        """通知の送信は表示時間を待たずに戻る"""
+        scheduler = NotificationScheduler(lifetime=60.0)
+        channel = create_mock_channel()
+
+        await asyncio.wait_for(scheduler.notify(channel, PIN_TEMPLATE, "<@1>"), timeout=1.0)
+
+        assert channel.sent[0].content == "📌 <@1> がメッセージをピン留めしました！"
+        assert scheduler.outstanding == 1
+        await scheduler.close()
+
+    async def test_notification_deleted_after_lifetime(self):
+        """表示時間を過ぎると削除される"""
+        scheduler = NotificationScheduler(lifetime=0.01)
+        channel = create_mock_channel()
+
+        await scheduler.notify(channel, PIN_TEMPLATE, "<@1>")
+        await asyncio.sleep(0.05)
+
+        channel.sent[0].delete.assert_awaited_once()
+        assert scheduler.outstanding == 0
+        await scheduler.close()
+
+    async def test_same_channel_notifications_are_coalesced(self):
+        """同じチャンネルの通知は1つのメッセージにまとめられる"""
+        scheduler = NotificationScheduler(lifetime=60.0)
+        channel = create_mock_channel()
+
+        await asyncio.gather(
+            scheduler.notify(channel, PIN_TEMPLATE, "<@1>"),
+            scheduler.notify(channel, PIN_TEMPLATE, "<@2>"),
+            scheduler.notify(channel, PIN_TEMPLATE, "<@3>"),
+        )
+
+        assert channel.send.await_count == 1
+        assert channel.sent[0].content == "📌 <@1>, <@2>, <@3> がメッセージをピン留めしました！"
+        assert scheduler.outstanding == 1
+        await scheduler.close()
+
+    async def test_different_channels_are_not_coalesced(self):
+        """別チャンネルの通知はまとめない"""
+        scheduler = NotificationScheduler(lifetime=60.0)
+
+        await scheduler.notify(create_mock_channel(1), PIN_TEMPLATE, "<@1>")
+        await scheduler.notify(create_mock_channel(2), PIN_TEMPLATE, "<@1>")
+
+        assert scheduler.outstanding == 2
+        await scheduler.close()
+
+    async def test_outstanding_cap(self):
+        """上限を超えた通知は送信しない"""
+        scheduler = NotificationScheduler(lifetime=60.0, max_outstanding=1)
+        channel = create_mock_channel()
+
+        await scheduler.send_temporary(channel, "❌ 1")
+        await scheduler.send_temporary(channel, "❌ 2")
+
+        assert channel.send.await_count == 1
+        assert scheduler.dropped == 1
+        await scheduler.close()
+
+    async def test_close_deletes_outstanding(self):
+        """停止時に残っている通知を削除する"""
+        scheduler = NotificationScheduler(lifetime=60.0)
+        channel = create_mock_channel()
+        await scheduler.send_temporary(channel, "❌ エラー")
+
+        await scheduler.close()
+
+        channel.sent[0].delete.assert_awaited_once()
+        assert scheduler.outstanding == 0
+
+    async def test_close_right_after_wakeup(self):
+        """起床と同時に停止しても止まる（待機の完了とキャンセルが重なる場合）"""
+        scheduler = NotificationScheduler(lifetime=60.0)
+        channel = create_mock_channel()
+        await scheduler.send_temporary(channel, "❌ エラー")
+        await asyncio.sleep(0.01)
+
+        task = scheduler._task
+        scheduler._wakeup.set()
+        closing = asyncio.ensure_future(scheduler.close())
+        await asyncio.wait([closing], timeout=1.0)
+
+        assert closing.done()
+        assert task.cancelled()
+
+        channel.sent[0].delete.assert_awaited_once()
+
+    async def test_failed_first_send_is_counted_once(self):
+        """まとめ先の最初の送信が失敗しても、表示中の通知数は1回だけ戻す"""
+        scheduler = NotificationScheduler(lifetime=60.0)
+        channel = create_mock_channel()
+        send = channel.send.side_effect
+        failures = [discord.HTTPException(MagicMock(status=500), "error")]
+
+        async def flaky_send(content):
+            await asyncio.sleep(0)
+            if failures:
+                raise failures.pop()
+            return await send(content)
+
+        channel.send.side_effect = flaky_send
+        results = await asyncio.gather(
+            scheduler.notify(channel, PIN_TEMPLATE, "<@1>"),
+            scheduler.notify(channel, PIN_TEMPLATE, "<@2>"),
+            scheduler.notify(channel, PIN_TEMPLATE, "<@3>"),
+            return_exceptions=True,
+        )
+
+        assert isinstance(results[0], discord.HTTPException)
+        assert results[1:] == [None, None]
+        assert len(channel.sent) == 1
+        assert channel.sent[0].content == "📌 <@2>, <@3> がメッセージをピン留めしました！"
+        assert scheduler.outstanding == 1
+        await scheduler.close()
+        assert scheduler.outstanding == 0
+
+    async def test_failed_sends_do_not_go_negative(self):
+        """送信がすべて失敗しても、表示中の通知数は負にならない"""
+        scheduler = NotificationScheduler(lifetime=60.0)
+        channel = create_mock_channel()
+
+        async def failing_send(content):
+            await asyncio.sleep(0)
+            raise discord.HTTPException(MagicMock(status=500), "error")
+
+        channel.send.side_effect = failing_send
+
+        results = await asyncio.gather(
+            scheduler.notify(channel, PIN_TEMPLATE, "<@1>"),
+            scheduler.notify(channel, PIN_TEMPLATE, "<@2>"),
+            return_exceptions=True,
+        )
+
+        assert all(isinstance(result, discord.HTTPException) for result in results)
+        assert scheduler.outstanding == 0
+        await scheduler.close()
@@ -0,0 +1,144 @@
+"""PinArchive のユニットテスト"""
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import discord
+import pytest
+
+from services.pin_archive import ArchivedPin, PinArchive, choose_eviction, group_by_channel, is_max_pins_error
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = PinArchive(str(tmp_path / "pin_index.db"), clock=lambda: 1000.0)
+    yield archive
+    archive.close()
+
+
+def snowflake(day):
+    """2024年1月 day 日に投稿されたメッセージのID"""
+    return discord.utils.time_snowflake(datetime(2024, 1, day, tzinfo=timezone.utc))
+
+
+def create_message(message_id, channel_id=10, author_id=5, content="本文"):
+    return SimpleNamespace(
+        id=message_id,
+        guild=SimpleNamespace(id=1),
+        channel=SimpleNamespace(id=channel_id),
+        author=SimpleNamespace(id=author_id, display_name=f"user{author_id}"),
+        content=content,
+    )
+
+
+def http_error(code):
+    response = MagicMock()
+    response.status = 400
+    return discord.HTTPException(response, {"code": code, "message": "error"})
+
+
+class TestChooseEviction:
+    """アーカイブするピン留めの選び方のテスト"""
+
+    def test_policies(self):
+        # channel.pins() の順（新しくピン留めした順）
+        pins = [create_message(3), create_message(1), create_message(2)]
+
+        assert choose_eviction(pins).id == 2
+        assert choose_eviction(pins, "oldest_message").id == 1
+        assert choose_eviction(pins, "off") is None
+        assert choose_eviction([]) is None
+
+    def test_is_max_pins_error(self):
+        assert is_max_pins_error(http_error(30003))
+        assert not is_max_pins_error(http_error(50013))
+
+
+class TestGroupByChannel:
+    """チャンネルごとの分け方のテスト"""
+
+    def test_archived_pin_first_uses_live_channel(self):
+        # アーカイブしたピン留めが同じチャンネルの通常のピン留めより前に並ぶ（新しい順の一覧）
+        live_channel = SimpleNamespace(id=10, fetch_message=None)
+        archived = ArchivedPin(snowflake(3), 1, 10, 5, "user5", "アーカイブ")
+        live = SimpleNamespace(id=snowflake(1), channel=live_channel)
+
+        groups = group_by_channel([archived, live], get_channel=lambda channel_id: None)
+
+        assert groups == [(live_channel, [archived, live])]
+
+    def test_archived_only_channel(self):
+        resolved = SimpleNamespace(id=11)
+        archived = ArchivedPin(snowflake(3), 1, 11, 5, "user5", "アーカイブ")
+        other = ArchivedPin(snowflake(4), 1, 12, 5, "user5", "アーカイブ")
+
+        groups = group_by_channel([archived, other], get_channel={11: resolved}.get)
+
+        assert groups[0] == (resolved, [archived])
+        # 解決できなければ discord.Object のまま（アーカイブしたピン留めはメッセージを取得しない）
+        assert isinstance(groups[1][0], discord.Object) and groups[1][0].id == 12
+
+
+class TestPinArchive:
+    """PinArchive のテスト"""
+
+    async def test_add_and_get(self, archive):
+        await archive.add(create_message(snowflake(1), content="古いピン留め"), {5, 6})
+
+        pin = await archive.get(snowflake(1))
+        assert isinstance(pin, ArchivedPin)
+        assert (pin.id, pin.channel.id, pin.content, pin.reactors) == (snowflake(1), 10, "古いピン留め", {5, 6})
+        assert pin.author.display_name == "user5"
+        assert pin.created_at.date() == datetime(2024, 1, 1).date()
+        assert pin.archived_at == 1000.0
+        assert len(archive) == 1
+
+        # 保存し直しても件数は増えない
+        await archive.add(create_message(snowflake(1), content="古いピン留め"), {5})
+        assert len(archive) == 1
+
+    async def test_query_by_channel_author_and_date(self, archive):
+        for day in range(1, 6):
+            await archive.add(create_message(snowflake(day), channel_id=10 + day % 2, author_id=day), set())
+
+        def ids(pins):
+            return [pin.id for pin in pins]
+
+        # 新しい順
+        assert ids(await archive.query(1)) == [snowflake(d) for d in (5, 4, 3, 2, 1)]
+        assert ids(await archive.query(1, channel_id=11)) == [snowflake(d) for d in (5, 3, 1)]
+        assert ids(await archive.query(1, author_id=2)) == [snowflake(2)]
+        assert ids(await archive.query(
+            1, after=datetime(2024, 1, 2, tzinfo=timezone.utc), before=datetime(2024, 1, 4, tzinfo=timezone.utc)
+        )) == [snowflake(3), snowflake(2)]
+        assert ids(await archive.query(1, limit=2)) == [snowflake(5), snowflake(4)]
+        assert await archive.query(2) == []
+
+    async def test_unpin_removes_from_archive(self, archive):
+        await archive.add(create_message(100), {5})
+        pin = await archive.get(100)
+
+        await pin.unpin()
+
+        assert await archive.get(100) is None
+        assert await archive.channel_message_ids(10) == set()
+        assert not await archive.remove(100)
+        assert len(archive) == 0
+
+    async def test_count_persists_across_restarts(self, tmp_path):
+        path = str(tmp_path / "pin_index.db")
+        archive = PinArchive(path)
+        await archive.add(create_message(100), set())
+        await archive.add(create_message(101), set())
+        archive.close()
+
+        reopened = PinArchive(path)
+        assert len(reopened) == 2
+        reopened.close()
+
+    async def test_set_reactors(self, archive):
+        await archive.add(create_message(100), {5, 6})
+
+        await archive.set_reactors(100, {6})
+
+        assert (await archive.get(100)).reactors == {6}
@@ -0,0 +1,103 @@
+"""/pinbatch のジョブのユニットテスト"""
+from collections import Counter
+from unittest.mock import MagicMock
+
+import discord
+import pytest
+
+from services.pin_batch import MessageLink, PinBatchJobs, parse_message_links, result_status
+from views.batch_report import batch_report_embed
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    return str(tmp_path / "pin_index.db")
+
+
+@pytest.fixture
+def jobs(index_path):
+    jobs = PinBatchJobs(index_path, clock=lambda: 1000.0)
+    yield jobs
+    jobs.close()
+
+
+def link(channel_id, message_id, guild_id=1):
+    return f"https://discord.com/channels/{guild_id}/{channel_id}/{message_id}"
+
+
+def http_error(cls, status):
+    response = MagicMock()
+    response.status = status
+    return cls(response, {"code": 0, "message": "error"})
+
+
+class TestParseMessageLinks:
+    """メッセージリンクの検証のテスト"""
+
+    def test_validates_and_deduplicates(self):
+        text = "\n".join([
+            link(10, 100),
+            f"<{link(10, 101)}>, https://ptb.discord.com/channels/1/11/102",
+            link(10, 100),  # 重複
+            link(10, 103, guild_id=2),  # 別のサーバー
+            "https://example.com/channels/1/10/104",
+            "",
+        ])
+
+        parsed = parse_message_links(text, guild_id=1)
+
+        assert parsed.links == [MessageLink(10, 100), MessageLink(10, 101), MessageLink(11, 102)]
+        assert parsed.duplicates == 1
+        assert parsed.invalid == [link(10, 103, guild_id=2), "https://example.com/channels/1/10/104"]
+
+    def test_result_status(self):
+        assert result_status("done") == ("done", "")
+        assert result_status(http_error(discord.NotFound, 404)) == ("not_found", "")
+        assert result_status(http_error(discord.Forbidden, 403)) == ("forbidden", "")
+        assert result_status(RuntimeError("壊れた")) == ("failed", "壊れた")
+
+
+class TestPinBatchJobs:
+    """PinBatchJobs のテスト"""
+
+    async def test_resume_from_pending(self, index_path):
+        parsed = parse_message_links(" ".join(link(10, i) for i in range(100, 104)), guild_id=1)
+        jobs = PinBatchJobs(index_path)
+        job = await jobs.create(1, 10, 5, "pin", parsed, rejected={MessageLink(10, 103): "forbidden"})
+        await jobs.set_result(job.job_id, 100, "done")
+        jobs.close()
+
+        # 再起動しても未処理のメッセージから続けられる
+        reopened = PinBatchJobs(index_path)
+        assert [j.job_id for j in await reopened.unfinished()] == [job.job_id]
+        assert await reopened.pending(job.job_id) == [MessageLink(10, 101), MessageLink(10, 102)]
+
+        await reopened.set_result(job.job_id, 101, "skipped")
+        await reopened.set_result(job.job_id, 102, "failed", "エラー")
+        await reopened.finish(job.job_id)
+
+        assert await reopened.unfinished() == []
+        assert (await reopened.get(job.job_id)).finished
+        assert await reopened.counts(job.job_id) == Counter(done=1, skipped=1, failed=1, forbidden=1)
+        assert [(f.message_id, f.status) for f in await reopened.failures(job.job_id)] == [
+            (102, "failed"), (103, "forbidden")
+        ]
+        reopened.close()
+
+    async def test_report(self, jobs):
+        parsed = parse_message_links(f"{link(10, 100)} {link(10, 100)} {link(10, 101)} 不正", guild_id=1)
+        job = await jobs.create(1, 10, 5, "unpin", parsed)
+        await jobs.set_result(job.job_id, 100, "done")
+
+        embed = batch_report_embed(job, await jobs.counts(job.job_id), [])
+        assert embed.footer.text == "⏳ 処理中... 1/2 件"
+        assert "✅ 解除しました: 1 件" in embed.description
+        assert "🔁 重複したリンク: 1 件" in embed.description
+        assert "⚠️ 無効なリンク: 1 件" in embed.description
+
+        await jobs.set_result(job.job_id, 101, "not_found")
+        await jobs.finish(job.job_id)
+        job = await jobs.get(job.job_id)
+        embed = batch_report_embed(job, await jobs.counts(job.job_id), await jobs.failures(job.job_id))
+        assert embed.footer.text == "完了 2/2 件"
+        assert f"• {link(10, 101)} - 見つかりません" in embed.description
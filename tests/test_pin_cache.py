@@ -0,0 +1,178 @@
+"""PinListCache のユニットテスト"""
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from services.pin_cache import PinListCache
+
+
+class FakeClock:
+    """テスト用の時計"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def mock_pins(*results, delay=0.0):
+    """channel.pins(limit=None) の代わり（呼ぶたびに results を順に非同期イテレータで返す、最後の結果は繰り返す）"""
+    remaining = list(results)
+
+    async def iterate(pins):
+        await asyncio.sleep(delay)
+        for pin in pins:
+            yield pin
+
+    def pins(limit=50):
+        assert limit is None  # 50件を超えるピン留めも全て取得する
+        return iterate(remaining.pop(0) if len(remaining) > 1 else remaining[0])
+
+    return MagicMock(side_effect=pins)
+
+
+def create_mock_channel(channel_id, pins=None):
+    channel = MagicMock()
+    channel.id = channel_id
+    channel.pins = mock_pins(pins if pins is not None else [MagicMock()])
+    return channel
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+class TestPinListCache:
+    """PinListCache のテスト"""
+
+    async def test_second_call_is_served_from_cache(self, clock):
+        """2回目の取得ではREST呼び出しが発生しない"""
+        cache = PinListCache(clock=clock)
+        channel = create_mock_channel(1)
+
+        await cache.get_pins(channel)
+        await cache.get_pins(channel)
+
+        channel.pins.assert_called_once()
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    async def test_fetches_beyond_first_page(self, clock):
+        """50件を超えるピン留めも全て取得する"""
+        cache = PinListCache(clock=clock)
+        channel = create_mock_channel(1, pins=list(range(120)))
+
+        assert await cache.get_pins(channel) == list(range(120))
+
+    async def test_returns_copy(self, clock):
+        """返されたリストを変更してもキャッシュに影響しない"""
+        cache = PinListCache(clock=clock)
+        channel = create_mock_channel(1, pins=[1, 2, 3])
+
+        pins = await cache.get_pins(channel)
+        pins.clear()
+
+        assert await cache.get_pins(channel) == [1, 2, 3]
+
+    async def test_ttl_expiry(self, clock):
+        """TTLを過ぎると再取得する"""
+        cache = PinListCache(ttl=10.0, clock=clock)
+        channel = create_mock_channel(1)
+
+        await cache.get_pins(channel)
+        clock.now = 10.0
+        await cache.get_pins(channel)
+
+        assert channel.pins.call_count == 2
+
+    async def test_lru_eviction(self, clock):
+        """上限を超えると最も使われていないチャンネルが破棄される"""
+        cache = PinListCache(maxsize=2, clock=clock)
+        channels = [create_mock_channel(i) for i in range(3)]
+
+        await cache.get_pins(channels[0])
+        await cache.get_pins(channels[1])
+        await cache.get_pins(channels[0])  # 0 を最近使用に
+        await cache.get_pins(channels[2])  # 1 が破棄される
+
+        await cache.get_pins(channels[0])
+        await cache.get_pins(channels[1])
+
+        assert channels[0].pins.call_count == 1
+        assert channels[1].pins.call_count == 2
+
+    async def test_invalidate(self, clock):
+        """invalidate 後は再取得する"""
+        cache = PinListCache(clock=clock)
+        channel = create_mock_channel(1)
+
+        await cache.get_pins(channel)
+        await cache.invalidate(1)
+        await cache.get_pins(channel)
+
+        assert channel.pins.call_count == 2
+
+    async def test_concurrent_misses_share_one_request(self, clock):
+        """同時の取得はREST呼び出し1回にまとめられる"""
+        cache = PinListCache(clock=clock)
+        channel = create_mock_channel(1)
+
+        channel.pins = mock_pins(["pin"], delay=0.01)
+
+        results = await asyncio.gather(*(cache.get_pins(channel) for _ in range(5)))
+
+        channel.pins.assert_called_once()
+        assert all(r == ["pin"] for r in results)
+
+
+    async def test_on_fetch_runs_only_when_fetched(self, clock):
+        """取得し直した時だけ on_fetch を呼ぶ（キャッシュのヒットや相乗りでは呼ばない）"""
+        fetched = []
+
+        async def on_fetch(channel, pins):
+            fetched.append((channel.id, pins))
+
+        cache = PinListCache(clock=clock, on_fetch=on_fetch)
+        channel = create_mock_channel(1)
+        channel.pins = mock_pins(["pin"], delay=0.01)
+
+        await asyncio.gather(*(cache.get_pins(channel) for _ in range(3)))
+        await cache.get_pins(channel)
+        assert fetched == [(1, ["pin"])]
+
+        await cache.invalidate(1)
+        await cache.get_pins(channel)
+        assert len(fetched) == 2
+
+
+class TestPinCatalogCache:
+    """get_catalog() のテスト"""
+
+    async def test_catalog_is_reused_until_invalidated(self, clock):
+        """ピン留め一覧のキャッシュが有効な間は索引を作り直さない"""
+        cache = PinListCache(clock=clock)
+        pin = MagicMock(id=1)
+        pin.author.id = 5
+        channel = create_mock_channel(1, pins=[pin])
+
+        catalog = await cache.get_catalog(channel)
+        assert await cache.get_catalog(channel) is catalog
+        assert catalog.query(author_id=5) == [pin]
+        channel.pins.assert_called_once()
+
+        await cache.invalidate(1)
+        assert await cache.get_catalog(channel) is not catalog
+        assert channel.pins.call_count == 2
+
+    async def test_each_lookup_is_counted_once(self, clock):
+        """索引の取得は一覧の取得と同じく1回の参照として数える"""
+        cache = PinListCache(clock=clock)
+        channel = create_mock_channel(1)
+
+        await cache.get_catalog(channel)
+        assert (cache.hits, cache.misses) == (0, 1)
+        await cache.get_catalog(channel)
+        assert (cache.hits, cache.misses) == (1, 1)
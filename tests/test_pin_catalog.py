@@ -0,0 +1,68 @@
+"""PinCatalog のユニットテスト"""
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import discord
+
+from services.pin_archive import ArchivedPin
+from services.pin_catalog import PinCatalog, merge_sorted
+
+
+def snowflake(day):
+    """2024年1月 day 日に投稿されたメッセージのID"""
+    return discord.utils.time_snowflake(datetime(2024, 1, day, tzinfo=timezone.utc))
+
+
+def create_pin(day, author_id=5):
+    # channel.pins() の取得結果にはリアクションの情報が揃っていない
+    return SimpleNamespace(id=snowflake(day), author=SimpleNamespace(id=author_id), reactions=[])
+
+
+def days(pins):
+    return [discord.utils.snowflake_time(pin.id).day for pin in pins]
+
+
+def jan(day):
+    return datetime(2024, 1, day, tzinfo=timezone.utc)
+
+
+class TestPinCatalog:
+    """PinCatalog のテスト"""
+
+    def test_query_keeps_pinned_order(self):
+        # channel.pins() の順（新しくピン留めした順）は投稿日時の順と一致しない
+        catalog = PinCatalog([create_pin(2), create_pin(5), create_pin(1), create_pin(4, author_id=6)])
+
+        assert days(catalog.query()) == [2, 5, 1, 4]
+        assert days(catalog.query(author_id=5)) == [2, 5, 1]
+        assert days(catalog.query(after=jan(2))) == [2, 5, 4]
+        assert catalog.query(author_id=7) == []
+        assert len(catalog) == 4
+
+    def test_query_by_author_and_date(self):
+        catalog = PinCatalog([create_pin(day, author_id=5 + day % 2) for day in range(1, 11)])
+
+        assert days(catalog.query(order="newest")) == list(range(10, 0, -1))
+        assert days(catalog.query(order="oldest", after=jan(3), before=jan(6))) == [3, 4, 5]
+        assert days(catalog.query(author_id=6, after=jan(4), order="newest")) == [9, 7, 5]
+        assert catalog.query(after=jan(20), order="newest") == []
+
+    def test_most_reacted(self):
+        catalog = PinCatalog([create_pin(1), create_pin(2), create_pin(3, author_id=6), create_pin(4)])
+        # 件数は📌リアクションユーザーのインデックスから渡す（ないものは0件）
+        counts = {snowflake(1): 3, snowflake(2): 1, snowflake(3): 3}
+
+        # 同数なら新しい順
+        assert days(catalog.query(order="most_reacted", counts=counts)) == [3, 1, 2, 4]
+        assert days(catalog.query(order="most_reacted", counts=counts, author_id=5)) == [1, 2, 4]
+        assert days(catalog.query(order="most_reacted", counts=counts, after=jan(2))) == [3, 2, 4]
+
+    def test_merge_with_archived(self):
+        archived = ArchivedPin(snowflake(3), 1, 10, 5, "user5", "アーカイブ", reactors={5, 6, 7})
+        pinned = PinCatalog([create_pin(1), create_pin(5)])
+        counts = {snowflake(1): 1, snowflake(5): 2, archived.id: len(archived.reactors)}
+
+        assert days(merge_sorted([pinned.query(order="newest"), [archived]], "newest")) == [5, 3, 1]
+        assert days(merge_sorted(
+            [pinned.query(order="most_reacted", counts=counts), [archived]], "most_reacted", counts
+        )) == [3, 5, 1]
@@ -0,0 +1,71 @@
+"""PinIndex のユニットテスト"""
+import pytest
+
+from services.pin_index import PinIndex
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    return str(tmp_path / "pin_index.db")
+
+
+@pytest.fixture
+def pin_index(index_path):
+    index = PinIndex(index_path)
+    yield index
+    index.close()
+
+
+class TestPinIndex:
+    """PinIndex のテスト"""
+
+    async def test_unknown_message_returns_none(self, pin_index):
+        """未登録のメッセージはNoneを返す（空setと区別する）"""
+        assert await pin_index.get_reactors(123) is None
+
+    async def test_add_and_remove_reactor(self, pin_index):
+        """リアクションユーザーの追加・削除が反映される"""
+        await pin_index.add_reactor(1, 2, 123, 111)
+        await pin_index.add_reactor(1, 2, 123, 222)
+        assert await pin_index.get_reactors(123) == {111, 222}
+
+        remaining = await pin_index.remove_reactor(123, 111)
+
+        assert remaining == {222}
+        assert await pin_index.get_reactors(123) == {222}
+
+    async def test_remove_reactor_of_unknown_message(self, pin_index):
+        """未登録メッセージからの削除はNoneを返す"""
+        assert await pin_index.remove_reactor(999, 111) is None
+
+    async def test_persists_across_restarts(self, index_path):
+        """再起動後もインデックスが復元される"""
+        index = PinIndex(index_path)
+        await index.set_reactors(1, 2, 123, {111, 222})
+        await index.add_reactor(1, 2, 124, 333)
+        await index.remove_message(124)
+        index.close()
+
+        reopened = PinIndex(index_path)
+
+        assert await reopened.get_reactors(123) == {111, 222}
+        assert await reopened.get_reactors(124) is None
+        reopened.close()
+
+    async def test_reconcile_channel(self, pin_index):
+        """リコンシリエーションでピン留めされていないメッセージが削除される"""
+        await pin_index.set_reactors(1, 2, 100, {111})
+        await pin_index.set_reactors(1, 2, 101, {111})
+        await pin_index.set_reactors(1, 3, 200, {111})  # 別チャンネル
+
+        await pin_index.reconcile_channel(1, 2, [(101, {111, 222}), (102, {333})])
+
+        assert await pin_index.get_reactors(100) is None
+        assert await pin_index.get_reactors(101) == {111, 222}
+        assert await pin_index.get_reactors(102) == {333}
+        assert await pin_index.get_reactors(200) == {111}
+        assert await pin_index.channel_message_ids(2) == {101, 102}
+        assert await pin_index.channel_message_ids(3) == {200}
+
+        await pin_index.remove_message(200)
+        assert await pin_index.channel_message_ids(3) == set()
@@ -0,0 +1,168 @@
+"""PinnedListView のユニットテスト"""
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+from services.pin_archive import ArchivedPin
+from views.pinned_list_view import PageButton, PinnedListView, format_pin_line, progress_embed
+from views.unpin_view import ApplyButton, UnpinSelect
+
+MY_ID = 111111111
+
+
+def create_pins(count):
+    pins = []
+    for i in range(count):
+        pin = MagicMock()
+        pin.id = 1000 + i
+        pin.content = f"ピン留めメッセージ {i}"
+        pin.created_at = datetime.now(timezone.utc)
+        pin.channel = MagicMock()
+        pin.channel.id = 222222
+        pin.author = MagicMock()
+        pin.author.display_name = "OtherUser"
+        pin.unpin = AsyncMock()
+        pins.append(pin)
+    return pins
+
+
+class RecordingResolver:
+    """判定したピン留めを記録するリゾルバ（偶数IDは自分だけのピン留め）"""
+
+    def __init__(self):
+        self.resolved = []
+
+    async def __call__(self, pins):
+        self.resolved.extend(p.id for p in pins)
+        return [(p, {MY_ID} if p.id % 2 == 0 else {222222222}) for p in pins]
+
+
+def create_view(pins, resolver, page_size=10):
+    return PinnedListView(
+        pins,
+        user_id=MY_ID,
+        resolve=resolver,
+        title="📌 全員のピン留めメッセージ一覧",
+        guild_id=1,
+        page_size=page_size
+    )
+
+
+class TestPinnedListView:
+    """PinnedListView のテスト"""
+
+    async def test_only_visible_page_is_resolved(self):
+        """表示するページの分だけ判定される"""
+        pins = create_pins(45)
+        resolver = RecordingResolver()
+        view = create_view(pins, resolver)
+
+        await view.render_page(0)
+
+        assert resolver.resolved == [p.id for p in pins[:10]]
+
+    async def test_page_navigation(self):
+        """次のページに移動すると次の分だけ判定される"""
+        pins = create_pins(45)
+        resolver = RecordingResolver()
+        view = create_view(pins, resolver)
+        await view.render_page(0)
+
+        embed = await view.render_page(4)
+
+        assert resolver.resolved[10:] == [p.id for p in pins[40:]]
+        assert "ページ 5/5" in embed.footer.text
+        assert "合計 45 件" in embed.footer.text
+
+    async def test_unpin_select_contains_only_own_pins_on_page(self):
+        """解除用Selectは表示中のページの自分のピン留めのみ"""
+        view = create_view(create_pins(45), RecordingResolver())
+
+        await view.render_page(1)
+
+        select = next(c for c in view.children if isinstance(c, UnpinSelect))
+        assert [o.value for o in select.options] == [str(1000 + i) for i in range(10, 20, 2)]
+        assert set(view.pins_by_id) == {1000 + i for i in range(10, 20, 2)}
+
+    async def test_page_buttons_disabled_at_edges(self):
+        """先頭ページでは「前へ」、最終ページでは「次へ」が無効"""
+        view = create_view(create_pins(15), RecordingResolver())
+
+        await view.render_page(0)
+        buttons = [c for c in view.children if isinstance(c, PageButton)]
+        assert [b.disabled for b in buttons] == [True, False]
+
+        await view.render_page(1)
+        buttons = [c for c in view.children if isinstance(c, PageButton)]
+        assert [b.disabled for b in buttons] == [False, True]
+
+    async def test_single_page_without_own_pins_has_no_controls(self):
+        """1ページかつ自分のピン留めがなければコンポーネントなし"""
+        pins = [p for p in create_pins(6) if p.id % 2 == 1]
+        view = create_view(pins, RecordingResolver())
+
+        await view.render_page(0)
+
+        assert view.children == []
+
+    async def test_apply_button_works_on_page(self, mock_interaction):
+        """ページ上の選択を適用ボタンで解除できる"""
+        pins = create_pins(20)
+        view = create_view(pins, RecordingResolver())
+        await view.render_page(1)
+        view.selected_message_ids = [1010, 1012]
+        apply_button = next(c for c in view.children if isinstance(c, ApplyButton))
+
+        await apply_button.callback(mock_interaction)
+
+        pins[10].unpin.assert_awaited_once()
+        pins[12].unpin.assert_awaited_once()
+        pins[0].unpin.assert_not_called()
+
+    async def test_page_button_edits_response(self, mock_interaction):
+        """ページボタンで元のメッセージが次のページに更新される"""
+        view = create_view(create_pins(15), RecordingResolver())
+        await view.render_page(0)
+        next_button = [c for c in view.children if isinstance(c, PageButton)][1]
+
+        await next_button.callback(mock_interaction)
+
+        mock_interaction.response.defer.assert_awaited_once()
+        embed = mock_interaction.edit_original_response.call_args.kwargs["embed"]
+        assert "ページ 2/2" in embed.footer.text
+
+
+class TestFormatPinLine:
+    """一覧の行表示のテスト"""
+
+    def test_self_only_pin(self):
+        pin = create_pins(1)[0]
+        assert format_pin_line(pin, {MY_ID}, MY_ID, 1).startswith("📌 [ピン留めメッセージ ...]")
+
+    def test_shared_pin_shows_author(self):
+        pin = create_pins(1)[0]
+        line = format_pin_line(pin, {MY_ID, 2}, MY_ID, 1)
+        assert line.startswith("🔒")
+        assert "*by OtherUser*" in line
+
+    def test_show_channel(self):
+        pin = create_pins(1)[0]
+        assert format_pin_line(pin, {MY_ID}, MY_ID, 1, show_channel=True).endswith("<#222222>")
+        assert "<#222222>" not in format_pin_line(pin, {MY_ID}, MY_ID, 1)
+
+    def test_archived_pin_is_marked(self):
+        pin = ArchivedPin(1000, 1, 222222, 5, "OtherUser", "アーカイブしたピン留め", {MY_ID})
+        line = format_pin_line(pin, {MY_ID}, MY_ID, 1)
+        assert line == "📌 [アーカイブしたピン留...](https://discord.com/channels/1/222222/1000) 🗄️"
+
+
+def test_progress_embed_shows_newest_pins():
+    pins = create_pins(3)
+    for i, pin in enumerate(pins):
+        pin.created_at = datetime(2024, 1, 1 + i, tzinfo=timezone.utc)
+
+    embed = progress_embed("一覧", pins, 2, 5, 1, preview=2)
+
+    assert embed.description.splitlines()[0].startswith("• [ピン留めメッセージ ...](https://discord.com/channels/1/222222/1002)")
+    assert len(embed.description.splitlines()) == 2
+    assert "2/5 チャンネル" in embed.footer.text
+    assert "3 件" in embed.footer.text
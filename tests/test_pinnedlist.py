@@ -6,6 +6,8 @@ import sys
 
 sys.path.insert(0, '/Users/fujiemon/dev/PinnedDiscordBot')
 
+from services.pin_fetcher import is_self_only, refresh_pins, resolve_pushpin_reactors
+
 
 @pytest.fixture
 def mock_bot():
@@ -86,37 +88,6 @@ def create_mock_user(user_id, user_name, is_bot=False):
     return user
 
 
-async def check_is_self_only_pin(pin, user_id):
-    """ピン留めメッセージが自分だけのものかチェックする関数
-
-    Args:
-        pin: ピン留めメッセージオブジェクト
-        user_id: チェックするユーザーのID
-
-    Returns:
-        bool: 自分だけがピン留めしている場合True
-    """
-    pin_reaction = None
-    for reaction in pin.reactions:
-        if str(reaction.emoji) == "📌":
-            pin_reaction = reaction
-            break
-
-    if pin_reaction is None:
-        return False
-
-    reaction_users = []
-    async for user in pin_reaction.users():
-        if not user.bot:
-            reaction_users.append(user)
-
-    # 自分だけがリアクションしている場合のみTrue
-    return (
-        len(reaction_users) == 1 and
-        reaction_users[0].id == user_id
-    )
-
-
 class TestPinnedListReactionBasedLogic:
     """pinnedlistコマンドのリアクションベース判定ロジックのテスト"""
 
@@ -135,10 +106,10 @@ class TestPinnedListReactionBasedLogic:
         )
 
         # 実行
-        is_self_only = await check_is_self_only_pin(pin, mock_interaction.user.id)
+        self_only = is_self_only(await resolve_pushpin_reactors(pin), mock_interaction.user.id)
 
         # 期待: 自分だけがリアクションしているのでTrue
-        assert is_self_only is True
+        assert self_only is True
 
     @pytest.mark.asyncio
     async def test_self_and_others_reaction_shows_lock_emoji(self, mock_interaction):
@@ -156,10 +127,10 @@ class TestPinnedListReactionBasedLogic:
         )
 
         # 実行
-        is_self_only = await check_is_self_only_pin(pin, mock_interaction.user.id)
+        self_only = is_self_only(await resolve_pushpin_reactors(pin), mock_interaction.user.id)
 
         # 期待: 他人もリアクションしているのでFalse
-        assert is_self_only is False
+        assert self_only is False
 
     @pytest.mark.asyncio
     async def test_others_only_reaction_shows_lock_emoji(self, mock_interaction):
@@ -176,10 +147,10 @@ class TestPinnedListReactionBasedLogic:
         )
 
         # 実行
-        is_self_only = await check_is_self_only_pin(pin, mock_interaction.user.id)
+        self_only = is_self_only(await resolve_pushpin_reactors(pin), mock_interaction.user.id)
 
         # 期待: 自分はリアクションしていないのでFalse
-        assert is_self_only is False
+        assert self_only is False
 
     @pytest.mark.asyncio
     async def test_no_pushpin_reaction_shows_lock_emoji(self, mock_interaction):
@@ -196,10 +167,10 @@ class TestPinnedListReactionBasedLogic:
         )
 
         # 実行
-        is_self_only = await check_is_self_only_pin(pin, mock_interaction.user.id)
+        self_only = is_self_only(await resolve_pushpin_reactors(pin), mock_interaction.user.id)
 
         # 期待: 📌リアクションがないのでFalse
-        assert is_self_only is False
+        assert self_only is False
 
     @pytest.mark.asyncio
     async def test_bot_reactions_are_ignored(self, mock_interaction):
@@ -217,7 +188,116 @@ class TestPinnedListReactionBasedLogic:
         )
 
         # 実行
-        is_self_only = await check_is_self_only_pin(pin, mock_interaction.user.id)
+        self_only = is_self_only(await resolve_pushpin_reactors(pin), mock_interaction.user.id)
 
         # 期待: Botを除外すると自分だけなのでTrue
-        assert is_self_only is True
+        assert self_only is True
+
+
+class TestRefreshPinsConcurrently:
+    """ピン留めメッセージの並列再取得のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_preserves_original_order(self):
+        """完了順に関係なく元のピン留め順序が維持される"""
+        import asyncio
+        user = create_mock_user(111111111, "CommandUser")
+        pins = [
+            create_mock_pin(i, f"メッセージ{i}", 1, "Author", [create_mock_reaction("📌", [user])])
+            for i in range(5)
+        ]
+        by_id = {p.id: p for p in pins}
+
+        async def fetch_message(message_id):
+            # 後ろのメッセージほど早く返る
+            await asyncio.sleep(0.01 * (5 - message_id))
+            return by_id[message_id]
+
+        channel = MagicMock()
+        channel.fetch_message = fetch_message
+
+        refreshed = await refresh_pins(channel, pins, concurrency=5)
+
+        assert [m.id for m, _ in refreshed] == [0, 1, 2, 3, 4]
+        assert all(reactors == {111111111} for _, reactors in refreshed)
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self):
+        """同時実行数が上限を超えない"""
+        import asyncio
+        pins = [create_mock_pin(i, "m", 1, "Author", []) for i in range(10)]
+        by_id = {p.id: p for p in pins}
+        running = 0
+        peak = 0
+
+        async def fetch_message(message_id):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return by_id[message_id]
+
+        channel = MagicMock()
+        channel.fetch_message = fetch_message
+
+        refreshed = await refresh_pins(channel, pins, concurrency=3)
+
+        assert len(refreshed) == 10
+        assert peak == 3
+
+    @pytest.mark.asyncio
+    async def test_deleted_messages_are_skipped(self):
+        """削除済みメッセージは結果から除外される"""
+        import discord
+        pins = [create_mock_pin(i, "m", 1, "Author", []) for i in range(3)]
+
+        async def fetch_message(message_id):
+            if message_id == 1:
+                raise discord.NotFound(MagicMock(status=404), "Unknown Message")
+            return pins[message_id]
+
+        channel = MagicMock()
+        channel.fetch_message = fetch_message
+
+        refreshed = await refresh_pins(channel, pins)
+
+        assert [m.id for m, _ in refreshed] == [0, 2]
+
+
+class TestResolveRemainingReactors:
+    """リアクション削除後の残りユーザー判定のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_no_pushpin_reaction(self):
+        """📌リアクションがなければ空"""
+        from services.pin_fetcher import resolve_remaining_reactors
+        pin = create_mock_pin(1, "m", 1, "Author", [])
+
+        assert await resolve_remaining_reactors(pin) == set()
+
+    @pytest.mark.asyncio
+    async def test_only_self_reaction_skips_user_walk(self):
+        """残りがBot自身のリアクションだけならユーザー一覧を取得しない"""
+        from services.pin_fetcher import resolve_remaining_reactors
+        reaction = MagicMock()
+        reaction.emoji = "📌"
+        reaction.count = 1
+        reaction.me = True
+        reaction.users = MagicMock()
+        pin = create_mock_pin(1, "m", 1, "Author", [reaction])
+
+        assert await resolve_remaining_reactors(pin) == set()
+        reaction.users.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_other_reactors_are_walked(self):
+        """他のユーザーが残っている場合はBotを除外して数える"""
+        from services.pin_fetcher import resolve_remaining_reactors
+        other_user = create_mock_user(222222222, "OtherUser")
+        other_bot = create_mock_user(333333333, "OtherBot", is_bot=True)
+        reaction = create_mock_reaction("📌", [other_user, other_bot])
+        reaction.me = False
+        pin = create_mock_pin(1, "m", 1, "Author", [reaction])
+
+        assert await resolve_remaining_reactors(pin) == {222222222}
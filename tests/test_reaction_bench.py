@@ -0,0 +1,97 @@
+"""リアクションイベントのベンチマークと偽のDiscord APIのテスト"""
+from types import SimpleNamespace
+
+import discord
+import pytest
+
+from benchmarks.fake_discord import FakeDiscord, FakeHTTPLayer
+from benchmarks.reaction_bench import check_thresholds, parse_args, run_benchmarks
+
+PIN_ROUTE = "PUT /channels/{channel_id}/messages/pins/{message_id}"
+
+
+def route(method, path):
+    """discord.http.Route の代わり（url と method だけを使う）"""
+    return SimpleNamespace(BASE="https://discord.com/api/v10", url=f"https://discord.com/api/v10{path}", method=method)
+
+
+class TestFakeDiscord:
+    """偽のDiscord APIのテスト"""
+
+    def test_pin_limit(self):
+        api = FakeDiscord()
+        api.add_channel(1, 10)
+        ids = [api.add_message(10, 2) for _ in range(51)]
+
+        for message_id in ids[:50]:
+            assert api.handle("PUT", f"/channels/10/messages/pins/{message_id}")[0] == 204
+        status, data = api.handle("PUT", f"/channels/10/messages/pins/{ids[50]}")
+
+        assert status == 400
+        assert data["code"] == 30003
+        assert api.calls[PIN_ROUTE] == 51
+
+    def test_pins_omit_reactions(self):
+        """ピン留め一覧には、実際のDiscordと同じくリアクションの情報を含めない"""
+        api = FakeDiscord()
+        api.add_channel(1, 10)
+        message_id = api.add_message(10, 2)
+        api.pin_message(10, message_id)
+        api.add_reaction(message_id, 3)
+
+        _, pins = api.handle("GET", "/channels/10/messages/pins")
+
+        assert "reactions" not in pins["items"][0]["message"]
+        assert api.handle("GET", f"/channels/10/messages/{message_id}")[1]["reactions"][0]["count"] == 1
+
+    async def test_rate_limited_requests_are_retried(self):
+        api = FakeDiscord(rate_limit_ratio=0.5, retry_after=0.001)
+        api.add_channel(1, 10)
+        message_id = api.add_message(10, 2)
+        layer = FakeHTTPLayer(api)
+
+        for _ in range(5):
+            data = await layer.request(route("GET", f"/channels/10/messages/{message_id}"))
+            assert data["id"] == str(message_id)
+
+        assert sum(api.rate_limited.values()) > 0
+        assert api.total_calls() == 5 + sum(api.rate_limited.values())
+
+    async def test_errors_are_raised_as_discord_exceptions(self):
+        layer = FakeHTTPLayer(FakeDiscord())
+
+        with pytest.raises(discord.NotFound):
+            await layer.request(route("GET", "/channels/10/messages/1"))
+
+
+class TestReactionBench:
+    """main.py のハンドラを使ったシナリオのテスト"""
+
+    async def test_scenarios(self):
+        args = parse_args(["--messages", "4", "--users", "3", "--channels", "2", "--latency", "0", "--window", "0"])
+
+        results = {r["scenario"]: r for r in await run_benchmarks(args)}
+
+        assert results["pin"]["pinned"] == 4
+        assert results["pin"]["rest_by_route"][PIN_ROUTE] == 4
+        # 同時に付けられた📌はまとめられ、ピン留めはメッセージごとに1回
+        assert results["pin_burst"]["rest_by_route"][PIN_ROUTE] == 4
+        assert results["pin_burst"]["batches"] == 4
+        # 準備でピン留めしたメッセージは、インデックスで判定して取得せずに解除する
+        assert results["unpin"]["pinned"] == 0
+        assert "GET /channels/{channel_id}/messages/{message_id}" not in results["unpin"]["rest_by_route"]
+        for result in results.values():
+            assert result["throughput"] > 0
+            assert result["p99_ms"] >= result["p50_ms"]
+
+    def test_thresholds(self):
+        args = parse_args(["--max-p99-ms", "100", "--min-throughput", "50"])
+        results = [
+            {"scenario": "ok", "p99_ms": 10.0, "throughput": 100.0},
+            {"scenario": "slow", "p99_ms": 200.0, "throughput": 10.0},
+        ]
+
+        failures = check_thresholds(results, args)
+
+        assert len(failures) == 2
+        assert all(f.startswith("slow") for f in failures)
@@ -0,0 +1,102 @@
+"""ReactionCoalescer のユニットテスト"""
+import asyncio
+from unittest.mock import MagicMock
+
+from services.reaction_coalescer import KeyedLock, ReactionCoalescer
+
+
+def create_payload(message_id, user_id):
+    """モック RawReactionActionEvent"""
+    payload = MagicMock()
+    payload.message_id = message_id
+    payload.user_id = user_id
+    return payload
+
+
+class RecordingHandler:
+    """呼び出しを記録するハンドラ"""
+
+    def __init__(self, delay=0.0):
+        self.calls = []
+        self.delay = delay
+        self.running = 0
+        self.peak = 0
+
+    async def __call__(self, added, removed):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(self.delay)
+        self.calls.append(([p.user_id for p in added], [p.user_id for p in removed]))
+        self.running -= 1
+
+
+class TestReactionCoalescer:
+    """ReactionCoalescer のテスト"""
+
+    async def test_events_within_window_are_batched(self):
+        """ウィンドウ内の同じメッセージのイベントは1回の処理にまとめられる"""
+        handler = RecordingHandler()
+        coalescer = ReactionCoalescer(handler, window=0.01)
+
+        coalescer.submit(create_payload(1, 10), added=True)
+        coalescer.submit(create_payload(1, 20), added=True)
+        coalescer.submit(create_payload(1, 30), added=False)
+        await coalescer.drain()
+
+        assert handler.calls == [([10, 20], [30])]
+
+    async def test_toggled_reaction_is_a_no_op(self):
+        """付けてすぐ外したリアクションは処理しない"""
+        handler = RecordingHandler()
+        coalescer = ReactionCoalescer(handler, window=0.01)
+
+        coalescer.submit(create_payload(1, 10), added=True)
+        coalescer.submit(create_payload(1, 10), added=False)
+        coalescer.submit(create_payload(1, 20), added=False)
+        coalescer.submit(create_payload(1, 20), added=True)
+        await coalescer.drain()
+
+        assert handler.calls == []
+
+    async def test_different_messages_are_separate(self):
+        """別メッセージのイベントは別々に処理される"""
+        handler = RecordingHandler()
+        coalescer = ReactionCoalescer(handler, window=0.01)
+
+        coalescer.submit(create_payload(1, 10), added=True)
+        coalescer.submit(create_payload(2, 10), added=False)
+        await coalescer.drain()
+
+        assert sorted(handler.calls) == [([], [10]), ([10], [])]
+
+    async def test_same_message_is_serialized(self):
+        """同じメッセージの処理は並行して実行されない"""
+        handler = RecordingHandler(delay=0.02)
+        coalescer = ReactionCoalescer(handler, window=0)
+
+        coalescer.submit(create_payload(1, 10), added=True)
+        await asyncio.sleep(0.005)  # 1つ目の処理中に次のバッチを投入
+        coalescer.submit(create_payload(1, 20), added=False)
+        await coalescer.drain()
+
+        assert handler.peak == 1
+        assert handler.calls == [([10], []), ([], [20])]
+        assert len(coalescer.locks) == 0
+
+
+class TestKeyedLock:
+    """KeyedLock のテスト"""
+
+    async def test_different_keys_run_concurrently(self):
+        """別キーのロックは互いにブロックしない"""
+        locks = KeyedLock()
+        order = []
+
+        async def worker(key, delay):
+            async with locks(key):
+                await asyncio.sleep(delay)
+                order.append(key)
+
+        await asyncio.gather(worker("a", 0.02), worker("b", 0.0))
+
+        assert order == ["b", "a"]
@@ -0,0 +1,191 @@
+"""RestScheduler のユニットテスト"""
+import asyncio
+from types import SimpleNamespace
+
+from discord.http import Route
+
+from services.rest_scheduler import Priority, RestScheduler, rest_priority, route_priority
+
+
+def pin_route(channel_id=1, message_id=10, method="PUT"):
+    return Route(method, "/channels/{channel_id}/messages/pins/{message_id}", channel_id=channel_id, message_id=message_id)
+
+
+def fetch_route(channel_id=1, message_id=10):
+    return Route("GET", "/channels/{channel_id}/messages/{message_id}", channel_id=channel_id, message_id=message_id)
+
+
+class FakeHTTP:
+    """ルートごとに limit 回 / per 秒のレート制限を返す HTTPClient の代わり
+
+    discord.py と同じく、応答のヘッダーから _buckets のレート制限の状態を更新する。
+    """
+
+    def __init__(self, limit=1, per=0.05, delay=0.0, headers=True):
+        self.limit = limit
+        self.per = per
+        self.delay = delay
+        self.headers = headers
+        self._bucket_hashes = {}
+        self._buckets = {}
+        self.sent = []
+        # 次のリクエストで送出する例外（応答を受け取らない失敗）
+        self.error = None
+        self.running = 0
+        self.peak = 0
+
+    async def request(self, route, **kwargs):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        self.sent.append((route.method, route.url))
+        await asyncio.sleep(self.delay)
+        self.running -= 1
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+        key = f"{route.key}:{route.major_parameters}"
+        ratelimit = self._buckets.setdefault(key, SimpleNamespace(dirty=False, limit=1, remaining=1, expires=None))
+        if self.headers:
+            now = asyncio.get_running_loop().time()
+            if ratelimit.expires is None or now >= ratelimit.expires:
+                ratelimit.remaining = self.limit
+                ratelimit.expires = now + self.per
+            ratelimit.dirty = True
+            ratelimit.limit = self.limit
+            ratelimit.remaining -= 1
+
+
+def install(http, **kwargs):
+    scheduler = RestScheduler(**kwargs)
+    scheduler.install(http)
+    return scheduler
+
+
+class TestRoutePriority:
+    """ルートによる優先度のテスト"""
+
+    def test_defaults(self):
+        assert route_priority(pin_route()) == Priority.PIN
+        assert route_priority(pin_route(method="DELETE")) == Priority.PIN
+        assert route_priority(fetch_route()) == Priority.REFRESH
+        assert route_priority(Route("DELETE", "/channels/{channel_id}/messages/{message_id}", channel_id=1, message_id=2)) == Priority.CLEANUP
+        assert route_priority(Route("POST", "/channels/{channel_id}/messages", channel_id=1)) == Priority.RESPONSE
+
+
+class TestRestScheduler:
+    """RestScheduler のテスト"""
+
+    async def test_exhausted_bucket_releases_by_priority(self):
+        """残り回数がなくなったバケットは、リセット後に優先度の高いものから送る"""
+        http = FakeHTTP(limit=1, per=0.05)
+        scheduler = install(http)
+        await http.request(fetch_route(message_id=1))  # 1回目でバケットの上限を知る
+
+        refresh = [asyncio.create_task(http.request(fetch_route(message_id=i))) for i in range(2, 5)]
+        await asyncio.sleep(0)
+        with rest_priority(Priority.PIN):
+            pin = asyncio.create_task(http.request(fetch_route(message_id=99)))
+        await asyncio.sleep(0)
+
+        assert scheduler.depth()[Priority.REFRESH] == 3
+        assert scheduler.depth()[Priority.PIN] == 1
+        await asyncio.gather(pin, *refresh)
+
+        # 先に待っていた一覧の更新より、後から来たピン留めの操作が先に送られる
+        assert http.sent[1][1].endswith("/channels/1/messages/99")
+        assert scheduler.depth()[Priority.PIN] == 0
+        assert scheduler.in_flight == 0
+
+    async def test_budget_is_respected(self):
+        """バケットの残り回数を超えて同時に送らない"""
+        http = FakeHTTP(limit=2, per=0.05, delay=0.01)
+        install(http)
+        await http.request(fetch_route())
+
+        await asyncio.gather(*(http.request(fetch_route()) for _ in range(6)))
+
+        assert http.peak <= 2
+        assert len(http.sent) == 7
+
+    async def test_other_buckets_are_not_blocked(self):
+        """残り回数がなくなったバケットの待ちは、別のチャンネルのリクエストを止めない"""
+        http = FakeHTTP(limit=1, per=10.0)
+        scheduler = install(http)
+        await http.request(fetch_route(channel_id=1))
+
+        blocked = asyncio.create_task(http.request(fetch_route(channel_id=1)))
+        await asyncio.sleep(0)
+        await asyncio.wait_for(http.request(fetch_route(channel_id=2)), 1.0)
+
+        assert not blocked.done()
+        blocked.cancel()
+        await asyncio.gather(blocked, return_exceptions=True)
+        assert sum(scheduler.depth().values()) == 0
+
+    async def test_max_in_flight_by_priority(self):
+        """同時実行数の上限に達している間は優先度の順に待つ"""
+        http = FakeHTTP(delay=0.01, headers=False)
+        scheduler = install(http, max_in_flight=1)
+        await http.request(fetch_route(channel_id=1))  # ヘッダーのないルートは制限なしとみなす
+
+        first = asyncio.create_task(http.request(fetch_route(channel_id=1)))
+        await asyncio.sleep(0)
+        cleanup = asyncio.create_task(http.request(
+            Route("DELETE", "/channels/{channel_id}/messages/{message_id}", channel_id=2, message_id=1)
+        ))
+        await asyncio.sleep(0)
+        pin = asyncio.create_task(http.request(pin_route(channel_id=3)))
+        await asyncio.gather(first, cleanup, pin)
+
+        assert [method for method, _ in http.sent[2:]] == ["PUT", "DELETE"]
+        assert http.peak == 1
+        assert scheduler.dispatched == 4
+
+    async def test_failed_request_does_not_block_bucket(self):
+        """応答のないまま失敗したリクエストの分は戻し、同じバケットの次のリクエストを送る"""
+        http = FakeHTTP(limit=1, per=0.01)
+        scheduler = install(http)
+        await http.request(fetch_route())
+        await asyncio.sleep(0.02)  # リセット後に残り回数を使い切ってから失敗する
+
+        http.error = OSError("connection reset")
+        try:
+            await http.request(fetch_route())
+        except OSError:
+            pass
+
+        await asyncio.wait_for(http.request(fetch_route()), 1.0)
+        assert len(http.sent) == 3
+        assert scheduler.in_flight == 0
+
+    async def test_cancelled_request_does_not_block_bucket(self):
+        """送信中にキャンセルされたリクエストの分も戻す"""
+        http = FakeHTTP(limit=1, per=0.01, delay=0.05)
+        install(http)
+        await http.request(fetch_route())
+        await asyncio.sleep(0.02)
+
+        cancelled = asyncio.create_task(http.request(fetch_route()))
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+
+        await asyncio.wait_for(http.request(fetch_route()), 1.0)
+        assert len(http.sent) == 3
+
+    async def test_expired_budgets_are_pruned(self):
+        """リセットの時刻を過ぎて使われていないバケットは捨て、使用中のバケットは残す"""
+        http = FakeHTTP(limit=1, per=0.01)
+        scheduler = install(http, prune_interval=0)
+        for channel_id in range(20):
+            await http.request(fetch_route(channel_id=channel_id))
+        assert len(scheduler._budgets) > 1
+        await asyncio.sleep(0.02)
+
+        await http.request(fetch_route(channel_id=100))
+        assert list(scheduler._budgets) == [scheduler._key(fetch_route(channel_id=100))]
+
+        # 捨てたバケットも discord.py の状態から作り直し、残り回数の範囲で送る
+        await asyncio.wait_for(asyncio.gather(*(http.request(fetch_route(channel_id=1)) for _ in range(2))), 1.0)
+        assert len(http.sent) == 23
+        assert scheduler.in_flight == 0
@@ -0,0 +1,53 @@
+"""インテントとキャッシュの設定のテスト"""
+import discord
+
+from benchmarks.memory_bench import load, parse_args
+from services.runtime import client_options
+
+
+class TestClientOptions:
+    """LEAN_RUNTIME の設定のテスト"""
+
+    def test_default_keeps_previous_intents(self):
+        options = client_options(lean=False)
+
+        assert set(options) == {"intents"}
+        assert options["intents"].message_content
+        assert options["intents"].guild_messages
+        assert options["intents"].reactions
+
+    def test_lean_subscribes_only_required_events(self):
+        options = client_options(lean=True)
+        intents = options["intents"]
+
+        assert intents.guilds and intents.guild_reactions and intents.message_content
+        assert not intents.guild_messages
+        assert not intents.dm_messages
+        assert not intents.emojis_and_stickers
+        assert not intents.voice_states
+        assert not intents.typing
+
+    def test_lean_disables_caches(self):
+        options = client_options(lean=True)
+
+        assert options["member_cache_flags"] == discord.MemberCacheFlags.none()
+        assert options["max_messages"] is None
+        assert options["chunk_guilds_at_startup"] is False
+
+
+class TestMemoryBench:
+    """メモリベンチマークのペイロード投入のテスト"""
+
+    async def test_lean_caches_only_guilds_and_self(self):
+        args = parse_args(["--guilds", "3", "--messages", "2", "--reactions", "2"])
+
+        default = await load(False, args)
+        lean = await load(True, args)
+
+        assert default["guilds"] == lean["guilds"] == 3
+        assert default["cached_messages"] == 6
+        assert default["cached_emojis"] > 0
+        assert lean["cached_messages"] == 0
+        assert lean["cached_emojis"] == 0
+        # Bot自身のメンバーだけが残る
+        assert lean["cached_members"] == 3
@@ -0,0 +1,139 @@
+"""PinSearchIndex のユニットテスト"""
+from types import SimpleNamespace
+
+import pytest
+
+from services.search_index import PinSearchIndex, build_query, index_text
+from views.search_results import format_search_hit, snippet
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    return str(tmp_path / "pin_index.db")
+
+
+@pytest.fixture
+def search_index(index_path):
+    index = PinSearchIndex(index_path)
+    yield index
+    index.close()
+
+
+def create_message(message_id, content, author_id=5):
+    return SimpleNamespace(id=message_id, content=content, author=SimpleNamespace(id=author_id))
+
+
+async def ids(search_index, query, **kwargs):
+    return [hit.message_id for hit in await search_index.search(1, query, **kwargs)]
+
+
+class TestTokenize:
+    """N-gramへの分割のテスト"""
+
+    def test_index_text(self):
+        # 全角・大文字は正規化し、記号と空白はN-gramをまたがない
+        assert index_text("会議室。ＡＢ c") == "会議 議室 ab"
+
+    def test_build_query(self):
+        assert build_query("会議室 Python") == ('"会議 議室" AND "py yt th ho on"', [])
+        assert build_query("棟 会議") == ('"会議"', ["棟"])
+        assert build_query("！？") == (None, [])
+
+
+class TestPinSearchIndex:
+    """PinSearchIndex のテスト"""
+
+    async def test_substring_search(self, search_index):
+        await search_index.add(1, 10, 100, 5, "明日の会議室はＡ棟です。Python勉強会")
+        await search_index.add(1, 10, 101, 6, "会議の議事録")
+        await search_index.add(2, 20, 102, 5, "会議")  # 別のギルド
+
+        # 新しい順（メッセージIDの降順）
+        assert await ids(search_index, "会議") == [101, 100]
+        assert await ids(search_index, "会議室") == [100]
+        assert await ids(search_index, "ＰＹＴＨＯＮ 勉強") == [100]
+        # 1文字の語は本文を直接照合する
+        assert await ids(search_index, "棟") == [100]
+        assert await ids(search_index, "室 議事") == []
+        # N-gramが連続していなければ一致しない
+        assert await ids(search_index, "会録") == []
+        assert await ids(search_index, "　") == []
+
+    async def test_filters_and_limit(self, search_index):
+        for i in range(5):
+            await search_index.add(1, 10 + i % 2, 100 + i, 5 + i % 2, f"リリース {i}")
+
+        assert await ids(search_index, "リリース", limit=2) == [104, 103]
+        assert await ids(search_index, "リリース", channel_id=11) == [103, 101]
+        assert await ids(search_index, "リリース", author_id=5) == [104, 102, 100]
+
+    async def test_channel_ids_filter(self, search_index):
+        await search_index.add(1, 10, 100, 5, "公開チャンネルの議事録")
+        await search_index.add(1, 11, 101, 5, "非公開チャンネルの議事録")
+
+        assert await ids(search_index, "議事録", channel_ids={10}) == [100]
+        assert await ids(search_index, "議事録", channel_ids={10, 11}) == [101, 100]
+        assert await ids(search_index, "議事録", channel_ids=set()) == []
+        # 見られないチャンネルを channel_id に指定しても結果は出ない
+        assert await ids(search_index, "議事録", channel_id=11, channel_ids={10}) == []
+
+    async def test_update_and_remove(self, search_index):
+        await search_index.add(1, 10, 100, 5, "古い本文")
+        # 登録済みのメッセージは置き換えるだけで件数は増えない
+        await search_index.add(1, 10, 100, 5, "古い本文")
+        assert len(search_index) == 1
+
+        assert await search_index.update_content(100, "新しい本文")
+        assert not await search_index.update_content(999, "未登録")
+        assert await ids(search_index, "古い") == []
+        assert await ids(search_index, "新しい") == [100]
+
+        await search_index.remove(100)
+        assert await ids(search_index, "本文") == []
+        assert len(search_index) == 0
+        await search_index.remove(100)
+        assert len(search_index) == 0
+
+    async def test_reconcile_channel(self, search_index):
+        await search_index.add(1, 10, 100, 5, "解除されたメッセージ")
+        await search_index.add(1, 10, 101, 5, "編集前")
+        await search_index.add(1, 11, 200, 5, "別のチャンネルのメッセージ")
+
+        await search_index.reconcile_channel(1, 10, [create_message(101, "編集後"), create_message(102, "新規")])
+
+        assert await search_index.channel_message_ids(10) == {101, 102}
+        assert len(search_index) == 3
+        assert await ids(search_index, "編集後") == [101]
+        assert await ids(search_index, "メッセージ") == [200]
+
+        # アーカイブしたピン留めは一覧になくても残す
+        await search_index.reconcile_channel(1, 10, [], keep={101})
+        assert await search_index.channel_message_ids(10) == {101}
+        assert len(search_index) == 2
+
+    async def test_persists_across_restarts(self, index_path):
+        index = PinSearchIndex(index_path)
+        await index.add(1, 10, 100, 5, "議事録")
+        index.close()
+
+        reopened = PinSearchIndex(index_path)
+        assert [hit.message_id for hit in await reopened.search(1, "議事")] == [100]
+        assert len(reopened) == 1
+        reopened.close()
+
+
+class TestSearchResults:
+    """検索結果の表示のテスト"""
+
+    def test_snippet_highlights_match(self):
+        content = "0123456789012345明日の会議室は*A棟*です"
+        assert snippet(content, "会議") == "...9012345明日の**会議**室は\\*A棟\\*です"
+
+    def test_snippet_without_position(self):
+        # 全角・半角の違いで位置が分からなければ冒頭を表示する
+        assert snippet("ＡＢＣ", "abc") == "ＡＢＣ"
+
+    def test_format_search_hit(self):
+        hit = SimpleNamespace(message_id=3, guild_id=1, channel_id=2, author_id=5, content="[重要] 会議")
+        line = format_search_hit(hit, "会議")
+        assert line == "• [［重要］ **会議**](https://discord.com/channels/1/2/3) <#2> by <@5>"
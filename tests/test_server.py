@@ -0,0 +1,150 @@
+"""ヘルスチェック用サーバーのテスト"""
+import asyncio
+import os
+import signal
+from unittest.mock import MagicMock
+
+import pytest
+
+import server
+
+
+class FakeServer:
+    """uvicorn.Server の代わり（should_exit が立つまで serve() が終わらない）"""
+
+    def __init__(self):
+        self.config = MagicMock(port=8080)
+        self.should_exit = False
+        self.started = asyncio.Event()
+
+    async def serve(self):
+        self.started.set()
+        while not self.should_exit:
+            await asyncio.sleep(0.01)
+
+
+class TestServeWith:
+    """サーバーとBotを同じイベントループで動かすテスト"""
+
+    async def test_server_stops_when_bot_finishes(self):
+        fake = FakeServer()
+
+        async def bot():
+            await fake.started.wait()
+
+        await asyncio.wait_for(server.serve_with(fake, bot()), timeout=1)
+
+        assert fake.should_exit
+
+    async def test_bot_is_cancelled_when_server_exits(self):
+        fake = FakeServer()
+        cancelled = asyncio.Event()
+
+        async def bot():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        async def stop_server():
+            await fake.started.wait()
+            # シグナルを受けた uvicorn と同じく should_exit を立てる
+            fake.should_exit = True
+
+        asyncio.create_task(stop_server())
+        await asyncio.wait_for(server.serve_with(fake, bot()), timeout=1)
+
+        assert cancelled.is_set()
+
+    async def test_bot_error_is_raised(self):
+        fake = FakeServer()
+
+        async def bot():
+            raise RuntimeError("login failed")
+
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(server.serve_with(fake, bot()), timeout=1)
+        assert fake.should_exit
+
+
+class TestStopSignals:
+    """SIGTERM（コンテナの停止）で後片付けをしてから戻るテスト"""
+
+    def test_embedded_server_does_not_capture_signals(self):
+        # uvicorn は停止後にシグナルを送り直し、SIGTERMではプロセスが終了してしまう
+        assert isinstance(server.create_server(), server.EmbeddedServer)
+
+    async def test_sigterm_stops_server_and_cancels_bot(self):
+        fake = FakeServer()
+        cancelled = asyncio.Event()
+
+        async def bot():
+            await fake.started.wait()
+            os.kill(os.getpid(), signal.SIGTERM)
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        await asyncio.wait_for(server.serve_with(fake, bot()), timeout=1)
+
+        assert fake.should_exit
+        assert cancelled.is_set()
+
+    async def test_run_until_signal_cancels_bot_on_sigterm(self):
+        cancelled = asyncio.Event()
+
+        async def bot():
+            os.kill(os.getpid(), signal.SIGTERM)
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        await asyncio.wait_for(server.run_until_signal(bot()), timeout=1)
+
+        assert cancelled.is_set()
+        # 終わったらシグナルハンドラを外す
+        assert not asyncio.get_running_loop().remove_signal_handler(signal.SIGTERM)
+
+    async def test_run_until_signal_raises_bot_error(self):
+        async def bot():
+            raise RuntimeError("login failed")
+
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(server.run_until_signal(bot()), timeout=1)
+
+
+class TestBotStatus:
+    """/status エンドポイントのテスト"""
+
+    async def test_status_without_bot(self, monkeypatch):
+        monkeypatch.setattr(server.app.state, "bot", None)
+
+        status = await server.bot_status()
+
+        assert status["port"] == server.PORT
+        assert "ready" not in status
+
+    async def test_status_reads_bot_state(self, monkeypatch):
+        bot = MagicMock(latency=0.1234, guilds=[1, 2])
+        bot.is_ready.return_value = True
+        monkeypatch.setattr(server.app.state, "bot", bot)
+
+        status = await server.bot_status()
+
+        assert status["ready"] is True
+        assert status["guilds"] == 2
+        assert status["latency_ms"] == 123.4
+
+    async def test_status_before_connect(self, monkeypatch):
+        bot = MagicMock(latency=float("nan"), guilds=[])
+        bot.is_ready.return_value = False
+        monkeypatch.setattr(server.app.state, "bot", bot)
+
+        status = await server.bot_status()
+
+        assert status["latency_ms"] is None
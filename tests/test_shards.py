@@ -0,0 +1,94 @@
+"""シャーディング設定とシャードごとの統計のテスト"""
+from unittest.mock import MagicMock
+
+import pytest
+
+from services.shards import ShardStats, parse_shard_ids, shard_id_for_guild, shard_options
+
+
+class TestShardOptions:
+    """環境変数からのシャード設定のテスト"""
+
+    def test_parse_ranges_and_lists(self):
+        assert parse_shard_ids("0-3,8, 6") == [0, 1, 2, 3, 6, 8]
+        assert parse_shard_ids("") is None
+        assert parse_shard_ids(None) is None
+
+    def test_parse_invalid_range(self):
+        with pytest.raises(ValueError):
+            parse_shard_ids("3-1")
+
+    def test_not_sharded_by_default(self):
+        assert shard_options(None, None, None) is None
+
+    def test_auto_mode(self):
+        assert shard_options("auto", None, None) == {"shard_count": None, "shard_ids": None}
+
+    def test_shard_range(self):
+        assert shard_options(None, "4", "2-3") == {"shard_count": 4, "shard_ids": [2, 3]}
+
+    def test_shard_ids_require_count(self):
+        with pytest.raises(ValueError):
+            shard_options(None, None, "0-1")
+
+    def test_shard_ids_out_of_range(self):
+        with pytest.raises(ValueError):
+            shard_options(None, "2", "0-2")
+
+
+def make_guild(guild_id, shard_count):
+    guild = MagicMock(id=guild_id)
+    guild.shard_id = shard_id_for_guild(guild_id, shard_count)
+    return guild
+
+
+class TestShardStats:
+    """シャードごとの統計のテスト"""
+
+    def test_shard_id_for_guild(self):
+        guild_id = (5 << 22) | 123
+        assert shard_id_for_guild(guild_id, 4) == 1
+        assert shard_id_for_guild(guild_id, None) == 0
+        assert shard_id_for_guild(None, 4) == 0
+
+    def test_sharded_snapshot(self):
+        shard_count = 2
+        bot = MagicMock(shard_count=shard_count, latencies=[(0, 0.05), (1, float("inf"))])
+        bot.shards = {0: MagicMock(), 1: MagicMock()}
+        bot.shards[0].is_closed.return_value = False
+        bot.shards[1].is_closed.return_value = True
+        bot.guilds = [make_guild(0 << 22, shard_count), make_guild(1 << 22, shard_count), make_guild(3 << 22, shard_count)]
+        stats = ShardStats(bot, clock=lambda: 100.0)
+
+        stats.connected(0)
+        stats.connected(1)
+        stats.disconnected(1)
+        stats.connected(1)
+        stats.resumed(0)
+        stats.record_event(1 << 22)
+        stats.record_event(3 << 22)
+
+        snapshot = stats.snapshot()
+        shard0, shard1 = snapshot["shards"]
+        assert snapshot["shard_count"] == 2
+        assert shard0["connected"] and shard0["latency_ms"] == 50.0
+        assert shard0["resumes"] == 1 and shard0["guilds"] == 1
+        assert not shard1["connected"] and shard1["latency_ms"] is None
+        assert shard1["connects"] == 2 and shard1["disconnects"] == 1
+        assert shard1["events"] == 2 and shard1["last_event"] == 100.0
+        assert shard1["guilds"] == 2
+
+    def test_unsharded_bot_is_shard_zero(self):
+        bot = MagicMock(spec=["latency", "shard_count", "guilds", "is_closed"])
+        bot.latency = 0.1
+        bot.shard_count = None
+        bot.guilds = []
+        bot.is_closed.return_value = False
+        stats = ShardStats(bot)
+
+        stats.record_event(12345 << 22)
+
+        snapshot = stats.snapshot()
+        assert [s["id"] for s in snapshot["shards"]] == [0]
+        assert snapshot["shards"][0]["events"] == 1
+        assert snapshot["shards"][0]["latency_ms"] == 100.0
@@ -0,0 +1,348 @@
+"""ステートバックエンドのテスト
+
+RedisStateBackend はテスト内のRESPサーバー（Redis互換の最小限のスタンドイン）に接続して確認する。
+"""
+import asyncio
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from services.pin_cache import PinListCache
+from services.pin_index import SharedPinIndex
+from services.state_backend import RELEASE_LOCK_SCRIPT, MemoryStateBackend, RedisError, RedisStateBackend
+
+
+class StandInRedis:
+    """テスト用のRedis互換サーバー（使用するコマンドだけを実装）"""
+
+    def __init__(self):
+        self.values: dict[bytes, bytes] = {}
+        self.expires: dict[bytes, float] = {}
+        self.sets: dict[bytes, set[bytes]] = {}
+        self.commands: list[str] = []
+        # 応答を返すまでの時間（秒）
+        self.delay = 0.0
+        self.server = None
+        self.port = None
+        # 受け付けた接続（停止時に閉じる）
+        self.connections: set[asyncio.Task] = set()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        for task in self.connections:
+            task.cancel()
+        await asyncio.gather(*self.connections, return_exceptions=True)
+        await self.server.wait_closed()
+
+    async def _read_command(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        count = int(line[1:-2])
+        args = []
+        for _ in range(count):
+            length = int((await reader.readline())[1:-2])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        return args
+
+    def _alive(self, key):
+        expires_at = self.expires.get(key)
+        if expires_at is not None and time.monotonic() >= expires_at:
+            self.values.pop(key, None)
+            del self.expires[key]
+        return key in self.values
+
+    @staticmethod
+    def _bulk(value):
+        return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+
+    def _run(self, args) -> bytes:
+        name = args[0].decode().upper()
+        self.commands.append(name)
+        if name in ("SELECT", "AUTH"):
+            return b"+OK\r\n"
+        if name == "GET":
+            return self._bulk(self.values[args[1]] if self._alive(args[1]) else None)
+        if name == "SET":
+            key, value, options = args[1], args[2], [a.decode().upper() for a in args[3:]]
+            if "NX" in options and self._alive(key):
+                return b"$-1\r\n"
+            self.values[key] = value
+            self.expires.pop(key, None)
+            if "PX" in options:
+                self.expires[key] = time.monotonic() + int(options[options.index("PX") + 1]) / 1000
+            return b"+OK\r\n"
+        if name == "DEL":
+            deleted = 0
+            for key in args[1:]:
+                if self._alive(key):
+                    del self.values[key]
+                    deleted += 1
+                if self.sets.pop(key, None) is not None:
+                    deleted += 1
+            return b":%d\r\n" % deleted
+        if name == "INCR":
+            value = int(self.values[args[1]]) + 1 if self._alive(args[1]) else 1
+            self.values[args[1]] = str(value).encode()
+            return b":%d\r\n" % value
+        if name == "SADD":
+            current = self.sets.setdefault(args[1], set())
+            added = len(set(args[2:]) - current)
+            current.update(args[2:])
+            return b":%d\r\n" % added
+        if name == "SREM":
+            current = self.sets.get(args[1], set())
+            removed = len(current & set(args[2:]))
+            current.difference_update(args[2:])
+            if not current:
+                self.sets.pop(args[1], None)
+            return b":%d\r\n" % removed
+        if name == "SMEMBERS":
+            members = self.sets.get(args[1], set())
+            return b"*%d\r\n" % len(members) + b"".join(self._bulk(m) for m in members)
+        if name == "SCARD":
+            return b":%d\r\n" % len(self.sets.get(args[1], ()))
+        if name == "EVAL" and args[1].decode() == RELEASE_LOCK_SCRIPT:
+            key, token = args[3], args[4]
+            if self._alive(key) and self.values[key] == token:
+                del self.values[key]
+                return b":1\r\n"
+            return b":0\r\n"
+        return b"-ERR unknown command '%s'\r\n" % name.encode()
+
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self.connections.add(task)
+        try:
+            while (args := await self._read_command(reader)) is not None:
+                reply = self._run(args)
+                await asyncio.sleep(self.delay)
+                writer.write(reply)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections.discard(task)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+
+@pytest.fixture
+async def redis_server():
+    server = StandInRedis()
+    await server.start()
+    yield server
+    await server.stop()
+
+
+@pytest.fixture(params=["memory", "redis"])
+async def backend(request, redis_server):
+    if request.param == "memory":
+        yield MemoryStateBackend()
+        return
+    backend = RedisStateBackend(f"redis://127.0.0.1:{redis_server.port}/2")
+    yield backend
+    await backend.close()
+
+
+class TestStateBackend:
+    """メモリ版とRedis版で共通の動作のテスト"""
+
+    async def test_values(self, backend):
+        assert await backend.get("a") is None
+        assert await backend.put("a", 1)
+        assert await backend.get("a") == "1"
+        assert not await backend.put("a", 2, nx=True)
+        assert await backend.incr("a") == 2
+        assert await backend.incr("b") == 1
+        assert await backend.delete("a", "b") == 2
+        assert await backend.get("a") is None
+
+    async def test_ttl(self, backend):
+        await backend.put("a", "x", ttl=0.01)
+        await asyncio.sleep(0.03)
+
+        assert await backend.get("a") is None
+        assert await backend.put("a", "y", nx=True)
+
+    async def test_sets(self, backend):
+        assert await backend.sadd("s", 1, 2, 3) == 3
+        assert await backend.sadd("s", 3, 4) == 1
+        assert await backend.srem("s", 1, 9) == 1
+        assert await backend.smembers("s") == {"2", "3", "4"}
+        assert await backend.scard("s") == 3
+        assert await backend.smembers("missing") == set()
+
+    async def test_lock_is_exclusive(self, backend):
+        active = 0
+        max_active = 0
+
+        async def worker():
+            nonlocal active, max_active
+            async with backend.lock("message"):
+                active += 1
+                max_active = max(max_active, active)
+                await asyncio.sleep(0.01)
+                active -= 1
+
+        await asyncio.gather(*(worker() for _ in range(3)))
+
+        assert max_active == 1
+
+
+class TestRedisStateBackend:
+    """Redis版に固有の動作のテスト"""
+
+    async def test_selects_database_and_prefixes_keys(self, redis_server):
+        backend = RedisStateBackend(f"redis://127.0.0.1:{redis_server.port}/3", prefix="test")
+
+        await backend.put("a", "1")
+
+        assert redis_server.commands[0] == "SELECT"
+        assert b"test:a" in redis_server.values
+        await backend.close()
+
+    async def test_lock_is_shared_between_processes(self, redis_server):
+        url = f"redis://127.0.0.1:{redis_server.port}"
+        first, second = RedisStateBackend(url), RedisStateBackend(url)
+        order = []
+
+        async def hold(backend, name):
+            async with backend.lock("message"):
+                order.append(f"{name}-start")
+                await asyncio.sleep(0.02)
+                order.append(f"{name}-end")
+
+        await asyncio.gather(hold(first, "a"), hold(second, "b"))
+
+        assert order in (["a-start", "a-end", "b-start", "b-end"], ["b-start", "b-end", "a-start", "a-end"])
+        await first.close()
+        await second.close()
+
+    async def test_expired_lock_is_not_released_by_previous_holder(self, redis_server):
+        """保持時間を超えて他のプロセスが取得したロックは、前の保持者の解放で消さない"""
+        url = f"redis://127.0.0.1:{redis_server.port}"
+        first, second = RedisStateBackend(url, lock_timeout=0.01), RedisStateBackend(url)
+
+        async with first.lock("message"):
+            await asyncio.sleep(0.02)
+            # first の保持時間が切れたので second が取得できる
+            assert await second.put("lock:message", "second-token", nx=True)
+
+        assert await second.get("lock:message") == "second-token"
+        assert "EVAL" in redis_server.commands
+        await first.close()
+        await second.close()
+
+    async def test_error_reply_raises(self, redis_server):
+        backend = RedisStateBackend(f"redis://127.0.0.1:{redis_server.port}")
+
+        with pytest.raises(RedisError):
+            await backend.execute("FLUSHALL")
+        # エラー応答の後も同じ接続を使い続けられる
+        assert await backend.get("a") is None
+        await backend.close()
+
+    async def test_reconnects_after_disconnect(self, redis_server):
+        backend = RedisStateBackend(f"redis://127.0.0.1:{redis_server.port}")
+        await backend.put("a", "1")
+        backend._writer.close()
+        await asyncio.sleep(0)
+
+        with pytest.raises((ConnectionError, OSError)):
+            await backend.get("a")
+        assert await backend.get("a") == "1"
+        await backend.close()
+
+    async def test_cancelled_command_does_not_leak_reply(self, redis_server):
+        """応答を待っている間にキャンセルされても、その応答を次のコマンドの応答として読まない"""
+        backend = RedisStateBackend(f"redis://127.0.0.1:{redis_server.port}")
+        await backend.put("first", "1")
+        await backend.put("second", "2")
+
+        redis_server.delay = 0.05
+        task = asyncio.create_task(backend.get("first"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        redis_server.delay = 0.0
+
+        assert await backend.get("second") == "2"
+        await backend.close()
+
+    def test_rejects_unknown_scheme(self):
+        with pytest.raises(ValueError):
+            RedisStateBackend("http://localhost")
+
+
+class TestSharedPinIndex:
+    """ステートバックエンド上のピン留めインデックスのテスト"""
+
+    async def test_reactors_are_shared(self, backend):
+        index_a, index_b = SharedPinIndex(backend), SharedPinIndex(backend)
+
+        await index_a.set_reactors(1, 10, 100, {111, 222})
+        await index_a.add_reactor(1, 10, 101, 333)
+
+        assert await index_b.get_reactors(100) == {111, 222}
+        assert await index_b.channel_message_ids(10) == {100, 101}
+        assert await index_b.remove_reactor(100, 111) == {222}
+        assert await index_a.get_reactors(100) == {222}
+        assert await index_b.get_reactors(999) is None
+        assert await index_b.remove_reactor(999, 111) is None
+        assert len(index_a) == 2
+
+    async def test_remove_message(self, backend):
+        index = SharedPinIndex(backend)
+        await index.set_reactors(1, 10, 100, {111})
+
+        await index.remove_message(100)
+
+        assert await index.get_reactors(100) is None
+        assert await index.channel_message_ids(10) == set()
+        assert len(index) == 0
+
+    async def test_reconcile_channel(self, backend):
+        index = SharedPinIndex(backend)
+        await index.set_reactors(1, 10, 100, {111})
+        await index.set_reactors(1, 10, 101, {111})
+
+        await index.reconcile_channel(1, 10, [(101, {222}), (102, set())])
+
+        assert await index.channel_message_ids(10) == {101, 102}
+        assert await index.get_reactors(101) == {222}
+        assert await index.get_reactors(102) == set()
+        assert len(index) == 2
+
+
+class TestSharedPinCache:
+    """プロセス間でのキャッシュの無効化のテスト"""
+
+    async def test_invalidate_reaches_other_process(self, backend):
+        channel = MagicMock(id=10)
+        results = iter([["a"], ["a"], ["b"]])
+
+        async def pins(pinned):
+            for pin in pinned:
+                yield pin
+
+        channel.pins = MagicMock(side_effect=lambda limit=50: pins(next(results)))
+        cache_a = PinListCache(backend=backend)
+        cache_b = PinListCache(backend=backend)
+
+        assert await cache_a.get_pins(channel) == ["a"]
+        assert await cache_b.get_pins(channel) == ["a"]
+
+        # 別のプロセスで invalidate されたら再取得する
+        await cache_a.invalidate(10)
+        assert await cache_b.get_pins(channel) == ["b"]
+        assert await cache_b.get_pins(channel) == ["b"]
+        assert channel.pins.call_count == 3
@@ -1,4 +1,4 @@
-"""UnpinSelectView のユニットテスト"""
+"""まとめてピン留め解除用のSelect/Button のユニットテスト"""
 import pytest
 from unittest.mock import MagicMock, AsyncMock
 from datetime import datetime, timezone
@@ -6,7 +6,21 @@ from datetime import datetime, timezone
 import sys
 sys.path.insert(0, '/Users/fujiemon/dev/PinnedDiscordBot')
 
-from views.unpin_view import UnpinSelect, UnpinSelectView
+from views.pinned_list_view import PinnedListView
+from views.unpin_view import UnpinSelect
+
+
+async def create_view(pins, user_id=111111111, timeout=180.0, on_unpinned=None):
+    """全てのピン留めを自分だけのものとして表示した PinnedListView（解除用のSelect/Buttonを載せる）"""
+
+    async def resolve(page):
+        return [(pin, {user_id}) for pin in page]
+
+    view = PinnedListView(
+        pins, user_id=user_id, resolve=resolve, title="一覧", guild_id=1, timeout=timeout, on_unpinned=on_unpinned
+    )
+    await view.render_page(0)
+    return view
 
 
 class TestUnpinSelect:
@@ -64,19 +78,19 @@ class TestUnpinSelect:
         assert select.min_values == 0
 
 
-class TestUnpinSelectView:
-    """UnpinSelectView のテスト"""
+class TestUnpinControls:
+    """一覧に載せる解除用のSelect/Button のテスト"""
 
     async def test_view_has_select_and_buttons(self, mock_pins):
         """ViewにSelect、適用ボタン、キャンセルボタンが含まれる"""
-        view = UnpinSelectView(mock_pins, user_id=111111111)
+        view = await create_view(mock_pins, user_id=111111111)
 
         # コンポーネント数をチェック（Select + Button x 2）
         assert len(view.children) == 3
 
     async def test_interaction_check_allows_owner(self, mock_pins, mock_interaction):
         """コマンド実行者は操作可能"""
-        view = UnpinSelectView(mock_pins, user_id=111111111)
+        view = await create_view(mock_pins, user_id=111111111)
         mock_interaction.user.id = 111111111
 
         result = await view.interaction_check(mock_interaction)
@@ -85,7 +99,7 @@ class TestUnpinSelectView:
 
     async def test_interaction_check_denies_others(self, mock_pins, mock_interaction):
         """コマンド実行者以外は操作不可"""
-        view = UnpinSelectView(mock_pins, user_id=111111111)
+        view = await create_view(mock_pins, user_id=111111111)
         mock_interaction.user.id = 999999999  # 別のユーザー
 
         result = await view.interaction_check(mock_interaction)
@@ -100,7 +114,7 @@ class TestCancelButton:
         """キャンセルボタンでViewがクリアされる"""
         from views.unpin_view import CancelButton
 
-        view = UnpinSelectView(mock_pins, user_id=111111111)
+        view = await create_view(mock_pins, user_id=111111111)
         cancel_button = None
         for child in view.children:
             if isinstance(child, CancelButton):
@@ -124,7 +138,7 @@ class TestApplyButton:
         """適用ボタンで選択メッセージがunpinされる"""
         from views.unpin_view import ApplyButton
 
-        view = UnpinSelectView(mock_pins, user_id=111111111)
+        view = await create_view(mock_pins, user_id=111111111)
         view.selected_message_ids = [mock_pins[0].id, mock_pins[1].id]
 
         apply_button = None
@@ -143,15 +157,17 @@ class TestApplyButton:
         # 他のピンは呼ばれていない
         mock_pins[2].unpin.assert_not_called()
 
-        # 結果メッセージを確認
-        call_kwargs = mock_interaction.response.edit_message.call_args.kwargs
+        # 先に defer し、結果は元のメッセージの編集で表示する
+        mock_interaction.response.defer.assert_awaited_once()
+        call_kwargs = mock_interaction.edit_original_response.call_args.kwargs
         assert "2件" in call_kwargs["content"]
+        assert call_kwargs["view"] is None
 
     async def test_apply_button_no_selection(self, mock_pins, mock_interaction):
         """未選択時はエラーメッセージ"""
         from views.unpin_view import ApplyButton
 
-        view = UnpinSelectView(mock_pins, user_id=111111111)
+        view = await create_view(mock_pins, user_id=111111111)
         view.selected_message_ids = []
 
         apply_button = None
@@ -175,7 +191,7 @@ class TestApplyButton:
         # 2つ目は成功
         mock_pins[1].unpin = AsyncMock()
 
-        view = UnpinSelectView(mock_pins, user_id=111111111)
+        view = await create_view(mock_pins, user_id=111111111)
         view.selected_message_ids = [mock_pins[0].id, mock_pins[1].id]
 
         apply_button = None
@@ -189,8 +205,11 @@ class TestApplyButton:
         # 両方呼ばれたが、成功は1件のみ
         mock_pins[0].unpin.assert_called_once()
         mock_pins[1].unpin.assert_called_once()
-        call_kwargs = mock_interaction.response.edit_message.call_args.kwargs
-        assert "1件" in call_kwargs["content"]
+        call_kwargs = mock_interaction.edit_original_response.call_args.kwargs
+        assert "1件のピン留めを解除しました" in call_kwargs["content"]
+        # 失敗したメッセージも報告される
+        assert "1件の解除に失敗しました" in call_kwargs["content"]
+        assert "権限がありません" in call_kwargs["content"]
 
 
 class TestViewTimeout:
@@ -198,10 +217,85 @@ class TestViewTimeout:
 
     async def test_view_has_timeout(self, mock_pins):
         """Viewにタイムアウトが設定されている"""
-        view = UnpinSelectView(mock_pins, user_id=111111111)
+        view = await create_view(mock_pins, user_id=111111111)
         assert view.timeout == 180.0
 
     async def test_view_custom_timeout(self, mock_pins):
         """カスタムタイムアウトを設定できる"""
-        view = UnpinSelectView(mock_pins, user_id=111111111, timeout=60.0)
+        view = await create_view(mock_pins, user_id=111111111, timeout=60.0)
         assert view.timeout == 60.0
+
+
+class TestParallelUnpin:
+    """並列ピン留め解除のテスト"""
+
+    async def test_unpins_run_concurrently_with_bound(self, mock_interaction):
+        """ピン留め解除は上限付きで並列に実行される"""
+        import asyncio
+        from views.unpin_view import ApplyButton, UNPIN_CONCURRENCY
+
+        running = 0
+        peak = 0
+
+        async def slow_unpin():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        pins = []
+        for i in range(10):
+            pin = MagicMock()
+            pin.id = 100 + i
+            pin.content = f"メッセージ {i}"
+            pin.created_at = datetime.now(timezone.utc)
+            pin.unpin = AsyncMock(side_effect=slow_unpin)
+            pins.append(pin)
+
+        view = await create_view(pins, user_id=111111111)
+        view.selected_message_ids = [p.id for p in pins]
+        apply_button = next(c for c in view.children if isinstance(c, ApplyButton))
+
+        await apply_button.callback(mock_interaction)
+
+        assert peak == UNPIN_CONCURRENCY
+        call_kwargs = mock_interaction.edit_original_response.call_args.kwargs
+        assert "10件" in call_kwargs["content"]
+
+    async def test_progress_is_reported(self, mock_pins, mock_interaction, monkeypatch):
+        """解除中の進捗が元のメッセージに表示される"""
+        import views.unpin_view
+        from views.unpin_view import ApplyButton
+
+        monkeypatch.setattr(views.unpin_view, "PROGRESS_INTERVAL", 0.0)
+        view = await create_view(mock_pins, user_id=111111111)
+        view.selected_message_ids = [p.id for p in mock_pins]
+        apply_button = next(c for c in view.children if isinstance(c, ApplyButton))
+
+        await apply_button.callback(mock_interaction)
+
+        contents = [c.kwargs["content"] for c in mock_interaction.edit_original_response.call_args_list]
+        assert contents[0] == "⏳ ピン留めを解除しています... (0/5)"
+        assert any("(3/5)" in c for c in contents)
+        assert "5件" in contents[-1]
+
+
+class TestOnUnpinnedCallback:
+    """解除完了コールバックのテスト"""
+
+    async def test_callback_receives_unpinned_messages(self, mock_pins, mock_interaction):
+        """解除に成功したメッセージだけがコールバックに渡される"""
+        import discord
+        from views.unpin_view import ApplyButton
+
+        mock_pins[1].unpin = AsyncMock(side_effect=discord.Forbidden(MagicMock(), "No permission"))
+        on_unpinned = AsyncMock()
+
+        view = await create_view(mock_pins, user_id=111111111, on_unpinned=on_unpinned)
+        view.selected_message_ids = [mock_pins[0].id, mock_pins[1].id]
+        apply_button = next(c for c in view.children if isinstance(c, ApplyButton))
+
+        await apply_button.callback(mock_interaction)
+
+        on_unpinned.assert_awaited_once_with([mock_pins[0]])
@@ -0,0 +1,65 @@
+"""ユーザー名の解決のテスト"""
+from unittest.mock import AsyncMock, MagicMock
+
+from services.user_resolver import UserResolver, mention
+
+
+def make_user(user_id, name):
+    user = MagicMock()
+    user.id = user_id
+    user.name = name
+    return user
+
+
+def make_client(cached=None):
+    client = MagicMock()
+    client.get_user.side_effect = lambda user_id: (cached or {}).get(user_id)
+    client.fetch_user = AsyncMock(side_effect=lambda user_id: make_user(user_id, f"fetched{user_id}"))
+    return client
+
+
+class TestUserResolver:
+    """UserResolver のテスト"""
+
+    def test_mention_needs_no_lookup(self):
+        assert mention(123) == "<@123>"
+
+    def test_payload_member_is_used_first(self):
+        client = make_client()
+        resolver = UserResolver(client)
+
+        resolver.remember(make_user(1, "alice"))
+
+        assert resolver.name(1) == "alice"
+        client.get_user.assert_not_called()
+        client.fetch_user.assert_not_called()
+
+    def test_falls_back_to_client_cache_then_id(self):
+        client = make_client({2: make_user(2, "bob")})
+        resolver = UserResolver(client)
+
+        assert resolver.name(2) == "bob"
+        assert resolver.name(3) == "3"
+        assert resolver.hits == 1
+        assert resolver.misses == 1
+        # ログ用の解決ではRESTを呼ばない
+        client.fetch_user.assert_not_called()
+
+    def test_remember_ignores_none(self):
+        resolver = UserResolver(make_client())
+
+        resolver.remember(None)
+
+        assert len(resolver) == 0
+
+    def test_lru_evicts_oldest(self):
+        resolver = UserResolver(make_client(), maxsize=2)
+        resolver.remember(make_user(1, "a"))
+        resolver.remember(make_user(2, "b"))
+        resolver.name(1)  # 1 を最近使ったものにする
+
+        resolver.remember(make_user(3, "c"))
+
+        assert resolver.cached_name(2) is None
+        assert resolver.cached_name(1) == "a"
+        assert resolver.cached_name(3) == "c"
@@ -0,0 +1,161 @@
+"""PinWarmup のユニットテスト"""
+import asyncio
+from unittest.mock import MagicMock
+
+import discord
+
+from services.rest_scheduler import Priority, current_priority
+from services.warmup import PinWarmup, accessible_channels
+
+
+def create_channel(channel_id, readable=True):
+    """モック TextChannel"""
+    channel = MagicMock()
+    channel.id = channel_id
+    channel.name = f"channel-{channel_id}"
+    permissions = MagicMock()
+    permissions.view_channel = readable
+    permissions.read_message_history = readable
+    channel.permissions_for.return_value = permissions
+    return channel
+
+
+def http_error(cls, status):
+    response = MagicMock()
+    response.status = status
+    return cls(response, "error")
+
+
+class RecordingWarm:
+    """読み込みを記録する warm_channel"""
+
+    def __init__(self, delay=0.0, errors=None):
+        self.delay = delay
+        self.errors = errors or {}
+        self.calls = []
+        self.priorities = []
+        self.running = 0
+        self.peak = 0
+
+    async def __call__(self, channel):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        self.priorities.append(current_priority())
+        await asyncio.sleep(self.delay)
+        self.running -= 1
+        self.calls.append(channel.id)
+        if channel.id in self.errors:
+            raise self.errors[channel.id]
+        return 3
+
+
+class TestPinWarmup:
+    """PinWarmup のテスト"""
+
+    async def test_warms_all_channels_with_bounded_concurrency(self):
+        warm = RecordingWarm(delay=0.01)
+        warmup = PinWarmup(warm, concurrency=2, rate=0)
+
+        assert warmup.schedule([create_channel(i) for i in range(6)]) == 6
+        await warmup.wait()
+
+        assert sorted(warm.calls) == list(range(6))
+        assert warm.peak == 2
+        assert warmup.progress() == {"total": 6, "done": 6, "failed": 0, "skipped": 0, "pending": 0, "pins": 18}
+        # REST呼び出しは最も低い優先度で送る
+        assert set(warm.priorities) == {Priority.WARMUP}
+
+    async def test_duplicate_channels_are_not_queued(self):
+        warm = RecordingWarm(delay=0.01)
+        warmup = PinWarmup(warm, concurrency=1, rate=0)
+
+        warmup.schedule([create_channel(1), create_channel(2)])
+        # 再接続とギルド参加が重なっても、待っているチャンネルは追加しない
+        assert warmup.schedule([create_channel(2), create_channel(3)]) == 1
+        await warmup.wait()
+
+        assert sorted(warm.calls) == [1, 2, 3]
+        # 終わったチャンネルは再び追加できる（再接続時のリコンシリエーション）
+        assert warmup.schedule([create_channel(1)]) == 1
+        await warmup.wait()
+        assert warm.calls.count(1) == 2
+
+    async def test_errors_are_counted(self):
+        warm = RecordingWarm(errors={
+            1: http_error(discord.Forbidden, 403),
+            2: http_error(discord.HTTPException, 500),
+            3: RuntimeError("unexpected"),
+        })
+        warmup = PinWarmup(warm, concurrency=1, rate=0)
+
+        warmup.schedule([create_channel(i) for i in range(1, 5)])
+        await warmup.wait()
+
+        progress = warmup.progress()
+        assert (progress["done"], progress["skipped"], progress["failed"]) == (1, 1, 2)
+
+    async def test_rate_spaces_channel_starts(self):
+        warm = RecordingWarm()
+        warmup = PinWarmup(warm, concurrency=4, rate=50)
+        loop = asyncio.get_running_loop()
+
+        start = loop.time()
+        warmup.schedule([create_channel(i) for i in range(5)])
+        await warmup.wait()
+
+        # 5チャンネルの開始に 4 × 1/50 秒以上かかる
+        assert loop.time() - start >= 0.08
+
+    async def test_warm_channels_until_forgotten(self):
+        warmup = PinWarmup(RecordingWarm(errors={2: http_error(discord.HTTPException, 500)}), rate=0)
+
+        warmup.schedule([create_channel(1), create_channel(2)])
+        await warmup.wait()
+
+        assert warmup.is_warm(1)
+        assert not warmup.is_warm(2)  # 失敗したチャンネル
+        warmup.forget(1)
+        assert not warmup.is_warm(1)
+
+    async def test_change_during_load_is_not_warm(self):
+        """読み込み中にピン留めが変化したチャンネルは読み込み済みとして扱わない"""
+        warm = RecordingWarm(delay=0.05)
+        warmup = PinWarmup(warm, rate=0)
+        warmup.schedule([create_channel(1)])
+        while not warm.running:
+            await asyncio.sleep(0)
+
+        warmup.forget(1)
+        await warmup.wait()
+
+        assert not warmup.is_warm(1)
+
+    async def test_close_cancels_job(self):
+        warmup = PinWarmup(RecordingWarm(delay=10), rate=0)
+        warmup.schedule([create_channel(1)])
+
+        await asyncio.wait_for(warmup.close(), 1.0)
+
+        assert not warmup.running
+
+
+def test_accessible_channels():
+    guild = MagicMock()
+    guild.text_channels = [create_channel(1), create_channel(2, readable=False)]
+
+    assert [c.id for c in accessible_channels(guild)] == [1]
+    guild.me = None
+    assert [c.id for c in accessible_channels(guild)] == [1, 2]
+
+
+def test_accessible_channels_for_member():
+    """Botが読めても、実行したユーザーが読めないチャンネルは除く"""
+    guild = MagicMock()
+    member = MagicMock()
+    private = create_channel(2)
+    no_history = MagicMock(view_channel=True, read_message_history=False)
+    private.permissions_for.side_effect = lambda who: no_history if who is member else MagicMock()
+    guild.text_channels = [create_channel(1), private]
+
+    assert [c.id for c in accessible_channels(guild)] == [1, 2]
+    assert [c.id for c in accessible_channels(guild, member)] == [1]
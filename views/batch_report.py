@@ -0,0 +1,63 @@
+"""/pinbatch の途中経過と結果の表示"""
+import discord
+
+# 結果に一覧表示する、ピン留め・解除できなかったメッセージの件数
+MAX_FAILURES_SHOWN = 10
+
+ACTION_LABELS = {"pin": "ピン留め", "unpin": "ピン留め解除"}
+STATUS_LABELS = {
+    "pin": {"done": "📌 ピン留めしました", "skipped": "⏭️ 既にピン留め済み"},
+    "unpin": {"done": "✅ 解除しました", "skipped": "⏭️ ピン留めされていません"},
+}
+FAILURE_LABELS = {
+    "not_found": "見つかりません",
+    "forbidden": "権限がありません",
+    "failed": "失敗しました",
+}
+
+
+def format_failure(failure, guild_id: int) -> str:
+    """ピン留め・解除できなかったメッセージの1行分の表示"""
+    link = f"https://discord.com/channels/{guild_id}/{failure.channel_id}/{failure.message_id}"
+    detail = f"（{failure.detail}）" if failure.detail else ""
+    return f"• {link} - {FAILURE_LABELS[failure.status]}{detail}"
+
+
+def batch_report_embed(job, counts, failures: list) -> discord.Embed:
+    """ジョブの途中経過（完了していなければ）または結果のEmbed
+
+    Args:
+        job: BatchJob
+        counts: 結果ごとのメッセージ数（collections.Counter）
+        failures: ピン留め・解除できなかったメッセージ（先頭から MAX_FAILURES_SHOWN 件を表示する）
+    """
+    total = sum(counts.values())
+    processed = total - counts["pending"]
+    labels = STATUS_LABELS[job.action]
+    lines = [
+        f"{labels['done']}: {counts['done']} 件",
+        f"{labels['skipped']}: {counts['skipped']} 件",
+    ]
+    failed = sum(counts[status] for status in FAILURE_LABELS)
+    if failed:
+        lines.append(f"❌ できませんでした: {failed} 件")
+    if job.duplicates:
+        lines.append(f"🔁 重複したリンク: {job.duplicates} 件")
+    if job.invalid:
+        lines.append(f"⚠️ 無効なリンク: {len(job.invalid)} 件")
+    if failures:
+        lines.append("")
+        lines.extend(format_failure(failure, job.guild_id) for failure in failures[:MAX_FAILURES_SHOWN])
+        if failed > MAX_FAILURES_SHOWN:
+            lines.append(f"...ほか {failed - MAX_FAILURES_SHOWN} 件")
+
+    embed = discord.Embed(
+        title=f"🗂️ まとめて{ACTION_LABELS[job.action]}（ジョブ #{job.job_id}）",
+        description="\n".join(lines),
+        color=discord.Color.gold() if job.finished else discord.Color.light_grey()
+    )
+    if job.finished:
+        embed.set_footer(text=f"完了 {processed}/{total} 件")
+    else:
+        embed.set_footer(text=f"⏳ 処理中... {processed}/{total} 件")
+    return embed
@@ -0,0 +1,168 @@
+"""ページ送りできるピン留め一覧のView"""
+import discord
+from discord import ui
+
+from services.pin_archive import ArchivedPin
+from services.pin_fetcher import is_self_only
+from services.rest_scheduler import Priority, rest_priority
+from views.unpin_view import ApplyButton, CancelButton, UnpinSelect
+
+# 1ページに表示する件数の既定値（解除用Selectの上限25件以下）
+DEFAULT_PAGE_SIZE = 10
+
+
+def _preview_link(pin, guild_id) -> str:
+    """メッセージ冒頭のプレビューとリンク"""
+    # メッセージ冒頭の10文字を取得（改行を除去）
+    content_preview = pin.content.replace('\n', ' ')[:10]
+    if len(pin.content) > 10:
+        content_preview += "..."
+
+    # メッセージが空の場合（画像のみなど）
+    if not content_preview.strip():
+        content_preview = "[添付ファイル/埋め込み]"
+
+    # メッセージリンクを作成
+    message_link = f"https://discord.com/channels/{guild_id}/{pin.channel.id}/{pin.id}"
+    return f"[{content_preview}]({message_link})"
+
+
+def format_pin_line(pin, reactors: set[int], user_id: int, guild_id, show_channel: bool = False) -> str:
+    """一覧の1行分の表示を作成する（show_channel: サーバー全体の一覧ではチャンネルも表示する）"""
+    suffix = f" <#{pin.channel.id}>" if show_channel else ""
+    if isinstance(pin, ArchivedPin):
+        suffix += " 🗄️"  # ピン留めの上限を超えてアーカイブしたもの
+    if is_self_only(reactors, user_id):
+        # 自分だけがピン留め: 解除可能
+        return f"📌 {_preview_link(pin, guild_id)}{suffix}"
+    # 他人もピン留め or 自分はピン留めしていない: 解除不可
+    return f"🔒 {_preview_link(pin, guild_id)} *by {pin.author.display_name}*{suffix}"
+
+
+def progress_embed(title: str, pins: list, done: int, total: int, guild_id, preview: int = DEFAULT_PAGE_SIZE) -> discord.Embed:
+    """サーバー全体の一覧を読み込み中に表示する途中経過
+
+    📌/🔒の判定はせず、見つかったピン留めのうち新しいものから preview 件を表示する。
+    """
+    newest = sorted(pins, key=lambda p: p.created_at, reverse=True)[:preview]
+    embed = discord.Embed(title=title, color=discord.Color.light_grey())
+    embed.description = "\n".join(
+        f"• {_preview_link(pin, guild_id)} <#{pin.channel.id}>" for pin in newest
+    ) or "（まだ見つかっていません）"
+    embed.set_footer(text=f"⏳ 読み込み中... {done}/{total} チャンネル | 見つかった件数 {len(pins)} 件")
+    return embed
+
+
+class PageButton(ui.Button):
+    """前/次のページへ移動するボタン"""
+
+    def __init__(self, label: str, step: int, disabled: bool):
+        super().__init__(
+            label=label,
+            style=discord.ButtonStyle.primary,
+            disabled=disabled,
+            row=1
+        )
+        self.step = step
+
+    async def callback(self, interaction: discord.Interaction):
+        view: PinnedListView = self.view
+        # ページの📌判定にRESTが必要な場合があるため先に defer する
+        await interaction.response.defer()
+        # 操作したユーザーが表示を待っているため、一覧の更新より先に送り出す
+        with rest_priority(Priority.RESPONSE):
+            embed = await view.render_page(view.page + self.step)
+        await interaction.edit_original_response(embed=embed, view=view)
+
+
+class PinnedListView(ui.View):
+    """ピン留め一覧をページ単位で表示し、表示中のページの自分のピン留めを解除できるView
+
+    📌/🔒の判定（メッセージの再取得やリアクションユーザーの解決）は
+    表示するページの分だけ行う。
+    """
+
+    def __init__(
+        self,
+        pins: list,
+        user_id: int,
+        resolve,
+        title: str,
+        guild_id,
+        period_text: str = "",
+        page_size: int = DEFAULT_PAGE_SIZE,
+        timeout: float = 180.0,
+        on_unpinned=None,
+        show_channel: bool = False,
+    ):
+        """
+        Args:
+            pins: 表示するピン留めメッセージ（フィルタ済み）
+            user_id: 操作を許可するユーザーID
+            resolve: ピン留めのリストを受け取り (メッセージ, 📌リアクションユーザー) のリストを返すコルーチン関数
+            title: Embedのタイトル
+            guild_id: メッセージリンク用のギルドID
+            period_text: フッターに表示する期間の説明
+            page_size: 1ページの件数
+            timeout: タイムアウト秒数
+            on_unpinned: 解除に成功したメッセージのリストを受け取るコルーチン関数（任意）
+            show_channel: 各行にチャンネルを表示する（サーバー全体の一覧）
+        """
+        super().__init__(timeout=timeout)
+        self.pins = pins
+        self.user_id = user_id
+        self.resolve = resolve
+        self.title = title
+        self.guild_id = guild_id
+        self.period_text = period_text
+        self.page_size = max(1, min(page_size, 25))
+        self.on_unpinned = on_unpinned
+        self.show_channel = show_channel
+        self.page = 0
+        self.selected_message_ids: list[int] = []
+        self.pins_by_id: dict = {}
+
+    @property
+    def page_count(self) -> int:
+        return max(1, -(-len(self.pins) // self.page_size))
+
+    async def render_page(self, page: int) -> discord.Embed:
+        """指定ページのEmbedを作成し、ページに合わせてボタン等を組み直す"""
+        self.page = max(0, min(page, self.page_count - 1))
+        start = self.page * self.page_size
+        refreshed = await self.resolve(self.pins[start:start + self.page_size])
+
+        message_list = []
+        my_pins = []
+        for pin, reactors in refreshed:
+            message_list.append(format_pin_line(pin, reactors, self.user_id, self.guild_id, self.show_channel))
+            if is_self_only(reactors, self.user_id):
+                my_pins.append(pin)
+
+        embed = discord.Embed(title=self.title, color=discord.Color.gold())
+        embed.description = "\n".join(message_list) or "（このページのメッセージは削除されています）"
+
+        footer_text = f"合計 {len(self.pins)} 件{self.period_text}"
+        if self.page_count > 1:
+            footer_text += f" | ページ {self.page + 1}/{self.page_count}"
+        if my_pins:
+            footer_text += f" | 📌 自分: {len(my_pins)}件（解除可能）"
+        else:
+            footer_text += " | 自分のピン留めはありません"
+        embed.set_footer(text=footer_text)
+
+        self.clear_items()
+        self.selected_message_ids = []
+        self.pins_by_id = {pin.id: pin for pin in my_pins}
+        if my_pins:
+            self.add_item(UnpinSelect(my_pins))
+            self.add_item(ApplyButton())
+            self.add_item(CancelButton())
+        if self.page_count > 1:
+            self.add_item(PageButton("◀ 前へ", -1, disabled=self.page == 0))
+            self.add_item(PageButton("次へ ▶", 1, disabled=self.page >= self.page_count - 1))
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        """コマンド実行者のみ操作可能"""
+        return interaction.user.id == self.user_id
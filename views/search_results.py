@@ -0,0 +1,47 @@
+"""/pinsearch の検索結果の表示"""
+import discord
+
+# 一致した箇所の前後に表示する文字数
+SNIPPET_BEFORE = 10
+SNIPPET_AFTER = 20
+
+
+def snippet(content: str, query: str) -> str:
+    """本文のうち最初の検索語に一致した箇所の前後を切り出し、一致した部分を太字にする"""
+    text = content.replace('\n', ' ')
+    words = query.split()
+    start = text.casefold().find(words[0].casefold()) if words else -1
+    if start < 0:
+        # 正規化の違い（全角・半角など）で位置が分からない場合は冒頭を表示する
+        preview = discord.utils.escape_markdown(text[:SNIPPET_BEFORE + SNIPPET_AFTER])
+        return preview + ("..." if len(text) > SNIPPET_BEFORE + SNIPPET_AFTER else "")
+
+    end = start + len(words[0])
+    left = max(0, start - SNIPPET_BEFORE)
+    right = min(len(text), end + SNIPPET_AFTER)
+    before, matched, after = (discord.utils.escape_markdown(part) for part in (
+        text[left:start], text[start:end], text[end:right]
+    ))
+    return f"{'...' if left > 0 else ''}{before}**{matched}**{after}{'...' if right < len(text) else ''}"
+
+
+def format_search_hit(hit, query: str) -> str:
+    """検索結果の1行分の表示を作成する"""
+    # リンクの表示文字列の中では角括弧を使えないため全角にする
+    text = snippet(hit.content, query).replace("[", "［").replace("]", "］") or "[添付ファイル/埋め込み]"
+    message_link = f"https://discord.com/channels/{hit.guild_id}/{hit.channel_id}/{hit.message_id}"
+    return f"• [{text}]({message_link}) <#{hit.channel_id}> by <@{hit.author_id}>"
+
+
+def search_results_embed(query: str, hits: list, more: bool = False) -> discord.Embed:
+    """検索結果のEmbed（more: 表示した件数より多く一致している）"""
+    embed = discord.Embed(
+        title=f"🔍 「{query}」を含むピン留めメッセージ",
+        description="\n".join(format_search_hit(hit, query) for hit in hits),
+        color=discord.Color.gold()
+    )
+    footer = f"{len(hits)} 件"
+    if more:
+        footer = f"新しい順に {len(hits)} 件を表示（さらに一致するメッセージがあります）"
+    embed.set_footer(text=footer)
+    return embed
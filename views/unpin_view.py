@@ -1,7 +1,25 @@
-"""まとめてピン留め解除用のView/Select/Button"""
+"""まとめてピン留め解除用のSelect/Button（PinnedListView の表示中のページに載せる）"""
+import time
+
 import discord
 from discord import ui
 
+from services.concurrency import bounded_gather
+from services.metrics import PIN_ACTIONS
+
+# 同時に実行するピン留め解除の上限（同じチャンネルのピン留めAPIはレート制限を共有する）
+UNPIN_CONCURRENCY = 3
+# 進捗表示を更新する最小間隔（秒）
+PROGRESS_INTERVAL = 1.0
+
+
+def _preview(pin, length: int = 20) -> str:
+    """結果表示用のメッセージ冒頭"""
+    content = pin.content.replace("\n", " ").strip()
+    if not content:
+        return "[添付ファイル]"
+    return content[:length] + ("..." if len(content) > length else "")
+
 
 class UnpinSelect(ui.Select):
     """ピン留め解除対象を選択するSelectMenu"""
@@ -48,7 +66,7 @@ class ApplyButton(ui.Button):
         )
 
     async def callback(self, interaction: discord.Interaction):
-        view: UnpinSelectView = self.view
+        view = self.view  # PinnedListView
         selected_ids = view.selected_message_ids
 
         if not selected_ids:
@@ -59,25 +77,61 @@ class ApplyButton(ui.Button):
             )
             return
 
-        success_count = 0
-        for msg_id in selected_ids:
-            msg = view.pins_by_id.get(msg_id)
-            if msg:
-                try:
-                    await msg.unpin()
-                    success_count += 1
-                except discord.Forbidden:
-                    pass
-                except discord.HTTPException:
-                    pass
-
-        await interaction.response.edit_message(
-            content=f"📌 {success_count}件のピン留めを解除しました。",
-            embed=None,
-            view=None
+        # 3秒以内に応答するため先に defer し、二重実行を防ぐためViewを外す
+        await interaction.response.defer()
+        targets = [view.pins_by_id[i] for i in selected_ids if i in view.pins_by_id]
+        total = len(targets)
+        await self._report(interaction, f"⏳ ピン留めを解除しています... (0/{total})")
+
+        done = 0
+        last_report = time.monotonic()
+
+        async def report_progress(msg, result):
+            nonlocal done, last_report
+            done += 1
+            now = time.monotonic()
+            if done < total and now - last_report >= PROGRESS_INTERVAL:
+                last_report = now
+                await self._report(interaction, f"⏳ ピン留めを解除しています... ({done}/{total})")
+
+        results = await bounded_gather(
+            targets,
+            lambda msg: msg.unpin(),
+            UNPIN_CONCURRENCY,
+            on_done=report_progress
         )
+
+        unpinned = []
+        failures = []
+        for msg, result in zip(targets, results):
+            if isinstance(result, discord.Forbidden):
+                PIN_ACTIONS.inc(action="unpin", source="bulk", result="forbidden")
+                failures.append(f"• {_preview(msg)}: 権限がありません")
+            elif isinstance(result, BaseException):
+                PIN_ACTIONS.inc(action="unpin", source="bulk", result="error")
+                failures.append(f"• {_preview(msg)}: {result}")
+            else:
+                PIN_ACTIONS.inc(action="unpin", source="bulk", result="success")
+                unpinned.append(msg)
+        success_count = len(unpinned)
+
+        if unpinned and view.on_unpinned is not None:
+            await view.on_unpinned(unpinned)
+
+        content = f"📌 {success_count}件のピン留めを解除しました。"
+        if failures:
+            content += f"\n❌ {len(failures)}件の解除に失敗しました:\n" + "\n".join(failures)
+        await self._report(interaction, content[:2000])
         view.stop()
 
+    @staticmethod
+    async def _report(interaction: discord.Interaction, content: str):
+        """元のメッセージを編集して進捗・結果を表示する"""
+        try:
+            await interaction.edit_original_response(content=content, embed=None, view=None)
+        except discord.HTTPException:
+            pass  # 進捗表示の失敗で解除処理を止めない
+
 
 class CancelButton(ui.Button):
     """キャンセルボタン"""
@@ -97,25 +151,3 @@ class CancelButton(ui.Button):
         )
         self.view.stop()
 
-
-class UnpinSelectView(ui.View):
-    """まとめてピン留め解除用のView"""
-
-    def __init__(self, pins: list, user_id: int, timeout: float = 180.0):
-        super().__init__(timeout=timeout)
-        self.pins = pins
-        self.user_id = user_id
-        self.selected_message_ids: list[int] = []
-        self.pins_by_id = {pin.id: pin for pin in pins}
-
-        self.add_item(UnpinSelect(pins))
-        self.add_item(ApplyButton())
-        self.add_item(CancelButton())
-
-    async def interaction_check(self, interaction: discord.Interaction) -> bool:
-        """コマンド実行者のみ操作可能"""
-        return interaction.user.id == self.user_id
-
-    async def on_timeout(self):
-        """タイムアウト時の処理"""
-        pass